@@ -421,7 +421,7 @@ def create_app(config_class=Config):
             }
     
     from app.routes import auth, profile, admin, main, api, cinema, presence, legal, sitemap
-    from app.routes import api_v1
+    from app.routes import api_v1, jobs
     app.register_blueprint(auth.bp)
     app.register_blueprint(profile.bp)
     app.register_blueprint(admin.bp)
@@ -432,6 +432,7 @@ def create_app(config_class=Config):
     app.register_blueprint(legal.bp)
     app.register_blueprint(sitemap.bp)
     app.register_blueprint(api_v1.bp)
+    app.register_blueprint(jobs.bp)
     
     # Exemption CSRF pour toutes les routes API v1
     csrf.exempt(api_v1.bp)
@@ -440,10 +441,25 @@ def create_app(config_class=Config):
     from app.utils.activity_logger import init_activity_logging_middleware
     init_activity_logging_middleware(app)
     
+    # Compteur de requêtes SQL pour les budgets des vues de liste (tests / QUERY_BUDGET_ENABLED=1)
+    from app.utils.query_budget import init_query_counter
+    init_query_counter(app, db)
+    
+    # Statistiques précalculées : invalidation sur les écritures des utilisateurs et talents
+    from app.services.stats_service import StatsService
+    StatsService.init_app(app)
+    
+    # Cache HTTP des données de référence : invalidation sur les écritures talents / pays / villes
+    from app.utils.http_cache import init_reference_cache
+    init_reference_cache(app)
+    
     # Désactiver le cache pour éviter les problèmes avec les mises à jour
     @app.after_request
     def add_no_cache_headers(response):
         """Ajouter des en-têtes pour désactiver le cache navigateur"""
+        # Les réponses avec leur propre politique de cache (données de référence) la conservent
+        if 'Cache-Control' in response.headers:
+            return response
         # Ne pas mettre en cache les pages HTML et les données JSON
         if response.content_type and ('text/html' in response.content_type or 'application/json' in response.content_type):
             response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
@@ -11,12 +11,20 @@ from app.models.talent import Talent, UserTalent
 from app.models.location import Country, City
 from app.models.settings import AppSettings
 from app.models.cinema_talent import CinemaTalent
+from app.models.cinema_talent_attribute import CinemaTalentAttribute
 from app.models.production import Production
 from app.models.project import Project, ProjectTalent
-from app.models.attendance import Attendance
+from app.models.attendance import Attendance, AttendanceScan
 from app.models.activity_log import ActivityLog
+from app.models.activity_log_daily_stat import ActivityLogDailyStat
 from app.models.security_log import SecurityLog
 from app.models.email_log import EmailLog
+from app.models.email_outbox import EmailOutbox
 from app.models.name_tracking import NameTracking, NameTrackingMatch
+from app.models.ai_match_cache import AIMatchCache
+from app.models.background_job import BackgroundJob
+from app.models.stats_snapshot import StatsSnapshot
+from app.models.phone_search_token import PhoneSearchToken
+from app.models.code_sequence import CodeSequence
 
-__all__ = ['User', 'Talent', 'UserTalent', 'Country', 'City', 'AppSettings', 'CinemaTalent', 'Production', 'Project', 'ProjectTalent', 'Attendance', 'ActivityLog', 'SecurityLog', 'EmailLog', 'NameTracking', 'NameTrackingMatch']
+__all__ = ['User', 'Talent', 'UserTalent', 'Country', 'City', 'AppSettings', 'CinemaTalent', 'CinemaTalentAttribute', 'Production', 'Project', 'ProjectTalent', 'Attendance', 'AttendanceScan', 'ActivityLog', 'ActivityLogDailyStat', 'SecurityLog', 'EmailLog', 'EmailOutbox', 'NameTracking', 'NameTrackingMatch', 'AIMatchCache', 'BackgroundJob', 'StatsSnapshot', 'PhoneSearchToken', 'CodeSequence']
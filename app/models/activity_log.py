@@ -9,6 +9,12 @@ from app import db
 class ActivityLog(db.Model):
     """Modèle pour enregistrer toutes les activités des utilisateurs"""
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        # Filtres des pages de logs (type d'action, utilisateur, IP) sur une période
+        db.Index('ix_activity_logs_action_type_created_at', 'action_type', 'created_at'),
+        db.Index('ix_activity_logs_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_activity_logs_ip_address_created_at', 'ip_address', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
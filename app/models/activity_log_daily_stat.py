@@ -0,0 +1,34 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Agrégats quotidiens des logs d'activité
+Les logs bruts plus anciens que ACTIVITY_LOG_RETENTION_DAYS sont compactés
+en un compteur par jour, type d'action, catégorie, statut et type d'appareil
+(voir LogRetentionService)
+"""
+
+from app import db
+
+
+class ActivityLogDailyStat(db.Model):
+    """Nombre d'activités d'un jour pour une combinaison (action, catégorie, statut, appareil)"""
+    __tablename__ = 'activity_log_daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'action_type', 'action_category', 'status', 'device_type',
+                            name='uq_activity_log_daily_stats_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    action_type = db.Column(db.String(100), nullable=False)
+    action_category = db.Column(db.String(50), nullable=False, default='')
+    status = db.Column(db.String(50), nullable=False, default='')
+    device_type = db.Column(db.String(50), nullable=False, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ActivityLogDailyStat {self.day} {self.action_type} {self.count}>'
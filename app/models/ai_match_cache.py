@@ -0,0 +1,155 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Cache des résultats de matching IA
+Une ligne = un profil évalué pour une description de poste/rôle donnée
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta
+from app import db
+
+# À incrémenter quand les prompts de AIMatchingService changent (invalide tout le cache)
+PROMPT_VERSION = '2'
+
+
+class AIMatchCache(db.Model):
+    """Résultat IA réutilisable tant que la description, le modèle et le profil sont inchangés"""
+    __tablename__ = 'ai_match_cache'
+    __table_args__ = (
+        db.UniqueConstraint('prompt_hash', 'provider', 'model', 'subject_type', 'subject_id',
+                            name='uq_ai_match_cache_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    prompt_hash = db.Column(db.String(64), nullable=False, index=True)
+    provider = db.Column(db.String(50), nullable=False)
+    model = db.Column(db.String(200), nullable=False)
+    subject_type = db.Column(db.String(20), nullable=False)  # 'user' ou 'cinema_talent'
+    subject_id = db.Column(db.Integer, nullable=False)
+    profile_updated_at = db.Column(db.DateTime)
+    # Empreinte du profil évalué (updated_at + talents déclarés, voir profile_version)
+    profile_version = db.Column(db.String(64))
+    
+    score = db.Column(db.Integer, default=0)
+    result = db.Column(db.Text)  # JSON : explication, points_forts, points_faibles
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    hit_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<AIMatchCache {self.subject_type}:{self.subject_id} {self.score}>'
+    
+    @staticmethod
+    def hash_prompt(job_description):
+        """Empreinte de la description normalisée (casse et espaces ignorés)"""
+        normalized = re.sub(r'\s+', ' ', (job_description or '').strip().lower())
+        return hashlib.sha256(f'{PROMPT_VERSION}:{normalized}'.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def profile_version_of(profile):
+        """
+        Empreinte de ce que l'IA a évalué : date de modification du profil et, pour les
+        talents, la liste des compétences (les lignes user_talents ne modifient pas updated_at)
+        """
+        parts = [profile.updated_at.isoformat() if profile.updated_at else '']
+        if getattr(profile, '__tablename__', None) == 'users':
+            parts.append(','.join(str(talent_id) for talent_id in sorted(ut.talent_id for ut in profile.talents)))
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+    
+    @property
+    def match_data(self):
+        try:
+            data = json.loads(self.result) if self.result else {}
+        except (ValueError, TypeError):
+            data = {}
+        data['score'] = self.score
+        return data
+    
+    @staticmethod
+    def lookup(prompt_hash, provider, model, subject_type, profiles, ttl):
+        """
+        Retourne {subject_id: AIMatchCache} pour les profils dont le résultat est encore valide
+        (une seule requête pour toute la liste)
+        """
+        if not profiles:
+            return {}
+        
+        versions = {profile.id: AIMatchCache.profile_version_of(profile) for profile in profiles}
+        rows = AIMatchCache.query.filter(
+            AIMatchCache.prompt_hash == prompt_hash,
+            AIMatchCache.provider == provider,
+            AIMatchCache.model == model,
+            AIMatchCache.subject_type == subject_type,
+            AIMatchCache.subject_id.in_(list(versions.keys())),
+            AIMatchCache.created_at >= datetime.utcnow() - timedelta(seconds=ttl)
+        ).all()
+        
+        hits = {row.subject_id: row for row in rows if row.profile_version == versions.get(row.subject_id)}
+        if hits:
+            AIMatchCache.query.filter(AIMatchCache.id.in_([row.id for row in hits.values()])).update(
+                {
+                    AIMatchCache.last_hit_at: datetime.utcnow(),
+                    AIMatchCache.hit_count: AIMatchCache.hit_count + 1
+                },
+                synchronize_session=False
+            )
+            db.session.commit()
+        return hits
+    
+    @staticmethod
+    def store(prompt_hash, provider, model, subject_type, profile, match_data):
+        """Enregistre (ou remplace) le résultat IA d'un profil, sans commit"""
+        entry = AIMatchCache.query.filter_by(
+            prompt_hash=prompt_hash, provider=provider, model=model,
+            subject_type=subject_type, subject_id=profile.id
+        ).first()
+        if entry is None:
+            entry = AIMatchCache(
+                prompt_hash=prompt_hash, provider=provider, model=model,
+                subject_type=subject_type, subject_id=profile.id
+            )
+            db.session.add(entry)
+        
+        now = datetime.utcnow()
+        entry.profile_updated_at = profile.updated_at
+        entry.profile_version = AIMatchCache.profile_version_of(profile)
+        entry.score = int(match_data.get('score') or 0)
+        entry.result = json.dumps({
+            'explication': match_data.get('explication', ''),
+            'points_forts': match_data.get('points_forts', []),
+            'points_faibles': match_data.get('points_faibles', [])
+        }, ensure_ascii=False)
+        entry.created_at = now
+        entry.last_hit_at = now
+        return entry
+    
+    @staticmethod
+    def purge(ttl, max_entries):
+        """
+        Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_entries
+        
+        Returns:
+            int: nombre d'entrées supprimées
+        """
+        deleted = AIMatchCache.query.filter(
+            AIMatchCache.created_at < datetime.utcnow() - timedelta(seconds=ttl)
+        ).delete(synchronize_session=False)
+        
+        if max_entries and max_entries > 0:
+            excess = AIMatchCache.query.count() - max_entries
+            if excess > 0:
+                oldest_ids = [row.id for row in db.session.query(AIMatchCache.id)
+                              .order_by(AIMatchCache.last_hit_at.asc(), AIMatchCache.id.asc())
+                              .limit(excess).all()]
+                deleted += AIMatchCache.query.filter(AIMatchCache.id.in_(oldest_ids)).delete(synchronize_session=False)
+        
+        db.session.commit()
+        return deleted
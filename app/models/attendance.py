@@ -9,9 +9,17 @@ www.myoneart.com
 from app import db
 from datetime import datetime, timedelta, date
 
+# URL de la base -> index unique projet / talent / jour présent
+_unique_index_present = {}
+
 class Attendance(db.Model):
     """Modèle pour gérer les présences des talents cinéma sur les projets"""
     __tablename__ = 'attendances'
+    UNIQUE_DAILY_INDEX = 'uq_attendances_project_talent_date'
+    __table_args__ = (
+        # Une présence par talent, projet et jour (pointage en masse, scans concurrents)
+        db.Index(UNIQUE_DAILY_INDEX, 'project_id', 'cinema_talent_code', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -99,6 +107,130 @@ class Attendance(db.Model):
             db.session.commit()
             return attendance, 'checkin'
     
+    @staticmethod
+    def _assigned_codes(project_id, codes=None):
+        """Requête des codes des talents cinéma assignés au projet (optionnellement restreints)"""
+        from app.models.project import ProjectTalent
+        from app.models.cinema_talent import CinemaTalent
+        
+        query = (
+            db.select(CinemaTalent.unique_code)
+            .join(ProjectTalent, ProjectTalent.cinema_talent_id == CinemaTalent.id)
+            .where(ProjectTalent.project_id == project_id)
+        )
+        if codes is not None:
+            query = query.where(CinemaTalent.unique_code.in_(codes))
+        return query.distinct()
+    
+    @staticmethod
+    def _has_unique_daily_index(bind):
+        """
+        L'index unique projet / talent / jour existe-t-il ? (vérifié une fois par base)
+        Il manque quand la migration automatique n'a pas pu le créer à cause de doublons existants
+        """
+        key = str(bind.url)
+        if key not in _unique_index_present:
+            indexes = db.inspect(bind).get_indexes(Attendance.__tablename__)
+            _unique_index_present[key] = any(index['name'] == Attendance.UNIQUE_DAILY_INDEX for index in indexes)
+        return _unique_index_present[key]
+    
+    @staticmethod
+    def _insert_ignoring_duplicates():
+        """INSERT qui ignore les lignes déjà présentes (index unique projet / talent / jour)"""
+        bind = db.session.get_bind()
+        dialect = bind.dialect.name
+        if dialect not in ('postgresql', 'sqlite') or not Attendance._has_unique_daily_index(bind):
+            # Sans index unique, ON CONFLICT échouerait : seul le NOT EXISTS évite les doublons
+            return Attendance.__table__.insert(), False
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(Attendance.__table__), True
+    
+    @staticmethod
+    def bulk_check_in(project_id, recorded_by, codes=None, day=None, at=None):
+        """
+        Enregistre l'arrivée de tous les talents assignés (ou des codes donnés) en une requête
+        
+        Les talents déjà pointés ce jour sont ignorés ; le nombre de requêtes ne dépend
+        pas du nombre de talents. Le commit est laissé à l'appelant.
+        
+        Args:
+            project_id: ID du projet
+            recorded_by: ID de l'utilisateur qui enregistre
+            codes: Codes des talents à pointer (None = tous les talents assignés)
+            day: Jour de présence (défaut : aujourd'hui)
+            at: Heure d'arrivée (défaut : maintenant)
+        
+        Returns:
+            dict: {'checked_in': nouvelles arrivées, 'already_present': déjà enregistrés}
+        """
+        day = day or date.today()
+        at = at or datetime.utcnow()
+        if codes is not None:
+            codes = list(codes)
+            if not codes:
+                return {'checked_in': 0, 'already_present': 0}
+        
+        assigned = Attendance._assigned_codes(project_id, codes).subquery()
+        total = db.session.execute(db.select(db.func.count()).select_from(assigned)).scalar()
+        
+        table = Attendance.__table__
+        already = db.select(table.c.id).where(
+            table.c.project_id == project_id,
+            table.c.cinema_talent_code == assigned.c.unique_code,
+            table.c.date == day
+        )
+        rows = db.select(
+            db.literal(project_id, db.Integer),
+            assigned.c.unique_code,
+            db.literal(day, db.Date),
+            db.literal(at, db.DateTime),
+            db.literal(recorded_by, db.Integer),
+            db.literal(at, db.DateTime),
+            db.literal(at, db.DateTime)
+        ).where(~already.exists())
+        
+        insert, supports_conflicts = Attendance._insert_ignoring_duplicates()
+        insert = insert.from_select(
+            ['project_id', 'cinema_talent_code', 'date', 'check_in_time', 'recorded_by',
+             'created_at', 'updated_at'],
+            rows
+        )
+        if supports_conflicts:
+            # Un scan concurrent a pu pointer le même talent entre-temps
+            insert = insert.on_conflict_do_nothing(
+                index_elements=['project_id', 'cinema_talent_code', 'date']
+            )
+        
+        checked_in = db.session.execute(insert).rowcount
+        return {'checked_in': checked_in, 'already_present': total - checked_in}
+    
+    @staticmethod
+    def bulk_check_out(project_id, codes=None, day=None, at=None):
+        """
+        Enregistre le départ des talents présents sans heure de départ, en une requête
+        Le commit est laissé à l'appelant.
+        
+        Returns:
+            int: Nombre de départs enregistrés
+        """
+        day = day or date.today()
+        at = at or datetime.utcnow()
+        table = Attendance.__table__
+        
+        update = table.update().where(
+            table.c.project_id == project_id,
+            table.c.date == day,
+            table.c.check_in_time.isnot(None),
+            table.c.check_out_time.is_(None)
+        )
+        if codes is not None:
+            update = update.where(table.c.cinema_talent_code.in_(list(codes)))
+        
+        return db.session.execute(update.values(check_out_time=at, updated_at=at)).rowcount
+    
     @staticmethod
     def get_project_attendance_summary(project_id, start_date=None, end_date=None):
         """
@@ -114,23 +246,175 @@ class Attendance(db.Model):
         return query.order_by(Attendance.date.desc(), Attendance.check_in_time.desc()).all()
     
     @staticmethod
-    def get_talent_total_hours(cinema_talent_code, project_id):
+    def format_minutes(total_minutes):
+        """Durée totale au format '12h 05min'"""
+        hours = total_minutes // 60
+        minutes = total_minutes % 60
+        return f"{hours}h {minutes:02d}min"
+    
+    @staticmethod
+    def duration_minutes_expr():
         """
-        Calcule le total d'heures travaillées par un talent sur un projet
+        Expression SQL de la durée en minutes entières d'une présence
+        (même arrondi que get_duration_minutes, NULL tant que le départ n'est pas enregistré)
         """
-        attendances = Attendance.query.filter_by(
-            cinema_talent_code=cinema_talent_code,
-            project_id=project_id
-        ).filter(Attendance.check_out_time.isnot(None)).all()
+        table = Attendance.__table__
+        check_in, check_out = table.c.check_in_time, table.c.check_out_time
+        dialect = db.session.get_bind().dialect.name
         
-        total_minutes = sum(att.get_duration_minutes() for att in attendances)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
+        if dialect == 'sqlite':
+            # Microsecondes entières : secondes de 'AAAA-MM-JJ HH:MM:SS' (strftime arrondit les
+            # fractions à la milliseconde) plus la fraction stockée par SQLAlchemy ('.ffffff'),
+            # puis une troncature unique, comme int() dans get_duration_minutes
+            def micros(column):
+                return (db.cast(db.func.strftime('%s', db.func.substr(column, 1, 19)), db.Integer) * 1000000
+                        + db.cast(db.func.substr(column, 21, 6), db.Integer))
+            return (micros(check_out) - micros(check_in)) // 60000000
+        if dialect in ('mysql', 'mariadb'):
+            return db.func.timestampdiff(db.text('MINUTE'), check_in, check_out)
+        return db.cast(db.func.floor(db.extract('epoch', check_out - check_in)), db.Integer) // 60
+    
+    @staticmethod
+    def _aggregate(group_columns, *criteria, start_date=None, end_date=None):
+        """
+        Totaux calculés par la base : minutes travaillées et jours complets (départ enregistré),
+        jours de présence (arrivée enregistrée)
+        """
+        table = Attendance.__table__
+        query = db.select(
+            *group_columns,
+            db.func.coalesce(db.func.sum(Attendance.duration_minutes_expr()), 0).label('total_minutes'),
+            db.func.count(table.c.check_out_time).label('days_worked'),
+            db.func.count(table.c.id).label('days_present')
+        ).where(*criteria)
+        
+        if start_date:
+            query = query.where(table.c.date >= start_date)
+        if end_date:
+            query = query.where(table.c.date <= end_date)
+        if group_columns:
+            query = query.group_by(*group_columns).order_by(*group_columns)
+        
+        return db.session.execute(query).all()
+    
+    @staticmethod
+    def get_talent_total_hours(cinema_talent_code, project_id, start_date=None, end_date=None):
+        """
+        Calcule le total d'heures travaillées par un talent sur un projet
+        """
+        table = Attendance.__table__
+        row = Attendance._aggregate(
+            (),
+            table.c.cinema_talent_code == cinema_talent_code,
+            table.c.project_id == project_id,
+            start_date=start_date,
+            end_date=end_date
+        )[0]
         
+        total_minutes = int(row.total_minutes)
         return {
             'total_minutes': total_minutes,
-            'formatted': f"{hours}h {minutes:02d}min",
-            'hours': hours,
-            'minutes': minutes,
-            'days_worked': len(attendances)
+            'formatted': Attendance.format_minutes(total_minutes),
+            'hours': total_minutes // 60,
+            'minutes': total_minutes % 60,
+            'days_worked': row.days_worked
+        }
+    
+    @staticmethod
+    def get_talent_totals_by_project(cinema_talent_code, start_date=None, end_date=None):
+        """
+        Totaux d'un talent sur chacun de ses projets
+        
+        Returns:
+            dict: {project_id: {'total_minutes', 'formatted', 'days_worked', 'days_present'}}
+        """
+        table = Attendance.__table__
+        rows = Attendance._aggregate(
+            (table.c.project_id,),
+            table.c.cinema_talent_code == cinema_talent_code,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return {
+            row.project_id: {
+                'total_minutes': int(row.total_minutes),
+                'formatted': Attendance.format_minutes(int(row.total_minutes)),
+                'days_worked': row.days_worked,
+                'days_present': row.days_present
+            }
+            for row in rows
         }
+    
+    @staticmethod
+    def get_project_talent_totals(project_id, start_date=None, end_date=None):
+        """
+        Totaux par talent sur un projet (une ligne par code talent)
+        
+        Returns:
+            list: dicts {'cinema_talent_code', 'total_minutes', 'formatted', 'days_worked', 'days_present'}
+        """
+        table = Attendance.__table__
+        rows = Attendance._aggregate(
+            (table.c.cinema_talent_code,),
+            table.c.project_id == project_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return [{
+            'cinema_talent_code': row.cinema_talent_code,
+            'total_minutes': int(row.total_minutes),
+            'formatted': Attendance.format_minutes(int(row.total_minutes)),
+            'days_worked': row.days_worked,
+            'days_present': row.days_present
+        } for row in rows]
+    
+    @staticmethod
+    def get_daily_headcounts(project_id, start_date=None, end_date=None):
+        """
+        Effectifs par jour sur un projet
+        
+        Returns:
+            list: dicts {'date', 'present', 'checked_out', 'total_minutes', 'formatted'}
+        """
+        table = Attendance.__table__
+        rows = Attendance._aggregate(
+            (table.c.date,),
+            table.c.project_id == project_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return [{
+            'date': row.date,
+            'present': row.days_present,
+            'checked_out': row.days_worked,
+            'total_minutes': int(row.total_minutes),
+            'formatted': Attendance.format_minutes(int(row.total_minutes))
+        } for row in rows]
+
+class AttendanceScan(db.Model):
+    """
+    Scan QR reçu d'un appareil de pointage (synchronisation hors ligne)
+    L'identifiant généré par l'appareil rend l'envoi d'un lot idempotent : un scan déjà
+    traité renvoie le résultat enregistré au lieu d'être appliqué une seconde fois
+    """
+    __tablename__ = 'attendance_scans'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_scan_id = db.Column(db.String(64), unique=True, nullable=False)
+    
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    cinema_talent_code = db.Column(db.String(20), nullable=False)
+    scanned_at = db.Column(db.DateTime, nullable=False)
+    
+    # Résultat : checkin, checkout, already_complete, not_found, not_assigned
+    action = db.Column(db.String(20), nullable=False)
+    message = db.Column(db.String(255))
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendances.id'), nullable=True)
+    
+    recorded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    attendance = db.relationship('Attendance')
+    
+    def __repr__(self):
+        return f'<AttendanceScan {self.client_scan_id} {self.action}>'
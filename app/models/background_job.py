@@ -0,0 +1,106 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Tâches longues exécutées hors des workers web (voir JobService)
+"""
+
+import json
+from datetime import datetime
+from app import db
+
+
+class BackgroundJob(db.Model):
+    """Tâche d'arrière-plan persistée (analyse CV, recherche IA, sauvegarde, emails, exports)"""
+    __tablename__ = 'background_jobs'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+    
+    STATUS_LABELS = {
+        STATUS_PENDING: 'En attente',
+        STATUS_RUNNING: 'En cours',
+        STATUS_SUCCEEDED: 'Terminée',
+        STATUS_FAILED: 'Échec',
+        STATUS_CANCELLED: 'Annulée',
+    }
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING, index=True)
+    params = db.Column(db.Text)  # JSON
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    
+    progress = db.Column(db.Integer, default=0)
+    progress_message = db.Column(db.String(255))
+    cancel_requested = db.Column(db.Boolean, default=False)
+    
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    worker_id = db.Column(db.String(100))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    created_by = db.relationship('User', backref=db.backref('background_jobs', lazy='dynamic'))
+    
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.job_type} {self.status}>'
+    
+    @property
+    def params_data(self):
+        try:
+            return json.loads(self.params) if self.params else {}
+        except (ValueError, TypeError):
+            return {}
+    
+    @property
+    def result_data(self):
+        try:
+            return json.loads(self.result) if self.result else None
+        except (ValueError, TypeError):
+            return None
+    
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+    
+    @property
+    def status_label(self):
+        return self.STATUS_LABELS.get(self.status, self.status)
+    
+    @property
+    def duration_seconds(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or datetime.utcnow()
+        return round((end - self.started_at).total_seconds(), 1)
+    
+    def to_dict(self):
+        result = self.result_data
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'status_label': self.status_label,
+            'progress': self.progress or 0,
+            'progress_message': self.progress_message,
+            'cancel_requested': bool(self.cancel_requested),
+            'is_finished': self.is_finished,
+            'has_result': self.status == self.STATUS_SUCCEEDED and result is not None,
+            'message': result.get('message') if isinstance(result, dict) else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': self.duration_seconds
+        }
@@ -7,16 +7,36 @@ www.myoneart.com
 """
 
 from datetime import datetime
+from sqlalchemy import event
 from app import db
+from app.utils.encryption import EncryptedFieldsMixin
+from app.utils.name_matcher import normalize_full_name
+from app.utils.blind_index import register_blind_index
+from app.models.cinema_talent_attribute import CinemaTalentAttribute, ListAttribute, register_list_attributes
 
-class CinemaTalent(db.Model):
+class CinemaTalent(EncryptedFieldsMixin, db.Model):
     __tablename__ = 'cinema_talents'
+    __table_args__ = (
+        # Liste paginée des talents actifs (recherche à facettes)
+        db.Index('ix_cinema_talents_active_created', 'is_active', 'created_at', 'id'),
+        # Filtres de la recherche à facettes (voir CinemaSearchService)
+        db.Index('ix_cinema_talents_gender_birth', 'gender', 'date_of_birth'),
+        db.Index('ix_cinema_talents_date_of_birth', 'date_of_birth'),
+        db.Index('ix_cinema_talents_height', 'height'),
+        db.Index('ix_cinema_talents_country_of_residence', 'country_of_residence'),
+        db.Index('ix_cinema_talents_eye_color', 'eye_color'),
+        db.Index('ix_cinema_talents_hair_color', 'hair_color'),
+        db.Index('ix_cinema_talents_hair_type', 'hair_type'),
+        db.Index('ix_cinema_talents_skin_tone', 'skin_tone'),
+        db.Index('ix_cinema_talents_build', 'build'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
     # Personal Information
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
+    name_normalized = db.Column(db.String(255))  # Nom complet sans accents (watchlist)
     gender = db.Column(db.String(1), nullable=False)
     date_of_birth = db.Column(db.Date, nullable=False)
     
@@ -60,6 +80,9 @@ class CinemaTalent(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     phone_encrypted = db.Column(db.Text, nullable=False)
     whatsapp_encrypted = db.Column(db.Text)
+    # Empreintes HMAC des numéros complets (recherche sans déchiffrement)
+    phone_bidx = db.Column(db.String(32), index=True)
+    whatsapp_bidx = db.Column(db.String(32), index=True)
     website = db.Column(db.String(500))  # Site web personnel/professionnel
     
     # Social Media (encrypted)
@@ -86,6 +109,54 @@ class CinemaTalent(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
+    # Champs chiffrés (colonne = <champ>_encrypted)
+    ENCRYPTED_FIELDS = (
+        'id_document_number', 'phone', 'whatsapp',
+        'facebook', 'instagram', 'linkedin', 'twitter', 'youtube',
+        'tiktok', 'snapchat', 'telegram', 'imdb_url', 'threads'
+    )
+    BLIND_INDEXED_FIELDS = ('phone', 'whatsapp')
+    # Listes JSON recopiées dans cinema_talent_attributes (filtres SQL)
+    LIST_ATTRIBUTES = ('talent_types', 'languages_spoken', 'ethnicities', 'other_talents')
+    
+    # Listes JSON décodées (lecture et écriture)
+    ethnicities_list = ListAttribute('ethnicities')
+    languages_spoken_list = ListAttribute('languages_spoken')
+    talent_types_list = ListAttribute('talent_types')
+    other_talents_list = ListAttribute('other_talents')
+    gallery_photos_list = ListAttribute('gallery_photos')
+    
+    @classmethod
+    def has_values(cls, attribute, *values):
+        """
+        Critère SQL : la liste contient toutes les valeurs demandées
+        
+        Exemple (parle arabe et figurant) :
+            CinemaTalent.query.filter(
+                CinemaTalent.has_values('languages_spoken', 'Arabe'),
+                CinemaTalent.has_values('talent_types', 'Figurant(e)')
+            )
+        """
+        if attribute not in cls.LIST_ATTRIBUTES:
+            raise ValueError(f"Attribut non indexé: {attribute}")
+        return db.and_(*[
+            cls.id.in_(db.select(CinemaTalentAttribute.cinema_talent_id).where(
+                CinemaTalentAttribute.attribute == attribute,
+                CinemaTalentAttribute.value == value
+            ))
+            for value in values
+        ])
+    
+    @classmethod
+    def has_any_value(cls, attribute, values):
+        """Critère SQL : la liste contient au moins une des valeurs"""
+        if attribute not in cls.LIST_ATTRIBUTES:
+            raise ValueError(f"Attribut non indexé: {attribute}")
+        return cls.id.in_(db.select(CinemaTalentAttribute.cinema_talent_id).where(
+            CinemaTalentAttribute.attribute == attribute,
+            CinemaTalentAttribute.value.in_(list(values))
+        ))
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -114,8 +185,7 @@ class CinemaTalent(db.Model):
             return None
         
         try:
-            from app.utils.encryption import decrypt_sensitive_data
-            decrypted_number = decrypt_sensitive_data(self.id_document_number_encrypted)
+            decrypted_number = self.get_decrypted('id_document_number')
             
             if not decrypted_number:
                 return "***"
@@ -140,11 +210,20 @@ class CinemaTalent(db.Model):
             return None
         
         try:
-            from app.utils.encryption import decrypt_sensitive_data
-            decrypted_number = decrypt_sensitive_data(self.id_document_number_encrypted)
+            decrypted_number = self.get_decrypted('id_document_number')
             return decrypted_number if decrypted_number else None
         except Exception:
             return None
     
     def __repr__(self):
         return f'<CinemaTalent {self.first_name} {self.last_name}>'
+
+
+@event.listens_for(CinemaTalent, 'before_insert')
+@event.listens_for(CinemaTalent, 'before_update')
+def _set_name_normalized(mapper, connection, target):
+    target.name_normalized = normalize_full_name(target.first_name, target.last_name)
+
+
+register_blind_index(CinemaTalent)
+register_list_attributes(CinemaTalent)
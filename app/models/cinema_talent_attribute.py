@@ -0,0 +1,224 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Attributs multi-valués des talents cinéma
+- Les colonnes restent des listes JSON ; ListAttribute les expose en listes Python
+  (talent.languages_spoken_list) sans json.loads dans chaque appelant
+- cinema_talent_attributes : une ligne par valeur (types de talents, langues, ethnicités,
+  autres talents) pour les filtres, facettes et tests d'appartenance en SQL
+"""
+
+import json
+
+from sqlalchemy import event, inspect
+from app import db
+
+
+def json_list(value):
+    """
+    Liste de chaînes d'une colonne JSON (sans doublons)
+    
+    Les anciennes saisies hors JSON ("Arabe, Français") sont découpées sur les virgules ;
+    une valeur absente ou illisible donne une liste vide.
+    """
+    if not value:
+        return []
+    items = value
+    if isinstance(value, str):
+        try:
+            items = json.loads(value)
+        except ValueError:
+            items = value.split(',')
+    if isinstance(items, str):
+        items = [items]
+    if not isinstance(items, (list, tuple)):
+        return []
+    
+    values = []
+    for item in items:
+        item = str(item).strip() if item is not None else ''
+        if item and item not in values:
+            values.append(item)
+    return values
+
+
+def dump_json_list(values):
+    """Valeur stockée d'une liste (None si vide)"""
+    values = json_list(list(values or []))
+    return json.dumps(values) if values else None
+
+
+class ListAttribute:
+    """
+    Accès en liste à une colonne JSON d'un modèle
+    
+        languages_spoken_list = ListAttribute('languages_spoken')
+        talent.languages_spoken_list            -> ['Arabe', 'Français']
+        talent.languages_spoken_list = [...]    -> colonne languages_spoken réécrite
+    
+    La liste décodée est mémorisée par instance tant que la colonne ne change pas.
+    """
+    
+    def __init__(self, column):
+        self.column = column
+        self.cache_key = f'_{column}_list_cache'
+    
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        raw = getattr(instance, self.column)
+        cached = instance.__dict__.get(self.cache_key)
+        if cached is None or cached[0] != raw:
+            cached = (raw, tuple(json_list(raw)))
+            instance.__dict__[self.cache_key] = cached
+        return list(cached[1])
+    
+    def __set__(self, instance, values):
+        setattr(instance, self.column, dump_json_list(values))
+
+
+class CinemaTalentAttribute(db.Model):
+    """Une valeur d'un attribut multi-valué (ex: languages_spoken = 'Arabe') d'un talent cinéma"""
+    __tablename__ = 'cinema_talent_attributes'
+    __table_args__ = (
+        # Filtre : talents ayant attribute = value ; facettes : GROUP BY value
+        db.Index('ix_cinema_talent_attributes_lookup', 'attribute', 'value', 'cinema_talent_id'),
+        # Remplacement des valeurs d'un talent à chaque écriture
+        db.Index('ix_cinema_talent_attributes_talent', 'cinema_talent_id', 'attribute'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cinema_talent_id = db.Column(db.Integer, db.ForeignKey('cinema_talents.id', ondelete='CASCADE'), nullable=False)
+    attribute = db.Column(db.String(30), nullable=False)  # Nom de la colonne JSON
+    value = db.Column(db.String(150), nullable=False)
+    
+    def __repr__(self):
+        return f'<CinemaTalentAttribute {self.cinema_talent_id} {self.attribute}={self.value}>'
+
+
+def attribute_rows(talent_id, attribute, raw_value):
+    """Lignes à insérer pour une colonne JSON d'un talent"""
+    return [
+        {'cinema_talent_id': talent_id, 'attribute': attribute, 'value': value[:150]}
+        for value in json_list(raw_value)
+    ]
+
+
+def register_list_attributes(model):
+    """Recopier model.LIST_ATTRIBUTES dans cinema_talent_attributes à chaque écriture"""
+    event.listen(model, 'before_insert', _collect_list_attributes)
+    event.listen(model, 'before_update', _collect_list_attributes)
+    event.listen(model, 'after_insert', _write_list_attributes)
+    event.listen(model, 'after_update', _write_list_attributes)
+    event.listen(model, 'after_delete', _delete_list_attributes)
+
+
+def _collect_list_attributes(mapper, connection, target):
+    state = inspect(target)
+    pending = [
+        attribute for attribute in target.LIST_ATTRIBUTES
+        if not state.has_identity or state.attrs[attribute].history.has_changes()
+    ]
+    if pending:
+        target.__dict__['_pending_list_attributes'] = pending
+
+
+def _write_list_attributes(mapper, connection, target):
+    pending = target.__dict__.pop('_pending_list_attributes', None)
+    if not pending:
+        return
+    
+    table = CinemaTalentAttribute.__table__
+    connection.execute(table.delete().where(
+        table.c.cinema_talent_id == target.id,
+        table.c.attribute.in_(pending)
+    ))
+    rows = [row for attribute in pending for row in attribute_rows(target.id, attribute, getattr(target, attribute))]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def _delete_list_attributes(mapper, connection, target):
+    table = CinemaTalentAttribute.__table__
+    connection.execute(table.delete().where(table.c.cinema_talent_id == target.id))
+
+
+def backfill_list_attributes(model, batch_size=500):
+    """
+    Reconstruit cinema_talent_attributes à partir des colonnes JSON existantes, par lots
+    
+    Returns:
+        int: Nombre de talents traités
+    """
+    table = CinemaTalentAttribute.__table__
+    attributes = model.LIST_ATTRIBUTES
+    query = db.select(model.id, *[getattr(model, attribute) for attribute in attributes]).order_by(model.id).limit(batch_size)
+    
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(model.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        values = [
+            value for row in rows
+            for index, attribute in enumerate(attributes)
+            for value in attribute_rows(row[0], attribute, row[index + 1])
+        ]
+        db.session.execute(table.delete().where(
+            table.c.cinema_talent_id.in_([row[0] for row in rows]),
+            table.c.attribute.in_(attributes)
+        ))
+        if values:
+            db.session.execute(table.insert(), values)
+        db.session.commit()
+        processed += len(rows)
+    
+    return processed
+
+
+def normalize_list_columns(model, columns, batch_size=500, dry_run=False):
+    """
+    Réécrit les colonnes JSON de liste au format canonique (liste JSON sans doublons, NULL si vide)
+    
+    Returns:
+        int: Nombre de lignes dont au moins une colonne a changé
+    """
+    query = db.select(model.id, *[getattr(model, column) for column in columns]).order_by(model.id).limit(batch_size)
+    
+    changed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(model.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        updates = []
+        for row in rows:
+            update = {}
+            for index, column in enumerate(columns):
+                canonical = dump_json_list(json_list(row[index + 1]))
+                if row[index + 1] != canonical:
+                    update[column] = canonical
+            if update:
+                update['id'] = row[0]
+                updates.append(update)
+        
+        # Mise à jour groupée par jeu de colonnes (executemany)
+        if updates and not dry_run:
+            groups = {}
+            for update in updates:
+                groups.setdefault(tuple(sorted(update)), []).append(update)
+            for group in groups.values():
+                db.session.execute(db.update(model), group)
+            db.session.commit()
+        changed += len(updates)
+    
+    return changed
@@ -0,0 +1,111 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Compteurs des codes uniques (talents par pays, talents cinéma par pays, talents par projet)
+Une ligne par périmètre : l'allocation est un seul UPDATE ... RETURNING, la ligne
+verrouillée sérialise les inscriptions concurrentes d'un même périmètre jusqu'au commit
+"""
+
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+class CodeSequence(db.Model):
+    """Dernière valeur attribuée dans un périmètre (ex: 'user:MA', 'cinema:SN', 'project_talent:12')"""
+    __tablename__ = 'code_sequences'
+    
+    scope = db.Column(db.String(64), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CodeSequence {self.scope}={self.last_value}>'
+    
+    @staticmethod
+    def _increment(scope):
+        table = CodeSequence.__table__
+        update = table.update().where(table.c.scope == scope).values(
+            last_value=table.c.last_value + 1,
+            updated_at=datetime.utcnow()
+        )
+        if db.engine.dialect.update_returning:
+            return db.session.execute(update.returning(table.c.last_value)).scalar()
+        
+        # SQLite < 3.35 : la ligne reste verrouillée par l'UPDATE jusqu'au commit
+        if db.session.execute(update).rowcount == 0:
+            return None
+        return db.session.execute(db.select(table.c.last_value).where(table.c.scope == scope)).scalar()
+    
+    @staticmethod
+    def next_value(scope, initial=None):
+        """
+        Valeur suivante d'un compteur, dans la transaction de la session (validée par le commit de l'appelant)
+        
+        La ligne du compteur reste verrouillée jusqu'au commit : appeler juste avant le commit,
+        après les traitements lents (fichiers, appels IA, hachage de mot de passe).
+        
+        Args:
+            scope: Périmètre du compteur
+            initial: Fonction donnant la dernière valeur déjà utilisée, appelée une seule fois
+                     quand le compteur n'existe pas encore (reprise des codes existants)
+        
+        Returns:
+            int: Valeur attribuée (jamais rendue deux fois, même en cas d'inscriptions simultanées)
+        """
+        for _ in range(3):
+            value = CodeSequence._increment(scope)
+            if value is not None:
+                return value
+            
+            start = (initial() if initial else 0) + 1
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(CodeSequence.__table__.insert().values(
+                        scope=scope, last_value=start, updated_at=datetime.utcnow()
+                    ))
+                return start
+            except IntegrityError:
+                # Compteur créé entre-temps par une inscription concurrente : l'incrémenter
+                continue
+        
+        raise RuntimeError(f"Impossible d'allouer une valeur pour le compteur {scope}")
+    
+    @staticmethod
+    def ensure_at_least(values):
+        """
+        Relève des compteurs à au moins une valeur donnée (reprise des codes existants)
+        
+        Args:
+            values: dict {scope: dernière valeur utilisée}
+        
+        Returns:
+            int: Nombre de compteurs créés ou relevés
+        """
+        if not values:
+            return 0
+        
+        existing = dict(db.session.execute(
+            db.select(CodeSequence.scope, CodeSequence.last_value).where(CodeSequence.scope.in_(list(values)))
+        ).all())
+        now = datetime.utcnow()
+        
+        created = [
+            {'scope': scope, 'last_value': value, 'updated_at': now}
+            for scope, value in values.items() if scope not in existing
+        ]
+        raised = [
+            {'scope': scope, 'last_value': value, 'updated_at': now}
+            for scope, value in values.items() if scope in existing and existing[scope] < value
+        ]
+        if created:
+            db.session.execute(db.insert(CodeSequence), created)
+        if raised:
+            db.session.execute(db.update(CodeSequence), raised)
+        db.session.commit()
+        return len(created) + len(raised)
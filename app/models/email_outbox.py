@@ -0,0 +1,74 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+File d'envoi des emails (voir EmailOutboxService)
+"""
+
+import json
+from datetime import datetime
+from app import db
+
+
+class EmailOutbox(db.Model):
+    """Email en attente d'envoi (supprimé une fois envoyé, l'historique est dans email_logs)"""
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Réclamation des messages dus : status = pending AND next_attempt_at <= now
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_email = db.Column(db.String(255), nullable=False)
+    recipient_name = db.Column(db.String(255))
+    subject = db.Column(db.String(500), nullable=False)
+    # Corps HTML commun ; les marqueurs de substitutions sont remplacés par destinataire
+    html_content = db.Column(db.Text, nullable=False)
+    substitutions = db.Column(db.Text)  # JSON {marqueur: valeur}
+    attachments = db.Column(db.Text)  # JSON [{'content', 'filename', 'type'}]
+    template_type = db.Column(db.String(100), nullable=False, default='generic')
+    
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(64), index=True)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    
+    sent_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    related_talent_code = db.Column(db.String(50))
+    related_project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
+    related_cinema_talent_id = db.Column(db.Integer, db.ForeignKey('cinema_talents.id'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.recipient_email} {self.status}>'
+    
+    @property
+    def substitutions_data(self):
+        try:
+            return json.loads(self.substitutions) if self.substitutions else {}
+        except (TypeError, ValueError):
+            return {}
+    
+    @property
+    def attachments_data(self):
+        try:
+            return json.loads(self.attachments) if self.attachments else []
+        except (TypeError, ValueError):
+            return []
+    
+    def render_html(self):
+        """Corps HTML tel que reçu par le destinataire (substitutions appliquées)"""
+        html = self.html_content
+        for marker, value in self.substitutions_data.items():
+            html = html.replace(marker, value)
+        return html
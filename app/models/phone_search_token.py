@@ -0,0 +1,31 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Empreintes des fins de numéros de téléphone chiffrés (voir app/utils/blind_index.py)
+"""
+
+from app import db
+
+
+class PhoneSearchToken(db.Model):
+    """Empreinte HMAC d'une fin de numéro (téléphone ou WhatsApp) d'un talent"""
+    __tablename__ = 'phone_search_tokens'
+    __table_args__ = (
+        # Recherche : token IN (...) pour un type de propriétaire
+        db.Index('ix_phone_search_tokens_token_owner', 'token', 'owner_type'),
+        # Remplacement des empreintes d'une ligne à chaque écriture
+        db.Index('ix_phone_search_tokens_owner', 'owner_type', 'owner_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    owner_type = db.Column(db.String(30), nullable=False)  # Table du propriétaire (users, cinema_talents)
+    owner_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String(30), nullable=False)  # phone, whatsapp
+    token = db.Column(db.String(32), nullable=False)
+    
+    def __repr__(self):
+        return f'<PhoneSearchToken {self.owner_type}:{self.owner_id} {self.field}>'
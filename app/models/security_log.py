@@ -9,6 +9,12 @@ from app import db
 class SecurityLog(db.Model):
     """Modèle pour enregistrer tous les événements de sécurité"""
     __tablename__ = 'security_logs'
+    __table_args__ = (
+        # Tentatives échouées par période / par IP et statistiques par sévérité
+        db.Index('ix_security_logs_event_type_created_at', 'event_type', 'created_at'),
+        db.Index('ix_security_logs_ip_address_created_at', 'ip_address', 'created_at'),
+        db.Index('ix_security_logs_severity_created_at', 'severity', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
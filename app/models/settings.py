@@ -8,11 +8,27 @@ www.myoneart.com
 
 from app import db
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+import copy
 import json
+import time
+import uuid
+
+# Cache process-wide de la table app_settings
+# - toute la table est chargée en une requête puis servie depuis la mémoire
+# - après SETTINGS_CACHE_TTL secondes, une seule lecture de la ligne de version
+#   permet de savoir si un autre worker gunicorn a modifié les paramètres
+_settings_cache = {'values': None, 'version': None, 'expires_at': 0.0, 'loaded_at': None}
+_settings_stats = {'hits': 0, 'misses': 0, 'version_checks': 0, 'invalidations': 0}
+
 
 class AppSettings(db.Model):
     __tablename__ = 'app_settings'
     
+    # Ligne technique incrémentée à chaque écriture (cohérence multi-workers)
+    CACHE_VERSION_KEY = '_settings_cache_version'
+    
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(100), unique=True, nullable=False)
     value = db.Column(db.Text)
@@ -20,15 +36,16 @@ class AppSettings(db.Model):
     
     @staticmethod
     def get(key, default=None):
-        """Récupère une valeur de configuration"""
-        setting = AppSettings.query.filter_by(key=key).first()
-        if not setting or not setting.value:
+        """Récupère une valeur de configuration (servie depuis le cache)"""
+        values = AppSettings._get_cached_values()
+        if key not in values:
             return default
         
-        try:
-            return json.loads(setting.value)
-        except (json.JSONDecodeError, TypeError):
-            return setting.value
+        value = values[key]
+        if isinstance(value, (dict, list)):
+            # Copie pour que l'appelant ne modifie pas le cache partagé
+            return copy.deepcopy(value)
+        return value
     
     @staticmethod
     def set(key, value):
@@ -37,7 +54,7 @@ class AppSettings(db.Model):
             value_str = json.dumps(value, ensure_ascii=False)
         else:
             value_str = str(value) if value is not None else None
-            
+        
         setting = AppSettings.query.filter_by(key=key).first()
         if setting:
             setting.value = value_str
@@ -57,3 +74,154 @@ class AppSettings(db.Model):
             db.session.commit()
             return True
         return False
+    
+    @staticmethod
+    def _parse_value(raw):
+        try:
+            return json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return raw
+    
+    @staticmethod
+    def _read_version():
+        """Lire le jeton de version partagé entre les workers"""
+        return db.session.query(AppSettings.value).filter(
+            AppSettings.key == AppSettings.CACHE_VERSION_KEY
+        ).scalar()
+    
+    @staticmethod
+    def _get_cached_values():
+        """Retourner le dictionnaire des paramètres, rechargé si nécessaire"""
+        from flask import current_app
+        
+        cache = _settings_cache
+        now = time.monotonic()
+        values = cache['values']
+        if values is not None and now < cache['expires_at']:
+            _settings_stats['hits'] += 1
+            return values
+        
+        ttl = current_app.config.get('SETTINGS_CACHE_TTL', 5)
+        version = AppSettings._read_version()
+        _settings_stats['version_checks'] += 1
+        
+        if values is not None and version == cache['version']:
+            cache['expires_at'] = now + ttl
+            _settings_stats['hits'] += 1
+            return values
+        
+        _settings_stats['misses'] += 1
+        if version is None:
+            version = AppSettings._ensure_version_row()
+        
+        values = {}
+        for key, raw in db.session.query(AppSettings.key, AppSettings.value).all():
+            if key == AppSettings.CACHE_VERSION_KEY or not raw:
+                continue
+            values[key] = AppSettings._parse_value(raw)
+        
+        cache.update(values=values, version=version, expires_at=now + ttl, loaded_at=datetime.utcnow())
+        return values
+    
+    @staticmethod
+    def _ensure_version_row():
+        """Créer la ligne de version si elle n'existe pas encore"""
+        token = uuid.uuid4().hex
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(AppSettings.__table__.insert().values(
+                    key=AppSettings.CACHE_VERSION_KEY, value=token, updated_at=datetime.utcnow()
+                ))
+            return token
+        except Exception:
+            # Un autre worker l'a créée entre-temps
+            return AppSettings._read_version()
+    
+    @staticmethod
+    def _clear_local_cache():
+        _settings_cache.update(values=None, version=None, expires_at=0.0)
+        _settings_stats['invalidations'] += 1
+    
+    @staticmethod
+    def invalidate_cache():
+        """
+        Invalider le cache dans tous les workers
+        
+        À appeler après des écritures qui contournent l'ORM (ex: Query.delete()).
+        """
+        with db.engine.begin() as connection:
+            _bump_cache_version(connection)
+        AppSettings._clear_local_cache()
+    
+    @staticmethod
+    def cache_stats():
+        """Statistiques du cache des paramètres (page Système)"""
+        from flask import current_app
+        
+        hits = _settings_stats['hits']
+        misses = _settings_stats['misses']
+        total = hits + misses
+        values = _settings_cache['values']
+        loaded_at = _settings_cache['loaded_at']
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits * 100 / total, 1) if total else 0,
+            'version_checks': _settings_stats['version_checks'],
+            'invalidations': _settings_stats['invalidations'],
+            'entries': len(values) if values is not None else 0,
+            'version': (_settings_cache['version'] or '')[:8],
+            'loaded_at': loaded_at.strftime('%d/%m/%Y %H:%M:%S') if loaded_at else None,
+            'ttl': current_app.config.get('SETTINGS_CACHE_TTL', 5)
+        }
+
+
+def _bump_cache_version(connection):
+    """Changer le jeton de version dans la transaction en cours"""
+    table = AppSettings.__table__
+    token = uuid.uuid4().hex
+    result = connection.execute(
+        table.update()
+        .where(table.c.key == AppSettings.CACHE_VERSION_KEY)
+        .values(value=token, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(
+            key=AppSettings.CACHE_VERSION_KEY, value=token, updated_at=datetime.utcnow()
+        ))
+
+
+@event.listens_for(AppSettings, 'after_insert')
+@event.listens_for(AppSettings, 'after_update')
+@event.listens_for(AppSettings, 'after_delete')
+def _on_settings_write(mapper, connection, target):
+    """Toute écriture ORM sur app_settings invalide le cache (local et autres workers)"""
+    if target.key == AppSettings.CACHE_VERSION_KEY:
+        return
+    _bump_cache_version(connection)
+    AppSettings._clear_local_cache()
+    
+    session = object_session(target)
+    if session is not None:
+        session.info['app_settings_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _on_session_commit(session):
+    """Réinvalider après le commit (un autre thread a pu recharger l'ancien état)"""
+    if session.info.pop('app_settings_dirty', False):
+        AppSettings._clear_local_cache()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _on_session_rollback(session, previous_transaction):
+    """
+    Écritures annulées : le cache a pu être rechargé entre-temps avec les valeurs non
+    validées de la transaction, il est vidé pour relire l'état validé
+    (un savepoint annulé laisse en place les écritures de la transaction englobante)
+    """
+    if not session.info.get('app_settings_dirty'):
+        return
+    AppSettings._clear_local_cache()
+    if previous_transaction.parent is None:
+        session.info.pop('app_settings_dirty', None)
@@ -0,0 +1,42 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Statistiques précalculées (une ligne par périmètre : users, talents, cinema, dashboard)
+version est incrémentée à chaque écriture qui modifie les statistiques,
+computed_version est la version prise en compte par le dernier calcul (voir StatsService)
+"""
+
+import json
+from datetime import datetime
+from app import db
+
+
+class StatsSnapshot(db.Model):
+    """Dernier calcul des statistiques d'un périmètre"""
+    __tablename__ = 'stats_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(50), unique=True, nullable=False)
+    payload = db.Column(db.Text)  # JSON
+    version = db.Column(db.Integer, nullable=False, default=0)
+    computed_version = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duration_ms = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<StatsSnapshot {self.scope} v{self.computed_version}/{self.version}>'
+    
+    @property
+    def is_stale(self):
+        return self.version != self.computed_version
+    
+    @property
+    def data(self):
+        try:
+            return json.loads(self.payload) if self.payload else {}
+        except (ValueError, TypeError):
+            return {}
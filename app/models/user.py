@@ -11,15 +11,25 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 from sqlalchemy import event
+from sqlalchemy.orm import defer, joinedload, selectinload
+from app.models.talent import UserTalent
+from app.utils.encryption import EncryptedFieldsMixin
+from app.utils.name_matcher import normalize_full_name
+from app.utils.blind_index import register_blind_index
 
-class User(UserMixin, db.Model):
+class User(EncryptedFieldsMixin, UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Liste admin paginée par curseur (voir app/utils/pagination.py)
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     unique_code = db.Column(db.String(10), unique=True, nullable=False, index=True)
     
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
+    name_normalized = db.Column(db.String(255))  # Nom complet sans accents (watchlist)
     email = db.Column(db.String(120), nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     
@@ -28,6 +38,9 @@ class User(UserMixin, db.Model):
     
     phone_encrypted = db.Column(db.Text)
     whatsapp_encrypted = db.Column(db.Text)
+    # Empreintes HMAC des numéros complets (recherche sans déchiffrement)
+    phone_bidx = db.Column(db.String(32), index=True)
+    whatsapp_bidx = db.Column(db.String(32), index=True)
     address_encrypted = db.Column(db.Text)
     passport_number_encrypted = db.Column(db.Text)
     residence_card_encrypted = db.Column(db.Text)
@@ -87,6 +100,14 @@ class User(UserMixin, db.Model):
     residence_city = db.relationship('City', foreign_keys=[residence_city_id], backref='residence_city_users')
     talents = db.relationship('UserTalent', back_populates='user', cascade='all, delete-orphan')
     
+    # Champs chiffrés exposés en clair via des propriétés (colonne = <champ>_encrypted)
+    ENCRYPTED_FIELDS = (
+        'phone', 'whatsapp', 'address', 'passport_number', 'residence_card',
+        'linkedin', 'imdb_url', 'threads', 'instagram', 'twitter', 'facebook', 'tiktok',
+        'youtube', 'github', 'behance', 'dribbble', 'pinterest', 'snapchat', 'telegram'
+    )
+    BLIND_INDEXED_FIELDS = ('phone', 'whatsapp')
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -123,123 +144,60 @@ class User(UserMixin, db.Model):
     @property
     def phone(self):
         """Déchiffrer et retourner le numéro de téléphone"""
-        if not self.phone_encrypted:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(self.phone_encrypted)
-        except:
-            return None
+        return self.get_decrypted('phone')
     
     @phone.setter
     def phone(self, value):
         """Chiffrer et stocker le numéro de téléphone"""
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            self.phone_encrypted = encrypt_sensitive_data(value)
-        else:
-            self.phone_encrypted = None
+        self.set_encrypted('phone', value)
     
     @property
     def whatsapp(self):
         """Déchiffrer et retourner le numéro WhatsApp"""
-        if not self.whatsapp_encrypted:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(self.whatsapp_encrypted)
-        except:
-            return None
+        return self.get_decrypted('whatsapp')
     
     @whatsapp.setter
     def whatsapp(self, value):
         """Chiffrer et stocker le numéro WhatsApp"""
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            self.whatsapp_encrypted = encrypt_sensitive_data(value)
-        else:
-            self.whatsapp_encrypted = None
+        self.set_encrypted('whatsapp', value)
     
     @property
     def address(self):
         """Déchiffrer et retourner l'adresse"""
-        if not self.address_encrypted:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(self.address_encrypted)
-        except:
-            return None
+        return self.get_decrypted('address')
     
     @address.setter
     def address(self, value):
         """Chiffrer et stocker l'adresse"""
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            self.address_encrypted = encrypt_sensitive_data(value)
-        else:
-            self.address_encrypted = None
+        self.set_encrypted('address', value)
     
     @property
     def passport_number(self):
         """Déchiffrer et retourner le numéro de passeport"""
-        if not self.passport_number_encrypted:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(self.passport_number_encrypted)
-        except:
-            return None
+        return self.get_decrypted('passport_number')
     
     @passport_number.setter
     def passport_number(self, value):
         """Chiffrer et stocker le numéro de passeport"""
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            self.passport_number_encrypted = encrypt_sensitive_data(value)
-        else:
-            self.passport_number_encrypted = None
+        self.set_encrypted('passport_number', value)
     
     @property
     def residence_card(self):
         """Déchiffrer et retourner le numéro de carte de séjour"""
-        if not self.residence_card_encrypted:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(self.residence_card_encrypted)
-        except:
-            return None
+        return self.get_decrypted('residence_card')
     
     @residence_card.setter
     def residence_card(self, value):
         """Chiffrer et stocker le numéro de carte de séjour"""
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            self.residence_card_encrypted = encrypt_sensitive_data(value)
-        else:
-            self.residence_card_encrypted = None
+        self.set_encrypted('residence_card', value)
     
     def _get_social_media(self, field_name):
         """Helper pour déchiffrer les réseaux sociaux"""
-        encrypted_field = f"{field_name}_encrypted"
-        encrypted_value = getattr(self, encrypted_field, None)
-        if not encrypted_value:
-            return None
-        try:
-            from app.utils.encryption import decrypt_sensitive_data
-            return decrypt_sensitive_data(encrypted_value)
-        except:
-            return None
+        return self.get_decrypted(field_name)
     
     def _set_social_media(self, field_name, value):
         """Helper pour chiffrer les réseaux sociaux"""
-        encrypted_field = f"{field_name}_encrypted"
-        if value:
-            from app.utils.encryption import encrypt_sensitive_data
-            setattr(self, encrypted_field, encrypt_sensitive_data(value))
-        else:
-            setattr(self, encrypted_field, None)
+        self.set_encrypted(field_name, value)
     
     @property
     def linkedin(self):
@@ -356,6 +314,73 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.email}>'
 
+
+class _LoaderProfile:
+    """Options de chargement construites au premier accès (les mappers doivent être configurés)"""
+    
+    def __init__(self, build):
+        self._build = build
+        self._options = None
+    
+    def __get__(self, instance, owner):
+        if self._options is None:
+            self._options = tuple(self._build())
+        return self._options
+
+
+def _heavy_columns():
+    return (defer(User.bio), defer(User.education), defer(User.cv_analysis))
+
+
+class UserLoad:
+    """
+    Profils de chargement des relations pour les listes de talents
+    
+    Les relations affichées sont chargées en quelques requêtes pour toute la liste
+    au lieu d'une requête par ligne :
+        User.query.options(*UserLoad.EXPORT).filter(...).all()
+    """
+    
+    # Listes HTML (admin, recherche de talents) : villes seulement, aucun champ chiffré
+    LIST = _LoaderProfile(lambda: (
+        joinedload(User.city),
+        joinedload(User.residence_city),
+        *_heavy_columns(),
+        *User.encrypted_load_options()
+    ))
+    
+    # Exports Excel / CSV / PDF : pays, villes, talents, téléphone et WhatsApp
+    EXPORT = _LoaderProfile(lambda: (
+        joinedload(User.country),
+        joinedload(User.residence_country),
+        joinedload(User.residence_city),
+        selectinload(User.talents).joinedload(UserTalent.talent),
+        *_heavy_columns(),
+        *User.encrypted_load_options('phone', 'whatsapp')
+    ))
+    
+    # Matching IA et API : profil complet sans champ chiffré
+    MATCHING = _LoaderProfile(lambda: (
+        joinedload(User.country),
+        joinedload(User.city),
+        joinedload(User.residence_country),
+        joinedload(User.residence_city),
+        selectinload(User.talents).joinedload(UserTalent.talent),
+        *_heavy_columns(),
+        *User.encrypted_load_options()
+    ))
+
+
+
+@event.listens_for(User, 'before_insert')
+@event.listens_for(User, 'before_update')
+def _set_name_normalized(mapper, connection, target):
+    target.name_normalized = normalize_full_name(target.first_name, target.last_name)
+
+
+register_blind_index(User)
+
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -1,25 +1,25 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, jsonify, current_app, after_this_request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, jsonify, current_app
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime
-from sqlalchemy import or_, and_, func
+from sqlalchemy import and_
 from urllib.parse import urlparse, urljoin
 from app import db
-from app.models.user import User
+from app.models.user import User, UserLoad
 from app.models.talent import Talent, UserTalent
 from app.models.location import Country, City
 from app.models.settings import AppSettings
 from app.services.export_service import ExportService
-from app.services.cv_analyzer import CVAnalyzerService
 from app.services.email_service import EmailService
 from app.services.database_service import DatabaseService
 from app.services.update_service import UpdateService
 from app.services.backup_service import BackupService
 from app.services.seo_service import SEOService
 from app.services.maintenance_service import MaintenanceService
+from app.utils.pagination import keyset_paginate, DEFAULT_PER_PAGE
+from app.utils.query_budget import query_budget
 import io
 import os
-import shutil
 import secrets
 import string
 
@@ -67,63 +67,32 @@ def dashboard():
 @bp.route('/users')
 @login_required
 @recruiter_or_admin_required
+@query_budget(10)
 def users():
-    search_query = request.args.get('search', '').strip()
-    search_code = request.args.get('search_code', '').strip()
-    availability_filter = request.args.get('availability')
-    work_mode_filter = request.args.get('work_mode')
-    gender_filter = request.args.get('gender')
-    city_filter = request.args.get('city')
-    talent_filter = request.args.getlist('talent')
-    
-    # Sous-requête pour identifier les utilisateurs ayant au moins un talent général
-    users_with_general_talents_subquery = db.session.query(User.id).join(UserTalent).join(Talent).filter(
-        Talent.tag == 'general'
-    ).distinct().subquery()
-    
-    # Requête principale - n'afficher que les utilisateurs avec au moins un talent général
-    query = User.query.filter(
-        User.is_admin == False,
-        User.id.in_(db.session.query(users_with_general_talents_subquery))
-    )
-    
-    if search_query:
-        search_pattern = f'%{search_query}%'
-        query = query.filter(
-            or_(
-                User.first_name.ilike(search_pattern),
-                User.last_name.ilike(search_pattern),
-                User.email.ilike(search_pattern)
-            )
-        )
-    
-    if search_code:
-        code_clean = search_code.replace('-', '').upper()
-        query = query.filter(User.unique_code.ilike(f'%{code_clean}%'))
-    
-    if availability_filter:
-        query = query.filter(User.availability == availability_filter)
+    from app.services.user_search_service import UserSearchService
     
-    if work_mode_filter:
-        query = query.filter(User.work_mode == work_mode_filter)
+    query = UserSearchService.query(UserSearchService.parse_filters(request.args))
     
-    if gender_filter:
-        query = query.filter(User.gender == gender_filter)
+    total_users = query.order_by(None).count()
     
-    if city_filter:
-        query = query.filter(User.residence_city_id == int(city_filter))
-    
-    if talent_filter:
-        talent_ids = [int(tid) for tid in talent_filter]
-        query = query.join(UserTalent).filter(UserTalent.talent_id.in_(talent_ids)).group_by(User.id).having(func.count(func.distinct(UserTalent.talent_id)) == len(talent_ids))
+    # Page courante uniquement, avec les relations affichées chargées dans la même requête
+    query = query.options(*UserLoad.LIST)
+    page = keyset_paginate(
+        query, User.created_at, User.id,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=request.args.get('per_page', DEFAULT_PER_PAGE)
+    )
     
-    all_users = query.order_by(User.created_at.desc()).all()
+    # Filtres conservés dans les liens de pagination
+    page_args = {key: values for key, values in request.args.lists() if key not in ('after', 'before')}
     
     # Exclure les talents cinéma dans la vue admin
     all_talents = Talent.query.filter_by(tag='general').order_by(Talent.category, Talent.name).all()
     all_cities = City.query.order_by(City.name).all()
     
-    return render_template('admin/users.html', users=all_users, talents=all_talents, cities=all_cities)
+    return render_template('admin/users.html', users=page.items, page=page, page_args=page_args,
+                           total_users=total_users, talents=all_talents, cities=all_cities)
 
 
 @bp.route('/user/<int:user_id>/toggle-active', methods=['POST'])
@@ -155,9 +124,10 @@ def delete_user(user_id):
 @bp.route('/export/excel')
 @login_required
 @recruiter_or_admin_required
+@query_budget(10)
 def export_excel():
     # Exclure les admins et n'exporter que les utilisateurs avec talents généraux
-    users = User.query.filter(
+    users = User.query.options(*UserLoad.EXPORT).filter(
         User.is_admin == False
     ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().all()
     excel_bytes = ExportService.export_to_excel(users)
@@ -175,9 +145,10 @@ def export_excel():
 @bp.route('/export/csv')
 @login_required
 @recruiter_or_admin_required
+@query_budget(10)
 def export_csv():
     # Exclure les admins et n'exporter que les utilisateurs avec talents généraux
-    users = User.query.filter(
+    users = User.query.options(*UserLoad.EXPORT).filter(
         User.is_admin == False
     ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().all()
     csv_data = ExportService.export_to_csv(users)
@@ -197,45 +168,28 @@ def export_csv():
 @login_required
 @recruiter_or_admin_required
 def export_pdf():
-    try:
-        # Exclure les admins et n'exporter que les utilisateurs avec talents généraux
-        users = User.query.filter(
-            User.is_admin == False
-        ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().all()
-        pdf_bytes = ExportService.export_list_to_pdf(users, current_user=current_user)
-        
-        from app.services.logging_service import LoggingService
-        LoggingService.log_activity(
-            user=current_user,
-            action_type='export',
-            action_category='pdf',
-            description=f'Export PDF en lot de {len(users)} utilisateurs',
-            resource_type='User',
-            status='success'
-        )
-        
-        buffer = io.BytesIO(pdf_bytes)
-        buffer.seek(0)
-        
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'talento_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        )
-    except Exception as e:
-        from app.services.logging_service import LoggingService
-        LoggingService.log_activity(
-            user=current_user,
-            action_type='export',
-            action_category='pdf',
-            description='Échec de l\'export PDF en lot des utilisateurs',
-            resource_type='User',
-            status='error',
-            error_message=str(e)
-        )
-        flash(f'Erreur lors de l\'export PDF: {str(e)}', 'error')
-        return redirect(url_for('admin.users'))
+    """Export PDF en lot des talents (généré en arrière-plan)"""
+    from app.services.job_service import JobService
+    from app.services.logging_service import LoggingService
+    from app.services.user_search_service import UserSearchService
+    
+    # Toute la liste filtrée (les paramètres de pagination sont ignorés)
+    filters = UserSearchService.parse_filters(request.args)
+    job = JobService.enqueue('users_pdf_export', {
+        'filters': filters,
+        'return_url': url_for('admin.users', **filters)
+    }, user=current_user)
+    
+    LoggingService.log_activity(
+        user=current_user,
+        action_type='export',
+        action_category='pdf',
+        description=f'Export PDF en lot des utilisateurs planifié (tâche {job.id})',
+        resource_type='User',
+        status='success'
+    )
+    
+    return redirect(url_for('jobs.view', job_id=job.id))
 
 @bp.route('/export/pdf/<int:user_id>')
 @login_required
@@ -291,16 +245,16 @@ def analyze_cv(user_id):
     if not user.cv_filename:
         return jsonify({'error': 'Aucun CV disponible pour cet utilisateur'}), 400
     
-    try:
-        user_data = {
-            'name': user.full_name,
-            'talents': [ut.talent_id for ut in user.user_talents] if user.user_talents else [],
-            'location': f"{user.city.name if user.city else ''}, {user.country.name if user.country else ''}"
-        }
-        analysis = CVAnalyzerService.analyze_cv(user.cv_filename, user_data)
-        return jsonify(analysis)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # L'analyse (extraction + appel IA) est exécutée par un worker de tâches
+    from app.services.job_service import JobService
+    job = JobService.enqueue('cv_analysis', {'user_id': user.id}, user=current_user)
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('jobs.status', job_id=job.id),
+        'result_url': url_for('jobs.result', job_id=job.id)
+    }), 202
 
 @bp.route('/talent/new', methods=['GET', 'POST'])
 @login_required
@@ -1241,6 +1195,13 @@ def settings_system():
     # Récupérer le code personnalisé pour le <head>
     custom_head_code = AppSettings.get('custom_head_code', '')
     
+    # Statistiques du cache des paramètres (propres à ce worker)
+    settings_cache_stats = AppSettings.cache_stats()
+    
+    # Écriture des logs d'activité (coût côté requête vs thread d'écriture)
+    from app.utils.activity_log_writer import activity_log_writer
+    activity_log_stats = activity_log_writer.stats()
+    
     # Récupérer les paramètres SEO
     seo_settings = SEOService.get_all_settings()
     
@@ -1249,7 +1210,9 @@ def settings_system():
                          stats=stats, 
                          system_info=system_info,
                          custom_head_code=custom_head_code,
-                         seo_settings=seo_settings)
+                         seo_settings=seo_settings,
+                         settings_cache_stats=settings_cache_stats,
+                         activity_log_stats=activity_log_stats)
 
 @bp.route('/save-custom-head-code', methods=['POST'])
 @login_required
@@ -1902,10 +1865,11 @@ def create_admin_user():
         from app.utils.id_generator import generate_unique_code
         from app.utils.qr_generator import generate_qr_code
         
-        user.unique_code = generate_unique_code(country.code, city.code, user.id, gender)
+        user.unique_code = generate_unique_code(country.code, city.code, gender)
         
         try:
-            qr_filename = generate_qr_code(user.unique_code, user.id)
+            qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
+            qr_filename = generate_qr_code(user.unique_code, qr_path)
             user.qr_code_filename = qr_filename
         except Exception as e:
             print(f"Erreur génération QR code: {e}")
@@ -2081,61 +2045,30 @@ def bulk_delete():
 @login_required
 @admin_required
 def create_backup():
-    """Créer une sauvegarde complète de l'application"""
+    """Créer une sauvegarde complète de l'application (préparée en arrière-plan)"""
+    from app.services.job_service import JobService
     from app.services.logging_service import LoggingService
     
-    zip_path = None
-    temp_dir = None
+    job = JobService.enqueue('full_backup', {
+        'return_url': url_for('admin.settings')
+    }, user=current_user)
     
-    try:
-        # Créer le backup
-        zip_path, temp_dir = BackupService.create_full_backup()
-        
-        # Log backup creation
-        LoggingService.log_activity(
-            user=current_user,
-            action_type='create',
-            action_category='settings',
-            description='Création d\'une sauvegarde complète',
-            resource_type='Backup',
-            status='success'
-        )
-        LoggingService.log_security_event(
-            event_type='backup_created',
-            description=f'Sauvegarde créée par {current_user.email}',
-            severity='info',
-            user=current_user
-        )
-        
-        # Définir le nettoyage après l'envoi de la réponse
-        @after_this_request
-        def cleanup(response):
-            try:
-                if temp_dir and os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
-            except Exception as e:
-                current_app.logger.warning(f"Impossible de nettoyer le temp_dir: {e}")
-            return response
-        
-        # Envoyer le fichier ZIP au client
-        return send_file(
-            zip_path,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=os.path.basename(zip_path)
-        )
+    LoggingService.log_activity(
+        user=current_user,
+        action_type='create',
+        action_category='settings',
+        description=f'Création d\'une sauvegarde complète (tâche {job.id})',
+        resource_type='Backup',
+        status='success'
+    )
+    LoggingService.log_security_event(
+        event_type='backup_created',
+        description=f'Sauvegarde demandée par {current_user.email}',
+        severity='info',
+        user=current_user
+    )
     
-    except Exception as e:
-        # Nettoyer en cas d'erreur
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
-        
-        current_app.logger.error(f'Erreur lors de la création du backup: {e}')
-        flash(f'Erreur lors de la création de la sauvegarde: {str(e)}', 'error')
-        return redirect(url_for('admin.settings'))
+    return redirect(url_for('jobs.view', job_id=job.id))
 
 
 @bp.route('/backup/restore', methods=['POST'])
@@ -2222,84 +2155,24 @@ def settings_watchlist():
     Page de gestion de la liste de surveillance des inscriptions
     """
     from app.models.settings import AppSettings
-    from app.models.user import User
-    from app.models.cinema_talent import CinemaTalent
-    import unicodedata
-    import re
+    from app.services.watchlist_service import find_watchlist_matches
     
     # Récupérer la configuration
     watchlist_names_raw = AppSettings.get('watchlist_names', '')
     watchlist_notification_email = AppSettings.get('watchlist_notification_email', '')
     watchlist_enabled = AppSettings.get('watchlist_enabled', False)
     
-    # Récupérer les personnes détectées
-    detected_registrations = []
-    
-    if watchlist_names_raw:
-        # Normaliser les noms de la watchlist
-        watchlist_names = [name.strip().lower() for name in watchlist_names_raw.split('\n') if name.strip()]
-        
-        def normalize_name(text):
-            """Normalise un nom en retirant les accents et les caractères spéciaux"""
-            if not text:
-                return ""
-            # Supprimer les accents
-            nfkd_form = unicodedata.normalize('NFKD', text.lower())
-            return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
-        
-        # Chercher dans les talents
-        all_talents = User.query.filter_by(role='user').all()
-        for talent in all_talents:
-            full_name_normalized = normalize_name(talent.full_name)
-            first_name_normalized = normalize_name(talent.first_name)
-            last_name_normalized = normalize_name(talent.last_name)
-            
-            for watch_name in watchlist_names:
-                watch_name_normalized = normalize_name(watch_name)
-                if (watch_name_normalized in full_name_normalized or 
-                    watch_name_normalized == first_name_normalized or 
-                    watch_name_normalized == last_name_normalized):
-                    detected_registrations.append({
-                        'full_name': talent.full_name,
-                        'unique_code': talent.unique_code,
-                        'type': 'talent',
-                        'city': talent.city.name if talent.city else None,
-                        'country': talent.country.name if talent.country else None,
-                        'created_at': talent.created_at
-                    })
-                    break
-        
-        # Chercher dans les talents cinéma
-        all_cinema_talents = CinemaTalent.query.all()
-        for cinema_talent in all_cinema_talents:
-            full_name_normalized = normalize_name(cinema_talent.full_name)
-            first_name_normalized = normalize_name(cinema_talent.first_name)
-            last_name_normalized = normalize_name(cinema_talent.last_name)
-            
-            for watch_name in watchlist_names:
-                watch_name_normalized = normalize_name(watch_name)
-                if (watch_name_normalized in full_name_normalized or 
-                    watch_name_normalized == first_name_normalized or 
-                    watch_name_normalized == last_name_normalized):
-                    detected_registrations.append({
-                        'full_name': cinema_talent.full_name,
-                        'unique_code': cinema_talent.unique_code,
-                        'type': 'cinema',
-                        'city': cinema_talent.city,
-                        'country': cinema_talent.country,
-                        'created_at': cinema_talent.created_at
-                    })
-                    break
-        
-        # Trier par date (plus récent en premier)
-        detected_registrations.sort(key=lambda x: x['created_at'] if x['created_at'] else '', reverse=True)
+    # Personnes détectées, page par page (plus récentes en premier)
+    page = request.args.get('page', 1, type=int)
+    detected = find_watchlist_matches(page=page, per_page=50)
     
     return render_template(
         'admin/settings/watchlist.html',
         watchlist_names=watchlist_names_raw,
         watchlist_notification_email=watchlist_notification_email,
         watchlist_enabled=watchlist_enabled,
-        detected_registrations=detected_registrations
+        detected_registrations=detected.items,
+        detected=detected
     )
 
 @bp.route('/settings/watchlist/save', methods=['POST'])
@@ -6,56 +6,68 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
 from app import db
 from app.models.talent import Talent
 from app.models.location import Country, City
+from app.utils.http_cache import cached_json_response
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 @bp.route('/countries')
 def get_countries():
-    countries = Country.query.order_by(Country.name).all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'code': c.code
-    } for c in countries])
+    def build():
+        countries = Country.query.order_by(Country.name).all()
+        return [{
+            'id': c.id,
+            'name': c.name,
+            'code': c.code
+        } for c in countries]
+    
+    return cached_json_response('api.countries', build, 'countries')
 
 @bp.route('/cities')
 def get_cities():
     country_id = request.args.get('country_id')
-    
     if country_id:
-        cities = City.query.filter_by(country_id=int(country_id)).order_by(City.name).all()
-    else:
-        cities = City.query.order_by(City.name).all()
-    
-    # Séparer "Ville non listée" pour la mettre en dernier
-    ville_non_listee = []
-    other_cities = []
+        country_id = int(country_id)
     
-    for city in cities:
-        if city.name == "Ville non listée":
-            ville_non_listee.append(city)
+    def build():
+        if country_id:
+            cities = City.query.filter_by(country_id=country_id).order_by(City.name).all()
         else:
-            other_cities.append(city)
+            cities = City.query.order_by(City.name).all()
+        
+        # Séparer "Ville non listée" pour la mettre en dernier
+        ville_non_listee = []
+        other_cities = []
+        
+        for city in cities:
+            if city.name == "Ville non listée":
+                ville_non_listee.append(city)
+            else:
+                other_cities.append(city)
+        
+        # Réorganiser: autres villes d'abord, puis "Ville non listée"
+        sorted_cities = other_cities + ville_non_listee
+        
+        return [{
+            'id': c.id,
+            'name': c.name,
+            'code': c.code
+        } for c in sorted_cities]
     
-    # Réorganiser: autres villes d'abord, puis "Ville non listée"
-    sorted_cities = other_cities + ville_non_listee
-    
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'code': c.code
-    } for c in sorted_cities])
+    return cached_json_response(f'api.cities:{country_id or ""}', build, 'cities')
 
 @bp.route('/talents')
 def get_talents():
-    talents = Talent.query.filter_by(is_active=True, tag='general').all()
-    return jsonify([{
-        'id': t.id,
-        'name': t.name,
-        'emoji': t.emoji,
-        'category': t.category
-    } for t in talents])
+    def build():
+        talents = Talent.query.filter_by(is_active=True, tag='general').all()
+        return [{
+            'id': t.id,
+            'name': t.name,
+            'emoji': t.emoji,
+            'category': t.category
+        } for t in talents]
+    
+    return cached_json_response('api.talents', build, 'talents')
@@ -10,7 +10,7 @@ from flask import request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.routes.api_v1 import bp
 from app.models.cinema_talent import CinemaTalent
-from app.models.location import Country
+from app.services.stats_service import StatsService
 from app import db
 from functools import wraps
 import json
@@ -98,23 +98,9 @@ def get_cinema_talents():
                 talent_dict['email'] = talent.email
             
             # Add JSON fields
-            if talent.ethnicities:
-                try:
-                    talent_dict['ethnicities'] = json.loads(talent.ethnicities)
-                except:
-                    talent_dict['ethnicities'] = []
-            
-            if talent.languages_spoken:
-                try:
-                    talent_dict['languages_spoken'] = json.loads(talent.languages_spoken)
-                except:
-                    talent_dict['languages_spoken'] = []
-            
-            if talent.other_talents:
-                try:
-                    talent_dict['other_talents'] = json.loads(talent.other_talents)
-                except:
-                    talent_dict['other_talents'] = []
+            for field in ('ethnicities', 'languages_spoken', 'other_talents'):
+                if getattr(talent, field):
+                    talent_dict[field] = getattr(talent, f'{field}_list')
             
             talents_data.append(talent_dict)
         
@@ -198,23 +184,9 @@ def get_cinema_talent(talent_id):
             talent_dict['linkedin'] = talent.linkedin
         
         # JSON fields
-        if talent.ethnicities:
-            try:
-                talent_dict['ethnicities'] = json.loads(talent.ethnicities)
-            except:
-                talent_dict['ethnicities'] = []
-        
-        if talent.languages_spoken:
-            try:
-                talent_dict['languages_spoken'] = json.loads(talent.languages_spoken)
-            except:
-                talent_dict['languages_spoken'] = []
-        
-        if talent.other_talents:
-            try:
-                talent_dict['other_talents'] = json.loads(talent.other_talents)
-            except:
-                talent_dict['other_talents'] = []
+        for field in ('ethnicities', 'languages_spoken', 'other_talents'):
+            if getattr(talent, field):
+                talent_dict[field] = getattr(talent, f'{field}_list')
         
         if talent.previous_productions:
             try:
@@ -241,7 +213,7 @@ def get_cinema_stats():
     """
     Get CINEMA module statistics
     ---
-    GET /api/v1/cinema/stats
+    GET /api/v1/cinema/stats?fresh=1
     
     Response:
     {
@@ -255,38 +227,12 @@ def get_cinema_stats():
     }
     """
     try:
-        total_talents = CinemaTalent.query.count()
-        active_talents = CinemaTalent.query.filter_by(is_active=True).count()
-        
-        # By gender
-        by_gender = {}
-        for gender in ['M', 'F', 'N']:
-            count = CinemaTalent.query.filter_by(gender=gender, is_active=True).count()
-            if count > 0:
-                by_gender[gender] = count
-        
-        # By country of origin
-        by_country = {}
-        countries = db.session.query(
-            Country.name, db.func.count(CinemaTalent.id)
-        ).join(
-            CinemaTalent, CinemaTalent.country_origin_id == Country.id
-        ).filter(
-            CinemaTalent.is_active == True
-        ).group_by(Country.name).all()
-        
-        for country_name, count in countries:
-            by_country[country_name] = count
+        stats, computed_at = StatsService.get('cinema', fresh=request.args.get('fresh') == '1')
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_talents': total_talents,
-                'active_talents': active_talents,
-                'inactive_talents': total_talents - active_talents,
-                'by_gender': by_gender,
-                'by_country': by_country
-            }
+            'stats': stats,
+            'computed_at': computed_at.isoformat()
         }), 200
         
     except Exception as e:
@@ -9,8 +9,9 @@ www.myoneart.com
 from flask import request, jsonify, current_app, send_file
 from flask_login import login_required, current_user
 from app.routes.api_v1 import bp
-from app.models.user import User
+from app.models.user import User, UserLoad
 from app.services.export_service import ExportService
+from app.utils.query_budget import query_budget
 from functools import wraps
 import io
 from datetime import datetime
@@ -30,6 +31,7 @@ def admin_required(f):
 @bp.route('/export/users/excel', methods=['GET'])
 @login_required
 @admin_required
+@query_budget(10)
 def export_users_excel():
     """
     Export all users to Excel
@@ -39,7 +41,7 @@ def export_users_excel():
     Response: Excel file download
     """
     try:
-        users = User.query.filter(User.is_admin == False).all()
+        users = User.query.options(*UserLoad.EXPORT).filter(User.is_admin == False).all()
         excel_bytes = ExportService.export_to_excel(users)
         
         buffer = io.BytesIO(excel_bytes)
@@ -63,6 +65,7 @@ def export_users_excel():
 @bp.route('/export/users/csv', methods=['GET'])
 @login_required
 @admin_required
+@query_budget(10)
 def export_users_csv():
     """
     Export all users to CSV
@@ -72,7 +75,7 @@ def export_users_csv():
     Response: CSV file download
     """
     try:
-        users = User.query.filter(User.is_admin == False).all()
+        users = User.query.options(*UserLoad.EXPORT).filter(User.is_admin == False).all()
         csv_bytes = ExportService.export_to_csv(users)
         
         buffer = io.BytesIO(csv_bytes)
@@ -96,6 +99,7 @@ def export_users_csv():
 @bp.route('/export/users/pdf', methods=['POST'])
 @login_required
 @admin_required
+@query_budget(10)
 def export_users_pdf():
     """
     Export selected users to PDF
@@ -119,7 +123,7 @@ def export_users_pdf():
                 'error': 'No user IDs provided'
             }), 400
         
-        users = User.query.filter(User.id.in_(user_ids)).all()
+        users = User.query.options(*UserLoad.EXPORT).filter(User.id.in_(user_ids)).all()
         
         if not users:
             return jsonify({
@@ -11,6 +11,7 @@ from flask_login import login_required
 from app.routes.api_v1 import bp
 from app.models.talent import Talent
 from app.models.location import Country, City
+from app.utils.http_cache import cached_json_response
 from app import db
 
 
@@ -35,7 +36,7 @@ def get_talents():
         ]
     }
     """
-    try:
+    def build():
         talents = Talent.query.filter_by(is_active=True).order_by(Talent.category, Talent.name).all()
         
         talents_data = []
@@ -48,11 +49,14 @@ def get_talents():
                 'is_active': talent.is_active
             })
         
-        return jsonify({
+        return {
             'success': True,
             'total': len(talents_data),
             'talents': talents_data
-        }), 200
+        }
+    
+    try:
+        return cached_json_response('api_v1.talents', build, 'talents')
         
     except Exception as e:
         current_app.logger.error(f'Get talents API error: {e}')
@@ -82,7 +86,7 @@ def get_countries():
         ]
     }
     """
-    try:
+    def build():
         countries = Country.query.order_by(Country.name).all()
         
         countries_data = []
@@ -94,11 +98,14 @@ def get_countries():
                 'flag': country.flag
             })
         
-        return jsonify({
+        return {
             'success': True,
             'total': len(countries_data),
             'countries': countries_data
-        }), 200
+        }
+    
+    try:
+        return cached_json_response('api_v1.countries', build, 'countries')
         
     except Exception as e:
         current_app.logger.error(f'Get countries API error: {e}')
@@ -128,12 +135,10 @@ def get_cities():
         ]
     }
     """
-    try:
-        country_id = request.args.get('country_id')
-        
+    def build(country_id):
         query = City.query
         if country_id:
-            query = query.filter_by(country_id=int(country_id))
+            query = query.filter_by(country_id=country_id)
         
         cities = query.order_by(City.name).all()
         
@@ -159,11 +164,19 @@ def get_cities():
                 'country_id': city.country_id
             })
         
-        return jsonify({
+        return {
             'success': True,
             'total': len(cities_data),
             'cities': cities_data
-        }), 200
+        }
+    
+    try:
+        country_id = request.args.get('country_id')
+        if country_id:
+            country_id = int(country_id)
+        
+        return cached_json_response(f'api_v1.cities:{country_id or ""}',
+                                    lambda: build(country_id), 'cities')
         
     except Exception as e:
         current_app.logger.error(f'Get cities API error: {e}')
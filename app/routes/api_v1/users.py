@@ -9,10 +9,11 @@ www.myoneart.com
 from flask import request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.routes.api_v1 import bp
-from app.models.user import User
+from app.models.user import User, UserLoad
 from app.models.talent import UserTalent, Talent
 from app.models.location import Country, City
 from app import db
+from app.utils.query_budget import query_budget
 from functools import wraps
 
 def admin_required(f):
@@ -30,6 +31,7 @@ def admin_required(f):
 @bp.route('/users', methods=['GET'])
 @login_required
 @admin_required
+@query_budget(10)
 def get_users():
     """
     Get all users with optional filters
@@ -56,7 +58,7 @@ def get_users():
         limit = min(int(request.args.get('limit', 20)), 100)
         
         # Base query
-        query = User.query.filter(User.is_admin == False)
+        query = User.query.options(*UserLoad.MATCHING).filter(User.is_admin == False)
         
         # Filters
         if search:
@@ -218,13 +218,6 @@ def register():
                 flash('Veuillez sélectionner un pays d\'origine et une ville de résidence.', 'error')
                 return render_template('auth/register.html', countries=countries, talents=talents, nationalities=nationalities)
             
-            # Générer le code unique avec le pays d'origine et la ville de résidence
-            user.unique_code = generate_unique_user_code(
-                origin_country.code,
-                residence_city.code,
-                user.gender or 'N'
-            )
-            
             password = generate_random_password()
             user.set_password(password)
             
@@ -244,24 +237,17 @@ def register():
                         user.cv_filename = filename
                         cv_file_path = os.path.join('app', 'static', 'uploads', 'cvs', filename)
             
-            db.session.add(user)
-            db.session.flush()
-            
             talent_ids = request.form.getlist('talents')
-            for talent_id in talent_ids:
-                user_talent = UserTalent(user_id=user.id, talent_id=int(talent_id))
-                db.session.add(user_talent)
-            
-            qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
-            qr_filename = generate_qr_code(user.unique_code, qr_path)
-            user.qr_code_filename = qr_filename
             
+            # Analyse IA du CV avant l'attribution du code : aucune transaction
+            # d'écriture ouverte pendant l'appel au fournisseur
             if cv_file_path and os.path.exists(cv_file_path):
                 try:
+                    city = City.query.get(user.city_id) if user.city_id else None
                     analysis_result = CVAnalyzerService.analyze_cv(user.cv_filename, {
                         'name': user.full_name,
                         'talents': [talent_id for talent_id in talent_ids],
-                        'location': f"{user.city.name if user.city else ''}, {user.country.name if user.country else ''}"
+                        'location': f"{city.name if city else ''}, {origin_country.name}"
                     })
                     
                     if analysis_result.get('success'):
@@ -271,6 +257,25 @@ def register():
                 except Exception as e:
                     current_app.logger.error(f"Erreur analyse CV: {str(e)}")
             
+            # Générer le code unique avec le pays d'origine et la ville de résidence
+            # (juste avant le commit : le compteur du pays reste verrouillé jusque-là)
+            user.unique_code = generate_unique_user_code(
+                origin_country.code,
+                residence_city.code,
+                user.gender or 'N'
+            )
+            
+            db.session.add(user)
+            db.session.flush()
+            
+            for talent_id in talent_ids:
+                user_talent = UserTalent(user_id=user.id, talent_id=int(talent_id))
+                db.session.add(user_talent)
+            
+            qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
+            qr_filename = generate_qr_code(user.unique_code, qr_path)
+            user.qr_code_filename = qr_filename
+            
             db.session.commit()
             
             # Log registration
@@ -13,7 +13,8 @@ from app.services.export_service import ExportService
 from app.services.logging_service import LoggingService
 from app.utils.file_handler import save_file
 from app.data.world_countries import NATIONALITIES, NATIONALITIES_WITH_FLAGS
-from app.data.world_cities import get_cities_by_country
+from app.data.world_cities import WORLD_CITIES, get_cities_by_country
+from app.utils.http_cache import cached_json_response
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import json
@@ -53,7 +54,11 @@ def contrats():
 @login_required
 def talents():
     """Talents CINEMA - Gestion des talents spécifiques au cinéma"""
-    talents_list = CinemaTalent.query.filter_by(is_active=True).order_by(CinemaTalent.created_at.desc()).all()
+    from app.services.cinema_search_service import CinemaSearchService
+    
+    # Première page seulement : filtres et pages suivantes via /cinema/api/talents/search
+    filters = CinemaSearchService.parse_filters(request.args)
+    results = CinemaSearchService.search(filters, page=request.args.get('page', 1))
     
     # Récupérer tous les pays de la base de données pour les filtres
     countries = Country.query.order_by(Country.name).all()
@@ -61,7 +66,9 @@ def talents():
     # Utiliser TOUJOURS les constantes complètes pour les filtres
     # (même principe que le formulaire d'inscription - synchronisation totale)
     return render_template('cinema/talents.html', 
-                         talents=talents_list,
+                         talents=results['talents'],
+                         results=results,
+                         filters=filters,
                          countries=countries,
                          languages=LANGUAGES_CINEMA,
                          cinema_talent_types=CINEMA_TALENT_TYPES,
@@ -71,6 +78,39 @@ def talents():
                          skin_tones=SKIN_TONES,
                          build_types=BUILD_TYPES)
 
+@bp.route('/api/talents/search', methods=['GET'])
+@login_required
+def search_talents_api():
+    """
+    Recherche à facettes des talents cinéma actifs
+    
+    GET /cinema/api/talents/search?q=&gender=F&age=18-25&language=Arabe&talent_type=Figurant(e)&page=2
+    (talent_type, language et ethnicity acceptent plusieurs valeurs : toutes doivent correspondre)
+    html=1 ajoute les lignes du tableau rendues par le serveur
+    """
+    from app.services.cinema_search_service import CinemaSearchService
+    
+    filters = CinemaSearchService.parse_filters(request.args)
+    results = CinemaSearchService.search(
+        filters,
+        page=request.args.get('page', 1),
+        per_page=request.args.get('per_page'),
+        with_facets=request.args.get('facets', '1') != '0'
+    )
+    
+    payload = {
+        'success': True,
+        'total': results['total'],
+        'page': results['page'],
+        'per_page': results['per_page'],
+        'pages': results['pages'],
+        'talents': [CinemaSearchService.serialize(talent) for talent in results['talents']],
+        'facets': results['facets']
+    }
+    if request.args.get('html') == '1':
+        payload['html'] = render_template('includes/cinema_talent_rows.html', talents=results['talents'])
+    return jsonify(payload)
+
 @bp.route('/productions')
 @login_required
 def productions():
@@ -414,7 +454,7 @@ def add_team_member():
             
             # Générer le code unique
             from app.utils.id_generator import generate_unique_code
-            user.unique_code = generate_unique_code(morocco.code, user.gender, casablanca.code)
+            user.unique_code = generate_unique_code(morocco.code, casablanca.code, user.gender)
         
         db.session.add(user)
         db.session.commit()
@@ -486,8 +526,16 @@ def api_search_movies():
 @bp.route('/api/cities/<country_code>', methods=['GET'])
 def api_get_cities(country_code):
     """API pour récupérer les villes d'un pays donné"""
-    cities = get_cities_by_country(country_code.upper())
-    return jsonify({'cities': cities, 'country_code': country_code.upper()})
+    country_code = country_code.upper()
+    if country_code not in WORLD_CITIES:
+        return jsonify({'cities': get_cities_by_country(country_code), 'country_code': country_code})
+    
+    # Données statiques : corps construit une seule fois par processus
+    return cached_json_response(
+        f'cinema.cities:{country_code}',
+        lambda: {'cities': get_cities_by_country(country_code), 'country_code': country_code},
+        'cities', ttl=0
+    )
 
 @bp.route('/register', methods=['GET', 'POST'])
 def register_talent():
@@ -523,9 +571,7 @@ def register_talent():
                 talent.id_document_number_encrypted = encrypt_sensitive_data(id_doc_number)
             
             # Origins - Multiple ethnicities
-            ethnicities = request.form.getlist('ethnicities')
-            if ethnicities:
-                talent.ethnicities = json.dumps(ethnicities)
+            talent.ethnicities_list = request.form.getlist('ethnicities')
             
             talent.country_of_origin = request.form.get('country_of_origin')
             talent.nationality = request.form.get('nationality')
@@ -538,9 +584,7 @@ def register_talent():
             talent.city_of_residence = request.form.get('city_of_residence')
             
             # Languages - Multiple choices
-            languages = request.form.getlist('languages')
-            if languages:
-                talent.languages_spoken = json.dumps(languages)
+            talent.languages_spoken_list = request.form.getlist('languages')
             
             years_exp = request.form.get('years_of_experience')
             talent.years_of_experience = int(years_exp) if years_exp else 0
@@ -555,9 +599,7 @@ def register_talent():
             talent.build = request.form.get('build')
             
             # Other Talents - Multiple choices
-            other_talents = request.form.getlist('other_talents')
-            if other_talents:
-                talent.other_talents = json.dumps(other_talents)
+            talent.other_talents_list = request.form.getlist('other_talents')
             
             if 'profile_photo' in request.files:
                 photo = request.files['profile_photo']
@@ -581,8 +623,7 @@ def register_talent():
                         filename = save_file(gallery_file, 'cinema_photos')
                         if filename:
                             gallery_filenames.append(filename)
-            if gallery_filenames:
-                talent.gallery_photos = json.dumps(gallery_filenames)
+            talent.gallery_photos_list = gallery_filenames
             
             # Valider l'email et le téléphone
             from app.utils.validation_service import ValidationService
@@ -695,9 +736,35 @@ def register_talent():
             talent.previous_productions = request.form.get('previous_productions')
             
             # Talent Types (Multiple choices from CINEMA_TALENT_TYPES)
-            talent_types = request.form.getlist('talent_types')
-            if talent_types:
-                talent.talent_types = json.dumps(talent_types)
+            talent.talent_types_list = request.form.getlist('talent_types')
+            
+            # Préparer le compte User associé (hachage du mot de passe, copie de la photo)
+            # avant l'attribution du code : le compteur du pays reste verrouillé jusqu'au commit
+            from app.utils.email_service import generate_random_password
+            from app.models.user import User
+            
+            cinema_user = User()
+            cinema_user.first_name = talent.first_name
+            cinema_user.last_name = talent.last_name
+            cinema_user.email = talent.email
+            cinema_user.gender = talent.gender
+            cinema_user.date_of_birth = talent.date_of_birth
+            cinema_user.is_admin = False
+            cinema_user.account_active = True
+            
+            # Générer un mot de passe au format simple (Talent + 4 chiffres)
+            password = generate_random_password()
+            cinema_user.set_password(password)
+            
+            # Copier la photo si disponible
+            if talent.profile_photo_filename:
+                # Copier physiquement le fichier de cinema_photos vers photos pour l'affichage dans le tableau principal
+                from app.utils.file_handler import copy_file_between_folders
+                copy_success = copy_file_between_folders(talent.profile_photo_filename, 'cinema_photos', 'photo')
+                if copy_success:
+                    cinema_user.photo_filename = talent.profile_photo_filename
+                else:
+                    current_app.logger.warning(f"Impossible de copier la photo de profil pour le talent {talent.first_name} {talent.last_name}")
             
             # Generate unique code for CINEMA talent (format: PPVVVNNNNNG)
             # Utilise le pays d'origine (country_of_origin) et la ville de résidence
@@ -708,20 +775,7 @@ def register_talent():
                 talent.gender
             )
             
-            # Generate QR code for CINEMA talent
-            from app.utils.qr_generator import generate_qr_code
-            qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
-            qr_filename = generate_qr_code(talent.unique_code, qr_path)
-            talent.qr_code_filename = qr_filename
-            
-            db.session.add(talent)
-            db.session.flush()
-            
-            # Créer automatiquement un compte User pour permettre la connexion
-            from app.utils.email_service import generate_random_password
-            from app.models.user import User
-            
-            # Vérifier si un User existe déjà avec ce code (ne devrait pas arriver)
+            # Vérifier que le code a bien été généré (ne devrait pas arriver)
             if not talent.unique_code:
                 flash('Erreur: code unique CINEMA non généré.', 'error')
                 db.session.rollback()
@@ -737,32 +791,17 @@ def register_talent():
                                      skin_tones=SKIN_TONES,
                                      build_types=BUILD_TYPES)
             
-            # Créer le compte User associé au talent cinéma
-            cinema_user = User()
-            cinema_user.unique_code = talent.unique_code
-            cinema_user.first_name = talent.first_name
-            cinema_user.last_name = talent.last_name
-            cinema_user.email = talent.email
-            cinema_user.gender = talent.gender
-            cinema_user.date_of_birth = talent.date_of_birth
-            cinema_user.is_admin = False
-            cinema_user.account_active = True
-            
-            # Générer un mot de passe au format simple (Talent + 4 chiffres)
-            password = generate_random_password()
-            cinema_user.set_password(password)
+            # Generate QR code for CINEMA talent
+            from app.utils.qr_generator import generate_qr_code
+            qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
+            qr_filename = generate_qr_code(talent.unique_code, qr_path)
+            talent.qr_code_filename = qr_filename
             
-            # Copier la photo si disponible
-            if talent.profile_photo_filename:
-                # Copier physiquement le fichier de cinema_photos vers photos pour l'affichage dans le tableau principal
-                from app.utils.file_handler import copy_file_between_folders
-                copy_success = copy_file_between_folders(talent.profile_photo_filename, 'cinema_photos', 'photo')
-                if copy_success:
-                    cinema_user.photo_filename = talent.profile_photo_filename
-                else:
-                    current_app.logger.warning(f"Impossible de copier la photo de profil pour le talent {talent.unique_code}")
+            db.session.add(talent)
+            db.session.flush()
             
-            # Copier le QR code
+            # Compte User associé au talent cinéma : même code et même QR code
+            cinema_user.unique_code = talent.unique_code
             cinema_user.qr_code_filename = talent.qr_code_filename
             
             db.session.add(cinema_user)
@@ -854,32 +893,14 @@ def view_profile(unique_code):
             if encrypted_value:
                 decrypted_data[field] = decrypt_sensitive_data(encrypted_value)
     
-    # Parser les données JSON
-    parsed_data = {}
-    
-    if talent.ethnicities:
-        try:
-            parsed_data['ethnicities'] = json.loads(talent.ethnicities)
-        except:
-            parsed_data['ethnicities'] = []
-    
-    if talent.languages_spoken:
-        try:
-            parsed_data['languages'] = json.loads(talent.languages_spoken)
-        except:
-            parsed_data['languages'] = []
-    
-    if talent.talent_types:
-        try:
-            parsed_data['talent_types'] = json.loads(talent.talent_types)
-        except:
-            parsed_data['talent_types'] = []
-    
-    if talent.other_talents:
-        try:
-            parsed_data['talents'] = json.loads(talent.other_talents)
-        except:
-            parsed_data['talents'] = []
+    # Listes JSON décodées
+    parsed_data = {
+        'ethnicities': talent.ethnicities_list,
+        'languages': talent.languages_spoken_list,
+        'talent_types': talent.talent_types_list,
+        'talents': talent.other_talents_list,
+        'gallery': talent.gallery_photos_list
+    }
     
     if talent.previous_productions:
         try:
@@ -887,12 +908,6 @@ def view_profile(unique_code):
         except:
             parsed_data['productions'] = []
     
-    if talent.gallery_photos:
-        try:
-            parsed_data['gallery'] = json.loads(talent.gallery_photos)
-        except:
-            parsed_data['gallery'] = []
-    
     # Récupérer les drapeaux des pays
     from app.models.location import Country
     country_flags = {}
@@ -1203,24 +1218,18 @@ def print_talents_list():
                 pass
         
         ethnicity = ""
-        if talent.ethnicities:
-            try:
-                ethnicities_list = json.loads(talent.ethnicities)
-                ethnicity = ethnicities_list[0] if ethnicities_list else ""
-                if len(ethnicities_list) > 1:
-                    ethnicity += f" +{len(ethnicities_list)-1}"
-            except:
-                pass
+        ethnicities_list = talent.ethnicities_list
+        if ethnicities_list:
+            ethnicity = ethnicities_list[0]
+            if len(ethnicities_list) > 1:
+                ethnicity += f" +{len(ethnicities_list)-1}"
         
         talent_type = ""
-        if talent.talent_types:
-            try:
-                talent_types_list = json.loads(talent.talent_types)
-                talent_type = talent_types_list[0] if talent_types_list else ""
-                if len(talent_types_list) > 1:
-                    talent_type += f" +{len(talent_types_list)-1}"
-            except:
-                pass
+        talent_types_list = talent.talent_types_list
+        if talent_types_list:
+            talent_type = talent_types_list[0]
+            if len(talent_types_list) > 1:
+                talent_type += f" +{len(talent_types_list)-1}"
         
         data.append([
             full_name,
@@ -1747,7 +1756,7 @@ def generate_project_badge(project_talent_id):
     from reportlab.lib.enums import TA_CENTER
     from reportlab.platypus import Paragraph
     from reportlab.lib.styles import ParagraphStyle
-    import qrcode
+    from app.utils import qr_cache
     import os
     from PIL import Image as PILImage
     
@@ -1779,13 +1788,8 @@ def generate_project_badge(project_talent_id):
             (page_width/2 + horizontal_spacing/2, vertical_spacing)  # Bottom right
         ]
         
-        # Générer le QR code avec le code unique du projet
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
-        qr.add_data(project_talent.project_code)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        qr_path = f"/tmp/qr_{project_talent.project_code}.png"
-        qr_img.save(qr_path)
+        # QR code du code projet, lu depuis le cache des QR codes (rendu une seule fois)
+        qr_path = qr_cache.qr_path(project_talent.project_code, box_size=10, border=2, error_correction='M')
         
         # Logo path
         logo_path = os.path.join('app', 'static', 'img', 'logo.png')
@@ -2002,10 +2006,6 @@ def generate_project_badge(project_talent_id):
         # Finaliser le PDF
         c.save()
         
-        # Nettoyer les fichiers temporaires
-        if os.path.exists(qr_path):
-            os.remove(qr_path)
-        
         # Nettoyer l'image par défaut si elle a été créée
         default_photo_path = f"/tmp/default_photo_{project_talent.project_code}.png"
         if os.path.exists(default_photo_path):
@@ -2034,58 +2034,39 @@ def generate_project_badge(project_talent_id):
 def send_project_selection_emails(project_id):
     """Envoyer des emails de confirmation aux talents assignés à un projet"""
     from app.models.project import Project, ProjectTalent
-    from app.services.email_service import email_service
+    from app.services.job_service import JobService
     from app.services.logging_service import LoggingService
     
     project = Project.query.get_or_404(project_id)
-    project_talents = ProjectTalent.query.filter_by(project_id=project_id).all()
+    talents_count = ProjectTalent.query.filter_by(project_id=project_id).count()
     
-    if not project_talents:
+    if not talents_count:
         flash('❌ Aucun talent assigné à ce projet', 'error')
         return redirect(url_for('cinema.project_detail', project_id=project_id))
     
-    emails_sent = 0
-    emails_failed = 0
-    
-    for project_talent in project_talents:
-        try:
-            cinema_talent = project_talent.cinema_talent
-            if cinema_talent and cinema_talent.email:
-                success = email_service.send_project_selection_confirmation(
-                    project_talent=project_talent,
-                    sent_by_user_id=current_user.id if current_user.is_authenticated else None
-                )
-                if success:
-                    emails_sent += 1
-                else:
-                    emails_failed += 1
-        except Exception as e:
-            logger.warning(f"Erreur envoi email au talent {project_talent.cinema_talent.unique_code}: {e}")
-            emails_failed += 1
+    # Envoi en arrière-plan : un email par talent assigné
+    job = JobService.enqueue('project_selection_emails', {
+        'project_id': project.id,
+        'return_url': url_for('cinema.project_detail', project_id=project_id)
+    }, user=current_user)
     
     LoggingService.log_activity(
         user=current_user,
         action_type='email',
         action_category='project',
-        description=f'Envoi emails de confirmation aux talents du projet "{project.name}" ({emails_sent} envoyés, {emails_failed} échoués)',
+        description=f'Envoi emails de confirmation aux talents du projet "{project.name}" planifié ({talents_count} talents, tâche {job.id})',
         resource_type='Project',
         resource_id=project.id,
-        status='success' if emails_sent > 0 else 'error'
+        status='success'
     )
     
-    if emails_sent > 0:
-        flash(f'✅ {emails_sent} email(s) de confirmation envoyé(s) avec succès !', 'success')
-    if emails_failed > 0:
-        flash(f'⚠️ {emails_failed} email(s) n\'ont pas pu être envoyés', 'warning')
-    
-    return redirect(url_for('cinema.project_detail', project_id=project_id))
+    return redirect(url_for('jobs.view', job_id=job.id))
 
 @bp.route('/ai-search-cinema-talents', methods=['POST'])
 @login_required
 def ai_search_cinema_talents():
     """Recherche de talents cinéma par IA basée sur une description de rôle"""
     try:
-        from app.services.ai_matching_service import AIMatchingService
         from werkzeug.utils import secure_filename
         import logging
         
@@ -2150,46 +2131,15 @@ def ai_search_cinema_talents():
             flash('Veuillez fournir une description de rôle (texte ou fichier)', 'error')
             return redirect(url_for('cinema.talents'))
         
-        all_cinema_talents = CinemaTalent.query.filter_by(is_active=True).all()
-        
-        if not all_cinema_talents:
-            flash('Aucun profil cinéma disponible pour l\'analyse', 'warning')
-            return redirect(url_for('cinema.talents'))
-        
-        results = AIMatchingService.analyze_cinema_talents(
-            job_description=job_description,
-            cinema_talent_profiles=all_cinema_talents
-        )
-        
-        if not results.get('success'):
-            flash(results.get('message', 'Erreur lors de l\'analyse'), 'error')
-            return redirect(url_for('cinema.talents'))
-        
-        # Envoyer des notifications email aux talents cinéma qui matchent
-        from app.services.email_service import email_service
-        emails_sent = 0
-        for candidate in results.get('candidates', []):
-            try:
-                cinema_talent = CinemaTalent.query.filter_by(unique_code=candidate.get('code')).first()
-                if cinema_talent and cinema_talent.email:
-                    success = email_service.send_cinema_ai_match_notification(
-                        cinema_talent=cinema_talent,
-                        role_description=job_description,
-                        match_score=candidate.get('score', 0),
-                        match_reason=candidate.get('reason', ''),
-                        sent_by_user_id=current_user.id if current_user.is_authenticated else None
-                    )
-                    if success:
-                        emails_sent += 1
-            except Exception as e:
-                logger.warning(f"Erreur envoi email au talent cinéma {candidate.get('code')}: {e}")
-        
-        if emails_sent > 0:
-            flash(f'✅ {emails_sent} notification(s) email envoyée(s) aux talents cinéma matchés', 'success')
+        # Pré-filtre et analyse IA sont exécutés par un worker de tâches
+        from app.services.job_service import JobService
+        job = JobService.enqueue('ai_search', {
+            'job_description': job_description,
+            'scope': 'cinema',
+            'return_url': url_for('cinema.talents')
+        }, user=current_user)
         
-        return render_template('cinema/ai_search_results.html',
-                             job_description=job_description,
-                             results=results)
+        return redirect(url_for('jobs.view', job_id=job.id))
     
     except Exception as e:
         logger.error(f"Erreur lors de la recherche IA cinéma: {e}")
@@ -0,0 +1,124 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Suivi des tâches d'arrière-plan : progression, annulation, récupération du résultat
+"""
+
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, send_file, abort
+from flask_login import login_required, current_user
+from app.models.background_job import BackgroundJob
+from app.services.job_service import JobService
+import os
+
+bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+def _get_job_or_404(job_id):
+    job = JobService.get_for_user(job_id, current_user)
+    if job is None:
+        abort(404)
+    return job
+
+
+def _job_payload(job):
+    data = job.to_dict()
+    data['label'] = JobService.get_label(job.job_type)
+    data['status_url'] = url_for('jobs.status', job_id=job.id)
+    data['cancel_url'] = url_for('jobs.cancel', job_id=job.id)
+    data['result_url'] = url_for('jobs.result', job_id=job.id)
+    return data
+
+
+@bp.route('/<int:job_id>')
+@login_required
+def view(job_id):
+    """Page de suivi d'une tâche (rafraîchie par polling)"""
+    job = _get_job_or_404(job_id)
+    return render_template('jobs/status.html',
+                         job=job,
+                         job_label=JobService.get_label(job.job_type),
+                         return_url=job.params_data.get('return_url') or url_for('main.index'))
+
+
+@bp.route('/<int:job_id>/status')
+@login_required
+def status(job_id):
+    """Statut JSON d'une tâche"""
+    return jsonify(_job_payload(_get_job_or_404(job_id)))
+
+
+@bp.route('/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel(job_id):
+    """Annuler une tâche en attente ou demander l'arrêt d'une tâche en cours"""
+    job = _get_job_or_404(job_id)
+    JobService.request_cancel(job)
+    return jsonify(_job_payload(job))
+
+
+@bp.route('/<int:job_id>/result')
+@login_required
+def result(job_id):
+    """Récupérer le résultat d'une tâche terminée (fichier, page de résultats ou JSON)"""
+    job = _get_job_or_404(job_id)
+    
+    if job.status != BackgroundJob.STATUS_SUCCEEDED:
+        flash('Le résultat de cette tâche n\'est pas disponible', 'warning')
+        return redirect(url_for('jobs.view', job_id=job.id))
+    
+    data = job.result_data or {}
+    
+    if data.get('file'):
+        if not os.path.exists(data['file']):
+            flash('Le fichier de résultat a expiré, veuillez relancer la tâche', 'error')
+            return redirect(url_for('jobs.view', job_id=job.id))
+        return send_file(
+            data['file'],
+            mimetype=data.get('mimetype'),
+            as_attachment=True,
+            download_name=data.get('download_name')
+        )
+    
+    if data.get('view') == 'ai_search':
+        return _render_ai_search_result(data)
+    
+    return jsonify(data)
+
+
+@bp.route('/recent')
+@login_required
+def recent():
+    """Dernières tâches de l'utilisateur connecté"""
+    jobs = BackgroundJob.query.filter_by(created_by_id=current_user.id).order_by(
+        BackgroundJob.created_at.desc()
+    ).limit(20).all()
+    return jsonify([_job_payload(job) for job in jobs])
+
+
+def _render_ai_search_result(data):
+    """Recharger les profils matchés et réutiliser les templates de résultats existants"""
+    candidates = data.get('candidates', [])
+    ids = [candidate['subject_id'] for candidate in candidates]
+    
+    if data.get('scope') == 'cinema':
+        from app.models.cinema_talent import CinemaTalent
+        model, key, template = CinemaTalent, 'talent', 'cinema/ai_search_results.html'
+    else:
+        from app.models.user import User
+        model, key, template = User, 'user', 'ai_search_results.html'
+    
+    profiles = {profile.id: profile for profile in model.query.filter(model.id.in_(ids)).all()} if ids else {}
+    
+    results = dict(data)
+    results['candidates'] = [
+        {**candidate, key: profiles[candidate['subject_id']]}
+        for candidate in candidates if candidate['subject_id'] in profiles
+    ]
+    
+    return render_template(template,
+                         job_description=data.get('job_description', ''),
+                         results=results)
@@ -8,13 +8,16 @@ www.myoneart.com
 
 from flask import Blueprint, redirect, url_for, render_template, request, flash
 from flask_login import login_required, current_user
-from app.models.user import User
+from app.models.user import User, UserLoad
 from app.models.talent import Talent, UserTalent
 from app.models.location import Country, City
 from app import db
 from sqlalchemy import func, desc, or_
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from app.utils.query_budget import query_budget
+from app.services.stats_service import StatsService
+from app.utils.blind_index import phone_search_clause
 import os
 import logging
 
@@ -62,28 +65,23 @@ def admin_dashboard():
         User.id.in_(db.session.query(users_with_general_talents_subquery))
     )
     
-    # Filtres de recherche (sans phone/whatsapp qui sont chiffrés)
-    search_in_encrypted_fields = False
+    # Filtres de recherche (téléphone / WhatsApp chiffrés : index aveugle, voir app/utils/blind_index.py)
     if search_query:
         search_pattern = f'%{search_query}%'
-        query_with_search = query.filter(
-            or_(
-                User.first_name.ilike(search_pattern),
-                User.last_name.ilike(search_pattern),
-                User.email.ilike(search_pattern),
-                User.unique_code.ilike(search_pattern)
-            )
-        )
-        search_in_encrypted_fields = True
-    else:
-        query_with_search = query
+        search_criteria = [
+            User.first_name.ilike(search_pattern),
+            User.last_name.ilike(search_pattern),
+            User.email.ilike(search_pattern),
+            User.unique_code.ilike(search_pattern)
+        ]
+        phone_clause = phone_search_clause(User, search_query)
+        if phone_clause is not None:
+            search_criteria.append(phone_clause)
+        query = query.filter(or_(*search_criteria))
     
     if search_code:
         code_clean = search_code.replace('-', '').upper()
-        query_with_search = query_with_search.filter(User.unique_code.ilike(f'%{code_clean}%'))
-        search_in_encrypted_fields = False
-    
-    query = query_with_search
+        query = query.filter(User.unique_code.ilike(f'%{code_clean}%'))
     
     if talent_filter:
         for talent_id in talent_filter:
@@ -128,98 +126,10 @@ def admin_dashboard():
         except ValueError:
             pass
     
-    # Si search_in_encrypted_fields, on récupère TOUS les users filtres de base
-    # puis on filtre en Python pour inclure phone/whatsapp
-    if search_in_encrypted_fields and search_query:
-        # Récupérer les users qui matchent déjà
-        matched_users = query.order_by(User.created_at.desc()).all()
-        matched_ids = {u.id for u in matched_users}
-        
-        # Récupérer tous les users avec autres filtres (sans search_query)
-        # pour chercher dans phone/whatsapp
-        base_query = User.query.filter(
-            User.is_admin == False,
-            User.id.in_(db.session.query(users_with_general_talents_subquery))
-        )
-        
-        # Réappliquer tous les filtres sauf search_query
-        if talent_filter:
-            for talent_id in talent_filter:
-                base_query = base_query.join(UserTalent).filter(UserTalent.talent_id == int(talent_id))
-        if country_filter:
-            base_query = base_query.filter(User.country_id == int(country_filter))
-        if city_filter:
-            base_query = base_query.filter(User.residence_city_id == int(city_filter))
-        if gender_filter:
-            base_query = base_query.filter(User.gender == gender_filter)
-        if availability_filter:
-            base_query = base_query.filter(User.availability == availability_filter)
-        if work_mode_filter:
-            base_query = base_query.filter(User.work_mode == work_mode_filter)
-        if has_cv == 'yes':
-            base_query = base_query.filter(User.cv_filename.isnot(None))
-        elif has_cv == 'no':
-            base_query = base_query.filter(User.cv_filename.is_(None))
-        if has_portfolio == 'yes':
-            base_query = base_query.filter(User.portfolio_url.isnot(None))
-        elif has_portfolio == 'no':
-            base_query = base_query.filter(User.portfolio_url.is_(None))
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                base_query = base_query.filter(User.created_at >= date_from_obj)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-                base_query = base_query.filter(User.created_at <= date_to_obj)
-            except ValueError:
-                pass
-        
-        all_users_for_search = base_query.order_by(User.created_at.desc()).all()
-        search_lower = search_query.lower()
-        
-        # Chercher dans phone/whatsapp pour les users pas encore matchés
-        for user in all_users_for_search:
-            if user.id not in matched_ids:
-                try:
-                    if (user.phone and search_lower in user.phone.lower()) or \
-                       (user.whatsapp and search_lower in user.whatsapp.lower()):
-                        matched_users.append(user)
-                except:
-                    pass
-        
-        users = matched_users
-    else:
-        users = query.order_by(User.created_at.desc()).all()
-    
-    # Statistiques générales basées sur les utilisateurs actifs (uniquement talents généraux)
-    total_users = User.query.filter(
-        User.account_active == True,
-        User.is_admin == False
-    ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().count()
-    
-    # Nombre de compétences sélectionnées par les talents (pas le total disponible)
-    total_talents_selected = db.session.query(func.count(func.distinct(UserTalent.talent_id))).filter(
-        UserTalent.user_id.in_(
-            db.session.query(User.id).filter_by(account_active=True, is_admin=False)
-        )
-    ).scalar() or 0
-    
-    # Nombre de villes où il y a des utilisateurs inscrits
-    total_cities_with_users = db.session.query(func.count(func.distinct(User.city_id))).filter(
-        User.account_active == True,
-        User.is_admin == False,
-        User.city_id.isnot(None)
-    ).scalar() or 0
+    users = query.order_by(User.created_at.desc()).all()
     
-    # Nombre de pays où il y a des utilisateurs inscrits
-    total_countries_with_users = db.session.query(func.count(func.distinct(User.country_id))).filter(
-        User.account_active == True,
-        User.is_admin == False,
-        User.country_id.isnot(None)
-    ).scalar() or 0
+    # Statistiques générales précalculées (voir StatsService), ?fresh=1 force le recalcul
+    dashboard_stats, _ = StatsService.get('dashboard', fresh=request.args.get('fresh') == '1')
     
     # Utilisateurs récents (derniers 6) - uniquement talents généraux
     recent_users = User.query.filter(
@@ -227,38 +137,15 @@ def admin_dashboard():
         User.is_admin == False
     ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().order_by(desc(User.created_at)).limit(6).all()
     
-    # Top 10 compétences les plus sélectionnées par les utilisateurs
-    top_talents = db.session.query(
-        Talent.name,
-        Talent.emoji,
-        Talent.category,
-        func.count(UserTalent.talent_id).label('count')
-    ).join(UserTalent).join(User).filter(
-        User.account_active == True,
-        User.is_admin == False
-    ).group_by(Talent.id, Talent.name, Talent.emoji, Talent.category).order_by(desc('count')).limit(10).all()
-    
-    # Top 10 villes du monde avec le plus de talents
-    top_world_cities = db.session.query(
-        City.name,
-        Country.name.label('country_name'),
-        func.count(User.id).label('user_count')
-    ).join(User, City.id == User.residence_city_id
-    ).join(Country, Country.id == User.residence_country_id
-    ).filter(
-        User.account_active == True,
-        User.is_admin == False
-    ).group_by(City.id, City.name, Country.name).order_by(desc('user_count')).limit(10).all()
-    
     # Données pour les filtres - exclure les talents cinéma
     all_talents = Talent.query.filter_by(tag='general').order_by(Talent.category, Talent.name).all()
     all_countries = Country.query.order_by(Country.name).all()
     all_cities = City.query.order_by(City.name).all()
     
     stats = {
-        'total_users': total_users,
-        'with_cv': User.query.filter(User.cv_filename.isnot(None)).count(),
-        'with_portfolio': User.query.filter(User.portfolio_url.isnot(None)).count(),
+        'total_users': dashboard_stats['total_users'],
+        'with_cv': dashboard_stats['with_cv'],
+        'with_portfolio': dashboard_stats['with_portfolio'],
         'filtered_count': len(users)
     }
     
@@ -268,13 +155,13 @@ def admin_dashboard():
                          countries=all_countries,
                          cities=all_cities,
                          stats=stats,
-                         total_users=total_users,
-                         total_talents_selected=total_talents_selected,
-                         total_countries_with_users=total_countries_with_users,
-                         total_cities_with_users=total_cities_with_users,
+                         total_users=dashboard_stats['total_users'],
+                         total_talents_selected=dashboard_stats['total_talents_selected'],
+                         total_countries_with_users=dashboard_stats['total_countries_with_users'],
+                         total_cities_with_users=dashboard_stats['total_cities_with_users'],
                          recent_users=recent_users,
-                         top_talents=top_talents,
-                         top_world_cities=top_world_cities)
+                         top_talents=dashboard_stats['top_talents'],
+                         top_world_cities=dashboard_stats['top_world_cities'])
 
 @bp.route('/contrats')
 @login_required
@@ -284,6 +171,7 @@ def contrats():
 
 @bp.route('/talents')
 @login_required
+@query_budget(10)
 def talents():
     """Page de recherche et visualisation des talents - Exactement comme le dashboard"""
     search_query = request.args.get('search', '').strip()
@@ -295,7 +183,7 @@ def talents():
     gender_filter = request.args.get('gender')
     
     # Obtenir tous les utilisateurs avec filtres - uniquement talents généraux
-    user_query = User.query.filter(
+    user_query = User.query.options(*UserLoad.LIST).filter(
         User.account_active == True,
         User.is_admin == False
     ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct()
@@ -306,18 +194,18 @@ def talents():
             UserTalent.talent_id == int(talent_filter)
         )
     
-    # Appliquer les filtres de recherche
-    search_in_encrypted = False
+    # Appliquer les filtres de recherche (téléphone / WhatsApp : index aveugle)
     if search_query:
         search_pattern = f'%{search_query}%'
-        user_query = user_query.filter(
-            or_(
-                User.first_name.ilike(search_pattern),
-                User.last_name.ilike(search_pattern),
-                User.email.ilike(search_pattern)
-            )
-        )
-        search_in_encrypted = True
+        search_criteria = [
+            User.first_name.ilike(search_pattern),
+            User.last_name.ilike(search_pattern),
+            User.email.ilike(search_pattern)
+        ]
+        phone_clause = phone_search_clause(User, search_query)
+        if phone_clause is not None:
+            search_criteria.append(phone_clause)
+        user_query = user_query.filter(or_(*search_criteria))
     
     if search_code:
         user_query = user_query.filter(User.unique_code.ilike(f'%{search_code}%'))
@@ -334,42 +222,7 @@ def talents():
     if gender_filter:
         user_query = user_query.filter(User.gender == gender_filter)
     
-    # Recherche dans phone/whatsapp si search_query présent
-    if search_in_encrypted and search_query:
-        matched_users = user_query.distinct().order_by(User.created_at.desc()).all()
-        matched_ids = {u.id for u in matched_users}
-        
-        # Récupérer tous les users avec filtres de base (sans search_query) - exclure talents cinéma
-        base_query = User.query.filter(
-            User.account_active == True,
-            User.is_admin == False,
-            func.length(User.unique_code) == 10
-        )
-        if talent_filter:
-            base_query = base_query.join(UserTalent).filter(UserTalent.talent_id == int(talent_filter))
-        if availability_filter:
-            base_query = base_query.filter(User.availability == availability_filter)
-        if work_mode_filter:
-            base_query = base_query.filter(User.work_mode == work_mode_filter)
-        if city_filter:
-            base_query = base_query.filter(User.residence_city_id == int(city_filter))
-        if gender_filter:
-            base_query = base_query.filter(User.gender == gender_filter)
-        
-        all_users = base_query.distinct().order_by(User.created_at.desc()).all()
-        search_lower = search_query.lower()
-        
-        for user in all_users:
-            if user.id not in matched_ids:
-                try:
-                    if (user.phone and search_lower in user.phone.lower()) or \
-                       (user.whatsapp and search_lower in user.whatsapp.lower()):
-                        matched_users.append(user)
-                except:
-                    pass
-        users = matched_users
-    else:
-        users = user_query.distinct().order_by(User.created_at.desc()).all()
+    users = user_query.distinct().order_by(User.created_at.desc()).all()
     
     # Données pour les filtres - exclure les talents cinéma
     all_cities = City.query.order_by(City.name).all()
@@ -383,6 +236,7 @@ def talents():
 
 @bp.route('/talents/users/<int:talent_id>')
 @login_required
+@query_budget(10)
 def talent_users(talent_id):
     """Page affichant les utilisateurs qui ont un talent spécifique"""
     talent = Talent.query.get_or_404(talent_id)
@@ -395,7 +249,7 @@ def talent_users(talent_id):
     gender_filter = request.args.get('gender')
     
     # Base query: utilisateurs qui ont ce talent (exclure talents cinéma)
-    query = User.query.join(UserTalent).filter(
+    query = User.query.options(*UserLoad.LIST).join(UserTalent).filter(
         UserTalent.talent_id == talent_id,
         User.account_active == True,
         User.is_admin == False,
@@ -441,8 +295,6 @@ def talent_users(talent_id):
 def ai_search():
     """Recherche de candidats par IA basée sur une description de poste"""
     try:
-        from app.services.ai_matching_service import AIMatchingService
-        
         job_description = request.form.get('job_description', '').strip()
         job_file = request.files.get('job_file')
         
@@ -502,50 +354,15 @@ def ai_search():
             flash('Veuillez fournir une description de poste (texte ou fichier)', 'error')
             return redirect(url_for('main.index'))
         
-        all_users = User.query.filter(
-            User.is_admin == False,
-            User.account_active == True,
-            func.length(User.unique_code) == 10
-        ).all()
-        
-        if not all_users:
-            flash('Aucun profil disponible pour l\'analyse', 'warning')
-            return redirect(url_for('main.index'))
-        
-        results = AIMatchingService.analyze_job_description(
-            job_description=job_description,
-            user_profiles=all_users
-        )
-        
-        if not results.get('success'):
-            flash(results.get('message', 'Erreur lors de l\'analyse'), 'error')
-            return redirect(url_for('main.index'))
-        
-        # Envoyer des notifications email aux talents qui matchent
-        from app.services.email_service import email_service
-        emails_sent = 0
-        for candidate in results.get('candidates', []):
-            try:
-                user = User.query.filter_by(unique_code=candidate.get('code')).first()
-                if user and user.email:
-                    success = email_service.send_ai_match_notification(
-                        user=user,
-                        job_description=job_description,
-                        match_score=candidate.get('score', 0),
-                        match_reason=candidate.get('reason', ''),
-                        sent_by_user_id=current_user.id if current_user.is_authenticated else None
-                    )
-                    if success:
-                        emails_sent += 1
-            except Exception as e:
-                logger.warning(f"Erreur envoi email au talent {candidate.get('code')}: {e}")
-        
-        if emails_sent > 0:
-            flash(f'✅ {emails_sent} notification(s) email envoyée(s) aux talents matchés', 'success')
+        # L'analyse (un appel IA par profil) est exécutée par un worker de tâches
+        from app.services.job_service import JobService
+        job = JobService.enqueue('ai_search', {
+            'job_description': job_description,
+            'scope': 'users',
+            'return_url': url_for('main.index')
+        }, user=current_user)
         
-        return render_template('ai_search_results.html',
-                             job_description=job_description,
-                             results=results)
+        return redirect(url_for('jobs.view', job_id=job.id))
     
     except Exception as e:
         logger.error(f"Erreur lors de la recherche IA: {e}")
@@ -6,12 +6,15 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models.project import Project, ProjectTalent
 from app.models.cinema_talent import CinemaTalent
 from app.models.attendance import Attendance
+from app.services.presence_scan_service import PresenceScanService
 from datetime import datetime, timedelta, date
 from functools import wraps
 
@@ -58,7 +61,7 @@ def project_attendance(project_id):
         selected_date = date.today()
     
     # Obtenir les présences du jour
-    today_attendances = Attendance.query.filter_by(
+    today_attendances = Attendance.query.options(joinedload(Attendance.recorder)).filter_by(
         project_id=project_id,
         date=selected_date
     ).all()
@@ -66,21 +69,29 @@ def project_attendance(project_id):
     # Créer un dictionnaire pour accès rapide
     attendance_by_code = {att.cinema_talent_code: att for att in today_attendances}
     
-    # Obtenir tous les talents assignés au projet
-    project_talents = ProjectTalent.query.filter_by(project_id=project_id).all()
+    # Obtenir tous les talents assignés au projet (une seule requête)
+    assigned_talents = CinemaTalent.query.options(
+        *CinemaTalent.encrypted_load_options()
+    ).join(
+        ProjectTalent, ProjectTalent.cinema_talent_id == CinemaTalent.id
+    ).filter(
+        ProjectTalent.project_id == project_id
+    ).order_by(ProjectTalent.id).all()
     
     # Enrichir les données avec les infos des talents
     talents_data = []
-    for pt in project_talents:
-        talent = CinemaTalent.query.filter_by(unique_code=pt.cinema_talent_code).first()
-        if talent:
-            attendance = attendance_by_code.get(pt.cinema_talent_code)
-            talents_data.append({
-                'code': pt.cinema_talent_code,
-                'talent': talent,
-                'attendance': attendance,
-                'status': 'checked_out' if (attendance and attendance.check_out_time) else ('checked_in' if attendance else 'absent')
-            })
+    seen_codes = set()
+    for talent in assigned_talents:
+        if talent.unique_code in seen_codes:
+            continue
+        seen_codes.add(talent.unique_code)
+        attendance = attendance_by_code.get(talent.unique_code)
+        talents_data.append({
+            'code': talent.unique_code,
+            'talent': talent,
+            'attendance': attendance,
+            'status': 'checked_out' if (attendance and attendance.check_out_time) else ('checked_in' if attendance else 'absent')
+        })
     
     return render_template('presence/project_attendance.html',
                          project=project,
@@ -111,7 +122,7 @@ def record_attendance():
     # Vérifier que le talent est assigné au projet
     assignment = ProjectTalent.query.filter_by(
         project_id=project_id,
-        cinema_talent_code=cinema_talent_code
+        cinema_talent_id=talent.id
     ).first()
     
     if not assignment:
@@ -151,6 +162,48 @@ def record_attendance():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Erreur: {str(e)}'}), 500
 
+@bp.route('/record_batch', methods=['POST'])
+@login_required
+@presence_required
+def record_attendance_batch():
+    """
+    Enregistre un lot de scans mis en file par un appareil (synchronisation hors ligne)
+    
+    Corps JSON : {"project_id": 1, "scans": [{"client_id": "...", "code": "...", "scanned_at": "ISO 8601"}]}
+    Renvoyer un lot déjà traité ne pointe pas deux fois : chaque scan reçoit son résultat d'origine
+    """
+    payload = request.get_json(silent=True) or {}
+    scans = payload.get('scans')
+    try:
+        project_id = int(payload.get('project_id'))
+    except (TypeError, ValueError):
+        project_id = None
+    
+    if not project_id or not isinstance(scans, list):
+        return jsonify({'success': False, 'message': 'Données manquantes'}), 400
+    
+    max_scans = current_app.config.get('PRESENCE_SCAN_BATCH_MAX', 500)
+    if len(scans) > max_scans:
+        return jsonify({'success': False, 'message': f'Lot trop volumineux (maximum {max_scans} scans)'}), 413
+    
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'success': False, 'message': 'Projet non trouvé'}), 404
+    
+    try:
+        results = PresenceScanService.ingest(project.id, scans, recorded_by=current_user.id)
+        db.session.commit()
+    except IntegrityError:
+        # Un autre appareil a pointé les mêmes talents au même moment : le lot entier est rejoué plus tard
+        db.session.rollback()
+        return jsonify({'success': False, 'retry': True, 'message': 'Synchronisation concurrente, nouvel essai nécessaire'}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Erreur lors de la synchronisation des scans: {e}')
+        return jsonify({'success': False, 'retry': True, 'message': f'Erreur: {str(e)}'}), 500
+    
+    return jsonify({'success': True, 'results': results})
+
 @bp.route('/check_in_all/<int:project_id>', methods=['POST'])
 @login_required
 @presence_required
@@ -158,38 +211,11 @@ def check_in_all(project_id):
     """Marque l'arrivée de tous les talents assignés au projet"""
     project = Project.query.get_or_404(project_id)
     
-    # Obtenir tous les talents assignés
-    project_talents = ProjectTalent.query.filter_by(project_id=project_id).all()
-    
-    checked_in = 0
-    already_present = 0
-    today = date.today()
-    
-    for pt in project_talents:
-        # Vérifier si déjà enregistré aujourd'hui
-        existing = Attendance.query.filter_by(
-            project_id=project_id,
-            cinema_talent_code=pt.cinema_talent_code,
-            date=today
-        ).first()
-        
-        if not existing:
-            # Créer l'enregistrement d'arrivée
-            attendance = Attendance(
-                project_id=project_id,
-                cinema_talent_code=pt.cinema_talent_code,
-                date=today,
-                check_in_time=datetime.utcnow(),
-                recorded_by=current_user.id
-            )
-            db.session.add(attendance)
-            checked_in += 1
-        else:
-            already_present += 1
-    
     try:
+        # Arrivée de tous les talents assignés non encore pointés (requêtes en nombre constant)
+        result = Attendance.bulk_check_in(project_id, recorded_by=current_user.id, day=date.today())
         db.session.commit()
-        flash(f'✅ {checked_in} talent(s) marqué(s) présent(s). {already_present} déjà enregistré(s).', 'success')
+        flash(f'✅ {result["checked_in"]} talent(s) marqué(s) présent(s). {result["already_present"]} déjà enregistré(s).', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'❌ Erreur: {str(e)}', 'error')
@@ -202,21 +228,10 @@ def check_in_all(project_id):
 def check_out_all(project_id):
     """Marque le départ de tous les talents présents aujourd'hui"""
     project = Project.query.get_or_404(project_id)
-    today = date.today()
-    
-    # Obtenir toutes les présences d'aujourd'hui sans heure de départ
-    attendances = Attendance.query.filter_by(
-        project_id=project_id,
-        date=today
-    ).filter(Attendance.check_out_time.is_(None)).all()
-    
-    checked_out = 0
-    for attendance in attendances:
-        attendance.check_out_time = datetime.utcnow()
-        attendance.updated_at = datetime.utcnow()
-        checked_out += 1
     
     try:
+        # Départ de toutes les présences du jour sans heure de départ, en une requête
+        checked_out = Attendance.bulk_check_out(project_id, day=date.today())
         db.session.commit()
         flash(f'👋 {checked_out} talent(s) marqué(s) comme partis.', 'success')
     except Exception as e:
@@ -232,29 +247,26 @@ def talent_history(cinema_talent_code):
     talent = CinemaTalent.query.filter_by(unique_code=cinema_talent_code).first_or_404()
     
     # Obtenir toutes les présences du talent
-    attendances = Attendance.query.filter_by(
+    attendances = Attendance.query.options(joinedload(Attendance.project)).filter_by(
         cinema_talent_code=cinema_talent_code
     ).order_by(Attendance.date.desc()).all()
     
+    # Totaux calculés par la base
+    totals = Attendance.get_talent_totals_by_project(cinema_talent_code)
+    
     # Grouper par projet
     by_project = {}
     for att in attendances:
         if att.project_id not in by_project:
+            project_totals = totals.get(att.project_id, {})
             by_project[att.project_id] = {
                 'project': att.project,
                 'attendances': [],
-                'total_minutes': 0
+                'total_minutes': project_totals.get('total_minutes', 0),
+                'total_formatted': project_totals.get('formatted', Attendance.format_minutes(0)),
+                'days_worked': project_totals.get('days_worked', 0)
             }
         by_project[att.project_id]['attendances'].append(att)
-        by_project[att.project_id]['total_minutes'] += att.get_duration_minutes()
-    
-    # Formater les totaux
-    for proj_data in by_project.values():
-        minutes = proj_data['total_minutes']
-        hours = minutes // 60
-        mins = minutes % 60
-        proj_data['total_formatted'] = f"{hours}h {mins:02d}min"
-        proj_data['days_worked'] = len([a for a in proj_data['attendances'] if a.check_out_time])
     
     return render_template('presence/talent_history.html',
                          talent=talent,
@@ -264,8 +276,8 @@ def talent_history(cinema_talent_code):
 @login_required
 @presence_required
 def export_attendance(project_id):
-    """Exporte les présences d'un projet"""
-    from app.services.export_service import export_attendance_to_excel
+    """Exporte les présences d'un projet (Excel par défaut, CSV avec format=csv)"""
+    from app.services.export_service import export_attendance_to_excel, export_attendance_to_csv
     
     project = Project.query.get_or_404(project_id)
     
@@ -290,8 +302,7 @@ def export_attendance(project_id):
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    # Récupérer les données
-    attendances = Attendance.get_project_attendance_summary(project_id, start_date, end_date)
-    
-    # Exporter
-    return export_attendance_to_excel(project, attendances, start_date, end_date)
+    # Exporter (lecture des présences par lots, sans tout charger en mémoire)
+    if request.args.get('format') == 'csv':
+        return export_attendance_to_csv(project, start_date, end_date)
+    return export_attendance_to_excel(project, start_date, end_date)
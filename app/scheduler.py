@@ -5,9 +5,11 @@ Utilise APScheduler pour planifier les emails récapitulatifs et autres tâches
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import atexit
 
 scheduler = None
+_app = None
 
 def send_weekly_recap():
     """
@@ -53,6 +55,103 @@ def send_weekly_recap():
         import traceback
         current_app.logger.error(traceback.format_exc())
 
+def purge_ai_match_cache():
+    """
+    Supprime les résultats IA expirés et les moins utilisés au-delà de la taille maximale
+    Appelé tous les jours à 03:30
+    """
+    from app.models.ai_match_cache import AIMatchCache
+    
+    with _app.app_context():
+        try:
+            deleted = AIMatchCache.purge(
+                _app.config.get('AI_MATCH_CACHE_TTL', 7 * 24 * 3600),
+                _app.config.get('AI_MATCH_CACHE_MAX_ENTRIES', 20000)
+            )
+            _app.logger.info(f"🧹 Cache de matching IA purgé: {deleted} entrée(s) supprimée(s)")
+        except Exception as e:
+            _app.logger.error(f"❌ Erreur dans purge_ai_match_cache: {str(e)}")
+
+def apply_log_retention():
+    """
+    Compacte les logs d'activité anciens en agrégats quotidiens et purge les logs de sécurité anciens
+    Appelé tous les jours à 04:00
+    """
+    from app.services.log_retention_service import LogRetentionService
+    
+    try:
+        results = LogRetentionService.apply(_app)
+        _app.logger.info(
+            f"🧹 Rétention des logs: {results['activity_logs_compacted']} log(s) d'activité compacté(s), "
+            f"{results['security_logs_purged']} log(s) de sécurité supprimé(s)"
+        )
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans apply_log_retention: {str(e)}")
+
+def reconcile_stats():
+    """
+    Recalcule les statistiques précalculées (API stats, tableau de bord)
+    Appelé toutes les STATS_RECONCILE_INTERVAL secondes
+    """
+    from app.services.stats_service import StatsService
+    
+    try:
+        StatsService.reconcile(_app)
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans reconcile_stats: {str(e)}")
+
+def dispatch_background_jobs():
+    """
+    Lance les tâches d'arrière-plan en attente (analyse CV, recherches IA, sauvegardes...)
+    Appelé toutes les JOB_POLL_INTERVAL secondes
+    """
+    from app.services.job_service import JobService
+    
+    try:
+        JobService.dispatch_pending(_app)
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans dispatch_background_jobs: {str(e)}")
+
+def purge_background_jobs():
+    """
+    Supprime les tâches terminées et leurs fichiers au-delà de JOB_RESULT_TTL
+    Appelé toutes les heures
+    """
+    from app.services.job_service import JobService
+    
+    try:
+        deleted = JobService.purge(_app)
+        if deleted:
+            _app.logger.info(f"🧹 Tâches d'arrière-plan purgées: {deleted}")
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans purge_background_jobs: {str(e)}")
+
+def dispatch_email_outbox():
+    """
+    Envoie les emails en file d'attente (lots, nouvelles tentatives)
+    Appelé toutes les EMAIL_POLL_INTERVAL secondes
+    """
+    from app.services.email_outbox_service import EmailOutboxService
+    
+    try:
+        EmailOutboxService.dispatch(_app)
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans dispatch_email_outbox: {str(e)}")
+
+def purge_email_outbox():
+    """
+    Supprime les emails en échec définitif au-delà de EMAIL_OUTBOX_RETENTION_DAYS
+    Appelé tous les jours à 04:30
+    """
+    from app.services.email_outbox_service import EmailOutboxService
+    
+    try:
+        deleted = EmailOutboxService.purge(_app)
+        if deleted:
+            _app.logger.info(f"🧹 Emails en échec purgés de la file: {deleted}")
+    except Exception as e:
+        _app.logger.error(f"❌ Erreur dans purge_email_outbox: {str(e)}")
+
 def init_scheduler(app):
     """
     Initialise le scheduler avec toutes les tâches planifiées
@@ -60,7 +159,7 @@ def init_scheduler(app):
     Args:
         app: Instance Flask
     """
-    global scheduler
+    global scheduler, _app
     
     # Éviter de créer plusieurs instances du scheduler
     if scheduler is not None:
@@ -68,6 +167,7 @@ def init_scheduler(app):
         return scheduler
     
     app.logger.info("🕐 Initialisation du scheduler...")
+    _app = app
     
     scheduler = BackgroundScheduler({
         'apscheduler.timezone': 'Africa/Casablanca'  # Timezone Maroc
@@ -85,6 +185,82 @@ def init_scheduler(app):
     
     app.logger.info("✅ Tâche planifiée: Récapitulatif hebdomadaire (Dimanche 12:59)")
     
+    # Purge quotidienne du cache de matching IA
+    scheduler.add_job(
+        func=purge_ai_match_cache,
+        trigger=CronTrigger(hour=3, minute=30),
+        id='purge_ai_match_cache',
+        name='Purge du cache de matching IA',
+        replace_existing=True
+    )
+    
+    app.logger.info("✅ Tâche planifiée: Purge du cache de matching IA (tous les jours 03:30)")
+    
+    # Rétention des logs d'activité et de sécurité
+    scheduler.add_job(
+        func=apply_log_retention,
+        trigger=CronTrigger(hour=4, minute=0),
+        id='apply_log_retention',
+        name='Rétention des logs',
+        max_instances=1,
+        replace_existing=True
+    )
+    
+    app.logger.info("✅ Tâche planifiée: Rétention des logs (tous les jours 04:00)")
+    
+    # Réconciliation des statistiques précalculées
+    scheduler.add_job(
+        func=reconcile_stats,
+        trigger=IntervalTrigger(seconds=app.config.get('STATS_RECONCILE_INTERVAL', 900)),
+        id='reconcile_stats',
+        name='Recalcul des statistiques',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+    
+    app.logger.info("✅ Tâche planifiée: Recalcul des statistiques")
+    
+    # File des tâches d'arrière-plan (désactivable sur les workers web, voir job_worker.py)
+    if app.config.get('JOB_WORKER_ENABLED', True):
+        scheduler.add_job(
+            func=dispatch_background_jobs,
+            trigger=IntervalTrigger(seconds=app.config.get('JOB_POLL_INTERVAL', 2)),
+            id='dispatch_background_jobs',
+            name='Exécution des tâches d\'arrière-plan',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=purge_background_jobs,
+            trigger=IntervalTrigger(hours=1),
+            id='purge_background_jobs',
+            name='Purge des tâches d\'arrière-plan terminées',
+            replace_existing=True
+        )
+        app.logger.info(f"✅ Tâche planifiée: Exécution des tâches d'arrière-plan ({app.config.get('JOB_WORKERS', 2)} worker(s))")
+        
+        scheduler.add_job(
+            func=dispatch_email_outbox,
+            trigger=IntervalTrigger(seconds=app.config.get('EMAIL_POLL_INTERVAL', 5)),
+            id='dispatch_email_outbox',
+            name='Envoi des emails en file d\'attente',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=purge_email_outbox,
+            trigger=CronTrigger(hour=4, minute=30),
+            id='purge_email_outbox',
+            name='Purge des emails en échec',
+            replace_existing=True
+        )
+        app.logger.info(f"✅ Tâche planifiée: Envoi des emails en file d'attente ({app.config.get('EMAIL_WORKERS', 4)} worker(s))")
+    else:
+        app.logger.info("ℹ️ Tâches d'arrière-plan et emails traités par un worker dédié (JOB_WORKER_ENABLED=0, job_worker.py)")
+    
     # Démarrer le scheduler
     scheduler.start()
     app.logger.info("🚀 Scheduler démarré")
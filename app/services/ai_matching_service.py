@@ -3,20 +3,23 @@ taalentio.com
 Service d'analyse IA pour le matching talents/emplois
 """
 
+import json
 import logging
-import os
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.models import User
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 
+CANDIDATE_SYSTEM_MESSAGE = 'Tu es un expert RH qui analyse des profils et des CV. Réponds toujours en JSON valide.'
+CINEMA_SYSTEM_MESSAGE = 'Tu es un directeur de casting professionnel qui évalue des talents pour le cinéma. Réponds toujours en JSON valide.'
+
 
 class AIMatchingService:
     """Service pour analyser les profils et trouver les meilleurs candidats via IA"""
     
     @staticmethod
-    def analyze_job_description(job_description, user_profiles, api_key=None):
+    def analyze_job_description(job_description, user_profiles, api_key=None, on_progress=None):
         """
         Analyse une description de poste et trouve les meilleurs candidats
         
@@ -24,6 +27,7 @@ class AIMatchingService:
             job_description: Texte de la description du poste
             user_profiles: Liste des utilisateurs à analyser
             api_key: (Déprécié) Clé API - utilise maintenant le fournisseur IA configuré
+            on_progress: Callback optionnel appelé avec (analysés, total) après chaque réponse IA
             
         Returns:
             Liste de dictionnaires contenant les candidats matchés avec leurs scores et raisons
@@ -52,35 +56,17 @@ class AIMatchingService:
                     'message': 'Aucun profil à analyser.'
                 }
             
-            matched_candidates = []
-            
-            for user in user_profiles:
-                try:
-                    profile_data = AIMatchingService._extract_profile_data(user)
-                    
-                    match_result = AIMatchingService._analyze_single_candidate(
-                        job_description,
-                        profile_data,
-                        user,
-                        None  # api_key is now handled by AIProviderService
-                    )
-                    
-                    # Accepter tous les résultats avec un score >= 0 (y compris 0 pour voir pourquoi ça ne matche pas)
-                    # Mais en production, on pourrait filtrer sur score >= 10 ou 20
-                    if match_result and match_result.get('score', 0) >= 0:
-                        matched_candidates.append(match_result)
-                
-                except Exception as e:
-                    logger.warning(f"Erreur lors de l'analyse du profil {user.formatted_code}: {e}")
-                    continue
-            
+            matched_candidates = list(AIMatchingService.iter_job_matches(
+                job_description, user_profiles, config=config, on_progress=on_progress
+            ))
             matched_candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
             
             return {
                 'success': True,
                 'candidates': matched_candidates,
                 'total_analyzed': len(user_profiles),
-                'total_matched': len(matched_candidates)
+                'total_matched': len(matched_candidates),
+                'total_cached': sum(1 for c in matched_candidates if c.get('cached'))
             }
             
         except Exception as e:
@@ -91,7 +77,190 @@ class AIMatchingService:
             }
     
     @staticmethod
-    def _extract_profile_data(user):
+    def iter_job_matches(job_description, user_profiles, config=None, on_progress=None):
+        """
+        Générateur : renvoie chaque candidat analysé dès que sa réponse IA arrive
+        (résultats en cache d'abord, puis ordre d'achèvement, non trié)
+        """
+        return AIMatchingService._iter_matches(job_description, user_profiles, 'user', config, on_progress)
+    
+    @staticmethod
+    def _iter_matches(job_description, profiles, subject_type, config=None, on_progress=None):
+        """
+        Pipeline commun : cache des résultats, construction des prompts, appels IA parallèles
+        
+        Args:
+            subject_type: 'user' (talents) ou 'cinema_talent'
+        """
+        from app import db
+        from app.models.ai_match_cache import AIMatchCache
+        from app.services.ai_provider_service import AIProviderService
+        
+        if config is None:
+            config = AIProviderService.get_ai_config()
+        
+        if subject_type == 'user':
+            context_key, system_message = 'user', CANDIDATE_SYSTEM_MESSAGE
+        else:
+            context_key, system_message = 'talent', CINEMA_SYSTEM_MESSAGE
+        
+        ttl = int(current_app.config.get('AI_MATCH_CACHE_TTL', 7 * 24 * 3600))
+        prompt_hash = AIMatchCache.hash_prompt(job_description)
+        cache_key = (prompt_hash, config['provider'], config.get('model') or '', subject_type)
+        
+        cached = {}
+        if ttl > 0:
+            try:
+                cached = AIMatchCache.lookup(*cache_key, profiles, ttl)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Cache de matching IA indisponible: {e}")
+        
+        total = len(profiles)
+        tasks = []
+        for profile in profiles:
+            try:
+                hit = cached.get(profile.id)
+                if subject_type == 'user':
+                    # Le texte du CV n'est utile que pour construire le prompt
+                    profile_data = AIMatchingService._extract_profile_data(profile, include_cv=hit is None)
+                else:
+                    profile_data = AIMatchingService._extract_cinema_profile_data(profile)
+                
+                if hit is not None:
+                    result = {context_key: profile, 'profile_data': profile_data, 'cached': True}
+                    result.update(hit.match_data)
+                    yield result
+                    continue
+                
+                if subject_type == 'user':
+                    prompt = AIMatchingService._build_candidate_prompt(job_description, profile_data)
+                else:
+                    prompt = AIMatchingService._build_cinema_prompt(job_description, profile_data)
+                tasks.append(({context_key: profile, 'profile_data': profile_data}, prompt, system_message))
+            except Exception as e:
+                logger.warning(f"Erreur lors de l'analyse du profil {getattr(profile, 'unique_code', None) or profile.id}: {e}")
+        
+        if on_progress and total > len(tasks):
+            on_progress(total - len(tasks), total)
+        progress = None
+        if on_progress:
+            progress = lambda done, _: on_progress(total - len(tasks) + done, total)
+        
+        # Écritures du cache regroupées en fin d'analyse : aucune transaction
+        # d'écriture ouverte pendant les appels IA
+        to_store = []
+        try:
+            for context, ai_result in AIMatchingService._iter_ai_scores(tasks, config, progress):
+                match_result = AIMatchingService._build_match_result(ai_result, context)
+                # Accepter tous les résultats avec un score >= 0 (y compris 0 pour voir pourquoi ça ne matche pas)
+                # Mais en production, on pourrait filtrer sur score >= 10 ou 20
+                if match_result and match_result.get('score', 0) >= 0:
+                    if ttl > 0:
+                        to_store.append((context[context_key], match_result))
+                    yield match_result
+        finally:
+            if to_store:
+                try:
+                    for profile, match_result in to_store:
+                        AIMatchCache.store(*cache_key, profile, match_result)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Impossible d'enregistrer le cache de matching IA: {e}")
+    
+    @staticmethod
+    def _iter_ai_scores(tasks, config=None, on_progress=None):
+        """
+        Exécute les appels IA en parallèle (pool de threads borné) et renvoie
+        (contexte, résultat IA) au fil de l'eau
+        
+        Les prompts sont construits dans le thread appelant : les workers ne font
+        que des appels HTTP et ne touchent ni à la session SQLAlchemy ni au contexte Flask.
+        
+        Args:
+            tasks: Liste de tuples (contexte, prompt, system_message)
+            config: Configuration IA déjà résolue (AIProviderService.get_ai_config)
+            on_progress: Callback optionnel appelé avec (analysés, total)
+        """
+        from app.services.ai_provider_service import AIProviderService
+        
+        if not tasks:
+            return
+        
+        if config is None:
+            config = AIProviderService.get_ai_config()
+        
+        app_config = current_app.config
+        max_workers = max(1, min(int(app_config.get('AI_MATCHING_CONCURRENCY', 8)), len(tasks)))
+        max_retries = int(app_config.get('AI_MATCHING_MAX_RETRIES', 2))
+        backoff = float(app_config.get('AI_MATCHING_RETRY_BACKOFF', 1.0))
+        timeout = int(app_config.get('AI_MATCHING_TIMEOUT', 60))
+        rate_limiter = AIProviderService.get_rate_limiter(
+            config['provider'], int(app_config.get('AI_RATE_LIMIT_PER_MINUTE', 0))
+        )
+        
+        def score(prompt, system_message):
+            return AIProviderService.call_ai_with_retry(
+                prompt, system_message=system_message, temperature=0.3, timeout=timeout,
+                config=config, max_retries=max_retries, backoff=backoff, rate_limiter=rate_limiter
+            )
+        
+        total = len(tasks)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-matching')
+        try:
+            futures = {
+                executor.submit(score, prompt, system_message): context
+                for context, prompt, system_message in tasks
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                try:
+                    ai_result = future.result()
+                except Exception as e:
+                    ai_result = {'success': False, 'content': '', 'error': str(e)}
+                
+                if on_progress:
+                    on_progress(completed, total)
+                yield futures[future], ai_result
+        finally:
+            # Si l'appelant arrête la lecture, ne pas lancer les appels restants
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _build_match_result(ai_result, context):
+        """Convertit une réponse IA en résultat de matching (None si invalide)"""
+        if not ai_result['success']:
+            logger.error(f"Erreur IA: {ai_result['error']}")
+            return None
+        
+        try:
+            ai_response = ai_result['content'].strip()
+            
+            # Nettoyer la réponse
+            if ai_response.startswith('```json'):
+                ai_response = ai_response[7:]
+            if ai_response.startswith('```'):
+                ai_response = ai_response[3:]
+            if ai_response.endswith('```'):
+                ai_response = ai_response[:-3]
+            ai_response = ai_response.strip()
+            
+            match_data = json.loads(ai_response)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse de la réponse IA pour {context['profile_data']['code']}: {e}")
+            return None
+        
+        result = dict(context)
+        result.update({
+            'score': match_data.get('score', 0),
+            'explication': match_data.get('explication', ''),
+            'points_forts': match_data.get('points_forts', []),
+            'points_faibles': match_data.get('points_faibles', [])
+        })
+        return result
+    
+    @staticmethod
+    def _extract_profile_data(user, include_cv=True):
         """Extrait les données du profil utilisateur incluant le CV"""
         profile_data = {
             'code': user.formatted_code,
@@ -109,11 +278,11 @@ class AIMatchingService:
             'competences_cv': None
         }
         
-        if user.user_talents:
-            profile_data['talents'] = [ut.talent.name for ut in user.user_talents]
+        if user.talents:
+            profile_data['talents'] = [ut.talent.name for ut in user.talents]
         
-        if user.cv_file:
-            cv_text = AIMatchingService._extract_cv_text(user.cv_file)
+        if include_cv and user.cv_filename:
+            cv_text = AIMatchingService._extract_cv_text(user.cv_filename)
             if cv_text:
                 profile_data['competences_cv'] = cv_text[:3000]
         
@@ -121,53 +290,14 @@ class AIMatchingService:
     
     @staticmethod
     def _extract_cv_text(cv_filename):
-        """Extrait le texte d'un fichier CV en réutilisant la logique de cv_analyzer"""
-        try:
-            import PyPDF2
-            import docx
-            
-            file_path = os.path.join(
-                current_app.root_path,
-                current_app.config.get('UPLOAD_FOLDER', 'static/uploads'),
-                'cvs',
-                cv_filename
-            )
-            
-            if not os.path.exists(file_path):
-                logger.warning(f"Fichier CV non trouvé: {file_path}")
-                return None
-            
-            ext = os.path.splitext(cv_filename)[1].lower()
-            
-            if ext == '.pdf':
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ''
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + '\n'
-                    return text
-            
-            elif ext in ['.doc', '.docx']:
-                doc = docx.Document(file_path)
-                text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-                return text
-            
-            else:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                    return file.read()
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction du CV {cv_filename}: {e}")
-            return None
+        """Texte du CV (extrait une seule fois, voir CVTextService)"""
+        from app.services.cv_text_service import CVTextService
+        return CVTextService.get_text(cv_filename)
     
     @staticmethod
-    def _analyze_single_candidate(job_description, profile_data, user, api_key):
-        """Analyse un candidat individuel par rapport à la description de poste"""
-        try:
-            from app.services.ai_provider_service import AIProviderService
-            import json
-            
-            prompt = f"""Tu es un expert en recrutement. Analyse le profil du candidat suivant par rapport à cette description de poste et détermine s'il est un bon candidat.
+    def _build_candidate_prompt(job_description, profile_data):
+        """Construit le prompt d'analyse d'un candidat par rapport à la description de poste"""
+        return f"""Tu es un expert en recrutement. Analyse le profil du candidat suivant par rapport à cette description de poste et détermine s'il est un bon candidat.
 
 DESCRIPTION DU POSTE:
 {job_description}
@@ -199,43 +329,9 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
     "points_forts": ["<point 1>", "<point 2>", ...],
     "points_faibles": ["<point 1>", "<point 2>", ...]
 }}"""
-
-            system_message = 'Tu es un expert RH qui analyse des profils et des CV. Réponds toujours en JSON valide.'
-            
-            ai_result = AIProviderService.call_ai(prompt, system_message=system_message, temperature=0.3, timeout=60)
-            
-            if not ai_result['success']:
-                logger.error(f"Erreur IA: {ai_result['error']}")
-                return None
-            
-            ai_response = ai_result['content'].strip()
-            
-            # Nettoyer la réponse
-            if ai_response.startswith('```json'):
-                ai_response = ai_response[7:]
-            if ai_response.startswith('```'):
-                ai_response = ai_response[3:]
-            if ai_response.endswith('```'):
-                ai_response = ai_response[:-3]
-            ai_response = ai_response.strip()
-            
-            match_data = json.loads(ai_response)
-            
-            return {
-                'user': user,
-                'profile_data': profile_data,
-                'score': match_data.get('score', 0),
-                'explication': match_data.get('explication', ''),
-                'points_forts': match_data.get('points_forts', []),
-                'points_faibles': match_data.get('points_faibles', [])
-            }
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'analyse du candidat: {e}")
-            return None
     
     @staticmethod
-    def analyze_cinema_talents(job_description, cinema_talent_profiles, api_key=None):
+    def analyze_cinema_talents(job_description, cinema_talent_profiles, api_key=None, on_progress=None):
         """
         Analyse une description de rôle cinéma et trouve les meilleurs talents
         
@@ -243,6 +339,7 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
             job_description: Texte de la description du rôle
             cinema_talent_profiles: Liste des talents cinéma à analyser
             api_key: (Déprécié) Clé API - utilise maintenant le fournisseur IA configuré
+            on_progress: Callback optionnel appelé avec (analysés, total) après chaque réponse IA
             
         Returns:
             Liste de dictionnaires contenant les candidats matchés avec leurs scores et raisons
@@ -271,35 +368,17 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
                     'message': 'Aucun profil cinéma à analyser.'
                 }
             
-            matched_candidates = []
-            
-            for talent in cinema_talent_profiles:
-                try:
-                    profile_data = AIMatchingService._extract_cinema_profile_data(talent)
-                    
-                    match_result = AIMatchingService._analyze_single_cinema_talent(
-                        job_description,
-                        profile_data,
-                        talent,
-                        None  # api_key is now handled by AIProviderService
-                    )
-                    
-                    # Accepter tous les résultats avec un score >= 0 (y compris 0 pour voir pourquoi ça ne matche pas)
-                    # Mais en production, on pourrait filtrer sur score >= 10 ou 20
-                    if match_result and match_result.get('score', 0) >= 0:
-                        matched_candidates.append(match_result)
-                
-                except Exception as e:
-                    logger.warning(f"Erreur lors de l'analyse du talent {talent.unique_code if talent.unique_code else talent.id}: {e}")
-                    continue
-            
+            matched_candidates = list(AIMatchingService.iter_cinema_talent_matches(
+                job_description, cinema_talent_profiles, config=config, on_progress=on_progress
+            ))
             matched_candidates.sort(key=lambda x: x.get('score', 0), reverse=True)
             
             return {
                 'success': True,
                 'candidates': matched_candidates,
                 'total_analyzed': len(cinema_talent_profiles),
-                'total_matched': len(matched_candidates)
+                'total_matched': len(matched_candidates),
+                'total_cached': sum(1 for c in matched_candidates if c.get('cached'))
             }
             
         except Exception as e:
@@ -309,11 +388,17 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
                 'message': f'Erreur lors de l\'analyse: {str(e)}'
             }
     
+    @staticmethod
+    def iter_cinema_talent_matches(job_description, cinema_talent_profiles, config=None, on_progress=None):
+        """
+        Générateur : renvoie chaque talent cinéma analysé dès que sa réponse IA arrive
+        (résultats en cache d'abord, puis ordre d'achèvement, non trié)
+        """
+        return AIMatchingService._iter_matches(job_description, cinema_talent_profiles, 'cinema_talent', config, on_progress)
+    
     @staticmethod
     def _extract_cinema_profile_data(talent):
         """Extrait les données du profil d'un talent cinéma"""
-        import json
-        
         profile_data = {
             'code': talent.unique_code if talent.unique_code else f'ID-{talent.id}',
             'nom': f"{talent.first_name} {talent.last_name}",
@@ -325,38 +410,32 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
             'age': talent.age if talent.age else 'Non spécifié',
             'genre': 'Homme' if talent.gender == 'M' else 'Femme' if talent.gender == 'F' else 'Autre',
             'taille': f"{talent.height} cm" if talent.height else 'Non spécifiée',
-            'poids': f"{talent.weight} kg" if talent.weight else 'Non spécifié',
             'teint': talent.skin_tone or 'Non spécifié',
             'couleur_yeux': talent.eye_color or 'Non spécifiée',
             'couleur_cheveux': talent.hair_color or 'Non spécifiée',
             'type_cheveux': talent.hair_type or 'Non spécifié',
             'corpulence': talent.build or 'Non spécifiée',
-            'ethnicites': json.loads(talent.ethnicities) if talent.ethnicities else [],
-            'types_talents': json.loads(talent.talent_types) if talent.talent_types else [],
-            'autres_talents': json.loads(talent.other_talents) if talent.other_talents else [],
-            'langues': json.loads(talent.languages_spoken) if talent.languages_spoken else [],
-            'competences': json.loads(talent.skills) if talent.skills else [],
-            'experience': talent.experience_years if talent.experience_years else 0,
-            'bio': talent.bio or 'Non renseignée'
+            'ethnicites': talent.ethnicities_list,
+            'types_talents': talent.talent_types_list,
+            'autres_talents': talent.other_talents_list,
+            'langues': talent.languages_spoken_list,
+            'experience': talent.years_of_experience if talent.years_of_experience else 0,
+            'productions': talent.previous_productions or 'Non renseignées'
         }
         
         return profile_data
     
     @staticmethod
-    def _analyze_single_cinema_talent(job_description, profile_data, talent, api_key):
-        """Analyse un talent cinéma individuel par rapport à la description de rôle"""
-        try:
-            from app.services.ai_provider_service import AIProviderService
-            import json
-            
-            # Construire les listes de talents et compétences
-            talents_list = []
-            if profile_data['types_talents']:
-                talents_list.extend(profile_data['types_talents'])
-            if profile_data['autres_talents']:
-                talents_list.extend(profile_data['autres_talents'])
-            
-            prompt = f"""Tu es un directeur de casting professionnel. Analyse le profil du talent suivant par rapport à cette description de rôle et détermine s'il correspond au casting.
+    def _build_cinema_prompt(job_description, profile_data):
+        """Construit le prompt d'analyse d'un talent cinéma par rapport à la description de rôle"""
+        # Construire la liste des talents
+        talents_list = []
+        if profile_data['types_talents']:
+            talents_list.extend(profile_data['types_talents'])
+        if profile_data['autres_talents']:
+            talents_list.extend(profile_data['autres_talents'])
+        
+        return f"""Tu es un directeur de casting professionnel. Analyse le profil du talent suivant par rapport à cette description de rôle et détermine s'il correspond au casting.
 
 DESCRIPTION DU RÔLE:
 {job_description}
@@ -372,7 +451,6 @@ Résidence actuelle: {profile_data['ville']}, {profile_data['pays']}
 
 CARACTÉRISTIQUES PHYSIQUES:
 Taille: {profile_data['taille']}
-Poids: {profile_data['poids']}
 Teint de peau: {profile_data['teint']}
 Couleur des yeux: {profile_data['couleur_yeux']}
 Couleur des cheveux: {profile_data['couleur_cheveux']}
@@ -383,11 +461,10 @@ ORIGINES ET TALENTS:
 Ethnicités: {', '.join(profile_data['ethnicites']) if profile_data['ethnicites'] else 'Non spécifié'}
 Talents artistiques: {', '.join(talents_list) if talents_list else 'Non spécifié'}
 Langues parlées: {', '.join(profile_data['langues']) if profile_data['langues'] else 'Non spécifié'}
-Compétences spéciales: {', '.join(profile_data['competences']) if profile_data['competences'] else 'Aucune'}
 
 EXPÉRIENCE:
 Années d'expérience: {profile_data['experience']} ans
-Bio: {profile_data['bio']}
+Productions précédentes: {profile_data['productions']}
 
 INSTRUCTIONS:
 1. Analyse TOUS les critères de la description du rôle (genre, âge, nationalité, caractéristiques physiques, compétences, etc.)
@@ -403,37 +480,3 @@ Réponds UNIQUEMENT avec ce format JSON (pas de texte avant ou après):
     "points_forts": ["<point 1>", "<point 2>", ...],
     "points_faibles": ["<point 1>", "<point 2>", ...]
 }}"""
-
-            system_message = 'Tu es un directeur de casting professionnel qui évalue des talents pour le cinéma. Réponds toujours en JSON valide.'
-            
-            ai_result = AIProviderService.call_ai(prompt, system_message=system_message, temperature=0.3, timeout=60)
-            
-            if not ai_result['success']:
-                logger.error(f"Erreur IA: {ai_result['error']}")
-                return None
-            
-            ai_response = ai_result['content'].strip()
-            
-            # Nettoyer la réponse
-            if ai_response.startswith('```json'):
-                ai_response = ai_response[7:]
-            if ai_response.startswith('```'):
-                ai_response = ai_response[3:]
-            if ai_response.endswith('```'):
-                ai_response = ai_response[:-3]
-            ai_response = ai_response.strip()
-            
-            match_data = json.loads(ai_response)
-            
-            return {
-                'talent': talent,
-                'profile_data': profile_data,
-                'score': match_data.get('score', 0),
-                'explication': match_data.get('explication', ''),
-                'points_forts': match_data.get('points_forts', []),
-                'points_faibles': match_data.get('points_faibles', [])
-            }
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'analyse du talent cinéma: {e}")
-            return None
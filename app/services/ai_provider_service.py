@@ -1,9 +1,15 @@
 """
 Service unifié pour gérer différents fournisseurs d'IA
 Supporte: OpenRouter, Perplexity, OpenAI, Google Gemini, Bytez
+et un fournisseur local simulé ('fake') pour les benchmarks hors ligne
 """
 
 import os
+import json
+import time
+import random
+import hashlib
+import threading
 import requests
 import logging
 from flask import current_app
@@ -11,6 +17,34 @@ from flask import current_app
 logger = logging.getLogger(__name__)
 
 
+class RateLimiter:
+    """Limiteur de débit (token bucket) partagé entre les threads d'un processus"""
+    
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloquer jusqu'à ce qu'un appel soit autorisé"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
 class AIProviderService:
     """Service pour gérer différents fournisseurs d'IA de manière unifiée"""
     
@@ -58,10 +92,38 @@ class AIProviderService:
             config['model'] = AppSettings.get('bytez_model', 'Qwen/Qwen2.5-72B-Instruct')
             config['endpoint'] = 'https://api.bytez.com/models/v2/{model}'
         
+        elif provider == 'fake':
+            # Fournisseur local simulé (aucun appel réseau)
+            config['api_key'] = 'fake'
+            config['model'] = 'fake-scorer'
+        
         return config
     
     @staticmethod
-    def call_ai(prompt, system_message=None, temperature=0.3, timeout=60):
+    def get_rate_limiter(provider, per_minute):
+        """
+        Retourne le limiteur de débit partagé pour un fournisseur
+        
+        Args:
+            provider: Nom du fournisseur
+            per_minute: Nombre maximum d'appels par minute (0 = illimité)
+            
+        Returns:
+            RateLimiter ou None
+        """
+        if not per_minute or per_minute <= 0:
+            return None
+        
+        key = (provider, per_minute)
+        with _rate_limiters_lock:
+            limiter = _rate_limiters.get(key)
+            if limiter is None:
+                limiter = RateLimiter(per_minute)
+                _rate_limiters[key] = limiter
+            return limiter
+    
+    @staticmethod
+    def call_ai(prompt, system_message=None, temperature=0.3, timeout=60, config=None):
         """
         Appelle le fournisseur d'IA configuré avec un prompt
         
@@ -70,11 +132,13 @@ class AIProviderService:
             system_message: Message système (optionnel)
             temperature: Température pour la génération (0.0-1.0)
             timeout: Timeout en secondes
+            config: Configuration déjà résolue (permet l'appel hors contexte Flask)
             
         Returns:
-            dict: {'success': bool, 'content': str, 'error': str}
+            dict: {'success': bool, 'content': str, 'error': str, 'retryable': bool}
         """
-        config = AIProviderService.get_ai_config()
+        if config is None:
+            config = AIProviderService.get_ai_config()
         
         if not config['api_key']:
             return {
@@ -84,7 +148,9 @@ class AIProviderService:
             }
         
         try:
-            if config['provider'] == 'gemini':
+            if config['provider'] == 'fake':
+                return AIProviderService._call_fake(config, prompt, system_message, temperature, timeout)
+            elif config['provider'] == 'gemini':
                 return AIProviderService._call_gemini(config, prompt, system_message, temperature, timeout)
             elif config['provider'] == 'bytez':
                 return AIProviderService._call_bytez(config, prompt, system_message, temperature, timeout)
@@ -99,6 +165,57 @@ class AIProviderService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def call_ai_with_retry(prompt, system_message=None, temperature=0.3, timeout=60, config=None,
+                           max_retries=2, backoff=1.0, rate_limiter=None):
+        """
+        Appelle le fournisseur d'IA avec limitation de débit et reprise exponentielle
+        
+        Seules les erreurs transitoires (timeout, réseau, 429, 5xx) sont réessayées.
+        
+        Args:
+            max_retries: Nombre de nouvelles tentatives après le premier échec
+            backoff: Délai de base en secondes (doublé à chaque tentative)
+            rate_limiter: RateLimiter partagé (optionnel)
+            
+        Returns:
+            dict: Même format que call_ai
+        """
+        attempt = 0
+        while True:
+            if rate_limiter:
+                rate_limiter.acquire()
+            
+            result = AIProviderService.call_ai(prompt, system_message, temperature, timeout, config=config)
+            if result['success'] or not result.get('retryable') or attempt >= max_retries:
+                return result
+            
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            logger.warning(f"Nouvelle tentative IA dans {delay:.1f}s ({attempt + 1}/{max_retries}): {result['error'][:100]}")
+            time.sleep(delay)
+            attempt += 1
+    
+    @staticmethod
+    def _call_fake(config, prompt, system_message, temperature, timeout):
+        """
+        Fournisseur local simulé pour les benchmarks et tests hors ligne
+        Latence fixe (AI_FAKE_LATENCY, 0.2s par défaut) et score déterministe dérivé du prompt
+        """
+        time.sleep(float(os.environ.get('AI_FAKE_LATENCY', '0.2')))
+        
+        score = hashlib.sha256(prompt.encode('utf-8')).digest()[0] * 100 // 255
+        content = json.dumps({
+            'score': score,
+            'explication': 'Réponse simulée par le fournisseur local.',
+            'points_forts': [],
+            'points_faibles': []
+        }, ensure_ascii=False)
+        return {
+            'success': True,
+            'content': content,
+            'error': ''
+        }
+    
     @staticmethod
     def _call_openai_compatible(config, prompt, system_message, temperature, timeout):
         """
@@ -165,7 +282,8 @@ class AIProviderService:
                 return {
                     'success': False,
                     'content': '',
-                    'error': error_msg
+                    'error': error_msg,
+                    'retryable': response.status_code == 429 or response.status_code >= 500
                 }
         except requests.exceptions.Timeout:
             error_msg = f"Timeout lors de l'appel à {config['provider']} (>{timeout}s)"
@@ -173,7 +291,8 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
         except Exception as e:
             error_msg = f"Erreur réseau {config['provider']}: {str(e)}"
@@ -181,7 +300,8 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
     
     @staticmethod
@@ -246,7 +366,8 @@ class AIProviderService:
                 return {
                     'success': False,
                     'content': '',
-                    'error': error_msg
+                    'error': error_msg,
+                    'retryable': response.status_code == 429 or response.status_code >= 500
                 }
         except requests.exceptions.Timeout:
             error_msg = f"Timeout lors de l'appel à Gemini (>{timeout}s)"
@@ -254,7 +375,8 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
         except Exception as e:
             error_msg = f"Erreur réseau Gemini: {str(e)}"
@@ -262,7 +384,8 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
     
     @staticmethod
@@ -357,7 +480,8 @@ class AIProviderService:
                 return {
                     'success': False,
                     'content': '',
-                    'error': error_msg + help_text
+                    'error': error_msg + help_text,
+                    'retryable': response.status_code == 429 or response.status_code >= 500
                 }
         except requests.exceptions.Timeout:
             error_msg = f"Timeout lors de l'appel à Bytez (>{timeout}s)"
@@ -365,7 +489,8 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
         except Exception as e:
             error_msg = f"Erreur réseau Bytez: {str(e)}"
@@ -373,5 +498,6 @@ class AIProviderService:
             return {
                 'success': False,
                 'content': '',
-                'error': error_msg
+                'error': error_msg,
+                'retryable': True
             }
@@ -78,6 +78,7 @@ class BackupService:
         # Exporter les utilisateurs avec données DÉCRYPTÉES
         users_data = []
         for user in User.query.all():
+            decrypted = user.decrypt_fields()
             user_dict = {
                 'id': user.id,
                 'unique_code': user.unique_code,
@@ -89,11 +90,11 @@ class BackupService:
                 'gender': user.gender,
                 
                 # Données DÉCRYPTÉES
-                'phone': user.phone,
-                'whatsapp': user.whatsapp,
-                'address': user.address,
-                'passport_number': user.passport_number,
-                'residence_card': user.residence_card,
+                'phone': decrypted['phone'],
+                'whatsapp': decrypted['whatsapp'],
+                'address': decrypted['address'],
+                'passport_number': decrypted['passport_number'],
+                'residence_card': decrypted['residence_card'],
                 
                 'country_id': user.country_id,
                 'city_id': user.city_id,
@@ -102,18 +103,18 @@ class BackupService:
                 'portfolio_url': user.portfolio_url,
                 
                 # Réseaux sociaux DÉCRYPTÉS
-                'linkedin': user.linkedin,
-                'instagram': user.instagram,
-                'twitter': user.twitter,
-                'facebook': user.facebook,
-                'tiktok': user.tiktok,
-                'youtube': user.youtube,
-                'github': user.github,
-                'behance': user.behance,
-                'dribbble': user.dribbble,
-                'pinterest': user.pinterest,
-                'snapchat': user.snapchat,
-                'telegram': user.telegram,
+                'linkedin': decrypted['linkedin'],
+                'instagram': decrypted['instagram'],
+                'twitter': decrypted['twitter'],
+                'facebook': decrypted['facebook'],
+                'tiktok': decrypted['tiktok'],
+                'youtube': decrypted['youtube'],
+                'github': decrypted['github'],
+                'behance': decrypted['behance'],
+                'dribbble': decrypted['dribbble'],
+                'pinterest': decrypted['pinterest'],
+                'snapchat': decrypted['snapchat'],
+                'telegram': decrypted['telegram'],
                 
                 'bio': user.bio,
                 'years_experience': user.years_experience,
@@ -188,6 +189,8 @@ class BackupService:
         # Exporter les paramètres (settings)
         settings_data = []
         for setting in AppSettings.query.all():
+            if setting.key == AppSettings.CACHE_VERSION_KEY:
+                continue
             settings_data.append({
                 'id': setting.id,
                 'key': setting.key,
@@ -318,6 +321,7 @@ class BackupService:
         AppSettings.query.delete()
         # Ne pas supprimer les talents, pays et villes de base
         db.session.commit()
+        AppSettings.invalidate_cache()
     
     @staticmethod
     def _restore_database(backup_dir):
@@ -432,6 +436,8 @@ class BackupService:
                 settings_data = json.load(f)
             
             for setting_dict in settings_data:
+                if setting_dict['key'] == AppSettings.CACHE_VERSION_KEY:
+                    continue
                 setting = AppSettings(
                     key=setting_dict['key'],
                     value=setting_dict['value']
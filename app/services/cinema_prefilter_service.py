@@ -0,0 +1,307 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Pré-filtrage déterministe des talents cinéma avant l'analyse IA
+Extrait les critères explicites d'une description de rôle (genre, âge, taille,
+yeux, cheveux, langues, types de talents) puis ne retient que les N meilleurs profils
+"""
+
+import logging
+import re
+import unicodedata
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import or_
+
+from app.constants import LANGUAGES_CINEMA, EYE_COLORS, HAIR_COLORS
+from app.models.cinema_talent import CinemaTalent
+
+logger = logging.getLogger(__name__)
+
+# Couleurs de cheveux citées seules ("blonde", "rousse"...)
+HAIR_COLOR_WORDS = {
+    'blond': 'Blond', 'brun': 'Brun', 'roux': 'Roux', 'rousse': 'Roux',
+    'chatain': 'Châtain', 'auburn': 'Auburn',
+}
+
+# Mots-clés (sans accents) -> type de talent CINEMA
+TALENT_TYPE_KEYWORDS = [
+    ('premier role', 'Acteur/Actrice Principal(e)'),
+    ('principal', 'Acteur/Actrice Principal(e)'),
+    ('second role', 'Acteur/Actrice Secondaire'),
+    ('secondaire', 'Acteur/Actrice Secondaire'),
+    ('figura', 'Figurant(e)'),
+    ('silhouette', 'Silhouette'),
+    ('doublure lumiere', 'Doublure Lumière'),
+    ('doublure', 'Doublure'),
+    ('cascad', 'Cascadeur/Cascadeuse'),
+    ('mannequin', 'Mannequin'),
+    ('voix off', 'Voix Off'),
+    ('choriste', 'Choriste'),
+    ('danseu', 'Danseur/Danseuse de fond'),
+]
+
+# Genre explicite : seuls ces mots excluent des profils (formes féminines sans ambiguïté)
+FEMALE_WORDS = r'\b(?:femmes?|actrices?|feminine?s?|filles?|comediennes?|danseuses?|figurantes?)\b'
+MALE_WORDS = r'\b(?:hommes?|masculins?|garcons?)\b'
+# Masculins génériques ("des figurants", "acteurs" = distribution mixte) : classement seulement
+MALE_HINT_WORDS = r'\b(?:acteurs?|comediens?|danseurs?|figurants?)\b'
+
+# Tranches d'âge en toutes lettres
+AGE_DECADES = {
+    'vingtaine': (20, 29), 'trentaine': (30, 39), 'quarantaine': (40, 49),
+    'cinquantaine': (50, 59), 'soixantaine': (60, 69),
+}
+
+NOT_EXPERIENCE = r"(?!\s*(?:d'|de\s+|d\s+)experience)"
+AGE_RANGE = re.compile(r'(\d{1,2})\s*(?:-|a|et)\s*(\d{1,2})\s*ans' + NOT_EXPERIENCE)
+AGE_MIN = re.compile(r'(?:plus de|au moins|minimum|min\.?)\s*(\d{1,2})\s*ans|(\d{1,2})\s*(?:ans\s*(?:\+|et plus|ou plus|minimum)|\+\s*ans)')
+AGE_MAX = re.compile(r"(?:moins de|maximum|max\.?|au plus|jusqu'a)\s*(\d{1,2})\s*ans|(\d{1,2})\s*ans\s*(?:maximum|max|au plus)")
+AGE_SINGLE = re.compile(r'\b(\d{1,2})\s*ans\b' + NOT_EXPERIENCE)
+
+HEIGHT = r'(?:(?<!\d)1\s*(?:m|[.,])\s*(\d{2})\s*m?|(\d{3})\s*cm)'
+HEIGHT_RANGE = re.compile(HEIGHT + r'\s*(?:-|a|et)\s*' + HEIGHT)
+HEIGHT_MIN = re.compile(r'(?:plus de|au moins|minimum|min\.?)\s*' + HEIGHT + '|' + HEIGHT + r'\s*(?:\+|et plus|ou plus|minimum|min\b)')
+HEIGHT_MAX = re.compile(r'(?:moins de|maximum|max\.?|au plus)\s*' + HEIGHT + '|' + HEIGHT + r'\s*(?:maximum|max\b|au plus)')
+HEIGHT_SINGLE = re.compile(HEIGHT)
+
+# Tolérance appliquée aux valeurs isolées ("25 ans", "1m70") : critère de classement, pas d'exclusion
+AGE_TOLERANCE = 5
+HEIGHT_TOLERANCE = 5
+
+
+def _normalize(text):
+    """Minuscules sans accents (comparaison insensible aux accents)"""
+    text = unicodedata.normalize('NFKD', (text or '').replace('\u2019', "'"))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _height_cm(groups):
+    """Convertir les groupes (centimètres après '1m', centimètres complets) en cm"""
+    short, full = groups
+    if short:
+        return 100 + int(short)
+    return int(full) if full else None
+
+
+def _years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 février
+        return today.replace(year=today.year - years, day=28)
+
+
+class CinemaPrefilterService:
+    """Extraction des critères d'une description de rôle et sélection des profils à envoyer à l'IA"""
+    
+    @staticmethod
+    def extract_constraints(description):
+        """
+        Extrait les critères explicites d'une description de rôle
+        
+        Les contraintes dures (genre explicite, âge min/max, taille min/max) excluent les profils,
+        les autres (genre suggéré, valeurs isolées, yeux, cheveux, langues, types) servent au classement.
+        
+        Returns:
+            dict: critères trouvés (clés absentes si non mentionnées)
+        """
+        text = _normalize(description)
+        constraints = {}
+        
+        # Genre (ignoré si les deux genres sont mentionnés) ; un masculin générique seul
+        # ("figurants", "acteurs") ne fait que favoriser les hommes au classement
+        female = re.search(FEMALE_WORDS, text)
+        male = re.search(MALE_WORDS, text)
+        male_hint = re.search(MALE_HINT_WORDS, text)
+        if female and not (male or male_hint):
+            constraints['gender'] = 'F'
+        elif male and not female:
+            constraints['gender'] = 'M'
+        elif male_hint and not female:
+            constraints['gender_hint'] = 'M'
+        
+        # Âge
+        match = AGE_RANGE.search(text)
+        if match:
+            low, high = sorted((int(match.group(1)), int(match.group(2))))
+            constraints['age_min'], constraints['age_max'] = low, high
+        else:
+            for word, (low, high) in AGE_DECADES.items():
+                if word in text:
+                    constraints['age_min'], constraints['age_max'] = low, high
+                    break
+            else:
+                match = AGE_MIN.search(text)
+                if match:
+                    constraints['age_min'] = int(match.group(1) or match.group(2))
+                match = AGE_MAX.search(text)
+                if match:
+                    constraints['age_max'] = int(match.group(1) or match.group(2))
+                if 'age_min' not in constraints and 'age_max' not in constraints:
+                    match = AGE_SINGLE.search(text)
+                    if match:
+                        constraints['age_target'] = int(match.group(1))
+        
+        # Taille
+        match = HEIGHT_RANGE.search(text)
+        if match:
+            low, high = sorted((_height_cm(match.groups()[0:2]), _height_cm(match.groups()[2:4])))
+            constraints['height_min'], constraints['height_max'] = low, high
+        else:
+            match = HEIGHT_MIN.search(text)
+            if match:
+                groups = match.groups()
+                constraints['height_min'] = _height_cm(groups[0:2]) or _height_cm(groups[2:4])
+            match = HEIGHT_MAX.search(text)
+            if match:
+                groups = match.groups()
+                constraints['height_max'] = _height_cm(groups[0:2]) or _height_cm(groups[2:4])
+            if 'height_min' not in constraints and 'height_max' not in constraints:
+                match = HEIGHT_SINGLE.search(text)
+                if match:
+                    constraints['height_target'] = _height_cm(match.groups())
+        
+        # Yeux / cheveux (couleur mentionnée après "yeux" / "cheveux")
+        eye_colors = [c for c in EYE_COLORS if re.search(r'yeux\s+(?:de couleur\s+)?' + re.escape(_normalize(c)), text)]
+        if eye_colors:
+            constraints['eye_colors'] = eye_colors
+        
+        hair_colors = [c for c in HAIR_COLORS if re.search(r'cheveux\s+' + re.escape(_normalize(c).split('/')[0]), text)]
+        for word, color in HAIR_COLOR_WORDS.items():
+            if color not in hair_colors and re.search(r'\b' + word + r'e?s?\b', text):
+                hair_colors.append(color)
+        if hair_colors:
+            constraints['hair_colors'] = hair_colors
+        
+        # Langues (nom principal, ex: "Chinois (Mandarin)" -> "chinois" et "mandarin")
+        languages = []
+        for language in LANGUAGES_CINEMA:
+            name = language['name']
+            if name == 'Autre':
+                continue
+            variants = [v.strip() for v in re.split(r'[()]', _normalize(name)) if v.strip()]
+            if any(re.search(r'\b' + re.escape(v) + r'(?:e|s|es)?\b', text) for v in variants):
+                languages.append(name)
+        if languages:
+            constraints['languages'] = languages
+        
+        # Types de talents
+        talent_types = []
+        for keyword, talent_type in TALENT_TYPE_KEYWORDS:
+            if keyword in text and talent_type not in talent_types:
+                if keyword == 'doublure' and 'Doublure Lumière' in talent_types:
+                    continue
+                talent_types.append(talent_type)
+        if talent_types:
+            constraints['talent_types'] = talent_types
+        
+        return constraints
+    
+    @staticmethod
+    def apply_hard_filters(query, constraints, today=None):
+        """Traduit les contraintes dures en filtres SQL (taille inconnue conservée)"""
+        today = today or date.today()
+        
+        if constraints.get('gender'):
+            query = query.filter(CinemaTalent.gender == constraints['gender'])
+        
+        if constraints.get('age_min') is not None:
+            # âge >= age_min  <=>  né au plus tard il y a age_min ans
+            query = query.filter(CinemaTalent.date_of_birth <= _years_ago(today, constraints['age_min']))
+        if constraints.get('age_max') is not None:
+            # âge <= age_max  <=>  né après (aujourd'hui - (age_max + 1) ans)
+            query = query.filter(CinemaTalent.date_of_birth > _years_ago(today, constraints['age_max'] + 1))
+        
+        if constraints.get('height_min') is not None:
+            query = query.filter(or_(CinemaTalent.height.is_(None), CinemaTalent.height >= constraints['height_min']))
+        if constraints.get('height_max') is not None:
+            query = query.filter(or_(CinemaTalent.height.is_(None), CinemaTalent.height <= constraints['height_max']))
+        
+        return query
+    
+    @staticmethod
+    def score_talent(talent, constraints):
+        """Score de pertinence déterministe (plus élevé = plus pertinent)"""
+        score = 0.0
+        
+        # Données connues pour les critères durs (préférées aux profils incomplets)
+        if ('height_min' in constraints or 'height_max' in constraints) and talent.height:
+            score += 1
+        
+        if constraints.get('gender_hint') and talent.gender == constraints['gender_hint']:
+            score += 1
+        
+        age = talent.age
+        if constraints.get('age_target') is not None and age is not None:
+            if abs(age - constraints['age_target']) <= AGE_TOLERANCE:
+                score += 2
+        
+        if constraints.get('height_target') is not None and talent.height:
+            if abs(talent.height - constraints['height_target']) <= HEIGHT_TOLERANCE:
+                score += 2
+        
+        if talent.eye_color and talent.eye_color in constraints.get('eye_colors', ()):
+            score += 2
+        if talent.hair_color and talent.hair_color in constraints.get('hair_colors', ()):
+            score += 2
+        
+        wanted_languages = constraints.get('languages')
+        if wanted_languages:
+            spoken = set(talent.languages_spoken_list)
+            score += 3 * sum(1 for language in wanted_languages if language in spoken)
+        
+        wanted_types = constraints.get('talent_types')
+        if wanted_types:
+            types = set(talent.talent_types_list)
+            score += 3 * sum(1 for talent_type in wanted_types if talent_type in types)
+        
+        # Départage : expérience (plafonnée)
+        score += min(talent.years_of_experience or 0, 10) / 10
+        return score
+    
+    @staticmethod
+    def shortlist(description, query=None, limit=None):
+        """
+        Sélectionne les profils à envoyer à l'IA
+        
+        Args:
+            description: Description du rôle
+            query: Requête de base (par défaut : talents cinéma actifs)
+            limit: Nombre maximum de profils retenus (AI_PREFILTER_SHORTLIST, 0 = pas de limite)
+        
+        Returns:
+            dict: {'talents': [...], 'constraints': {...}, 'total_active': int, 'total_eligible': int}
+        """
+        if query is None:
+            query = CinemaTalent.query.filter_by(is_active=True)
+        if limit is None:
+            limit = int(current_app.config.get('AI_PREFILTER_SHORTLIST', 30))
+        
+        constraints = CinemaPrefilterService.extract_constraints(description)
+        total_active = query.count()
+        
+        eligible = CinemaPrefilterService.apply_hard_filters(query, constraints).all()
+        ranked = sorted(
+            eligible,
+            key=lambda talent: (CinemaPrefilterService.score_talent(talent, constraints), talent.id),
+            reverse=True
+        )
+        talents = ranked[:limit] if limit and limit > 0 else ranked
+        
+        logger.info(
+            f"Pré-filtre casting: {len(talents)}/{total_active} talents retenus "
+            f"({len(eligible)} éligibles) - critères: {constraints}"
+        )
+        
+        return {
+            'talents': talents,
+            'constraints': constraints,
+            'total_active': total_active,
+            'total_eligible': len(eligible)
+        }
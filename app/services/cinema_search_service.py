@@ -0,0 +1,284 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Recherche à facettes des talents cinéma (page /cinema/talents et /cinema/api/talents/search)
+- Filtres traduits en SQL : colonnes indexées et table cinema_talent_attributes
+  pour les listes JSON (types de talents, langues, ethnicités)
+- Résultats paginés : la page ne charge qu'une page de talents, quelle que soit la taille de la base
+- Facettes : nombre de talents par valeur, calculé avec tous les autres filtres actifs
+"""
+
+import math
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import case, func, or_
+
+from app import db
+from app.models.cinema_talent import CinemaTalent
+from app.models.cinema_talent_attribute import CinemaTalentAttribute
+from app.utils.blind_index import phone_search_clause
+from app.utils.name_matcher import normalize_name
+from app.utils.pagination import get_per_page
+
+# Tranches proposées par les filtres de la page (bornes d'âge incluses)
+AGE_RANGES = (
+    ('0-17', 0, 17),
+    ('18-25', 18, 25),
+    ('26-35', 26, 35),
+    ('36-50', 36, 50),
+    ('51+', 51, None),
+)
+
+# Tailles en cm : borne basse incluse, borne haute exclue ("< 160 cm", "160-170 cm"...)
+HEIGHT_RANGES = (
+    ('0-160', 0, 160),
+    ('160-170', 160, 170),
+    ('170-180', 170, 180),
+    ('180-190', 180, 190),
+    ('190+', 190, None),
+)
+
+# Paramètre de requête -> colonne (égalité simple)
+COLUMN_FILTERS = {
+    'gender': 'gender',
+    'country': 'country_of_residence',
+    'eye_color': 'eye_color',
+    'hair_color': 'hair_color',
+    'hair_type': 'hair_type',
+    'skin_tone': 'skin_tone',
+    'build': 'build',
+}
+
+# Paramètre de requête -> liste JSON (toutes les valeurs demandées doivent être présentes)
+LIST_FILTERS = {
+    'talent_type': 'talent_types',
+    'language': 'languages_spoken',
+    'ethnicity': 'ethnicities',
+    'other_talent': 'other_talents',
+}
+
+
+def _years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 février
+        return today.replace(year=today.year - years, day=28)
+
+
+def _range_bounds(ranges, key):
+    for name, low, high in ranges:
+        if name == key:
+            return low, high
+    return None
+
+
+class CinemaSearchService:
+    """Filtres, pagination et facettes de la liste des talents cinéma"""
+    
+    @staticmethod
+    def parse_filters(args):
+        """
+        Filtres reconnus dans les paramètres de la requête (valeurs vides ignorées)
+        
+        Args:
+            args: request.args (MultiDict) ; les filtres de liste acceptent plusieurs valeurs
+        
+        Returns:
+            dict: {'q', 'age', 'height', <COLUMN_FILTERS>, <LIST_FILTERS> (listes)}
+        """
+        filters = {}
+        
+        q = (args.get('q') or '').strip()
+        if q:
+            filters['q'] = q[:100]
+        
+        for key, ranges in (('age', AGE_RANGES), ('height', HEIGHT_RANGES)):
+            value = (args.get(key) or '').strip()
+            if _range_bounds(ranges, value):
+                filters[key] = value
+        
+        for key in COLUMN_FILTERS:
+            value = (args.get(key) or '').strip()
+            if value:
+                filters[key] = value
+        
+        for key in LIST_FILTERS:
+            values = [value.strip() for value in args.getlist(key) if value and value.strip()]
+            if values:
+                filters[key] = values
+        
+        return filters
+    
+    @staticmethod
+    def _criteria(filters, today, exclude=None):
+        """Critères SQL des filtres (sauf celui de la facette calculée)"""
+        criteria = [CinemaTalent.is_active == True]
+        
+        q = filters.get('q')
+        if q and exclude != 'q':
+            pattern = f"%{q}%"
+            search = [
+                CinemaTalent.name_normalized.like(f"%{normalize_name(q)}%"),
+                CinemaTalent.email.ilike(pattern),
+                CinemaTalent.unique_code.ilike(f"%{q.replace('-', '')}%"),
+            ]
+            phone_clause = phone_search_clause(CinemaTalent, q)
+            if phone_clause is not None:
+                search.append(phone_clause)
+            criteria.append(or_(*search))
+        
+        if filters.get('age') and exclude != 'age':
+            low, high = _range_bounds(AGE_RANGES, filters['age'])
+            # âge >= low  <=>  né au plus tard il y a low ans
+            criteria.append(CinemaTalent.date_of_birth <= _years_ago(today, low))
+            if high is not None:
+                criteria.append(CinemaTalent.date_of_birth > _years_ago(today, high + 1))
+        
+        if filters.get('height') and exclude != 'height':
+            low, high = _range_bounds(HEIGHT_RANGES, filters['height'])
+            criteria.append(CinemaTalent.height >= low)
+            if high is not None:
+                criteria.append(CinemaTalent.height < high)
+        
+        for key, column in COLUMN_FILTERS.items():
+            if filters.get(key) and exclude != key:
+                criteria.append(getattr(CinemaTalent, column) == filters[key])
+        
+        for key, attribute in LIST_FILTERS.items():
+            if exclude == key:
+                continue
+            if filters.get(key):
+                criteria.append(CinemaTalent.has_values(attribute, *filters[key]))
+        
+        return criteria
+    
+    @staticmethod
+    def _range_bucket(column, ranges):
+        return case(
+            *[(column < high, name) for name, _, high in ranges if high is not None],
+            else_=ranges[-1][0]
+        )
+    
+    @staticmethod
+    def facets(filters, today=None):
+        """
+        Nombre de talents par valeur de chaque filtre
+        
+        Chaque facette applique tous les filtres actifs sauf le sien : les autres
+        valeurs restent visibles avec le nombre de résultats qu'elles donneraient.
+        
+        Returns:
+            dict: {filtre: {valeur: nombre}}
+        """
+        today = today or date.today()
+        facets = {}
+        
+        for key, column_name in COLUMN_FILTERS.items():
+            column = getattr(CinemaTalent, column_name)
+            rows = db.session.execute(
+                db.select(column, func.count())
+                .where(*CinemaSearchService._criteria(filters, today, exclude=key), column.isnot(None))
+                .group_by(column)
+            )
+            facets[key] = {value: count for value, count in rows if value != ''}
+        
+        # Âge : tranche calculée à partir des dates de naissance limites
+        age_bucket = case(
+            *[
+                (CinemaTalent.date_of_birth > _years_ago(today, high + 1), name)
+                for name, _, high in AGE_RANGES if high is not None
+            ],
+            else_=AGE_RANGES[-1][0]
+        )
+        rows = db.session.execute(
+            db.select(age_bucket, func.count())
+            .where(*CinemaSearchService._criteria(filters, today, exclude='age'), CinemaTalent.date_of_birth.isnot(None))
+            .group_by(age_bucket)
+        )
+        facets['age'] = dict(rows.all())
+        
+        height_bucket = CinemaSearchService._range_bucket(CinemaTalent.height, HEIGHT_RANGES)
+        rows = db.session.execute(
+            db.select(height_bucket, func.count())
+            .where(*CinemaSearchService._criteria(filters, today, exclude='height'), CinemaTalent.height > 0)
+            .group_by(height_bucket)
+        )
+        facets['height'] = dict(rows.all())
+        
+        for key, attribute in LIST_FILTERS.items():
+            matching_ids = db.select(CinemaTalent.id).where(*CinemaSearchService._criteria(filters, today, exclude=key))
+            rows = db.session.execute(
+                db.select(CinemaTalentAttribute.value, func.count())
+                .where(
+                    CinemaTalentAttribute.attribute == attribute,
+                    CinemaTalentAttribute.cinema_talent_id.in_(matching_ids)
+                )
+                .group_by(CinemaTalentAttribute.value)
+            )
+            facets[key] = dict(rows.all())
+        
+        return facets
+    
+    @staticmethod
+    def search(filters, page=1, per_page=None, with_facets=True, today=None):
+        """
+        Une page de talents actifs correspondant aux filtres (les plus récents d'abord)
+        
+        Args:
+            filters: Filtres de parse_filters
+            page: Numéro de page (à partir de 1)
+            per_page: Taille de page (CINEMA_TALENTS_PER_PAGE par défaut, bornée)
+            with_facets: Calculer aussi les facettes
+        
+        Returns:
+            dict: {'talents', 'total', 'page', 'per_page', 'pages', 'facets'}
+        """
+        today = today or date.today()
+        per_page = get_per_page(per_page, default=int(current_app.config.get('CINEMA_TALENTS_PER_PAGE', 50)))
+        try:
+            page = max(1, int(page))
+        except (TypeError, ValueError):
+            page = 1
+        
+        criteria = CinemaSearchService._criteria(filters, today)
+        total = db.session.execute(db.select(func.count()).select_from(CinemaTalent).where(*criteria)).scalar()
+        pages = max(1, math.ceil(total / per_page))
+        page = min(page, pages)
+        
+        talents = CinemaTalent.query.options(*CinemaTalent.encrypted_load_options()).filter(*criteria).order_by(
+            CinemaTalent.created_at.desc(), CinemaTalent.id.desc()
+        ).limit(per_page).offset((page - 1) * per_page).all()
+        
+        return {
+            'talents': talents,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'facets': CinemaSearchService.facets(filters, today) if with_facets else None
+        }
+    
+    @staticmethod
+    def serialize(talent):
+        """Données d'une ligne de la liste (sans champ chiffré)"""
+        return {
+            'id': talent.id,
+            'unique_code': talent.unique_code,
+            'first_name': talent.first_name,
+            'last_name': talent.last_name,
+            'city_of_residence': talent.city_of_residence,
+            'country_of_residence': talent.country_of_residence,
+            'gender': talent.gender,
+            'age': talent.age,
+            'height': talent.height,
+            'profile_photo_filename': talent.profile_photo_filename,
+            'talent_types': talent.talent_types_list,
+            'ethnicities': talent.ethnicities_list,
+            'languages_spoken': talent.languages_spoken_list,
+        }
@@ -10,7 +10,6 @@ www.myoneart.com
 Service d'analyse intelligente de CV et profils
 Utilise OpenRouter AI pour analyser les CV et générer des scores
 """
-import os
 import json
 import requests
 from datetime import datetime
@@ -91,38 +90,9 @@ class CVAnalyzerService:
     
     @staticmethod
     def _extract_cv_text(cv_path):
-        """Extraire le texte d'un fichier CV (PDF, DOCX, etc.)"""
-        import PyPDF2
-        import docx
-        
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'cvs', cv_path)
-        
-        if not os.path.exists(file_path):
-            return None
-        
-        ext = os.path.splitext(cv_path)[1].lower()
-        
-        try:
-            if ext == '.pdf':
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ''
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + '\n'
-                    return text
-            
-            elif ext in ['.doc', '.docx']:
-                doc = docx.Document(file_path)
-                text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-                return text
-            
-            else:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                    return file.read()
-                    
-        except Exception as e:
-            current_app.logger.error(f"Erreur extraction CV: {e}")
-            return None
+        """Extraire le texte d'un fichier CV (PDF, DOCX, etc.) - mis en cache par CVTextService"""
+        from app.services.cv_text_service import CVTextService
+        return CVTextService.get_text(cv_path)
     
     @staticmethod
     def _build_analysis_prompt(cv_text, user_data=None):
@@ -0,0 +1,164 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Texte extrait des CV, calculé une seule fois
+Le texte est stocké à côté des uploads (uploads/cv_text/<sha256 du fichier>.txt) :
+matching IA et analyse de CV lisent du texte brut au lieu de re-parser PDF/DOCX
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Extraction en arrière-plan (déclenchée à l'upload)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cv-text')
+_pending = {}
+_pending_lock = threading.Lock()
+
+# chemin -> (taille, mtime, sha256), pour ne pas re-hacher un fichier inchangé
+# (LRU borné : une entrée par fichier, les moins récemment lus sont oubliés)
+HASH_MEMO_MAX_ENTRIES = 1024
+_hash_memo = OrderedDict()
+_hash_memo_lock = threading.Lock()
+
+
+class CVTextService:
+    """Extraction et cache du texte des CV"""
+    
+    @staticmethod
+    def get_cv_path(cv_filename):
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], 'cvs', cv_filename)
+    
+    @staticmethod
+    def get_text_dir():
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], 'cv_text')
+    
+    @staticmethod
+    def file_hash(file_path):
+        """SHA-256 du contenu du fichier (mémorisé tant que taille et date sont inchangées)"""
+        stat = os.stat(file_path)
+        with _hash_memo_lock:
+            memo = _hash_memo.get(file_path)
+            if memo is not None and memo[:2] == (stat.st_size, stat.st_mtime):
+                _hash_memo.move_to_end(file_path)
+                return memo[2]
+        
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        
+        with _hash_memo_lock:
+            _hash_memo[file_path] = (stat.st_size, stat.st_mtime, digest)
+            _hash_memo.move_to_end(file_path)
+            while len(_hash_memo) > HASH_MEMO_MAX_ENTRIES:
+                _hash_memo.popitem(last=False)
+        return digest
+    
+    @staticmethod
+    def get_text(cv_filename):
+        """
+        Texte d'un CV (extrait à la première demande puis lu depuis le cache)
+        
+        Args:
+            cv_filename: Nom du fichier dans uploads/cvs
+        
+        Returns:
+            str ou None si le fichier est absent ou illisible
+        """
+        if not cv_filename:
+            return None
+        
+        # Une extraction d'arrière-plan est en cours pour ce fichier : l'attendre
+        with _pending_lock:
+            future = _pending.get(cv_filename)
+        if future is not None:
+            try:
+                return future.result(timeout=60)
+            except Exception as e:
+                logger.warning(f"Extraction CV en arrière-plan échouée pour {cv_filename}: {e}")
+        
+        return CVTextService._get_or_extract(cv_filename)
+    
+    @staticmethod
+    def _get_or_extract(cv_filename):
+        file_path = CVTextService.get_cv_path(cv_filename)
+        if not os.path.exists(file_path):
+            logger.warning(f"Fichier CV non trouvé: {file_path}")
+            return None
+        
+        text_dir = CVTextService.get_text_dir()
+        text_path = os.path.join(text_dir, f"{CVTextService.file_hash(file_path)}.txt")
+        
+        if os.path.exists(text_path):
+            with open(text_path, 'r', encoding='utf-8') as file:
+                return file.read()
+        
+        text = CVTextService.extract_text(file_path)
+        if text is None:
+            return None
+        
+        # Écriture atomique (plusieurs workers peuvent extraire le même CV)
+        os.makedirs(text_dir, exist_ok=True)
+        tmp_path = f"{text_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(tmp_path, text_path)
+        return text
+    
+    @staticmethod
+    def extract_text(file_path):
+        """Extraire le texte d'un fichier CV (PDF, DOCX, texte brut)"""
+        ext = os.path.splitext(file_path)[1].lower()
+        
+        try:
+            if ext == '.pdf':
+                import PyPDF2
+                with open(file_path, 'rb') as file:
+                    pdf_reader = PyPDF2.PdfReader(file)
+                    return '\n'.join((page.extract_text() or '') for page in pdf_reader.pages)
+            
+            elif ext in ['.doc', '.docx']:
+                import docx
+                doc = docx.Document(file_path)
+                return '\n'.join(paragraph.text for paragraph in doc.paragraphs)
+            
+            else:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+                    return file.read()
+        
+        except Exception as e:
+            logger.error(f"Erreur lors de l'extraction du CV {os.path.basename(file_path)}: {e}")
+            return None
+    
+    @staticmethod
+    def extract_in_background(cv_filename):
+        """Planifier l'extraction d'un CV qui vient d'être uploadé"""
+        app = current_app._get_current_object()
+        
+        def run():
+            try:
+                with app.app_context():
+                    return CVTextService._get_or_extract(cv_filename)
+            finally:
+                with _pending_lock:
+                    _pending.pop(cv_filename, None)
+        
+        with _pending_lock:
+            if cv_filename in _pending:
+                return _pending[cv_filename]
+            future = _executor.submit(run)
+            _pending[cv_filename] = future
+        return future
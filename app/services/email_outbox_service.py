@@ -0,0 +1,538 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+File d'envoi des emails
+- Les requêtes web enregistrent le message (table email_outbox) et rendent la main
+- Le dispatcher (APScheduler, voir app/scheduler.py) réclame les messages dus et les envoie
+  dans un pool de threads borné (EMAIL_WORKERS), sous un débit maximal (EMAIL_RATE_PER_SECOND)
+- Les messages de même sujet et même corps sans pièce jointe partent en une seule requête
+  SendGrid (une personnalisation par destinataire, substitutions comprises)
+- Refus définitif d'une requête groupée : chaque destinataire est renvoyé seul dans le même lot
+- Échec temporaire (réseau, 429, 5xx) : nouvel essai avec délai exponentiel jusqu'à
+  EMAIL_MAX_ATTEMPTS ; l'historique est écrit dans email_logs par le dispatcher
+- EMAIL_TRANSPORT=fake : transport local sans réseau (tests de débit, développement)
+"""
+
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.email_outbox import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Limite SendGrid : 1000 personnalisations par requête
+MAX_PERSONALIZATIONS = 1000
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_executor = None
+_limiter = None
+_transports = {}
+_lock = threading.Lock()
+_dispatch_lock = threading.Lock()
+
+
+class EmailDeliveryError(Exception):
+    """Échec d'envoi ; retryable=False pour les refus définitifs (message invalide)"""
+    
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RateLimiter:
+    """Seau à jetons partagé par les threads d'envoi (rate requêtes par seconde, 0 = illimité)"""
+    
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self._tokens = self.rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SendGridTransport:
+    """Envoi via l'API SendGrid v3 (un client HTTP par clé API, réutilisé entre les envois)"""
+    
+    name = 'sendgrid'
+    
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+    
+    def _client(self, api_key):
+        from sendgrid import SendGridAPIClient
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = SendGridAPIClient(api_key)
+                # Clé modifiée dans les paramètres : l'ancien client n'est plus utile
+                self._clients = {api_key: client}
+            return client
+    
+    def send(self, envelope):
+        """
+        Envoie une enveloppe :
+        {'api_key', 'from_email', 'subject', 'html_content', 'attachments',
+         'personalizations': [{'email', 'name', 'bcc', 'substitutions'}]}
+        """
+        from python_http_client.exceptions import HTTPError
+        from sendgrid.helpers.mail import (
+            Mail, Personalization, To, Bcc, Substitution,
+            Attachment, FileContent, FileName, FileType, Disposition
+        )
+        
+        if not envelope.get('api_key'):
+            raise EmailDeliveryError(
+                "SendGrid API key manquante. Configurez SENDGRID_API_KEY dans les variables "
+                "d'environnement ou dans /admin/settings/api-keys"
+            )
+        
+        message = Mail(
+            from_email=envelope['from_email'],
+            subject=envelope['subject'],
+            html_content=envelope['html_content']
+        )
+        for recipient in envelope['personalizations']:
+            personalization = Personalization()
+            personalization.add_to(To(recipient['email'], recipient.get('name')))
+            if recipient.get('bcc'):
+                personalization.add_bcc(Bcc(recipient['bcc']))
+            for marker, value in (recipient.get('substitutions') or {}).items():
+                personalization.add_substitution(Substitution(marker, value))
+            message.add_personalization(personalization)
+        
+        for att in envelope.get('attachments') or []:
+            message.add_attachment(Attachment(
+                FileContent(att['content']),
+                FileName(att['filename']),
+                FileType(att['type']),
+                Disposition('attachment')
+            ))
+        
+        try:
+            response = self._client(envelope['api_key']).send(message)
+        except HTTPError as e:
+            status_code = getattr(e, 'status_code', None)
+            raise EmailDeliveryError(
+                f"Erreur SendGrid - Code: {status_code}, Body: {getattr(e, 'body', '')}",
+                retryable=status_code is None or status_code == 429 or status_code >= 500
+            )
+        except Exception as e:
+            raise EmailDeliveryError(f"Erreur SendGrid: {e}")
+        
+        if response.status_code not in (200, 201, 202):
+            raise EmailDeliveryError(f"Erreur SendGrid - Code: {response.status_code}, Body: {response.body}")
+
+
+class FakeTransport:
+    """
+    Transport local : enregistre les enveloppes en mémoire au lieu de les envoyer
+    EMAIL_FAKE_LATENCY_MS simule la durée d'un appel API, EMAIL_FAKE_FAILURE_RATE
+    la proportion d'échecs temporaires
+    """
+    
+    name = 'fake'
+    
+    def __init__(self, latency_ms=0, failure_rate=0.0):
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+    
+    def send(self, envelope):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise EmailDeliveryError('Échec simulé (transport fake)')
+        with self._lock:
+            self.sent.append(envelope)
+    
+    @property
+    def recipients(self):
+        with self._lock:
+            return [recipient['email'] for envelope in self.sent for recipient in envelope['personalizations']]
+    
+    def clear(self):
+        with self._lock:
+            self.sent = []
+
+
+def get_transport(app):
+    """Transport configuré (EMAIL_TRANSPORT), une instance par processus"""
+    name = app.config.get('EMAIL_TRANSPORT', 'sendgrid')
+    with _lock:
+        transport = _transports.get(name)
+        if transport is None:
+            if name == 'fake':
+                transport = FakeTransport(
+                    latency_ms=int(app.config.get('EMAIL_FAKE_LATENCY_MS', 0)),
+                    failure_rate=float(app.config.get('EMAIL_FAKE_FAILURE_RATE', 0.0))
+                )
+            elif name == 'sendgrid':
+                transport = SendGridTransport()
+            else:
+                raise ValueError(f"Transport email inconnu: {name}")
+            _transports[name] = transport
+        return transport
+
+
+class EmailOutboxService:
+    """Mise en file, envoi groupé et nouvelles tentatives des emails"""
+    
+    @staticmethod
+    def enqueue_many(messages, commit=True):
+        """
+        Enregistre des emails à envoyer (une seule requête d'insertion)
+        
+        Args:
+            messages: Liste de dicts avec 'to_email', 'subject', 'html_content' et optionnellement
+                'recipient_name', 'substitutions' ({marqueur: valeur} appliqué au corps),
+                'attachments', 'template_type', 'sent_by_user_id', 'related_talent_code',
+                'related_project_id', 'related_cinema_talent_id'
+            commit: Valider la transaction (False pour l'inclure dans celle de l'appelant)
+        
+        Returns:
+            int: Nombre d'emails mis en file
+        """
+        now = datetime.utcnow()
+        rows = []
+        for message in messages:
+            recipients = message['to_email']
+            if isinstance(recipients, str):
+                recipients = [recipients]
+            for recipient in recipients:
+                if isinstance(recipient, dict):
+                    recipient = recipient.get('email') or recipient.get('Email')
+                if not recipient:
+                    continue
+                rows.append({
+                    'recipient_email': recipient,
+                    'recipient_name': message.get('recipient_name'),
+                    'subject': message['subject'],
+                    'html_content': message['html_content'],
+                    'substitutions': json.dumps(message['substitutions'], ensure_ascii=False) if message.get('substitutions') else None,
+                    'attachments': json.dumps(message['attachments']) if message.get('attachments') else None,
+                    'template_type': message.get('template_type') or 'generic',
+                    'status': EmailOutbox.STATUS_PENDING,
+                    'attempts': 0,
+                    'next_attempt_at': now,
+                    'sent_by_user_id': message.get('sent_by_user_id'),
+                    'related_talent_code': message.get('related_talent_code'),
+                    'related_project_id': message.get('related_project_id'),
+                    'related_cinema_talent_id': message.get('related_cinema_talent_id'),
+                    'created_at': now
+                })
+        
+        if rows:
+            db.session.execute(db.insert(EmailOutbox), rows)
+            if commit:
+                db.session.commit()
+            logger.info(f"📥 {len(rows)} email(s) mis en file d'envoi")
+        return len(rows)
+    
+    @staticmethod
+    def enqueue(to_email, subject, html_content, commit=True, **options):
+        """Enregistre un email à envoyer (voir enqueue_many pour les options)"""
+        return EmailOutboxService.enqueue_many(
+            [dict(options, to_email=to_email, subject=subject, html_content=html_content)],
+            commit=commit
+        )
+    
+    @staticmethod
+    def _get_executor(app):
+        global _executor
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(app.config.get('EMAIL_WORKERS', 4))),
+                    thread_name_prefix='email-worker'
+                )
+            return _executor
+    
+    @staticmethod
+    def _get_limiter(app):
+        global _limiter
+        rate = float(app.config.get('EMAIL_RATE_PER_SECOND', 10))
+        with _lock:
+            if _limiter is None or _limiter.rate != rate:
+                _limiter = RateLimiter(rate)
+            return _limiter
+    
+    @staticmethod
+    def _send_group(transport, limiter, envelope):
+        """Envoie une enveloppe (thread du pool) ; retourne None ou l'erreur"""
+        limiter.acquire()
+        try:
+            transport.send(envelope)
+        except EmailDeliveryError as e:
+            return e
+        except Exception as e:
+            return EmailDeliveryError(str(e))
+        return None
+    
+    @staticmethod
+    def _retry_delay(app, attempts):
+        base = float(app.config.get('EMAIL_RETRY_BASE_SECONDS', 60))
+        delay = min(base * (2 ** (attempts - 1)), float(app.config.get('EMAIL_RETRY_MAX_SECONDS', 3600)))
+        # Décalage aléatoire : les messages en échec ne reviennent pas tous au même instant
+        return timedelta(seconds=delay * random.uniform(1.0, 1.2))
+    
+    @staticmethod
+    def _claim(app):
+        """Réclame atomiquement un lot de messages dus ; retourne les lignes réclamées"""
+        now = datetime.utcnow()
+        
+        # Messages réclamés par un dispatcher arrêté en cours d'envoi
+        stale_limit = now - timedelta(seconds=int(app.config.get('EMAIL_STALE_AFTER', 600)))
+        EmailOutbox.query.filter(
+            EmailOutbox.status == EmailOutbox.STATUS_SENDING,
+            EmailOutbox.claimed_at < stale_limit
+        ).update(
+            {'status': EmailOutbox.STATUS_PENDING, 'claim_token': None},
+            synchronize_session=False
+        )
+        
+        candidates = db.select(EmailOutbox.id).where(
+            EmailOutbox.status == EmailOutbox.STATUS_PENDING,
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(
+            max(1, int(app.config.get('EMAIL_BATCH_SIZE', 1000)))
+        )
+        candidate_ids = list(db.session.execute(candidates).scalars())
+        if not candidate_ids:
+            db.session.commit()
+            return []
+        
+        # Réclamation conditionnelle : un message n'est pris que par un seul dispatcher
+        token = uuid.uuid4().hex
+        EmailOutbox.query.filter(
+            EmailOutbox.id.in_(candidate_ids),
+            EmailOutbox.status == EmailOutbox.STATUS_PENDING
+        ).update(
+            {'status': EmailOutbox.STATUS_SENDING, 'claim_token': token, 'claimed_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return EmailOutbox.query.filter_by(claim_token=token).order_by(EmailOutbox.id).all()
+    
+    @staticmethod
+    def _build_envelopes(rows, sender, grouped=True):
+        """Regroupe les messages envoyables en une requête : [(lignes, enveloppe)]
+        (grouped=False : une enveloppe par destinataire)"""
+        bcc_by_template = {}
+        
+        def admin_bcc(row):
+            if row.template_type not in bcc_by_template:
+                bcc_by_template[row.template_type] = sender._admin_bcc_for(None, row.template_type)
+            admin_email = bcc_by_template[row.template_type]
+            if admin_email and admin_email.lower() == row.recipient_email.lower():
+                return None
+            return admin_email
+        
+        def envelope(group):
+            first = group[0]
+            return {
+                'api_key': sender.api_key,
+                'from_email': sender.from_email,
+                'subject': first.subject,
+                'html_content': first.html_content,
+                'attachments': first.attachments_data,
+                'personalizations': [{
+                    'email': row.recipient_email,
+                    'name': row.recipient_name,
+                    'bcc': admin_bcc(row),
+                    'substitutions': row.substitutions_data
+                } for row in group]
+            }
+        
+        groups = {}
+        envelopes = []
+        for row in rows:
+            if row.attachments or not grouped:
+                envelopes.append(([row], envelope([row])))
+                continue
+            groups.setdefault((row.subject, row.html_content), []).append(row)
+        
+        for group in groups.values():
+            for start in range(0, len(group), MAX_PERSONALIZATIONS):
+                chunk = group[start:start + MAX_PERSONALIZATIONS]
+                envelopes.append((chunk, envelope(chunk)))
+        return envelopes
+    
+    @staticmethod
+    def _log_rows(rows, status, error_message=None):
+        return [{
+            'recipient_email': row.recipient_email,
+            'recipient_name': row.recipient_name,
+            'subject': row.subject,
+            'html_content': row.render_html(),
+            'template_type': row.template_type,
+            'status': status,
+            'error_message': error_message,
+            'sent_at': datetime.utcnow(),
+            'sent_by_user_id': row.sent_by_user_id,
+            'related_talent_code': row.related_talent_code,
+            'related_project_id': row.related_project_id,
+            'related_cinema_talent_id': row.related_cinema_talent_id
+        } for row in rows]
+    
+    @staticmethod
+    def _process(app, rows):
+        """Envoie les lignes réclamées puis enregistre les résultats ; retourne (envoyés, échecs)"""
+        from app.models.email_log import EmailLog
+        from app.services.email_service import EmailService
+        
+        # Paramètres lus une fois par lot (clé API, expéditeur, copies admin)
+        sender = EmailService()
+        transport = get_transport(app)
+        limiter = EmailOutboxService._get_limiter(app)
+        executor = EmailOutboxService._get_executor(app)
+        max_attempts = max(1, int(app.config.get('EMAIL_MAX_ATTEMPTS', 5)))
+        
+        def submit(envelopes):
+            return [
+                (group, executor.submit(EmailOutboxService._send_group, transport, limiter, envelope))
+                for group, envelope in envelopes
+            ]
+        
+        futures = submit(EmailOutboxService._build_envelopes(rows, sender))
+        
+        sent_ids = []
+        retries = []
+        logs = []
+        failed = 0
+        split_rows = []
+        now = datetime.utcnow()
+        while futures:
+            group, future = futures.pop(0)
+            error = future.result()
+            if error is None:
+                sent_ids.extend(row.id for row in group)
+                logs.extend(EmailOutboxService._log_rows(group, 'sent'))
+            elif not error.retryable and len(group) > 1:
+                # Refus définitif d'une requête groupée (une adresse invalide suffit) :
+                # chaque destinataire est renvoyé seul, une fois, dans ce même lot
+                split_rows.extend(group)
+                logger.warning(f"⚠️ Envoi groupé de {len(group)} email(s) refusé, envoi individuel: {error}")
+            else:
+                failed += EmailOutboxService._record_failure(app, group, error, max_attempts, now, retries, logs)
+            
+            if not futures and split_rows:
+                futures = submit(EmailOutboxService._build_envelopes(split_rows, sender, grouped=False))
+                split_rows = []
+        
+        if sent_ids:
+            EmailOutbox.query.filter(EmailOutbox.id.in_(sent_ids)).delete(synchronize_session=False)
+        if retries:
+            db.session.execute(db.update(EmailOutbox), retries)
+        if logs:
+            db.session.execute(db.insert(EmailLog), logs)
+        db.session.commit()
+        return len(sent_ids), failed
+    
+    @staticmethod
+    def _record_failure(app, group, error, max_attempts, now, retries, logs):
+        """Nouvel essai différé, ou échec définitif, pour chaque ligne d'une enveloppe refusée ;
+        retourne le nombre d'échecs définitifs"""
+        failed = 0
+        for row in group:
+            attempts = row.attempts + 1
+            if error.retryable and attempts < max_attempts:
+                retries.append({
+                    'id': row.id, 'status': EmailOutbox.STATUS_PENDING, 'attempts': attempts,
+                    'next_attempt_at': now + EmailOutboxService._retry_delay(app, attempts),
+                    'claim_token': None, 'last_error': str(error)
+                })
+            else:
+                failed += 1
+                retries.append({
+                    'id': row.id, 'status': EmailOutbox.STATUS_FAILED, 'attempts': attempts,
+                    'next_attempt_at': row.next_attempt_at, 'claim_token': None, 'last_error': str(error)
+                })
+                logs.extend(EmailOutboxService._log_rows([row], 'failed', str(error)))
+        logger.warning(f"⚠️ Échec d'envoi de {len(group)} email(s): {error}")
+        return failed
+    
+    @staticmethod
+    def dispatch(app):
+        """
+        Envoie les messages dus par lots jusqu'à vider la file
+        (appelé périodiquement par le scheduler)
+        
+        Returns:
+            int: Nombre d'emails envoyés
+        """
+        # Un seul dispatch à la fois par processus ; les autres processus sont exclus par la réclamation
+        if not _dispatch_lock.acquire(blocking=False):
+            return 0
+        
+        total_sent = total_failed = 0
+        started = time.monotonic()
+        try:
+            with app.app_context():
+                try:
+                    while True:
+                        rows = EmailOutboxService._claim(app)
+                        if not rows:
+                            break
+                        sent, failed = EmailOutboxService._process(app, rows)
+                        total_sent += sent
+                        total_failed += failed
+                        db.session.expunge_all()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                finally:
+                    db.session.remove()
+        finally:
+            _dispatch_lock.release()
+        
+        if total_sent or total_failed:
+            logger.info(
+                f"📤 {total_sent} email(s) envoyé(s), {total_failed} échec(s) définitif(s) "
+                f"en {time.monotonic() - started:.1f}s ({WORKER_ID})"
+            )
+        return total_sent
+    
+    @staticmethod
+    def purge(app):
+        """Supprime les messages en échec définitif plus anciens que EMAIL_OUTBOX_RETENTION_DAYS"""
+        days = int(app.config.get('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+        limit = datetime.utcnow() - timedelta(days=days)
+        with app.app_context():
+            try:
+                deleted = EmailOutbox.query.filter(
+                    EmailOutbox.status == EmailOutbox.STATUS_FAILED,
+                    EmailOutbox.created_at < limit
+                ).delete(synchronize_session=False)
+                db.session.commit()
+                return deleted
+            finally:
+                db.session.remove()
@@ -2,8 +2,6 @@
 Service d'envoi d'emails avec SendGrid
 """
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
 import base64
 from flask import current_app, render_template
 
@@ -761,12 +759,71 @@ class EmailService:
             current_app.logger.warning(f"Erreur lors du logging de l'email: {str(e)}")
             return False
     
+    def _admin_bcc_for(self, to_email, template_type):
+        """
+        Adresse admin à mettre en copie cachée pour ce type d'email, ou None
+        (pas de copie si l'admin est déjà destinataire)
+        
+        Args:
+            to_email: Destinataire (string, liste ou dict selon SendGrid), None pour ignorer la vérification
+            template_type: Type de template email
+        
+        Returns:
+            str: Email de l'admin ou None
+        """
+        if not self._should_cc_admin(template_type):
+            return None
+        
+        admin_email = self._get_admin_email()
+        
+        # S'assurer que admin_email est une string valide
+        if not admin_email or not isinstance(admin_email, str):
+            return None
+        
+        # Vérifier si l'admin est déjà destinataire
+        # to_email peut être une string, une liste, ou un dict selon SendGrid
+        admin_is_recipient = False
+        admin_lower = admin_email.lower()
+        
+        try:
+            if isinstance(to_email, str):
+                # Comparaison insensible à la casse pour les strings
+                admin_is_recipient = admin_lower == to_email.lower()
+            elif isinstance(to_email, list):
+                # Vérifier dans la liste - ignorer les valeurs non-string
+                for e in to_email:
+                    if isinstance(e, str) and e.lower() == admin_lower:
+                        admin_is_recipient = True
+                        break
+                    elif isinstance(e, dict):
+                        recipient_email = e.get('email') or e.get('Email')
+                        if isinstance(recipient_email, str) and recipient_email.lower() == admin_lower:
+                            admin_is_recipient = True
+                            break
+            elif isinstance(to_email, dict):
+                # Vérifier dans le dict - gérer les clés manquantes/None
+                recipient_email = to_email.get('email') or to_email.get('Email')
+                if isinstance(recipient_email, str):
+                    admin_is_recipient = recipient_email.lower() == admin_lower
+        except (AttributeError, TypeError) as e:
+            # En cas d'erreur, ne pas bloquer l'envoi, simplement logger
+            print(f"⚠️  Erreur lors de la vérification du destinataire admin: {e}")
+            admin_is_recipient = False
+        
+        if admin_is_recipient:
+            print(f"ℹ️  Admin non ajouté en BCC car déjà destinataire principal: {admin_email}")
+            return None
+        return admin_email
+    
     def send_email(self, to_email, subject, html_content, attachments=None, template_type='generic', 
                    recipient_name=None, sent_by_user_id=None, related_talent_code=None, 
-                   related_project_id=None, related_cinema_talent_id=None):
+                   related_project_id=None, related_cinema_talent_id=None, substitutions=None, queue=True):
         """
         Envoie un email via SendGrid avec logging
         
+        Par défaut l'email est mis en file d'envoi (voir EmailOutboxService) et la méthode
+        rend la main immédiatement ; queue=False (ou EMAIL_OUTBOX_ENABLED=0) envoie tout de suite
+        
         Args:
             to_email: Email du destinataire
             subject: Sujet de l'email
@@ -778,9 +835,11 @@ class EmailService:
             related_talent_code: Code du talent lié
             related_project_id: ID du projet lié
             related_cinema_talent_id: ID du talent cinéma lié
+            substitutions: {marqueur: valeur} remplacés dans le corps pour ce destinataire
+            queue: Mettre l'email en file d'envoi (False pour un envoi immédiat, ex. email de test)
         
         Returns:
-            True si envoyé avec succès, False sinon
+            True si envoyé (ou mis en file) avec succès, False sinon
         """
         # Vérifier si ce type de template est activé
         from app.models.email_log import EmailLog
@@ -788,6 +847,22 @@ class EmailService:
             print(f"⚠️  Email {template_type} désactivé, envoi annulé pour {to_email}")
             return False
         
+        if queue and current_app.config.get('EMAIL_OUTBOX_ENABLED', True):
+            from app import db
+            from app.services.email_outbox_service import EmailOutboxService
+            try:
+                return EmailOutboxService.enqueue(
+                    to_email, subject, html_content,
+                    attachments=attachments, template_type=template_type, recipient_name=recipient_name,
+                    substitutions=substitutions, sent_by_user_id=sent_by_user_id,
+                    related_talent_code=related_talent_code, related_project_id=related_project_id,
+                    related_cinema_talent_id=related_cinema_talent_id
+                ) > 0
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"❌ Impossible de mettre l'email en file d'envoi pour {to_email}: {str(e)}")
+                return False
+        
         # Récupérer la clé API à chaque envoi pour supporter la mise à jour à chaud
         api_key = self.api_key
         from_email = self.from_email
@@ -799,7 +874,14 @@ class EmailService:
         except:
             pass
         
-        if not api_key:
+        if substitutions:
+            for marker, value in substitutions.items():
+                html_content = html_content.replace(marker, value)
+        
+        from app.services.email_outbox_service import EmailDeliveryError, get_transport
+        transport = get_transport(current_app)
+        
+        if not api_key and transport.name == 'sendgrid':
             error_msg = "❌ SendGrid API key manquante. Configurez SENDGRID_API_KEY dans les variables d'environnement ou dans /admin/settings/api-keys"
             current_app.logger.error(error_msg)
             print(f"🔴 {error_msg}")
@@ -822,107 +904,55 @@ class EmailService:
         print(f"📧 Tentative d'envoi email à: {to_email}")
         print(f"📤 Expéditeur: {from_email}")
         print(f"📝 Sujet: {subject}")
-        print(f"🔑 API Key (premiers 8 chars): {api_key[:8] if api_key else 'None'}...")
-            
+        
         try:
-            message = Mail(
-                from_email=from_email,
-                to_emails=to_email,
-                subject=subject,
-                html_content=html_content
-            )
-            
             # Ajouter BCC pour l'admin si configuré
             # Ne pas ajouter l'admin en copie si l'email lui est déjà destiné
-            if self._should_cc_admin(template_type):
-                admin_email = self._get_admin_email()
-                
-                # S'assurer que admin_email est une string valide
-                if not admin_email or not isinstance(admin_email, str):
-                    admin_email = None
-                
-                if admin_email:
-                    # Vérifier si l'admin est déjà destinataire
-                    # to_email peut être une string, une liste, ou un dict selon SendGrid
-                    admin_is_recipient = False
-                    admin_lower = admin_email.lower()
-                    
-                    try:
-                        if isinstance(to_email, str):
-                            # Comparaison insensible à la casse pour les strings
-                            admin_is_recipient = admin_lower == to_email.lower()
-                        elif isinstance(to_email, list):
-                            # Vérifier dans la liste - ignorer les valeurs non-string
-                            for e in to_email:
-                                if isinstance(e, str) and e.lower() == admin_lower:
-                                    admin_is_recipient = True
-                                    break
-                                elif isinstance(e, dict):
-                                    recipient_email = e.get('email') or e.get('Email')
-                                    if isinstance(recipient_email, str) and recipient_email.lower() == admin_lower:
-                                        admin_is_recipient = True
-                                        break
-                        elif isinstance(to_email, dict):
-                            # Vérifier dans le dict - gérer les clés manquantes/None
-                            recipient_email = to_email.get('email') or to_email.get('Email')
-                            if isinstance(recipient_email, str):
-                                admin_is_recipient = recipient_email.lower() == admin_lower
-                    except (AttributeError, TypeError) as e:
-                        # En cas d'erreur, ne pas bloquer l'envoi, simplement logger
-                        print(f"⚠️  Erreur lors de la vérification du destinataire admin: {e}")
-                        admin_is_recipient = False
-                    
-                    if not admin_is_recipient:
-                        message.add_bcc(admin_email)
-                        print(f"📬 BCC ajouté pour admin: {admin_email}")
-                    else:
-                        print(f"ℹ️  Admin non ajouté en BCC car déjà destinataire principal: {admin_email}")
-            
-            if attachments:
-                for att in attachments:
-                    attachment = Attachment(
-                        FileContent(att['content']),
-                        FileName(att['filename']),
-                        FileType(att['type']),
-                        Disposition('attachment')
-                    )
-                    message.add_attachment(attachment)
-            
-            sg = SendGridAPIClient(api_key)
-            response = sg.send(message)
-            
-            if response.status_code in [200, 201, 202]:
-                success_msg = f"✅ Email envoyé avec succès à {to_email}"
-                current_app.logger.info(success_msg)
-                print(success_msg)
-                
-                self._log_email(to_email, recipient_name, subject, html_content, template_type, 
-                              status='sent', sent_by_user_id=sent_by_user_id,
-                              related_talent_code=related_talent_code, related_project_id=related_project_id,
-                              related_cinema_talent_id=related_cinema_talent_id)
-                return True
-            else:
-                error_msg = f"❌ Erreur SendGrid - Code: {response.status_code}, Body: {response.body}"
-                current_app.logger.error(error_msg)
-                print(f"🔴 {error_msg}")
-                
-                self._log_email(to_email, recipient_name, subject, html_content, template_type, 
-                              status='failed', error_message=error_msg,
-                              sent_by_user_id=sent_by_user_id, related_talent_code=related_talent_code,
-                              related_project_id=related_project_id, related_cinema_talent_id=related_cinema_talent_id)
-                return False
+            admin_bcc = self._admin_bcc_for(to_email, template_type)
+            if admin_bcc:
+                print(f"📬 BCC ajouté pour admin: {admin_bcc}")
+            
+            recipients = to_email if isinstance(to_email, list) else [to_email]
+            recipients = [r.get('email') or r.get('Email') if isinstance(r, dict) else r for r in recipients]
+            
+            transport.send({
+                'api_key': api_key,
+                'from_email': from_email,
+                'subject': subject,
+                'html_content': html_content,
+                'attachments': attachments,
+                'personalizations': [{
+                    'email': recipient,
+                    'name': recipient_name,
+                    'bcc': admin_bcc if index == 0 else None
+                } for index, recipient in enumerate(recipients)]
+            })
+            
+            success_msg = f"✅ Email envoyé avec succès à {to_email}"
+            current_app.logger.info(success_msg)
+            print(success_msg)
+            
+            self._log_email(to_email, recipient_name, subject, html_content, template_type, 
+                          status='sent', sent_by_user_id=sent_by_user_id,
+                          related_talent_code=related_talent_code, related_project_id=related_project_id,
+                          related_cinema_talent_id=related_cinema_talent_id)
+            return True
                 
+        except EmailDeliveryError as e:
+            error_msg = f"❌ {str(e)}"
+            current_app.logger.error(error_msg)
+            print(f"🔴 {error_msg}")
+            
+            self._log_email(to_email, recipient_name, subject, html_content, template_type, 
+                          status='failed', error_message=str(e),
+                          sent_by_user_id=sent_by_user_id, related_talent_code=related_talent_code,
+                          related_project_id=related_project_id, related_cinema_talent_id=related_cinema_talent_id)
+            return False
+        
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
-            error_msg = f"❌ Erreur SendGrid: {str(e)}"
-            current_app.logger.error(f"{error_msg}\n{error_details}")
-            print(f"🔴 ERREUR SENDGRID DÉTAILLÉE:")
-            print(f"   Message: {str(e)}")
-            print(f"   Type: {type(e).__name__}")
-            print(f"   API Key présente: {bool(self.api_key)}")
-            print(f"   From Email: {self.from_email}")
-            print(f"   Traceback:\n{error_details}")
+            current_app.logger.error(f"❌ Erreur SendGrid: {str(e)}\n{error_details}")
             
             self._log_email(to_email, recipient_name, subject, html_content, template_type, 
                           status='failed', error_message=str(e),
@@ -1326,14 +1356,34 @@ class EmailService:
         Returns:
             True si envoyé, False sinon
         """
+        return self.send_project_selection_confirmations(
+            project_talent.project, [project_talent], sent_by_user_id=sent_by_user_id
+        ) > 0
+    
+    def send_project_selection_confirmations(self, project, project_talents, sent_by_user_id=None):
+        """
+        Envoie l'email de sélection à tous les talents retenus d'un projet
+        
+        Le corps est construit une fois pour le projet ; les informations propres à chaque
+        talent sont des substitutions, ce qui permet un envoi groupé via SendGrid
+        
+        Args:
+            project: Objet Project
+            project_talents: Liste de ProjectTalent (cinema_talent chargé de préférence)
+            sent_by_user_id: ID de l'utilisateur qui envoie les emails
+        
+        Returns:
+            int: Nombre d'emails envoyés ou mis en file
+        """
+        from app.models.email_log import EmailLog
+        if not EmailLog.is_template_enabled('project_selection'):
+            print(f"⚠️  Email project_selection désactivé, envoi annulé pour le projet {project.id}")
+            return 0
+        
         try:
-            project = project_talent.project
-            cinema_talent = project_talent.cinema_talent
-            production = project.production
+            production = project.production_company
             
             domain = get_application_domain()
-            profile_url = f"https://{domain}/cinema/view-talent/{cinema_talent.unique_code}"
-            badge_url = f"https://{domain}/cinema/projects/talent/{project_talent.id}/generate-badge"
             
             logo_base64 = self._get_logo_base64()
             logo_img = f'<img src="data:image/png;base64,{logo_base64}" alt="taalentio.com" style="max-width: 250px; height: auto; margin-bottom: 15px;">' if logo_base64 else ''
@@ -1368,7 +1418,7 @@ class EmailService:
                         <h1>🎉 Félicitations ! Vous avez été sélectionné(e) !</h1>
                     </div>
                     <div class="content">
-                        <h2>Bonjour {cinema_talent.full_name},</h2>
+                        <h2>Bonjour -talent_name-,</h2>
                         
                         <div class="success-box">
                             <h3>✨ Excellente nouvelle !</h3>
@@ -1378,9 +1428,9 @@ class EmailService:
                         <div class="project-info">
                             <h3>📽️ {project.name}</h3>
                             <p><strong>Boîte de production :</strong> {production.name if production else 'N/A'}</p>
-                            <p><strong>Type de talent :</strong> {project_talent.talent_type}</p>
-                            {f'<p><strong>Rôle :</strong> {project_talent.role_description}</p>' if project_talent.role_description else ''}
-                            <p><strong>Statut du projet :</strong> {project.get_status_display()}</p>
+                            <p><strong>Type de talent :</strong> -talent_type-</p>
+                            -role_block-
+                            <p><strong>Statut du projet :</strong> {project.status_display}</p>
                         </div>
                         
                         <div class="production-contact">
@@ -1393,8 +1443,8 @@ class EmailService:
                         
                         <p><strong>Votre profil et badge :</strong></p>
                         <div style="text-align: center;">
-                            <a href="{profile_url}" class="button">Voir mon profil</a>
-                            <a href="{badge_url}" class="button">Télécharger mon badge</a>
+                            <a href="-profile_url-" class="button">Voir mon profil</a>
+                            <a href="-badge_url-" class="button">Télécharger mon badge</a>
                         </div>
                         
                         <p style="margin-top: 30px;">Toute l'équipe vous félicite et vous souhaite beaucoup de succès dans ce projet !<br>
@@ -1408,20 +1458,38 @@ class EmailService:
             </html>
             """
             
-            return self.send_email(
-                to_email=cinema_talent.email,
-                subject=f"🎉 Félicitations ! Vous avez été sélectionné pour {project.name}",
-                html_content=html_content,
-                template_type='project_selection',
-                recipient_name=cinema_talent.full_name,
-                sent_by_user_id=sent_by_user_id,
-                related_project_id=project.id,
-                related_cinema_talent_id=cinema_talent.id
-            )
+            messages = []
+            for project_talent in project_talents:
+                cinema_talent = project_talent.cinema_talent
+                if not cinema_talent or not cinema_talent.email:
+                    continue
+                messages.append({
+                    'to_email': cinema_talent.email,
+                    'subject': f"🎉 Félicitations ! Vous avez été sélectionné pour {project.name}",
+                    'html_content': html_content,
+                    'substitutions': {
+                        '-talent_name-': cinema_talent.full_name,
+                        '-talent_type-': project_talent.talent_type or '',
+                        '-role_block-': f'<p><strong>Rôle :</strong> {project_talent.role_description}</p>' if project_talent.role_description else '',
+                        '-profile_url-': f"https://{domain}/cinema/view-talent/{cinema_talent.unique_code}",
+                        '-badge_url-': f"https://{domain}/cinema/projects/talent/{project_talent.id}/generate-badge"
+                    },
+                    'template_type': 'project_selection',
+                    'recipient_name': cinema_talent.full_name,
+                    'sent_by_user_id': sent_by_user_id,
+                    'related_project_id': project.id,
+                    'related_cinema_talent_id': cinema_talent.id
+                })
+            
+            if current_app.config.get('EMAIL_OUTBOX_ENABLED', True):
+                from app.services.email_outbox_service import EmailOutboxService
+                return EmailOutboxService.enqueue_many(messages)
+            
+            return sum(1 for message in messages if self.send_email(**message))
             
         except Exception as e:
             current_app.logger.error(f"Erreur envoi confirmation sélection projet: {str(e)}")
-            return False
+            return 0
     
     def send_test_email(self, to_email):
         """
@@ -1491,7 +1559,8 @@ class EmailService:
             return self.send_email(
                 to_email=to_email,
                 subject="✅ Test de configuration SendGrid - taalentio.com",
-                html_content=html_content
+                html_content=html_content,
+                queue=False
             )
             
         except Exception as e:
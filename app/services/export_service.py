@@ -4,19 +4,19 @@ Supporte Excel (XLSX), CSV, et PDF
 """
 import os
 import io
+import unicodedata
 from datetime import datetime
+from urllib.parse import quote
 from flask import current_app
 import pandas as pd
-import qrcode
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from app.utils.encryption import decrypt_sensitive_data
+from app.models.user import User
 from app.models.settings import AppSettings
-from config import Config
 
 class ExportService:
     """Service d'export des données"""
@@ -24,7 +24,7 @@ class ExportService:
     @staticmethod
     def _generate_qr_code_for_pdf(unique_code, profile_type='user', size=1.5):
         """
-        Génère un QR code en mémoire pour le PDF avec la bonne URL
+        QR code du profil pour le PDF (rendu une seule fois, voir app/utils/qr_cache.py)
         
         Args:
             unique_code: Code unique du profil
@@ -35,32 +35,10 @@ class ExportService:
             Image object pour ReportLab ou None
         """
         try:
-            # Obtenir l'URL de base correcte
-            base_url = Config.get_base_url()
+            from app.utils.qr_cache import profile_qr_png
             
-            # Construire l'URL du profil
-            if profile_type == 'cinema':
-                profile_url = f"{base_url}/cinema/profile/{unique_code}"
-            else:
-                profile_url = f"{base_url}/profile/view/{unique_code}"
-            
-            # Générer le QR code en mémoire
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(profile_url)
-            qr.make(fit=True)
-            
-            # Créer l'image en mémoire
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir en bytes pour ReportLab
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
+            # Image partagée avec les pages de profil et les autres exports (cache des QR codes)
+            img_buffer = io.BytesIO(profile_qr_png(unique_code, profile_type))
             
             # Créer l'élément Image pour ReportLab
             return Image(img_buffer, width=size*inch, height=size*inch)
@@ -80,6 +58,7 @@ class ExportService:
         Returns:
             bytes: Données du fichier Excel
         """
+        users = User.preload_decrypted(users, 'phone', 'whatsapp')
         data = []
         
         for user in users:
@@ -140,6 +119,7 @@ class ExportService:
         Returns:
             str: Données CSV
         """
+        users = User.preload_decrypted(users, 'phone', 'whatsapp')
         data = []
         
         for user in users:
@@ -215,7 +195,7 @@ class ExportService:
             alignment=TA_LEFT
         )
         
-        for user in users:
+        for user in User.preload_decrypted(users, 'phone', 'whatsapp'):
             talents_names = [ut.talent.name for ut in user.talents] if user.talents else []
             talents_str = ', '.join(talents_names) if talents_names else 'N/A'
             
@@ -1099,28 +1079,30 @@ class ExportService:
                     flag_nationality = item['flag']
                     break
         
-        # Déchiffrer le téléphone, WhatsApp et le numéro de pièce d'identité
-        phone_decrypted = 'Non renseigné'
-        if cinema_talent.phone_encrypted:
-            try:
-                phone_decrypted = decrypt_sensitive_data(cinema_talent.phone_encrypted)
-            except:
-                phone_decrypted = 'Non disponible'
+        # Déchiffrer en un seul lot le téléphone, WhatsApp, la pièce d'identité et les réseaux sociaux
+        social_fields = {
+            'facebook': 'Facebook',
+            'instagram': 'Instagram', 
+            'twitter': 'Twitter',
+            'youtube': 'YouTube',
+            'tiktok': 'TikTok',
+            'snapchat': 'Snapchat',
+            'linkedin': 'LinkedIn',
+            'telegram': 'Telegram',
+            'imdb_url': 'IMDb',
+            'threads': 'Threads'
+        }
+        decrypted_values = cinema_talent.decrypt_fields('phone', 'whatsapp', 'id_document_number', *social_fields.keys())
         
-        whatsapp_decrypted = 'Non renseigné'
-        if cinema_talent.whatsapp_encrypted:
-            try:
-                whatsapp_decrypted = decrypt_sensitive_data(cinema_talent.whatsapp_encrypted)
-            except:
-                whatsapp_decrypted = 'Non disponible'
+        def _decrypted_or_default(field):
+            if not getattr(cinema_talent, f'{field}_encrypted', None):
+                return 'Non renseigné'
+            return decrypted_values.get(field) or 'Non disponible'
         
-        id_document_number = 'Non renseigné'
+        phone_decrypted = _decrypted_or_default('phone')
+        whatsapp_decrypted = _decrypted_or_default('whatsapp')
+        id_document_number = _decrypted_or_default('id_document_number')
         id_document_label = 'Non renseigné'
-        if cinema_talent.id_document_number_encrypted:
-            try:
-                id_document_number = decrypt_sensitive_data(cinema_talent.id_document_number_encrypted)
-            except:
-                id_document_number = 'Non disponible'
         
         if cinema_talent.id_document_type == 'passport':
             id_document_label = 'Passeport'
@@ -1158,10 +1140,7 @@ class ExportService:
         elements.append(Spacer(1, 15))
         
         # ==== ORIGINES ====
-        try:
-            ethnicities = json.loads(cinema_talent.ethnicities) if cinema_talent.ethnicities else []
-        except:
-            ethnicities = []
+        ethnicities = cinema_talent.ethnicities_list
         
         if ethnicities:
             origins_title = Table([['ORIGINES']], colWidths=[6.5*inch])
@@ -1194,10 +1173,7 @@ class ExportService:
             elements.append(Spacer(1, 10))
         
         # ==== LANGUES ====
-        try:
-            languages = json.loads(cinema_talent.languages) if cinema_talent.languages else []
-        except:
-            languages = []
+        languages = cinema_talent.languages_spoken_list
         
         if languages:
             lang_title = Table([['LANGUES PARLÉES']], colWidths=[6.5*inch])
@@ -1278,10 +1254,7 @@ class ExportService:
             elements.append(Spacer(1, 10))
         
         # ==== TYPES DE TALENTS ====
-        try:
-            talent_types = json.loads(cinema_talent.talent_types) if cinema_talent.talent_types else []
-        except:
-            talent_types = []
+        talent_types = cinema_talent.talent_types_list
         
         if talent_types:
             talents_title = Table([['TYPES DE TALENTS']], colWidths=[6.5*inch])
@@ -1314,10 +1287,7 @@ class ExportService:
             elements.append(Spacer(1, 10))
         
         # ==== COMPÉTENCES ARTISTIQUES ====
-        try:
-            other_talents = json.loads(cinema_talent.other_talents) if cinema_talent.other_talents else []
-        except:
-            other_talents = []
+        other_talents = cinema_talent.other_talents_list
         
         if other_talents:
             comp_title = Table([['COMPÉTENCES ARTISTIQUES']], colWidths=[6.5*inch])
@@ -1350,30 +1320,10 @@ class ExportService:
         
         # ==== RÉSEAUX SOCIAUX ====
         social_networks = []
-        social_fields = {
-            'facebook': 'Facebook',
-            'instagram': 'Instagram', 
-            'twitter': 'Twitter',
-            'youtube': 'YouTube',
-            'tiktok': 'TikTok',
-            'snapchat': 'Snapchat',
-            'linkedin': 'LinkedIn',
-            'telegram': 'Telegram',
-            'imdb_url': 'IMDb',
-            'threads': 'Threads'
-        }
-        
         for field, label in social_fields.items():
-            encrypted_field = f'{field}_encrypted'
-            if hasattr(cinema_talent, encrypted_field):
-                encrypted_value = getattr(cinema_talent, encrypted_field)
-                if encrypted_value:
-                    try:
-                        decrypted_value = decrypt_sensitive_data(encrypted_value)
-                        if decrypted_value:
-                            social_networks.append([label, decrypted_value])
-                    except:
-                        pass
+            decrypted_value = decrypted_values.get(field)
+            if decrypted_value:
+                social_networks.append([label, decrypted_value])
         
         if social_networks:
             social_title = Table([['RÉSEAUX SOCIAUX']], colWidths=[6.5*inch])
@@ -1490,7 +1440,7 @@ class ExportService:
         
         # Photos de la galerie
         try:
-            gallery = json.loads(cinema_talent.gallery_photos) if cinema_talent.gallery_photos else []
+            gallery = cinema_talent.gallery_photos_list
             for idx, photo_filename in enumerate(gallery, 1):
                 try:
                     photo_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'cinema_photos', photo_filename)
@@ -1579,78 +1529,198 @@ class ExportService:
         buffer.seek(0)
         return buffer.getvalue()
 
-def export_attendance_to_excel(project, attendances, start_date=None, end_date=None):
+ATTENDANCE_EXPORT_COLUMNS = [
+    ('Date', 12), ('Code Cinéma', 14), ('Prénom', 20), ('Nom', 20), ('Type', 30),
+    ('Arrivée', 10), ('Départ', 10), ('Durée', 14), ('Minutes', 10), ('Enregistré par', 25)
+]
+
+
+def _attendance_export_filename(project, start_date, end_date, extension):
+    """Nom du fichier d'export des présences"""
+    period_str = ""
+    if start_date and end_date:
+        period_str = f"_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+    elif start_date:
+        period_str = f"_{start_date.strftime('%Y%m%d')}"
+    
+    return f"presences_{project.name.replace(' ', '_')}{period_str}.{extension}"
+
+
+def _attachment_filename(filename):
+    """
+    Paramètres de Content-Disposition pour un nom de fichier quelconque (comme send_file) :
+    nom ASCII de repli, plus filename*=UTF-8'' si le nom sort du Latin-1
+    """
+    try:
+        filename.encode('latin-1')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='')}"}
+    return {'filename': filename}
+
+
+def _iter_attendance_rows(project_id, start_date=None, end_date=None, batch_size=1000):
+    """
+    Lignes d'export des présences d'un projet, lues par lots (mémoire bornée)
+    Une seule requête avec jointures sur le talent et l'utilisateur qui a enregistré
+    """
+    from app import db
+    from app.models.attendance import Attendance
+    from app.models.cinema_talent import CinemaTalent
+    from app.models.cinema_talent_attribute import json_list
+    
+    recorder = db.aliased(User)
+    query = (
+        db.select(
+            Attendance.date, Attendance.cinema_talent_code,
+            Attendance.check_in_time, Attendance.check_out_time,
+            CinemaTalent.first_name, CinemaTalent.last_name, CinemaTalent.talent_types,
+            recorder.first_name.label('recorder_first_name'),
+            recorder.last_name.label('recorder_last_name')
+        )
+        .join(CinemaTalent, CinemaTalent.unique_code == Attendance.cinema_talent_code)
+        .outerjoin(recorder, recorder.id == Attendance.recorded_by)
+        .where(Attendance.project_id == project_id)
+        .order_by(Attendance.date.desc(), Attendance.check_in_time.desc())
+    )
+    if start_date:
+        query = query.where(Attendance.date >= start_date)
+    if end_date:
+        query = query.where(Attendance.date <= end_date)
+    
+    for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+        minutes = 0
+        if row.check_in_time and row.check_out_time:
+            minutes = int((row.check_out_time - row.check_in_time).total_seconds() / 60)
+        
+        talent_types = ', '.join(json_list(row.talent_types))
+        
+        yield [
+            row.date.strftime('%d/%m/%Y'),
+            row.cinema_talent_code,
+            row.first_name,
+            row.last_name,
+            talent_types or 'N/A',
+            row.check_in_time.strftime('%H:%M') if row.check_in_time else '-',
+            row.check_out_time.strftime('%H:%M') if row.check_out_time else 'En cours',
+            Attendance.format_minutes(minutes) if minutes else "En cours...",
+            minutes,
+            f"{row.recorder_first_name or ''} {row.recorder_last_name or ''}".strip()
+        ]
+
+
+def export_attendance_to_excel(project, start_date=None, end_date=None):
     """
     Exporter les présences d'un projet vers Excel
     
+    Le classeur est écrit en mode streaming (openpyxl write-only, fichier temporaire) :
+    la mémoire utilisée ne dépend pas du nombre de présences. Les feuilles de synthèse
+    (par talent, par jour) sont calculées par la base.
+    
     Args:
         project: Objet Project
-        attendances: Liste d'objets Attendance
         start_date: Date de début (optionnel)
         end_date: Date de fin (optionnel)
         
     Returns:
         Response Flask avec le fichier Excel
     """
+    import tempfile
     from flask import send_file
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from app import db
+    from app.models.attendance import Attendance
     from app.models.cinema_talent import CinemaTalent
     
-    data = []
-    
-    for att in attendances:
-        # Récupérer les infos du talent
-        talent = CinemaTalent.query.filter_by(unique_code=att.cinema_talent_code).first()
-        
-        if talent:
-            data.append({
-                'Date': att.date.strftime('%d/%m/%Y'),
-                'Code Cinéma': att.cinema_talent_code,
-                'Prénom': talent.first_name,
-                'Nom': talent.last_name,
-                'Type': talent.talent_type or 'N/A',
-                'Arrivée': att.check_in_time.strftime('%H:%M') if att.check_in_time else '-',
-                'Départ': att.check_out_time.strftime('%H:%M') if att.check_out_time else 'En cours',
-                'Durée': att.get_duration_formatted(),
-                'Minutes': att.get_duration_minutes(),
-                'Enregistré par': f"{att.recorder.first_name} {att.recorder.last_name}"
-            })
+    workbook = Workbook(write_only=True)
     
-    df = pd.DataFrame(data)
+    def add_sheet(title, columns):
+        worksheet = workbook.create_sheet(title)
+        for index, (_, width) in enumerate(columns, start=1):
+            worksheet.column_dimensions[get_column_letter(index)].width = width
+        worksheet.append([name for name, _ in columns])
+        return worksheet
     
-    # Créer le fichier Excel
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Présences', index=False)
-        
-        worksheet = writer.sheets['Présences']
-        
-        # Ajuster la largeur des colonnes
-        for column in worksheet.columns:
-            max_length = 0
-            column = [cell for cell in column]
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
+    worksheet = add_sheet('Présences', ATTENDANCE_EXPORT_COLUMNS)
+    for row in _iter_attendance_rows(project.id, start_date, end_date):
+        worksheet.append(row)
     
-    output.seek(0)
+    # Synthèse par talent
+    talent_totals = Attendance.get_project_talent_totals(project.id, start_date, end_date)
+    names = {}
+    if talent_totals:
+        names = {
+            row.unique_code: (row.first_name, row.last_name)
+            for row in db.session.execute(
+                db.select(CinemaTalent.unique_code, CinemaTalent.first_name, CinemaTalent.last_name)
+                .where(CinemaTalent.unique_code.in_([t['cinema_talent_code'] for t in talent_totals]))
+            )
+        }
+    worksheet = add_sheet('Par talent', [
+        ('Code Cinéma', 14), ('Prénom', 20), ('Nom', 20), ('Jours présents', 15),
+        ('Jours complets', 15), ('Durée totale', 15), ('Minutes', 10)
+    ])
+    for totals in talent_totals:
+        first_name, last_name = names.get(totals['cinema_talent_code'], ('', ''))
+        worksheet.append([
+            totals['cinema_talent_code'], first_name, last_name, totals['days_present'],
+            totals['days_worked'], totals['formatted'], totals['total_minutes']
+        ])
     
-    # Nom du fichier
-    period_str = ""
-    if start_date and end_date:
-        period_str = f"_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
-    elif start_date:
-        period_str = f"_{start_date.strftime('%Y%m%d')}"
+    # Effectifs par jour
+    worksheet = add_sheet('Par jour', [
+        ('Date', 12), ('Présents', 10), ('Départs enregistrés', 20), ('Durée totale', 15), ('Minutes', 10)
+    ])
+    for day in Attendance.get_daily_headcounts(project.id, start_date, end_date):
+        worksheet.append([
+            day['date'].strftime('%d/%m/%Y'), day['present'], day['checked_out'],
+            day['formatted'], day['total_minutes']
+        ])
     
-    filename = f"presences_{project.name.replace(' ', '_')}{period_str}.xlsx"
+    # Fichier temporaire sur disque, supprimé à la fermeture de la réponse
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
     
     return send_file(
         output,
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True,
-        download_name=filename
+        download_name=_attendance_export_filename(project, start_date, end_date, 'xlsx')
+    )
+
+
+def export_attendance_to_csv(project, start_date=None, end_date=None):
+    """
+    Exporter les présences d'un projet en CSV, envoyé au fil de la lecture
+    
+    Returns:
+        Response Flask en streaming
+    """
+    import csv
+    from flask import Response, stream_with_context
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        
+        # BOM pour qu'Excel détecte l'UTF-8
+        buffer.write('\ufeff')
+        writer.writerow([name for name, _ in ATTENDANCE_EXPORT_COLUMNS])
+        
+        for index, row in enumerate(_iter_attendance_rows(project.id, start_date, end_date), start=1):
+            writer.writerow(row)
+            if index % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        yield buffer.getvalue()
+    
+    response = Response(stream_with_context(generate()), mimetype='text/csv; charset=utf-8')
+    response.headers.set(
+        'Content-Disposition', 'attachment',
+        **_attachment_filename(_attendance_export_filename(project, start_date, end_date, 'csv'))
     )
+    return response
@@ -0,0 +1,232 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Fonctions exécutées par les tâches d'arrière-plan (voir JobService)
+Chaque fonction reçoit un JobContext puis les paramètres enregistrés à la création
+Un résultat fichier est décrit par {'file', 'download_name', 'mimetype'}
+"""
+
+import logging
+import os
+import shutil
+from datetime import datetime
+
+from app import db
+from app.services.job_service import register_job
+
+logger = logging.getLogger(__name__)
+
+
+@register_job('cv_analysis', 'Analyse de CV')
+def cv_analysis(ctx, user_id):
+    from app.models.user import User
+    from app.services.cv_analyzer import CVAnalyzerService
+    
+    user = db.session.get(User, user_id)
+    if user is None or not user.cv_filename:
+        raise ValueError('Aucun CV disponible pour cet utilisateur')
+    
+    ctx.progress(10, message='Analyse du CV en cours')
+    user_data = {
+        'name': user.full_name,
+        'talents': [ut.talent_id for ut in user.talents],
+        'location': f"{user.city.name if user.city else ''}, {user.country.name if user.country else ''}"
+    }
+    analysis = CVAnalyzerService.analyze_cv(user.cv_filename, user_data)
+    analysis['message'] = f'Analyse du CV de {user.full_name} terminée'
+    return analysis
+
+
+@register_job('ai_search', 'Recherche IA')
+def ai_search(ctx, job_description, scope='users'):
+    from sqlalchemy import func
+    from app.models.user import User, UserLoad
+    from app.models.cinema_talent import CinemaTalent
+    from app.services.ai_matching_service import AIMatchingService
+    from app.services.email_service import email_service
+    
+    def on_progress(done, total):
+        ctx.progress(done, total, message=f'{done}/{total} profil(s) analysé(s)')
+    
+    extra = {}
+    if scope == 'cinema':
+        from app.services.cinema_prefilter_service import CinemaPrefilterService
+        prefilter = CinemaPrefilterService.shortlist(job_description)
+        if not prefilter['total_active']:
+            raise ValueError('Aucun profil cinéma disponible pour l\'analyse')
+        if not prefilter['talents']:
+            raise ValueError('Aucun talent ne correspond aux critères de la description (genre, âge, taille)')
+        
+        results = AIMatchingService.analyze_cinema_talents(
+            job_description=job_description,
+            cinema_talent_profiles=prefilter['talents'],
+            on_progress=on_progress
+        )
+        extra = {'total_active': prefilter['total_active'], 'total_eligible': prefilter['total_eligible']}
+        subject_key = 'talent'
+    else:
+        all_users = User.query.options(*UserLoad.MATCHING).filter(
+            User.is_admin == False,
+            User.account_active == True,
+            func.length(User.unique_code) == 10
+        ).all()
+        if not all_users:
+            raise ValueError('Aucun profil disponible pour l\'analyse')
+        
+        results = AIMatchingService.analyze_job_description(
+            job_description=job_description,
+            user_profiles=all_users,
+            on_progress=on_progress
+        )
+        subject_key = 'user'
+    
+    if not results.get('success'):
+        raise ValueError(results.get('message', 'Erreur lors de l\'analyse'))
+    
+    # Envoyer des notifications email aux talents qui matchent
+    emails_sent = 0
+    for candidate in results.get('candidates', []):
+        try:
+            if scope == 'cinema':
+                cinema_talent = CinemaTalent.query.filter_by(unique_code=candidate.get('code')).first()
+                if cinema_talent and cinema_talent.email:
+                    success = email_service.send_cinema_ai_match_notification(
+                        cinema_talent=cinema_talent,
+                        role_description=job_description,
+                        match_score=candidate.get('score', 0),
+                        match_reason=candidate.get('reason', ''),
+                        sent_by_user_id=ctx.created_by_id
+                    )
+                    if success:
+                        emails_sent += 1
+            else:
+                user = User.query.filter_by(unique_code=candidate.get('code')).first()
+                if user and user.email:
+                    success = email_service.send_ai_match_notification(
+                        user=user,
+                        job_description=job_description,
+                        match_score=candidate.get('score', 0),
+                        match_reason=candidate.get('reason', ''),
+                        sent_by_user_id=ctx.created_by_id
+                    )
+                    if success:
+                        emails_sent += 1
+        except Exception as e:
+            logger.warning(f"Erreur envoi email au talent {candidate.get('code')}: {e}")
+    
+    # Les objets ORM ne sont pas sérialisables : seuls les identifiants sont conservés
+    candidates = []
+    for candidate in results.get('candidates', []):
+        profile_data = {key: value for key, value in candidate.get('profile_data', {}).items()
+                        if key != 'competences_cv'}
+        candidates.append({
+            'subject_id': candidate[subject_key].id,
+            'profile_data': profile_data,
+            'score': candidate.get('score', 0),
+            'explication': candidate.get('explication', ''),
+            'points_forts': candidate.get('points_forts', []),
+            'points_faibles': candidate.get('points_faibles', []),
+            'cached': candidate.get('cached', False)
+        })
+    
+    return {
+        'view': 'ai_search',
+        'scope': scope,
+        'job_description': job_description,
+        'total_analyzed': results.get('total_analyzed', 0),
+        'total_matched': results.get('total_matched', 0),
+        'total_cached': results.get('total_cached', 0),
+        'emails_sent': emails_sent,
+        'candidates': candidates,
+        'message': f"{results.get('total_matched', 0)} candidat(s) trouvé(s) sur {results.get('total_analyzed', 0)} profil(s) analysé(s)",
+        **extra
+    }
+
+
+@register_job('full_backup', 'Sauvegarde complète')
+def full_backup(ctx):
+    from app.services.backup_service import BackupService
+    
+    ctx.progress(5, message='Préparation de la sauvegarde')
+    zip_path, temp_dir = BackupService.create_full_backup()
+    try:
+        download_name = os.path.basename(zip_path)
+        target = ctx.result_path(download_name)
+        shutil.move(zip_path, target)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    return {
+        'file': target,
+        'download_name': download_name,
+        'mimetype': 'application/zip',
+        'message': 'Sauvegarde prête au téléchargement'
+    }
+
+
+@register_job('project_selection_emails', 'Emails de sélection du projet')
+def project_selection_emails(ctx, project_id):
+    from sqlalchemy.orm import joinedload
+    from app.models.project import Project, ProjectTalent
+    from app.services.email_service import email_service
+    
+    project = db.session.get(Project, project_id)
+    if project is None:
+        raise ValueError('Projet introuvable')
+    
+    ctx.progress(10, message='Préparation des emails')
+    project_talents = ProjectTalent.query.options(
+        joinedload(ProjectTalent.cinema_talent)
+    ).filter_by(project_id=project_id).all()
+    
+    # Un seul corps pour le projet, mis en file en une insertion (envoi groupé par le dispatcher d'emails)
+    emails_sent = email_service.send_project_selection_confirmations(
+        project, project_talents, sent_by_user_id=ctx.created_by_id
+    )
+    emails_failed = sum(
+        1 for project_talent in project_talents
+        if project_talent.cinema_talent and project_talent.cinema_talent.email
+    ) - emails_sent
+    
+    message = f'{emails_sent} email(s) de confirmation envoyé(s)'
+    if emails_failed:
+        message += f', {emails_failed} échec(s)'
+    return {
+        'project_id': project_id,
+        'emails_sent': emails_sent,
+        'emails_failed': emails_failed,
+        'message': message
+    }
+
+
+@register_job('users_pdf_export', 'Export PDF des talents')
+def users_pdf_export(ctx, filters=None):
+    from app.models.user import User, UserLoad
+    from app.services.export_service import ExportService
+    from app.services.user_search_service import UserSearchService
+    
+    ctx.progress(5, message='Chargement des profils')
+    # Talents de la liste admin (hors admins, talents généraux) avec les filtres actifs
+    users = UserSearchService.query(filters or {}).options(*UserLoad.EXPORT).order_by(
+        User.created_at.desc(), User.id.desc()
+    ).all()
+    
+    ctx.progress(20, message=f'Génération du PDF ({len(users)} profils)')
+    requested_by = db.session.get(User, ctx.created_by_id) if ctx.created_by_id else None
+    pdf_bytes = ExportService.export_list_to_pdf(users, current_user=requested_by)
+    
+    download_name = f'talento_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    target = ctx.result_path(download_name)
+    with open(target, 'wb') as file:
+        file.write(pdf_bytes)
+    
+    return {
+        'file': target,
+        'download_name': download_name,
+        'mimetype': 'application/pdf',
+        'message': f'Export PDF de {len(users)} talent(s) prêt'
+    }
@@ -0,0 +1,367 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Sous-système de tâches d'arrière-plan
+- Les routes enregistrent une tâche (table background_jobs) et rendent la main immédiatement
+- Le dispatcher (APScheduler, voir app/scheduler.py) réclame les tâches en attente
+  et les exécute dans un pool de threads borné (JOB_WORKERS)
+- Par défaut (JOB_WORKER_ENABLED=1) chaque processus web traite aussi la file : un déploiement
+  à un seul processus (python app.py) fonctionne sans rien lancer d'autre ; avec plusieurs workers
+  web, mettre JOB_WORKER_ENABLED=0 et lancer un processus dédié : python job_worker.py
+  (ecosystem.config.js le fait pour PM2)
+- Le dispatcher entretient le signe de vie des tâches qu'il exécute : seule une tâche dont le
+  processus s'est arrêté est marquée en échec après JOB_STALE_AFTER
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.background_job import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Registre des types de tâches : job_type -> {'func', 'label'}
+_handlers = {}
+
+_executor = None
+_running = {}  # job_id -> Future
+_lock = threading.Lock()
+_last_heartbeat = {'at': 0.0}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def register_job(job_type, label):
+    """Décorateur : déclare la fonction qui exécute un type de tâche"""
+    def decorator(func):
+        _handlers[job_type] = {'func': func, 'label': label}
+        return func
+    return decorator
+
+
+class JobCancelled(BaseException):
+    """
+    Levée par JobContext quand l'annulation a été demandée
+    Hérite de BaseException pour traverser les `except Exception` des services appelés
+    """
+
+
+class JobContext:
+    """Contexte passé aux fonctions de tâche : progression, annulation, fichiers de résultat"""
+    
+    # Intervalle minimum entre deux écritures de progression
+    PROGRESS_INTERVAL = 1.0
+    
+    def __init__(self, app, job):
+        self.app = app
+        self.job_id = job.id
+        self.created_by_id = job.created_by_id
+        self._last_write = 0.0
+        self._last_percent = -1
+    
+    def progress(self, current, total=None, message=None):
+        """
+        Met à jour la progression (current/total ou pourcentage si total est None)
+        et lève JobCancelled si l'annulation a été demandée
+        """
+        percent = int(current * 100 / total) if total else int(current)
+        percent = max(0, min(percent, 99))
+        
+        now = time.monotonic()
+        if percent == self._last_percent and now - self._last_write < self.PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        self._last_percent = percent
+        
+        # Connexion séparée : ne pas committer le travail en cours de la tâche
+        table = BackgroundJob.__table__
+        values = {'progress': percent, 'heartbeat_at': datetime.utcnow()}
+        if message:
+            values['progress_message'] = message[:255]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(table.update().where(table.c.id == self.job_id).values(**values))
+                cancel_requested = connection.execute(
+                    db.select(table.c.cancel_requested).where(table.c.id == self.job_id)
+                ).scalar()
+        except SQLAlchemyError as e:
+            # La progression est indicative : ne pas faire échouer la tâche
+            logger.warning(f"Progression de la tâche {self.job_id} non enregistrée: {e}")
+            return
+        
+        if cancel_requested:
+            raise JobCancelled()
+    
+    def check_cancelled(self):
+        """Lever JobCancelled si l'annulation a été demandée"""
+        table = BackgroundJob.__table__
+        with db.engine.connect() as connection:
+            cancel_requested = connection.execute(
+                db.select(table.c.cancel_requested).where(table.c.id == self.job_id)
+            ).scalar()
+        if cancel_requested:
+            raise JobCancelled()
+    
+    def result_path(self, filename):
+        """Chemin d'un fichier de résultat propre à cette tâche"""
+        directory = os.path.join(JobService.get_results_dir(self.app), str(self.job_id))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+
+class JobService:
+    """Création, suivi et exécution des tâches d'arrière-plan"""
+    
+    @staticmethod
+    def _load_handlers():
+        # Les fonctions de tâche s'enregistrent à l'import
+        import app.services.job_handlers  # noqa: F401
+    
+    @staticmethod
+    def get_label(job_type):
+        JobService._load_handlers()
+        handler = _handlers.get(job_type)
+        return handler['label'] if handler else job_type
+    
+    @staticmethod
+    def get_results_dir(app):
+        return app.config.get('JOB_RESULTS_FOLDER') or os.path.join(app.instance_path, 'job_results')
+    
+    @staticmethod
+    def enqueue(job_type, params=None, user=None):
+        """
+        Enregistre une tâche à exécuter
+        
+        Args:
+            job_type: Type déclaré avec @register_job
+            params: dict JSON-sérialisable passé en arguments nommés à la fonction
+            user: Utilisateur à l'origine de la tâche
+        
+        Returns:
+            BackgroundJob
+        """
+        JobService._load_handlers()
+        if job_type not in _handlers:
+            raise ValueError(f"Type de tâche inconnu: {job_type}")
+        
+        job = BackgroundJob(
+            job_type=job_type,
+            params=json.dumps(params or {}, ensure_ascii=False),
+            created_by_id=user.id if user else None,
+            status=BackgroundJob.STATUS_PENDING
+        )
+        db.session.add(job)
+        db.session.commit()
+        logger.info(f"📥 Tâche {job.id} ({job_type}) en attente")
+        return job
+    
+    @staticmethod
+    def get_for_user(job_id, user):
+        """Retourne la tâche si l'utilisateur en est l'auteur (ou admin), sinon None"""
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None:
+            return None
+        if user.is_admin or job.created_by_id == user.id:
+            return job
+        return None
+    
+    @staticmethod
+    def request_cancel(job):
+        """Annule une tâche en attente, ou demande l'arrêt d'une tâche en cours"""
+        if job.is_finished:
+            return False
+        
+        if job.status == BackgroundJob.STATUS_PENDING:
+            # Mise à jour conditionnelle : le dispatcher a pu la réclamer entre-temps
+            updated = BackgroundJob.query.filter_by(id=job.id, status=BackgroundJob.STATUS_PENDING).update(
+                {'status': BackgroundJob.STATUS_CANCELLED, 'cancel_requested': True, 'finished_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            if updated:
+                db.session.commit()
+                db.session.refresh(job)
+                return True
+        
+        BackgroundJob.query.filter_by(id=job.id).update({'cancel_requested': True}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+        return True
+    
+    @staticmethod
+    def _get_executor(app):
+        global _executor
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(app.config.get('JOB_WORKERS', 2))),
+                    thread_name_prefix='job-worker'
+                )
+            return _executor
+    
+    @staticmethod
+    def dispatch_pending(app):
+        """
+        Réclame les tâches en attente dans la limite des threads libres et les exécute
+        (appelé périodiquement par le scheduler)
+        """
+        JobService._load_handlers()
+        executor = JobService._get_executor(app)
+        max_workers = max(1, int(app.config.get('JOB_WORKERS', 2)))
+        
+        with _lock:
+            for job_id in [job_id for job_id, future in _running.items() if future.done()]:
+                _running.pop(job_id, None)
+            free_slots = max_workers - len(_running)
+            running_ids = list(_running.keys())
+        
+        with app.app_context():
+            try:
+                JobService._heartbeat(app, running_ids)
+                JobService._fail_stale_jobs(app)
+                if free_slots <= 0:
+                    return 0
+                
+                candidates = [row.id for row in db.session.query(BackgroundJob.id).filter(
+                    BackgroundJob.status == BackgroundJob.STATUS_PENDING
+                ).order_by(BackgroundJob.created_at.asc(), BackgroundJob.id.asc()).limit(free_slots).all()]
+                
+                claimed = []
+                for job_id in candidates:
+                    # Réclamation atomique : un seul processus passe la tâche en "running"
+                    now = datetime.utcnow()
+                    updated = BackgroundJob.query.filter_by(id=job_id, status=BackgroundJob.STATUS_PENDING).update(
+                        {'status': BackgroundJob.STATUS_RUNNING, 'worker_id': WORKER_ID,
+                         'started_at': now, 'heartbeat_at': now},
+                        synchronize_session=False
+                    )
+                    db.session.commit()
+                    if updated:
+                        claimed.append(job_id)
+            finally:
+                db.session.remove()
+        
+        for job_id in claimed:
+            future = executor.submit(JobService._run, app, job_id)
+            with _lock:
+                _running[job_id] = future
+        return len(claimed)
+    
+    @staticmethod
+    def _run(app, job_id):
+        """Exécute une tâche réclamée (thread du pool)"""
+        with app.app_context():
+            job = db.session.get(BackgroundJob, job_id)
+            if job is None:
+                return
+            
+            handler = _handlers.get(job.job_type)
+            started = time.monotonic()
+            status, result, error = BackgroundJob.STATUS_SUCCEEDED, None, None
+            try:
+                if handler is None:
+                    raise ValueError(f"Type de tâche inconnu: {job.job_type}")
+                
+                # return_url ne sert qu'à la page de suivi
+                params = job.params_data
+                params.pop('return_url', None)
+                
+                logger.info(f"▶️ Tâche {job_id} ({job.job_type}) démarrée")
+                result = handler['func'](JobContext(app, job), **params)
+            except JobCancelled:
+                status = BackgroundJob.STATUS_CANCELLED
+            except Exception as e:
+                status, error = BackgroundJob.STATUS_FAILED, str(e)
+                logger.exception(f"❌ Tâche {job_id} ({job.job_type}) en échec: {e}")
+            
+            try:
+                db.session.rollback()
+                job = db.session.get(BackgroundJob, job_id)
+                job.status = status
+                job.error = error
+                job.finished_at = datetime.utcnow()
+                if status == BackgroundJob.STATUS_SUCCEEDED:
+                    job.progress = 100
+                    job.result = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+                db.session.commit()
+                logger.info(f"⏹️ Tâche {job_id} ({job.job_type}) : {status} en {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Impossible d'enregistrer le résultat de la tâche {job_id}: {e}")
+            finally:
+                db.session.remove()
+    
+    @staticmethod
+    def _heartbeat(app, job_ids):
+        """
+        Signe de vie des tâches en cours dans ce processus, qu'elles signalent ou non leur progression
+        (au plus une écriture par minute, ou par tiers de JOB_STALE_AFTER s'il est plus court)
+        """
+        if not job_ids:
+            return
+        interval = min(60.0, int(app.config.get('JOB_STALE_AFTER', 3600)) / 3)
+        now = time.monotonic()
+        if now - _last_heartbeat['at'] < interval:
+            return
+        _last_heartbeat['at'] = now
+        
+        BackgroundJob.query.filter(
+            BackgroundJob.id.in_(job_ids),
+            BackgroundJob.status == BackgroundJob.STATUS_RUNNING
+        ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+    
+    @staticmethod
+    def _fail_stale_jobs(app):
+        """Marque en échec les tâches "running" dont le processus ne donne plus signe de vie"""
+        stale_after = int(app.config.get('JOB_STALE_AFTER', 3600))
+        limit = datetime.utcnow() - timedelta(seconds=stale_after)
+        with _lock:
+            local_ids = list(_running.keys())
+        
+        query = BackgroundJob.query.filter(
+            BackgroundJob.status == BackgroundJob.STATUS_RUNNING,
+            BackgroundJob.heartbeat_at < limit
+        )
+        if local_ids:
+            query = query.filter(~BackgroundJob.id.in_(local_ids))
+        updated = query.update(
+            {'status': BackgroundJob.STATUS_FAILED, 'error': 'Tâche interrompue (worker arrêté)',
+             'finished_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        if updated:
+            db.session.commit()
+            logger.warning(f"⚠️ {updated} tâche(s) interrompue(s) marquée(s) en échec")
+    
+    @staticmethod
+    def purge(app):
+        """Supprime les tâches terminées (et leurs fichiers) plus anciennes que JOB_RESULT_TTL"""
+        ttl = int(app.config.get('JOB_RESULT_TTL', 2 * 24 * 3600))
+        limit = datetime.utcnow() - timedelta(seconds=ttl)
+        with app.app_context():
+            try:
+                old_jobs = BackgroundJob.query.filter(
+                    BackgroundJob.status.in_(BackgroundJob.FINISHED_STATUSES),
+                    BackgroundJob.finished_at < limit
+                ).all()
+                results_dir = JobService.get_results_dir(app)
+                for job in old_jobs:
+                    shutil.rmtree(os.path.join(results_dir, str(job.id)), ignore_errors=True)
+                    db.session.delete(job)
+                db.session.commit()
+                return len(old_jobs)
+            finally:
+                db.session.remove()
@@ -0,0 +1,168 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Rétention des logs d'activité et de sécurité, sur activation (les deux durées valent 0 par défaut :
+les pages de logs lisent les logs bruts, rien n'est supprimé sans décision explicite)
+- Les logs d'activité plus anciens que ACTIVITY_LOG_RETENTION_DAYS sont compactés
+  dans activity_log_daily_stats puis supprimés
+- Les logs de sécurité plus anciens que SECURITY_LOG_RETENTION_DAYS sont supprimés
+  (les événements critiques sont conservés)
+Le travail est découpé en lots de LOG_RETENTION_BATCH_SIZE lignes : chaque lot
+(agrégats + suppression) est une transaction, une interruption ne compte rien deux fois
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.activity_log import ActivityLog
+from app.models.activity_log_daily_stat import ActivityLogDailyStat
+from app.models.security_log import SecurityLog
+
+logger = logging.getLogger(__name__)
+
+
+class LogRetentionService:
+    """Compactage et purge des logs anciens (appelé chaque nuit par le scheduler)"""
+    
+    @staticmethod
+    def _to_date(value):
+        # SQLite renvoie parfois une chaîne pour les DateTime lus hors ORM
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.date()
+    
+    @staticmethod
+    def rollup_activity_logs(retention_days, batch_size=5000, max_batches=None):
+        """
+        Compacte en agrégats quotidiens puis supprime les logs d'activité anciens
+        
+        Args:
+            retention_days: Nombre de jours de logs bruts conservés (0 = pas de compactage)
+            batch_size: Nombre de lignes traitées par transaction
+            max_batches: Nombre maximum de lots pour cette exécution (None = jusqu'au bout)
+        
+        Returns:
+            int: Nombre de logs bruts compactés
+        """
+        if not retention_days or retention_days <= 0:
+            return 0
+        
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        table = ActivityLog.__table__
+        stats_table = ActivityLogDailyStat.__table__
+        total = 0
+        batches = 0
+        
+        while max_batches is None or batches < max_batches:
+            # Lot le plus ancien, servi par l'index sur created_at
+            rows = db.session.execute(
+                db.select(table.c.id, table.c.created_at, table.c.action_type,
+                          table.c.action_category, table.c.status, table.c.device_type)
+                .where(table.c.created_at < cutoff)
+                .order_by(table.c.created_at)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            
+            counts = Counter(
+                (LogRetentionService._to_date(row.created_at), row.action_type,
+                 row.action_category or '', row.status or '', row.device_type or '')
+                for row in rows
+            )
+            
+            try:
+                existing = {}
+                for day in {key[0] for key in counts}:
+                    for stat in db.session.execute(
+                        db.select(stats_table).where(stats_table.c.day == day)
+                    ).all():
+                        existing[(stat.day, stat.action_type, stat.action_category,
+                                  stat.status, stat.device_type)] = stat.id
+                
+                for key, count in counts.items():
+                    if key in existing:
+                        db.session.execute(
+                            stats_table.update()
+                            .where(stats_table.c.id == existing[key])
+                            .values(count=stats_table.c.count + count)
+                        )
+                    else:
+                        day, action_type, action_category, status, device_type = key
+                        db.session.execute(stats_table.insert().values(
+                            day=day, action_type=action_type, action_category=action_category,
+                            status=status, device_type=device_type, count=count
+                        ))
+                
+                db.session.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            
+            total += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+        
+        return total
+    
+    @staticmethod
+    def purge_security_logs(retention_days, batch_size=5000, max_batches=None):
+        """
+        Supprime les logs de sécurité anciens (les événements critiques sont conservés)
+        
+        Returns:
+            int: Nombre de logs supprimés
+        """
+        if not retention_days or retention_days <= 0:
+            return 0
+        
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        table = SecurityLog.__table__
+        total = 0
+        batches = 0
+        
+        while max_batches is None or batches < max_batches:
+            ids = db.session.execute(
+                db.select(table.c.id)
+                .where(table.c.created_at < cutoff, table.c.severity != 'critical')
+                .order_by(table.c.created_at)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            
+            db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            db.session.commit()
+            
+            total += len(ids)
+            batches += 1
+            if len(ids) < batch_size:
+                break
+        
+        return total
+    
+    @staticmethod
+    def apply(app):
+        """Applique la rétention configurée (tâche planifiée)"""
+        batch_size = int(app.config.get('LOG_RETENTION_BATCH_SIZE', 5000))
+        max_batches = int(app.config.get('LOG_RETENTION_MAX_BATCHES', 0)) or None
+        
+        with app.app_context():
+            try:
+                compacted = LogRetentionService.rollup_activity_logs(
+                    int(app.config.get('ACTIVITY_LOG_RETENTION_DAYS', 0)), batch_size, max_batches
+                )
+                purged = LogRetentionService.purge_security_logs(
+                    int(app.config.get('SECURITY_LOG_RETENTION_DAYS', 0)), batch_size, max_batches
+                )
+                return {'activity_logs_compacted': compacted, 'security_logs_purged': purged}
+            finally:
+                db.session.remove()
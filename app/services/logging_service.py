@@ -7,7 +7,7 @@ from app.models.security_log import SecurityLog
 from flask import request
 from datetime import datetime
 import json
-from user_agents import parse
+from app.utils.activity_logger import ActivityLogger
 
 
 class LoggingService:
@@ -17,7 +17,6 @@ class LoggingService:
     def _get_client_info():
         """Extraire les informations du client (IP, user agent, etc.)"""
         user_agent_string = request.headers.get('User-Agent', '')
-        user_agent = parse(user_agent_string)
         
         # Récupérer l'IP réelle (prendre en compte les proxies)
         ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
@@ -27,13 +26,8 @@ class LoggingService:
         return {
             'ip_address': ip_address or 'Unknown',
             'user_agent': user_agent_string,
-            'browser': user_agent.browser.family,
-            'browser_version': user_agent.browser.version_string,
-            'device_type': 'mobile' if user_agent.is_mobile else ('tablet' if user_agent.is_tablet else 'desktop'),
-            'device_brand': user_agent.device.brand or None,
-            'device_model': user_agent.device.model or None,
-            'operating_system': user_agent.os.family,
-            'os_version': user_agent.os.version_string,
+            # Analyse du User-Agent en cache (partagée avec le middleware)
+            **ActivityLogger._parse_user_agent(user_agent_string),
             'request_method': request.method,
             'request_url': request.url,
             'request_referrer': request.referrer
@@ -0,0 +1,246 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Synchronisation des scans de présence hors ligne
+- Les appareils de pointage mettent les scans en file localement (identifiant client,
+  code talent, heure du scan) puis les envoient par lots
+- Un lot est traité dans une seule transaction avec un nombre constant de requêtes,
+  dans l'ordre chronologique des scans (même règle que le scan unitaire :
+  premier scan du jour = arrivée, deuxième = départ)
+- Chaque scan est enregistré dans attendance_scans : un lot renvoyé après une coupure
+  réseau reçoit les résultats déjà calculés sans pointer deux fois
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app import db
+from app.models.attendance import Attendance, AttendanceScan
+from app.models.cinema_talent import CinemaTalent
+
+# Tolérance sur l'horloge des appareils (scans datés dans le futur)
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class PresenceScanService:
+    """Application idempotente d'un lot de scans QR sur les présences d'un projet"""
+    
+    @staticmethod
+    def _normalize_code(code):
+        return str(code or '').strip().upper().replace('-', '')
+    
+    @staticmethod
+    def _parse_scanned_at(value, now):
+        """Heure du scan en UTC naïf (None si illisible, maintenant si absente ou dans le futur)"""
+        if not value:
+            return now
+        try:
+            scanned_at = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if scanned_at.tzinfo is not None:
+            scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return now if scanned_at > now + CLOCK_SKEW else scanned_at
+    
+    @staticmethod
+    def _attendance_payload(attendance):
+        if attendance is None:
+            return None
+        return {
+            'check_in': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
+            'check_out': attendance.check_out_time.isoformat() if attendance.check_out_time else None,
+            'duration': attendance.get_duration_formatted()
+        }
+    
+    @staticmethod
+    def _result(client_id, code, action, message, attendance, replayed=False):
+        return {
+            'client_id': client_id,
+            'code': code,
+            'success': action in ('checkin', 'checkout', 'already_complete'),
+            'action': action,
+            'message': message,
+            'replayed': replayed,
+            'attendance': PresenceScanService._attendance_payload(attendance)
+        }
+    
+    @staticmethod
+    def ingest(project_id, scans, recorded_by):
+        """
+        Applique un lot de scans (le commit est laissé à l'appelant)
+        
+        Args:
+            project_id: ID du projet
+            scans: Liste de dicts {'client_id', 'code', 'scanned_at' (ISO 8601, optionnel)}
+            recorded_by: ID de l'utilisateur connecté sur l'appareil
+        
+        Returns:
+            list: Un résultat par scan, dans l'ordre reçu
+        """
+        from sqlalchemy.orm import selectinload
+        
+        now = datetime.utcnow()
+        results = [None] * len(scans)
+        pending = []
+        
+        for index, scan in enumerate(scans):
+            scan = scan if isinstance(scan, dict) else {}
+            client_id = str(scan.get('client_id') or '').strip()
+            code = PresenceScanService._normalize_code(scan.get('code'))
+            scanned_at = PresenceScanService._parse_scanned_at(scan.get('scanned_at'), now)
+            
+            if not client_id or len(client_id) > 64 or not code or len(code) > 20 or scanned_at is None:
+                results[index] = {
+                    'client_id': client_id or None,
+                    'code': code or None,
+                    'success': False,
+                    'action': 'invalid',
+                    'message': 'Scan invalide (identifiant, code ou heure manquant)',
+                    'replayed': False,
+                    'attendance': None
+                }
+                continue
+            pending.append((index, client_id, code, scanned_at))
+        
+        if not pending:
+            return results
+        
+        # Scans déjà traités lors d'un envoi précédent
+        client_ids = {client_id for _, client_id, _, _ in pending}
+        previous = {
+            scan_row.client_scan_id: scan_row
+            for scan_row in AttendanceScan.query.options(
+                selectinload(AttendanceScan.attendance)
+            ).filter(AttendanceScan.client_scan_id.in_(client_ids))
+        }
+        
+        new_scans = []
+        seen = set()
+        for index, client_id, code, scanned_at in pending:
+            if client_id in previous:
+                scan_row = previous[client_id]
+                results[index] = PresenceScanService._result(
+                    client_id, scan_row.cinema_talent_code, scan_row.action, scan_row.message,
+                    scan_row.attendance, replayed=True
+                )
+            elif client_id not in seen:
+                seen.add(client_id)
+                new_scans.append((index, client_id, code, scanned_at))
+        
+        if new_scans:
+            codes = {code for _, _, code, _ in new_scans}
+            days = {scanned_at.date() for _, _, _, scanned_at in new_scans}
+            
+            talents = {
+                row.unique_code: row
+                for row in db.session.execute(
+                    db.select(CinemaTalent.unique_code, CinemaTalent.first_name, CinemaTalent.last_name)
+                    .where(CinemaTalent.unique_code.in_(codes))
+                )
+            }
+            assigned = set(db.session.execute(Attendance._assigned_codes(project_id, codes)).scalars())
+            attendances = {
+                (attendance.cinema_talent_code, attendance.date): attendance
+                for attendance in Attendance.query.filter(
+                    Attendance.project_id == project_id,
+                    Attendance.cinema_talent_code.in_(codes),
+                    Attendance.date.in_(days)
+                )
+            }
+            
+            # Nouvelles présences construites hors session puis insérées en une seule requête
+            created = []
+            scan_rows = []
+            
+            # Ordre chronologique : arrivée puis départ même si les appareils synchronisent en désordre
+            for index, client_id, code, scanned_at in sorted(new_scans, key=lambda scan: scan[3]):
+                attendance = None
+                talent = talents.get(code)
+                if talent is None:
+                    action, message = 'not_found', f'Talent {code} non trouvé'
+                elif code not in assigned:
+                    action = 'not_assigned'
+                    message = f'{talent.first_name} {talent.last_name} n\'est pas assigné à ce projet'
+                else:
+                    name = f'{talent.first_name} {talent.last_name}'
+                    key = (code, scanned_at.date())
+                    attendance = attendances.get(key)
+                    if attendance is None:
+                        attendance = Attendance(
+                            project_id=project_id,
+                            cinema_talent_code=code,
+                            date=scanned_at.date(),
+                            check_in_time=scanned_at,
+                            recorded_by=recorded_by
+                        )
+                        created.append(attendance)
+                        attendances[key] = attendance
+                        action = 'checkin'
+                        message = f'✅ Arrivée enregistrée: {name} à {scanned_at.strftime("%H:%M")}'
+                    elif attendance.check_out_time is None and attendance.check_in_time and scanned_at < attendance.check_in_time:
+                        # Scan hors ligne antérieur à l'arrivée déjà enregistrée : avancer l'arrivée
+                        attendance.check_in_time = scanned_at
+                        attendance.updated_at = now
+                        action = 'checkin'
+                        message = f'✅ Arrivée enregistrée: {name} à {scanned_at.strftime("%H:%M")}'
+                    elif attendance.check_out_time is None:
+                        attendance.check_out_time = scanned_at
+                        attendance.updated_at = now
+                        action = 'checkout'
+                        message = f'👋 Départ enregistré: {name} à {scanned_at.strftime("%H:%M")} (Durée: {attendance.get_duration_formatted()})'
+                    else:
+                        action = 'already_complete'
+                        message = f'ℹ️ {name} a déjà un enregistrement complet ce jour'
+                
+                scan_rows.append({
+                    'client_scan_id': client_id,
+                    'project_id': project_id,
+                    'cinema_talent_code': code,
+                    'scanned_at': scanned_at,
+                    'action': action,
+                    'message': message[:255],
+                    'attendance_key': (code, scanned_at.date()) if attendance is not None else None,
+                    'recorded_by': recorded_by,
+                    'created_at': now
+                })
+                results[index] = PresenceScanService._result(client_id, code, action, message, attendance)
+            
+            # Départs et arrivées avancées sur les présences existantes
+            db.session.flush()
+            
+            if created:
+                db.session.execute(db.insert(Attendance), [{
+                    'project_id': attendance.project_id,
+                    'cinema_talent_code': attendance.cinema_talent_code,
+                    'date': attendance.date,
+                    'check_in_time': attendance.check_in_time,
+                    'check_out_time': attendance.check_out_time,
+                    'recorded_by': attendance.recorded_by,
+                    'created_at': now,
+                    'updated_at': now
+                } for attendance in created])
+            
+            attendance_ids = {
+                (row.cinema_talent_code, row.date): row.id
+                for row in db.session.execute(
+                    db.select(Attendance.id, Attendance.cinema_talent_code, Attendance.date).where(
+                        Attendance.project_id == project_id,
+                        Attendance.cinema_talent_code.in_(codes),
+                        Attendance.date.in_(days)
+                    )
+                )
+            }
+            for scan_row in scan_rows:
+                scan_row['attendance_id'] = attendance_ids.get(scan_row.pop('attendance_key'))
+            db.session.execute(db.insert(AttendanceScan), scan_rows)
+        
+        # Doublons d'identifiant dans le même lot : même résultat que le premier
+        by_client_id = {result['client_id']: result for result in results if result and result['action'] != 'invalid'}
+        for index, client_id, _, _ in pending:
+            if results[index] is None:
+                results[index] = dict(by_client_id[client_id], replayed=True)
+        
+        return results
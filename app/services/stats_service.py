@@ -0,0 +1,417 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Couche de statistiques matérialisées
+- Chaque périmètre (users, talents, cinema, dashboard) est calculé puis stocké en JSON
+  dans stats_snapshots ; une lecture = une ligne
+- Les écritures ORM qui changent une statistique (création / suppression, changement de
+  genre, pays, statut...) incrémentent la version du périmètre après le commit, dans une
+  transaction courte (aucun verrou sur stats_snapshots pendant la transaction de l'écriture) :
+  le prochain lecteur recalcule, au plus toutes les STATS_REFRESH_MIN_INTERVAL secondes
+- Le scheduler recalcule tous les périmètres toutes les STATS_RECONCILE_INTERVAL secondes
+  (mises à jour en masse et SQL brut qui échappent aux événements ORM)
+- ?fresh=1 sur les endpoints force le recalcul
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import desc, event, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+
+from app import db
+from app.models.stats_snapshot import StatsSnapshot
+
+logger = logging.getLogger(__name__)
+
+_listeners_installed = False
+
+USER_SCOPES = ('users', 'talents', 'dashboard')
+CINEMA_SCOPES = ('cinema',)
+
+# Colonnes dont la modification change les statistiques
+_TRACKED_COLUMNS = {
+    'User': ('is_admin', 'account_active', 'gender', 'availability', 'country_id', 'city_id',
+             'residence_country_id', 'residence_city_id', 'cv_filename', 'portfolio_url'),
+    'UserTalent': ('user_id', 'talent_id'),
+    'Talent': ('name', 'emoji', 'category', 'tag', 'is_active'),
+    'CinemaTalent': ('is_active', 'gender', 'country_of_origin'),
+}
+
+
+def _compute_users():
+    from app.models.user import User
+    from app.models.talent import Talent, UserTalent
+    from app.models.location import Country
+    
+    total_users = User.query.filter_by(is_admin=False).count()
+    active_users = User.query.filter_by(is_admin=False, account_active=True).count()
+    
+    by_gender = {}
+    genders = db.session.query(User.gender, func.count(User.id)).filter(
+        User.is_admin == False,
+        User.account_active == True,
+        User.gender.in_(['M', 'F', 'N'])
+    ).group_by(User.gender).all()
+    for gender, count in genders:
+        if count > 0:
+            by_gender[gender] = count
+    
+    by_availability = {}
+    availabilities = db.session.query(
+        User.availability, func.count(User.id)
+    ).filter(
+        User.is_admin == False,
+        User.account_active == True,
+        User.availability.isnot(None)
+    ).group_by(User.availability).all()
+    for availability, count in availabilities:
+        by_availability[availability] = count
+    
+    by_country = {}
+    countries = db.session.query(
+        Country.name, func.count(User.id)
+    ).join(
+        User, User.country_id == Country.id
+    ).filter(
+        User.is_admin == False,
+        User.account_active == True
+    ).group_by(Country.name).all()
+    for country_name, count in countries:
+        by_country[country_name] = count
+    
+    talents = db.session.query(
+        Talent.name, Talent.emoji, func.count(UserTalent.id)
+    ).join(
+        UserTalent, UserTalent.talent_id == Talent.id
+    ).join(
+        User, User.id == UserTalent.user_id
+    ).filter(
+        User.is_admin == False,
+        User.account_active == True
+    ).group_by(Talent.id, Talent.name, Talent.emoji).order_by(
+        func.count(UserTalent.id).desc()
+    ).limit(10).all()
+    
+    return {
+        'total_users': total_users,
+        'active_users': active_users,
+        'inactive_users': total_users - active_users,
+        'by_gender': by_gender,
+        'by_availability': by_availability,
+        'by_country': by_country,
+        'top_talents': [{'name': name, 'emoji': emoji, 'count': count} for name, emoji, count in talents]
+    }
+
+
+def _compute_talents():
+    from app.models.user import User
+    from app.models.talent import Talent, UserTalent
+    
+    by_category = {}
+    categories = db.session.query(
+        Talent.category, func.count(func.distinct(UserTalent.user_id))
+    ).join(
+        UserTalent, UserTalent.talent_id == Talent.id
+    ).join(
+        User, User.id == UserTalent.user_id
+    ).filter(
+        User.is_admin == False,
+        User.account_active == True,
+        Talent.is_active == True
+    ).group_by(Talent.category).all()
+    for category, count in categories:
+        by_category[category] = count
+    
+    total_talents = Talent.query.filter_by(is_active=True).count()
+    total_users_with_talents = db.session.query(
+        func.count(func.distinct(UserTalent.user_id))
+    ).join(
+        User, User.id == UserTalent.user_id
+    ).filter(
+        User.is_admin == False,
+        User.account_active == True
+    ).scalar()
+    
+    return {
+        'by_category': by_category,
+        'total_talents': total_talents,
+        'total_users_with_talents': total_users_with_talents
+    }
+
+
+def _compute_cinema():
+    from app.models.cinema_talent import CinemaTalent
+    
+    total_talents = CinemaTalent.query.count()
+    active_talents = CinemaTalent.query.filter_by(is_active=True).count()
+    
+    by_gender = {}
+    genders = db.session.query(CinemaTalent.gender, func.count(CinemaTalent.id)).filter(
+        CinemaTalent.is_active == True,
+        CinemaTalent.gender.in_(['M', 'F', 'N'])
+    ).group_by(CinemaTalent.gender).all()
+    for gender, count in genders:
+        if count > 0:
+            by_gender[gender] = count
+    
+    # Pays d'origine stocké en texte sur CinemaTalent
+    by_country = {}
+    countries = db.session.query(
+        CinemaTalent.country_of_origin, func.count(CinemaTalent.id)
+    ).filter(
+        CinemaTalent.is_active == True,
+        CinemaTalent.country_of_origin.isnot(None)
+    ).group_by(CinemaTalent.country_of_origin).all()
+    for country_name, count in countries:
+        by_country[country_name] = count
+    
+    return {
+        'total_talents': total_talents,
+        'active_talents': active_talents,
+        'inactive_talents': total_talents - active_talents,
+        'by_gender': by_gender,
+        'by_country': by_country
+    }
+
+
+def _compute_dashboard():
+    """Indicateurs globaux du tableau de bord admin (indépendants des filtres)"""
+    from app.models.user import User
+    from app.models.talent import Talent, UserTalent
+    from app.models.location import Country, City
+    
+    # Utilisateurs actifs ayant au moins un talent général
+    total_users = User.query.filter(
+        User.account_active == True,
+        User.is_admin == False
+    ).join(UserTalent).join(Talent).filter(Talent.tag == 'general').distinct().count()
+    
+    # Nombre de compétences sélectionnées par les talents (pas le total disponible)
+    total_talents_selected = db.session.query(func.count(func.distinct(UserTalent.talent_id))).filter(
+        UserTalent.user_id.in_(
+            db.session.query(User.id).filter_by(account_active=True, is_admin=False)
+        )
+    ).scalar() or 0
+    
+    total_cities_with_users = db.session.query(func.count(func.distinct(User.city_id))).filter(
+        User.account_active == True,
+        User.is_admin == False,
+        User.city_id.isnot(None)
+    ).scalar() or 0
+    
+    total_countries_with_users = db.session.query(func.count(func.distinct(User.country_id))).filter(
+        User.account_active == True,
+        User.is_admin == False,
+        User.country_id.isnot(None)
+    ).scalar() or 0
+    
+    top_talents = db.session.query(
+        Talent.name,
+        Talent.emoji,
+        Talent.category,
+        func.count(UserTalent.talent_id).label('count')
+    ).join(UserTalent).join(User).filter(
+        User.account_active == True,
+        User.is_admin == False
+    ).group_by(Talent.id, Talent.name, Talent.emoji, Talent.category).order_by(desc('count')).limit(10).all()
+    
+    top_world_cities = db.session.query(
+        City.name,
+        Country.name.label('country_name'),
+        func.count(User.id).label('user_count')
+    ).join(User, City.id == User.residence_city_id
+    ).join(Country, Country.id == User.residence_country_id
+    ).filter(
+        User.account_active == True,
+        User.is_admin == False
+    ).group_by(City.id, City.name, Country.name).order_by(desc('user_count')).limit(10).all()
+    
+    return {
+        'total_users': total_users,
+        'total_talents_selected': total_talents_selected,
+        'total_cities_with_users': total_cities_with_users,
+        'total_countries_with_users': total_countries_with_users,
+        'with_cv': User.query.filter(User.cv_filename.isnot(None)).count(),
+        'with_portfolio': User.query.filter(User.portfolio_url.isnot(None)).count(),
+        'top_talents': [
+            {'name': name, 'emoji': emoji, 'category': category, 'count': count}
+            for name, emoji, category, count in top_talents
+        ],
+        'top_world_cities': [
+            {'name': name, 'country_name': country_name, 'user_count': user_count}
+            for name, country_name, user_count in top_world_cities
+        ]
+    }
+
+
+_COMPUTERS = {
+    'users': _compute_users,
+    'talents': _compute_talents,
+    'cinema': _compute_cinema,
+    'dashboard': _compute_dashboard,
+}
+
+
+class StatsService:
+    """Lecture et rafraîchissement des statistiques précalculées"""
+    
+    @staticmethod
+    def get(scope, fresh=False):
+        """
+        Statistiques d'un périmètre
+        
+        Args:
+            scope: 'users', 'talents', 'cinema' ou 'dashboard'
+            fresh: True pour recalculer sans tenir compte du stock
+        
+        Returns:
+            tuple: (dict des statistiques, datetime du calcul)
+        """
+        from flask import current_app
+        
+        if scope not in _COMPUTERS:
+            raise ValueError(f"Périmètre de statistiques inconnu: {scope}")
+        
+        snapshot = StatsSnapshot.query.filter_by(scope=scope).first()
+        if fresh or snapshot is None or snapshot.payload is None:
+            return StatsService.refresh(scope)
+        
+        if snapshot.is_stale:
+            min_interval = int(current_app.config.get('STATS_REFRESH_MIN_INTERVAL', 30))
+            age = (datetime.utcnow() - snapshot.computed_at).total_seconds() if snapshot.computed_at else min_interval
+            if age >= min_interval:
+                return StatsService.refresh(scope)
+        
+        return snapshot.data, snapshot.computed_at
+    
+    @staticmethod
+    def refresh(scope):
+        """Recalcule et stocke les statistiques d'un périmètre"""
+        table = StatsSnapshot.__table__
+        
+        # Version lue avant le calcul : une écriture pendant le calcul laisse le stock périmé
+        version = db.session.execute(
+            db.select(table.c.version).where(table.c.scope == scope)
+        ).scalar()
+        
+        started = time.perf_counter()
+        data = _COMPUTERS[scope]()
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        computed_at = datetime.utcnow()
+        
+        values = {
+            'payload': json.dumps(data, ensure_ascii=False, default=str),
+            'computed_version': version or 0,
+            'computed_at': computed_at,
+            'duration_ms': duration_ms
+        }
+        # Connexion séparée : ne pas committer le travail en cours de l'appelant
+        try:
+            with db.engine.begin() as connection:
+                if version is None:
+                    connection.execute(table.insert().values(scope=scope, version=0, **values))
+                else:
+                    connection.execute(table.update().where(table.c.scope == scope).values(**values))
+        except IntegrityError:
+            # Un autre worker a créé la ligne entre-temps : son calcul est aussi récent
+            pass
+        except Exception as e:
+            logger.warning(f"Statistiques '{scope}' non enregistrées: {e}")
+        
+        return data, computed_at
+    
+    @staticmethod
+    def reconcile(app):
+        """Recalcule tous les périmètres (tâche planifiée)"""
+        with app.app_context():
+            try:
+                for scope in _COMPUTERS:
+                    StatsService.refresh(scope)
+                return len(_COMPUTERS)
+            finally:
+                db.session.remove()
+    
+    @staticmethod
+    def init_app(app):
+        """Brancher l'invalidation sur les écritures ORM des modèles suivis"""
+        global _listeners_installed
+        if _listeners_installed:
+            return
+        _listeners_installed = True
+        
+        from app.models.user import User
+        from app.models.talent import Talent, UserTalent
+        from app.models.cinema_talent import CinemaTalent
+        
+        for model, scopes in ((User, USER_SCOPES), (UserTalent, USER_SCOPES),
+                              (Talent, USER_SCOPES), (CinemaTalent, CINEMA_SCOPES)):
+            for event_name in ('after_insert', 'after_update', 'after_delete'):
+                listener = _make_listener(model.__name__, scopes, event_name)
+                event.listen(model, event_name, listener)
+        
+        for event_name, handler in (('after_flush', _on_after_flush),
+                                    ('after_commit', _on_after_commit),
+                                    ('after_soft_rollback', _on_after_soft_rollback)):
+            if not event.contains(db.session, event_name, handler):
+                event.listen(db.session, event_name, handler)
+
+
+def _make_listener(model_name, scopes, event_name):
+    tracked = _TRACKED_COLUMNS[model_name]
+    
+    def listener(mapper, connection, target):
+        if event_name == 'after_update':
+            state = inspect(target)
+            if not any(state.attrs[column].history.has_changes() for column in tracked):
+                return
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('stats_dirty_scopes', set()).update(scopes)
+    
+    return listener
+
+
+def _on_after_flush(session, flush_context):
+    """Périmètres modifiés par le flush, en attente du commit de la transaction"""
+    scopes = session.info.pop('stats_dirty_scopes', None)
+    if scopes:
+        session.info.setdefault('stats_pending_scopes', set()).update(scopes)
+
+
+def _on_after_commit(session):
+    """
+    Une seule mise à jour des versions par transaction, après le commit et sur une connexion
+    séparée : les lignes de stats_snapshots ne restent verrouillées que le temps de l'UPDATE
+    """
+    scopes = session.info.pop('stats_pending_scopes', None)
+    if not scopes:
+        return
+    table = StatsSnapshot.__table__
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                table.update().where(table.c.scope.in_(sorted(scopes))).values(version=table.c.version + 1)
+            )
+    except Exception as e:
+        # Stock rafraîchi au plus tard par la réconciliation planifiée
+        logger.warning(f"Versions des statistiques non incrémentées ({', '.join(sorted(scopes))}): {e}")
+
+
+def _on_after_soft_rollback(session, previous_transaction):
+    """
+    Transaction annulée : rien à invalider
+    Le rollback d'un savepoint (begin_nested) laisse la transaction englobante et ses
+    écritures déjà flushées en place : seul le rollback de la transaction racine vide les périmètres
+    """
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop('stats_pending_scopes', None)
+    session.info.pop('stats_dirty_scopes', None)
@@ -0,0 +1,105 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Filtres de la liste admin des talents (/admin/users)
+- Les mêmes filtres servent à la page (paginée) et à l'export PDF en arrière-plan,
+  qui couvre toute la liste filtrée
+- Filtres sérialisables (dict de chaînes et listes) : ils passent tels quels dans la tâche d'export
+"""
+
+from sqlalchemy import func, or_
+
+from app import db
+from app.models.talent import Talent, UserTalent
+from app.models.user import User
+
+# Filtres à valeur unique (paramètre de la requête -> clé du dict)
+SINGLE_FILTERS = ('search', 'search_code', 'availability', 'work_mode', 'gender', 'city')
+
+
+class UserSearchService:
+    """Requête filtrée des talents de la liste admin"""
+    
+    @staticmethod
+    def parse_filters(args):
+        """
+        Filtres reconnus dans les paramètres de la requête (valeurs vides ignorées)
+        
+        Args:
+            args: request.args (MultiDict) ou dict déjà filtré ; 'talent' accepte plusieurs valeurs
+        
+        Returns:
+            dict: {<SINGLE_FILTERS>, 'talent' (liste d'ids)}
+        """
+        filters = {}
+        for key in SINGLE_FILTERS:
+            value = (args.get(key) or '').strip()
+            if value:
+                filters[key] = value
+        
+        talent_values = args.getlist('talent') if hasattr(args, 'getlist') else args.get('talent', [])
+        talent_ids = [int(value) for value in talent_values if str(value).strip().isdigit()]
+        if talent_ids:
+            filters['talent'] = talent_ids
+        
+        if 'city' in filters and not filters['city'].isdigit():
+            del filters['city']
+        return filters
+    
+    @staticmethod
+    def query(filters):
+        """
+        Talents (hors admins, avec au moins un talent général) correspondant aux filtres
+        
+        Returns:
+            Query: Requête sans tri ni options de chargement
+        """
+        # Sous-requête pour identifier les utilisateurs ayant au moins un talent général
+        users_with_general_talents_subquery = db.session.query(User.id).join(UserTalent).join(Talent).filter(
+            Talent.tag == 'general'
+        ).distinct().subquery()
+        
+        query = User.query.filter(
+            User.is_admin == False,
+            User.id.in_(db.session.query(users_with_general_talents_subquery))
+        )
+        
+        search_query = filters.get('search')
+        if search_query:
+            search_pattern = f'%{search_query}%'
+            query = query.filter(
+                or_(
+                    User.first_name.ilike(search_pattern),
+                    User.last_name.ilike(search_pattern),
+                    User.email.ilike(search_pattern)
+                )
+            )
+        
+        search_code = filters.get('search_code')
+        if search_code:
+            code_clean = search_code.replace('-', '').upper()
+            query = query.filter(User.unique_code.ilike(f'%{code_clean}%'))
+        
+        if filters.get('availability'):
+            query = query.filter(User.availability == filters['availability'])
+        
+        if filters.get('work_mode'):
+            query = query.filter(User.work_mode == filters['work_mode'])
+        
+        if filters.get('gender'):
+            query = query.filter(User.gender == filters['gender'])
+        
+        if filters.get('city'):
+            query = query.filter(User.residence_city_id == int(filters['city']))
+        
+        talent_ids = filters.get('talent')
+        if talent_ids:
+            query = query.join(UserTalent).filter(UserTalent.talent_id.in_(talent_ids)).group_by(User.id).having(
+                func.count(func.distinct(UserTalent.talent_id)) == len(talent_ids)
+            )
+        
+        return query
@@ -1,27 +1,131 @@
 """
 Service pour la gestion de la liste de surveillance (watchlist)
 Vérifie si les nouvelles inscriptions correspondent à des noms surveillés
+Les noms surveillés sont compilés une fois par version de la liste (voir NameMatcher)
 """
-import unicodedata
+from datetime import datetime
 from flask import current_app
+from app import db
 from app.models.settings import AppSettings
 from app.services.email_service import email_service
+from app.utils.name_matcher import NameMatcher, normalize_full_name
 
-def normalize_name(text):
+_matcher_cache = {'source': None, 'matcher': None}
+
+
+def get_watchlist_matcher(watchlist_names_raw=None):
     """
-    Normalise un nom en retirant les accents et les caractères spéciaux
+    Automate des noms surveillés, reconstruit seulement quand la liste change
     
     Args:
-        text: Texte à normaliser
+        watchlist_names_raw: Liste brute (un nom par ligne), lue dans les paramètres si None
     
     Returns:
-        str: Texte normalisé sans accents en minuscules
+        NameMatcher: Faux s'il n'y a aucun nom à surveiller
     """
-    if not text:
-        return ""
-    # Supprimer les accents
-    nfkd_form = unicodedata.normalize('NFKD', text.lower())
-    return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+    if watchlist_names_raw is None:
+        watchlist_names_raw = AppSettings.get('watchlist_names', '') or ''
+    
+    if _matcher_cache['matcher'] is None or _matcher_cache['source'] != watchlist_names_raw:
+        _matcher_cache['matcher'] = NameMatcher(watchlist_names_raw.split('\n'))
+        _matcher_cache['source'] = watchlist_names_raw
+    return _matcher_cache['matcher']
+
+
+class WatchlistPage:
+    """Page de résultats de la watchlist (mêmes attributs qu'une pagination Flask-SQLAlchemy)"""
+    
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = max(1, (total + per_page - 1) // per_page)
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+
+def find_watchlist_matches(page=1, per_page=50):
+    """
+    Inscriptions (talents et talents cinéma) correspondant à la liste de surveillance
+    
+    Seules les colonnes id / nom normalisé / date sont parcourues ; les fiches complètes
+    ne sont chargées que pour la page affichée
+    
+    Returns:
+        WatchlistPage: Inscriptions les plus récentes en premier
+    """
+    from app.models.user import User
+    from app.models.cinema_talent import CinemaTalent
+    from sqlalchemy.orm import joinedload
+    
+    matcher = get_watchlist_matcher()
+    if not matcher:
+        return WatchlistPage([], 1, per_page, 0)
+    
+    matches = []
+    sources = (
+        ('talent', User, User.role == 'user'),
+        ('cinema', CinemaTalent, None),
+    )
+    for talent_type, model, criterion in sources:
+        stmt = db.select(model.id, model.name_normalized, model.first_name, model.last_name, model.created_at)
+        if criterion is not None:
+            stmt = stmt.where(criterion)
+        for row in db.session.execute(stmt.execution_options(yield_per=2000)):
+            name = row.name_normalized
+            if name is None:
+                name = normalize_full_name(row.first_name, row.last_name)
+            if matcher.find(name):
+                matches.append((row.created_at or datetime.min, talent_type, row.id))
+    
+    # Trier par date (plus récent en premier)
+    matches.sort(key=lambda match: (match[0], match[2]), reverse=True)
+    
+    pages = max(1, (len(matches) + per_page - 1) // per_page)
+    page = min(max(page, 1), pages)
+    page_matches = matches[(page - 1) * per_page:page * per_page]
+    
+    user_ids = [match[2] for match in page_matches if match[1] == 'talent']
+    cinema_ids = [match[2] for match in page_matches if match[1] == 'cinema']
+    users = {}
+    cinema_talents = {}
+    if user_ids:
+        users = {user.id: user for user in User.query.options(
+            joinedload(User.city), joinedload(User.country), *User.encrypted_load_options()
+        ).filter(User.id.in_(user_ids))}
+    if cinema_ids:
+        cinema_talents = {talent.id: talent for talent in CinemaTalent.query.options(
+            *CinemaTalent.encrypted_load_options()
+        ).filter(CinemaTalent.id.in_(cinema_ids))}
+    
+    items = []
+    for _, talent_type, talent_id in page_matches:
+        if talent_type == 'talent':
+            talent = users.get(talent_id)
+            if talent is None:
+                continue
+            city = talent.city.name if talent.city else None
+            country = talent.country.name if talent.country else None
+        else:
+            talent = cinema_talents.get(talent_id)
+            if talent is None:
+                continue
+            city = talent.city_of_residence
+            country = talent.country_of_residence
+        items.append({
+            'full_name': talent.full_name,
+            'unique_code': talent.unique_code,
+            'type': talent_type,
+            'city': city,
+            'country': country,
+            'created_at': talent.created_at
+        })
+    
+    return WatchlistPage(items, page, per_page, len(matches))
+
 
 def check_watchlist_and_notify(talent_obj, talent_type='talent'):
     """
@@ -45,28 +149,15 @@ def check_watchlist_and_notify(talent_obj, talent_type='talent'):
         if not watchlist_names_raw:
             return False
         
-        watchlist_names = [name.strip() for name in watchlist_names_raw.split('\n') if name.strip()]
-        if not watchlist_names:
+        matcher = get_watchlist_matcher(watchlist_names_raw)
+        if not matcher:
             return False
         
-        # Normaliser les noms du talent
-        full_name_normalized = normalize_name(talent_obj.full_name)
-        first_name_normalized = normalize_name(talent_obj.first_name)
-        last_name_normalized = normalize_name(talent_obj.last_name)
-        
         # Vérifier si le nom est dans la liste
-        match_found = False
-        for watch_name in watchlist_names:
-            watch_name_normalized = normalize_name(watch_name)
-            if (watch_name_normalized in full_name_normalized or 
-                watch_name_normalized == first_name_normalized or 
-                watch_name_normalized == last_name_normalized):
-                match_found = True
-                current_app.logger.info(f"🔔 Watchlist match trouvé: {talent_obj.full_name} correspond à '{watch_name}'")
-                break
-        
-        if not match_found:
+        watch_name = matcher.find(normalize_full_name(talent_obj.first_name, talent_obj.last_name))
+        if watch_name is None:
             return False
+        current_app.logger.info(f"🔔 Watchlist match trouvé: {talent_obj.full_name} correspond à '{watch_name}'")
         
         # Préparer les données du talent
         if talent_type == 'talent':
@@ -80,8 +171,8 @@ def check_watchlist_and_notify(talent_obj, talent_type='talent'):
             talent_data = {
                 'full_name': talent_obj.full_name,
                 'unique_code': talent_obj.unique_code,
-                'city': talent_obj.city or 'N/A',
-                'country': talent_obj.country or 'N/A'
+                'city': talent_obj.city_of_residence or 'N/A',
+                'country': talent_obj.country_of_residence or 'N/A'
             }
         
         # Récupérer l'email de notification
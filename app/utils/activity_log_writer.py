@@ -0,0 +1,229 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Écriture asynchrone et groupée des logs d'activité
+- Le middleware dépose chaque entrée dans une file mémoire bornée (aucune requête SQL
+  pendant la réponse, le User-Agent est analysé hors requête)
+- Un thread d'écriture insère les entrées par lots toutes les ACTIVITY_LOG_FLUSH_INTERVAL_MS
+  millisecondes ou dès ACTIVITY_LOG_BATCH_SIZE entrées
+- File pleine : les consultations de pages sont abandonnées (comptées), les autres actions
+  attendent brièvement puis sont écrites de façon synchrone
+- La file est vidée à l'arrêt du processus (atexit)
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ActivityLogWriter:
+    """File d'attente des logs d'activité et thread d'écriture par lots (un par processus)"""
+    
+    def __init__(self):
+        self._app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        atexit.register(self.stop)
+    
+    def _reset_stats(self):
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'sync_writes': 0,
+            'failed': 0,
+            'batches': 0,
+            'enqueue_seconds': 0.0,
+            'write_seconds': 0.0,
+            'last_batch_size': 0,
+            'last_batch_ms': 0.0
+        }
+    
+    def _count(self, **values):
+        with self._stats_lock:
+            for key, value in values.items():
+                self._stats[key] += value
+    
+    def init_app(self, app):
+        self._app = app
+    
+    @property
+    def batch_size(self):
+        return max(1, int(self._app.config.get('ACTIVITY_LOG_BATCH_SIZE', 100)))
+    
+    @property
+    def flush_interval(self):
+        return max(10, int(self._app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL_MS', 500))) / 1000
+    
+    def is_enabled(self):
+        """Écriture asynchrone active (désactivée en mode test pour relire les logs aussitôt)"""
+        if self._app is None:
+            return False
+        return self._app.config.get('ACTIVITY_LOG_ASYNC', True) and not self._app.testing
+    
+    def _ensure_started(self):
+        """Démarrer le thread d'écriture au premier log (après le fork des workers gunicorn)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Processus forké : la file et le thread du parent ne sont pas utilisables
+                self._queue = queue.Queue(maxsize=max(1, int(self._app.config.get('ACTIVITY_LOG_QUEUE_SIZE', 10000))))
+                self._pid = os.getpid()
+                with self._stats_lock:
+                    self._reset_stats()
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+    
+    def submit(self, row, droppable=False):
+        """
+        Déposer une entrée dans la file
+        
+        Args:
+            row: dict des colonnes ActivityLog (User-Agent brut, voir ActivityLogger._build_log_row)
+            droppable: True si l'entrée peut être abandonnée quand la file est pleine
+        
+        Returns:
+            bool: False si l'entrée a été abandonnée
+        """
+        started = time.perf_counter()
+        self._ensure_started()
+        try:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                if droppable:
+                    self._count(dropped=1)
+                    return False
+                timeout = int(self._app.config.get('ACTIVITY_LOG_BLOCK_TIMEOUT_MS', 50)) / 1000
+                try:
+                    self._queue.put(row, timeout=timeout)
+                except queue.Full:
+                    # Ne jamais perdre une action : écriture directe dans la requête
+                    self._count(sync_writes=1)
+                    self._write([row])
+                    return True
+            self._count(enqueued=1)
+            return True
+        finally:
+            self._count(enqueue_seconds=time.perf_counter() - started)
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+            
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+    
+    def _write(self, batch):
+        """Insérer un lot en une transaction (analyse des User-Agent comprise)"""
+        from app import db
+        from app.models.activity_log import ActivityLog
+        from app.utils.activity_logger import ActivityLogger
+        
+        started = time.perf_counter()
+        try:
+            rows = [{**row, **ActivityLogger._parse_user_agent(row['user_agent'])} for row in batch]
+            with self._app.app_context():
+                with db.engine.begin() as connection:
+                    connection.execute(ActivityLog.__table__.insert(), rows)
+        except Exception as e:
+            self._count(failed=len(batch))
+            logger.error(f"❌ Écriture de {len(batch)} log(s) d'activité impossible: {e}")
+            return
+        
+        elapsed = time.perf_counter() - started
+        self._count(written=len(batch), batches=1, write_seconds=elapsed)
+        with self._stats_lock:
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['last_batch_ms'] = round(elapsed * 1000, 2)
+    
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            self._write(batch[start:start + self.batch_size])
+        return len(batch)
+    
+    def flush(self):
+        """Écrire immédiatement les entrées en attente (scripts, tests, arrêt)"""
+        if self._queue is None or self._pid != os.getpid():
+            return 0
+        return self._drain()
+    
+    def stop(self, timeout=5):
+        """Arrêter le thread d'écriture après avoir vidé la file"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                thread.join(timeout)
+            except queue.Full:
+                pass
+        self._thread = None
+        written = self._drain()
+        if written:
+            logger.info(f"📝 {written} log(s) d'activité écrits à l'arrêt")
+    
+    def stats(self):
+        """Statistiques du worker courant (page Système) : coût côté requête vs écriture"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        enqueue_count = stats['enqueued'] + stats['dropped'] + stats['sync_writes']
+        return {
+            **stats,
+            'enabled': self.is_enabled(),
+            'pending': self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+            'capacity': self._queue.maxsize if self._queue is not None else 0,
+            'avg_enqueue_us': round(stats['enqueue_seconds'] * 1e6 / enqueue_count, 1) if enqueue_count else 0,
+            'avg_write_ms_per_row': round(stats['write_seconds'] * 1000 / stats['written'], 3) if stats['written'] else 0,
+            'batch_size': self.batch_size if self._app else 0,
+            'flush_interval_ms': int(self.flush_interval * 1000) if self._app else 0
+        }
+
+
+activity_log_writer = ActivityLogWriter()
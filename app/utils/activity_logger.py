@@ -2,17 +2,49 @@
 Middleware de logging automatique pour enregistrer les activités utilisateurs
 Enregistre automatiquement toutes les consultations de pages et actions
 """
-from functools import wraps
+from functools import wraps, lru_cache
 from flask import request, g
 from flask_login import current_user
 from app import db
 from app.models.activity_log import ActivityLog
+from app.utils.activity_log_writer import activity_log_writer
 from user_agents import parse
 import json
 import traceback
 from datetime import datetime
 
 
+# Nombre de User-Agents distincts gardés en cache par processus
+USER_AGENT_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def _parse_user_agent_cached(user_agent_string):
+    """Analyse du User-Agent (expressions régulières coûteuses), tuple de paires (clé, valeur)"""
+    try:
+        user_agent = parse(user_agent_string)
+        return (
+            ('browser', user_agent.browser.family),
+            ('browser_version', user_agent.browser.version_string),
+            ('device_type', 'mobile' if user_agent.is_mobile else ('tablet' if user_agent.is_tablet else 'desktop')),
+            ('device_brand', user_agent.device.brand or None),
+            ('device_model', user_agent.device.model or None),
+            ('operating_system', user_agent.os.family),
+            ('os_version', user_agent.os.version_string)
+        )
+    except Exception as e:
+        print(f"⚠️ Erreur lors de l'analyse du User-Agent: {e}")
+        return (
+            ('browser', None),
+            ('browser_version', None),
+            ('device_type', 'desktop'),
+            ('device_brand', None),
+            ('device_model', None),
+            ('operating_system', None),
+            ('os_version', None)
+        )
+
+
 class ActivityLogger:
     """Classe pour gérer le logging automatique des activités"""
     
@@ -131,26 +163,47 @@ class ActivityLogger:
         display = ActivityLogger.get_action_display(action_type)
         return f"{display['display']}: {description}"
     
+    # Nom de page par règle Flask (url_rule.rule), résolu une seule fois par route
+    _page_names_by_rule = {}
+    
+    @staticmethod
+    def _lookup_page_name(path):
+        """Nom de page du mapping (exact puis par préfixe), ou None"""
+        # Recherche exacte dans le mapping
+        if path in ActivityLogger.PAGE_NAMES_MAP:
+            return ActivityLogger.PAGE_NAMES_MAP[path]
+        
+        # Recherche par préfixe pour les URLs dynamiques avec paramètres
+        for mapped_path, page_name in ActivityLogger.PAGE_NAMES_MAP.items():
+            if path.startswith(mapped_path + '/') or path.startswith(mapped_path + '?'):
+                # URL avec paramètres ou sous-chemins
+                return page_name
+        
+        return None
+    
     @staticmethod
-    def get_page_name_from_url(path):
+    def get_page_name_from_url(path, url_rule=None):
         """
         Retourne le nom complet d'une page à partir de son URL
         
         Args:
             path: Chemin de l'URL (ex: /admin/settings)
+            url_rule: Règle Flask de la requête (request.url_rule), optionnelle.
+                Le nom est alors mis en cache par route au lieu de parcourir le mapping
             
         Returns:
             str: Nom complet de la page (ex: "Paramètres - Administration")
         """
-        # Recherche exacte dans le mapping
-        if path in ActivityLogger.PAGE_NAMES_MAP:
-            return ActivityLogger.PAGE_NAMES_MAP[path]
+        if url_rule is not None:
+            rule = url_rule.rule
+            if rule not in ActivityLogger._page_names_by_rule:
+                ActivityLogger._page_names_by_rule[rule] = ActivityLogger._lookup_page_name(rule)
+            page_name = ActivityLogger._page_names_by_rule[rule]
+        else:
+            page_name = ActivityLogger._lookup_page_name(path)
         
-        # Recherche par préfixe pour les URLs dynamiques avec paramètres
-        for mapped_path, page_name in ActivityLogger.PAGE_NAMES_MAP.items():
-            if path.startswith(mapped_path + '/') or path.startswith(mapped_path + '?'):
-                # URL avec paramètres ou sous-chemins
-                return page_name
+        if page_name:
+            return page_name
         
         # Fallback: nettoyer le chemin pour le rendre plus lisible
         clean_path = path.replace('/', ' > ').strip(' > ')
@@ -159,46 +212,27 @@ class ActivityLogger:
         return path
     
     @staticmethod
-    def _get_client_info():
-        """Extraire les informations du client (IP, user agent, device info, etc.)"""
-        try:
-            user_agent_string = request.headers.get('User-Agent', '')
-            user_agent = parse(user_agent_string)
-            
-            ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-            if ip_address and ',' in ip_address:
-                ip_address = ip_address.split(',')[0].strip()
-            
-            return {
-                'ip_address': ip_address or 'Unknown',
-                'user_agent': user_agent_string,
-                'browser': user_agent.browser.family,
-                'browser_version': user_agent.browser.version_string,
-                'device_type': 'mobile' if user_agent.is_mobile else ('tablet' if user_agent.is_tablet else 'desktop'),
-                'device_brand': user_agent.device.brand or None,
-                'device_model': user_agent.device.model or None,
-                'operating_system': user_agent.os.family,
-                'os_version': user_agent.os.version_string,
-                'request_method': request.method,
-                'request_url': request.url,
-                'request_referrer': request.referrer
-            }
-        except Exception as e:
-            print(f"⚠️ Erreur lors de l'extraction des infos client: {e}")
-            return {
-                'ip_address': request.remote_addr or 'Unknown',
-                'user_agent': request.headers.get('User-Agent', ''),
-                'browser': None,
-                'browser_version': None,
-                'device_type': 'desktop',
-                'device_brand': None,
-                'device_model': None,
-                'operating_system': None,
-                'os_version': None,
-                'request_method': request.method,
-                'request_url': request.url,
-                'request_referrer': request.referrer
-            }
+    def _parse_user_agent(user_agent_string):
+        """
+        Navigateur, système et type d'appareil à partir du User-Agent
+        Le trafic réel n'utilise qu'un petit nombre de User-Agents : résultat en cache LRU
+        """
+        return dict(_parse_user_agent_cached(user_agent_string or ''))
+    
+    @staticmethod
+    def _get_request_info():
+        """Extraire les informations de la requête (IP, user agent brut, URL)"""
+        ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
+        if ip_address and ',' in ip_address:
+            ip_address = ip_address.split(',')[0].strip()
+        
+        return {
+            'ip_address': ip_address or 'Unknown',
+            'user_agent': request.headers.get('User-Agent', ''),
+            'request_method': request.method,
+            'request_url': request.url,
+            'request_referrer': request.referrer
+        }
     
     @staticmethod
     def _is_static_resource(path):
@@ -232,36 +266,56 @@ class ActivityLogger:
         
         return True
     
+    @staticmethod
+    def _build_log_row(user, action_type, action_category, description,
+                       resource_type=None, resource_id=None, status='success',
+                       error_message=None, extra_data=None):
+        """
+        Valeurs d'une entrée de log, lues pendant la requête
+        Le User-Agent reste brut : il est analysé au moment de l'écriture
+        """
+        # Formater la description avec icône et libellé
+        formatted_description = ActivityLogger.format_action_description(action_type, description)
+        
+        return {
+            'user_id': user.id if user and hasattr(user, 'id') else None,
+            'username': f"{user.first_name} {user.last_name}" if user and hasattr(user, 'first_name') else "Anonyme",
+            'user_email': user.email if user and hasattr(user, 'email') else None,
+            'user_code': user.unique_code if user and hasattr(user, 'unique_code') else None,
+            'action_type': action_type,
+            'action_category': action_category,
+            'action_description': formatted_description,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'status': status,
+            'error_message': error_message,
+            'extra_data': json.dumps(extra_data, ensure_ascii=False) if extra_data else None,
+            'created_at': datetime.utcnow(),
+            **ActivityLogger._get_request_info()
+        }
+    
     @staticmethod
     def _create_log_entry(user, action_type, action_category, description, 
                          resource_type=None, resource_id=None, status='success', 
                          error_message=None, extra_data=None):
         """
         Créer une entrée de log dans la base de données
+        Hors mode test l'entrée est mise en file et écrite par lots (retourne None)
         Gestion gracieuse des erreurs pour ne pas impacter l'application
         """
         try:
-            client_info = ActivityLogger._get_client_info()
-            
-            # Formater la description avec icône et libellé
-            formatted_description = ActivityLogger.format_action_description(action_type, description)
-            
-            activity_log = ActivityLog(
-                user_id=user.id if user and hasattr(user, 'id') else None,
-                username=f"{user.first_name} {user.last_name}" if user and hasattr(user, 'first_name') else "Anonyme",
-                user_email=user.email if user and hasattr(user, 'email') else None,
-                user_code=user.unique_code if user and hasattr(user, 'unique_code') else None,
-                action_type=action_type,
-                action_category=action_category,
-                action_description=formatted_description,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                status=status,
-                error_message=error_message,
-                extra_data=json.dumps(extra_data, ensure_ascii=False) if extra_data else None,
-                **client_info
+            row = ActivityLogger._build_log_row(
+                user, action_type, action_category, description,
+                resource_type=resource_type, resource_id=resource_id, status=status,
+                error_message=error_message, extra_data=extra_data
             )
             
+            # Hors mode test : file d'attente écrite par lots (voir activity_log_writer)
+            if activity_log_writer.is_enabled():
+                activity_log_writer.submit(row, droppable=(action_type == 'view'))
+                return None
+            
+            activity_log = ActivityLog(**row, **ActivityLogger._parse_user_agent(row['user_agent']))
             db.session.add(activity_log)
             db.session.commit()
             
@@ -362,7 +416,7 @@ def log_page_view(url=None, user=None):
             url = request.url if request else 'Unknown'
         
         page_path = request.path if request else url
-        page_name = ActivityLogger.get_page_name_from_url(page_path)
+        page_name = ActivityLogger.get_page_name_from_url(page_path, request.url_rule if request else None)
         
         ActivityLogger._create_log_entry(
             user=user,
@@ -473,6 +527,8 @@ def init_activity_logging_middleware(app):
     Args:
         app: Instance Flask
     """
+    activity_log_writer.init_app(app)
+    
     @app.before_request
     def log_request():
         """Logger automatiquement les requêtes entrantes"""
@@ -29,6 +29,18 @@ def safe_auto_migrate(db):
             if not _ensure_columns_exist(db, inspector):
                 logger.warning("⚠️ Ajout de colonnes échoué, mais application continue")
             
+            if not _ensure_indexes_exist(db):
+                logger.warning("⚠️ Création d'index échouée, mais application continue")
+            
+            if not _backfill_normalized_names(db):
+                logger.warning("⚠️ Remplissage des noms normalisés échoué, mais application continue")
+            
+            if not _backfill_cinema_talent_attributes(db):
+                logger.warning("⚠️ Remplissage des attributs des talents cinéma échoué, mais application continue")
+            
+            if not _backfill_blind_indexes(db):
+                logger.warning("⚠️ Remplissage des index aveugles des téléphones échoué, mais application continue")
+            
             logger.info("✅ Migration automatique terminée")
             return True
             
@@ -44,7 +56,10 @@ def _ensure_tables_exist(db, existing_tables):
     """
     try:
         required_tables = ['users', 'talents', 'user_talents', 'countries', 
-                          'cities', 'cinema_talents', 'app_settings']
+                          'cities', 'cinema_talents', 'app_settings', 'ai_match_cache', 'background_jobs',
+                          'activity_log_daily_stats', 'stats_snapshots', 'attendance_scans', 'email_outbox',
+                          'phone_search_tokens', 'cinema_talent_attributes',
+                          'code_sequences']
         
         missing_tables = [t for t in required_tables if t not in existing_tables]
         
@@ -84,7 +99,10 @@ def _ensure_columns_exist(db, inspector):
             'residence_card_encrypted': 'TEXT',
             'website': 'VARCHAR(255)',
             'imdb_url_encrypted': 'TEXT',
-            'threads_encrypted': 'TEXT'
+            'threads_encrypted': 'TEXT',
+            'name_normalized': 'VARCHAR(255)',
+            'phone_bidx': 'VARCHAR(32)',
+            'whatsapp_bidx': 'VARCHAR(32)'
         }
         
         cinema_columns = {
@@ -92,16 +110,24 @@ def _ensure_columns_exist(db, inspector):
             'qr_code_filename': 'VARCHAR(255)',
             'website': 'VARCHAR(255)',
             'imdb_url_encrypted': 'TEXT',
-            'threads_encrypted': 'TEXT'
+            'threads_encrypted': 'TEXT',
+            'name_normalized': 'VARCHAR(255)',
+            'phone_bidx': 'VARCHAR(32)',
+            'whatsapp_bidx': 'VARCHAR(32)'
         }
         
         talents_columns = {
             'tag': "VARCHAR(20) DEFAULT 'general'"
         }
         
+        ai_match_cache_columns = {
+            'profile_version': 'VARCHAR(64)'
+        }
+        
         columns_added += _add_columns_to_table(db, inspector, 'users', users_columns)
         columns_added += _add_columns_to_table(db, inspector, 'cinema_talents', cinema_columns)
         columns_added += _add_columns_to_table(db, inspector, 'talents', talents_columns)
+        columns_added += _add_columns_to_table(db, inspector, 'ai_match_cache', ai_match_cache_columns)
         
         if columns_added > 0:
             logger.info(f"✅ {columns_added} colonnes ajoutées au total")
@@ -151,6 +177,187 @@ def _add_columns_to_table(db, inspector, table_name, columns_to_check):
         logger.error(f"❌ Erreur lors de l'ajout de colonnes à {table_name}: {e}")
         return columns_added
 
+def _ensure_indexes_exist(db):
+    """
+    Crée les index composites ajoutés aux modèles après la création des tables
+    (db.create_all ne modifie pas une table existante)
+    Retourne False en cas d'erreur, mais ne lève pas d'exception
+    """
+    try:
+        # Pagination de /admin/users par curseur (created_at, id) : la clé ne doit pas être NULL
+        with db.engine.begin() as conn:
+            conn.execute(text('UPDATE users SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+        
+        required_indexes = {
+            'ix_users_created_at_id': ('users', 'created_at, id'),
+            # Filtres des pages de logs et rétention
+            'ix_activity_logs_action_type_created_at': ('activity_logs', 'action_type, created_at'),
+            'ix_activity_logs_user_id_created_at': ('activity_logs', 'user_id, created_at'),
+            'ix_activity_logs_ip_address_created_at': ('activity_logs', 'ip_address, created_at'),
+            'ix_security_logs_event_type_created_at': ('security_logs', 'event_type, created_at'),
+            'ix_security_logs_ip_address_created_at': ('security_logs', 'ip_address, created_at'),
+            'ix_security_logs_severity_created_at': ('security_logs', 'severity, created_at'),
+            # Recherche par index aveugle des numéros chiffrés (remplir avec backfill_blind_index.py)
+            'ix_users_phone_bidx': ('users', 'phone_bidx'),
+            'ix_users_whatsapp_bidx': ('users', 'whatsapp_bidx'),
+            'ix_cinema_talents_phone_bidx': ('cinema_talents', 'phone_bidx'),
+            'ix_cinema_talents_whatsapp_bidx': ('cinema_talents', 'whatsapp_bidx'),
+            # Recherche à facettes des talents cinéma
+            'ix_cinema_talents_active_created': ('cinema_talents', 'is_active, created_at, id'),
+            'ix_cinema_talents_gender_birth': ('cinema_talents', 'gender, date_of_birth'),
+            'ix_cinema_talents_date_of_birth': ('cinema_talents', 'date_of_birth'),
+            'ix_cinema_talents_height': ('cinema_talents', 'height'),
+            'ix_cinema_talents_country_of_residence': ('cinema_talents', 'country_of_residence'),
+            'ix_cinema_talents_eye_color': ('cinema_talents', 'eye_color'),
+            'ix_cinema_talents_hair_color': ('cinema_talents', 'hair_color'),
+            'ix_cinema_talents_hair_type': ('cinema_talents', 'hair_type'),
+            'ix_cinema_talents_skin_tone': ('cinema_talents', 'skin_tone'),
+            'ix_cinema_talents_build': ('cinema_talents', 'build'),
+        }
+        
+        required_unique_indexes = {
+            # Une présence par talent, projet et jour (pointage en masse)
+            'uq_attendances_project_talent_date': ('attendances', 'project_id, cinema_talent_code, date'),
+        }
+        
+        inspector = inspect(db.engine)
+        existing_tables = inspector.get_table_names()
+        indexes_created = 0
+        all_indexes = [(name, spec, False) for name, spec in required_indexes.items()]
+        all_indexes += [(name, spec, True) for name, spec in required_unique_indexes.items()]
+        for index_name, (table_name, columns), unique in all_indexes:
+            if table_name not in existing_tables:
+                continue
+            existing = [index['name'] for index in inspector.get_indexes(table_name)]
+            if index_name in existing:
+                continue
+            logger.info(f"➕ Création de l'index {index_name}...")
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(text(
+                        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})'
+                    ))
+            except Exception as e:
+                if not unique:
+                    raise
+                # Des doublons existants empêchent l'index unique : ne rien supprimer automatiquement
+                # (le pointage en masse se passe alors de ON CONFLICT, voir Attendance._insert_ignoring_duplicates)
+                logger.warning(f"⚠️ Index unique {index_name} non créé (doublons existants ?): {e}")
+                continue
+            indexes_created += 1
+        
+        if indexes_created > 0:
+            logger.info(f"✅ {indexes_created} index créés")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la création des index: {e}")
+        return False
+
+def _backfill_normalized_names(db, batch_size=1000):
+    """
+    Remplit name_normalized (watchlist) pour les inscriptions antérieures à la colonne
+    Retourne False en cas d'erreur, mais ne lève pas d'exception
+    """
+    from app.utils.name_matcher import normalize_full_name
+    
+    try:
+        existing_tables = inspect(db.engine).get_table_names()
+        filled = 0
+        for table_name in ('users', 'cinema_talents'):
+            if table_name not in existing_tables:
+                continue
+            while True:
+                with db.engine.begin() as conn:
+                    rows = conn.execute(text(
+                        f'SELECT id, first_name, last_name FROM {table_name} '
+                        f'WHERE name_normalized IS NULL LIMIT {int(batch_size)}'
+                    )).all()
+                    if not rows:
+                        break
+                    conn.execute(
+                        text(f'UPDATE {table_name} SET name_normalized = :name WHERE id = :id'),
+                        [{'id': row.id, 'name': normalize_full_name(row.first_name, row.last_name)} for row in rows]
+                    )
+                filled += len(rows)
+        
+        if filled > 0:
+            logger.info(f"✅ {filled} noms normalisés remplis")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur lors du remplissage des noms normalisés: {e}")
+        return False
+
+def _backfill_cinema_talent_attributes(db):
+    """
+    Remplit cinema_talent_attributes (recherche à facettes) à sa création et quand
+    CinemaTalent.LIST_ATTRIBUTES change (liste indexée mémorisée dans app_settings)
+    Les écritures suivantes sont tenues à jour par les événements du modèle
+    Retourne False en cas d'erreur, mais ne lève pas d'exception
+    """
+    try:
+        existing_tables = inspect(db.engine).get_table_names()
+        if 'cinema_talents' not in existing_tables or 'cinema_talent_attributes' not in existing_tables:
+            return True
+        
+        from app.models.cinema_talent import CinemaTalent
+        from app.models.cinema_talent_attribute import backfill_list_attributes
+        from app.models.settings import AppSettings
+        
+        indexed = ','.join(CinemaTalent.LIST_ATTRIBUTES)
+        if AppSettings.get('cinema_talent_attributes_indexed') == indexed:
+            return True
+        
+        processed = backfill_list_attributes(CinemaTalent)
+        AppSettings.set('cinema_talent_attributes_indexed', indexed)
+        if processed > 0:
+            logger.info(f"✅ Attributs de {processed} talents cinéma indexés ({indexed})")
+        
+        return True
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Erreur lors du remplissage des attributs des talents cinéma: {e}")
+        return False
+
+def _backfill_blind_indexes(db):
+    """
+    Remplit les index aveugles des téléphones (recherche par numéro) des profils sans empreinte,
+    et les recalcule tous quand la clé ou BLIND_INDEX_MIN_DIGITS change
+    (empreinte de contrôle mémorisée dans app_settings)
+    Retourne False en cas d'erreur, mais ne lève pas d'exception
+    """
+    try:
+        existing_tables = inspect(db.engine).get_table_names()
+        if 'phone_search_tokens' not in existing_tables:
+            return True
+        
+        from app.models.user import User
+        from app.models.cinema_talent import CinemaTalent
+        from app.models.settings import AppSettings
+        from app.utils.blind_index import backfill_blind_indexes, index_fingerprint
+        
+        fingerprint = index_fingerprint()
+        rebuild = AppSettings.get('blind_index_fingerprint') != fingerprint
+        processed = 0
+        for model in (User, CinemaTalent):
+            if model.__tablename__ in existing_tables:
+                processed += backfill_blind_indexes(model, only_missing=not rebuild)
+        if rebuild:
+            AppSettings.set('blind_index_fingerprint', fingerprint)
+        if processed > 0:
+            logger.info(f"✅ Index aveugles de {processed} profils {'recalculés' if rebuild else 'remplis'}")
+        
+        return True
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Erreur lors du remplissage des index aveugles: {e}")
+        return False
+
 def run_initial_seed(db):
     """
     Lance le seeding initial des données (pays, villes, talents, admin)
@@ -0,0 +1,265 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Index aveugles (blind index) des numéros de téléphone chiffrés
+- Le numéro est réduit à ses chiffres puis haché par HMAC-SHA256 avec une clé dédiée
+  (BLIND_INDEX_KEY, dérivée de ENCRYPTION_KEY à défaut) : la base ne contient jamais le numéro en clair
+- <champ>_bidx : empreinte du numéro complet (colonne indexée)
+- phone_search_tokens : empreintes des fins de numéro d'au moins BLIND_INDEX_MIN_DIGITS chiffres
+- Colonnes et empreintes sont recalculées à chaque écriture du champ chiffré ; la migration
+  automatique remplit les lignes sans empreinte et recalcule tout quand la clé ou
+  BLIND_INDEX_MIN_DIGITS change (empreinte de contrôle mémorisée dans app_settings)
+- La clé dérivée suit ENCRYPTION_KEY : avant une rotation, définir BLIND_INDEX_KEY (jamais modifiée)
+"""
+
+import hashlib
+import hmac
+import logging
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+_NON_DIGITS = re.compile(r'\D+')
+# Un terme de recherche n'est traité comme un numéro que s'il ne contient que ces caractères
+_PHONE_SEARCH = re.compile(r'^[\d\s+().\-/]+$')
+
+_key_lock = threading.Lock()
+_key_cache = {'config': None, 'key': None}
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_phone(value):
+    """Chiffres du numéro (indicatif compris), sans espaces ni ponctuation"""
+    if not value:
+        return ''
+    return _NON_DIGITS.sub('', str(value))
+
+
+def _get_key():
+    config_key = (current_app.config.get('BLIND_INDEX_KEY'), current_app.config.get('ENCRYPTION_KEY'))
+    if _key_cache['config'] == config_key:
+        return _key_cache['key']
+    
+    with _key_lock:
+        dedicated_key, encryption_key = config_key
+        if dedicated_key:
+            key = dedicated_key.encode()
+        elif encryption_key:
+            # Clé distincte de celle du chiffrement : une empreinte ne révèle rien sur le chiffré
+            key = hmac.new(encryption_key.encode(), b'taalentio-blind-index', hashlib.sha256).digest()
+            if current_app.config.get('ENCRYPTION_KEYS_PREVIOUS'):
+                logger.warning(
+                    "⚠️ Rotation de ENCRYPTION_KEY sans BLIND_INDEX_KEY : la clé des index aveugles a changé, "
+                    "les empreintes des téléphones sont recalculées au démarrage"
+                )
+        else:
+            raise ValueError("BLIND_INDEX_KEY ou ENCRYPTION_KEY doit être définie")
+        _key_cache['key'] = key
+        _key_cache['config'] = config_key
+        return key
+
+
+def _min_digits():
+    return max(1, int(current_app.config.get('BLIND_INDEX_MIN_DIGITS', 4)))
+
+
+def _digest(key, digits):
+    return hmac.new(key, digits.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def index_fingerprint():
+    """Empreinte de contrôle de la clé et de BLIND_INDEX_MIN_DIGITS (ne révèle pas la clé) :
+    change quand les index existants doivent être recalculés"""
+    return _digest(_get_key(), f"check|{_min_digits()}")[:16]
+
+
+def phone_index(value):
+    """Empreinte du numéro complet (valeur de <champ>_bidx), None si vide"""
+    digits = normalize_phone(value)
+    if not digits:
+        return None
+    return _digest(_get_key(), digits)
+
+
+def phone_suffix_tokens(value):
+    """Empreintes des fins de numéro (le numéro complet est dans <champ>_bidx)"""
+    digits = normalize_phone(value)
+    if not digits:
+        return set()
+    key = _get_key()
+    return {_digest(key, digits[start:]) for start in range(1, len(digits) - _min_digits() + 1)}
+
+
+def phone_query_tokens(search):
+    """
+    Empreintes à rechercher pour un terme saisi
+    
+    Returns:
+        list: Empreintes (vide si le terme n'est pas un numéro ou trop court)
+    """
+    if not search or not _PHONE_SEARCH.match(search.strip()):
+        return []
+    
+    digits = normalize_phone(search)
+    # Format national (06...) ou préfixe 00 : la fin du numéro international est indexée
+    variants = {variant for variant in (digits, digits.lstrip('0')) if len(variant) >= _min_digits()}
+    if not variants:
+        return []
+    key = _get_key()
+    return [_digest(key, variant) for variant in variants]
+
+
+def phone_search_clause(model, search):
+    """
+    Critère SQL « téléphone ou WhatsApp correspond au terme » pour un modèle indexé
+    
+    Args:
+        model: Modèle enregistré avec register_blind_index (User, CinemaTalent)
+        search: Terme saisi (numéro complet ou fin de numéro)
+    
+    Returns:
+        Critère SQLAlchemy, ou None si le terme n'est pas un numéro
+    """
+    from sqlalchemy import or_
+    from app import db
+    from app.models.phone_search_token import PhoneSearchToken
+    
+    tokens = phone_query_tokens(search)
+    if not tokens:
+        return None
+    
+    matching_ids = db.select(PhoneSearchToken.owner_id).where(
+        PhoneSearchToken.owner_type == model.__tablename__,
+        PhoneSearchToken.token.in_(tokens)
+    )
+    return or_(
+        *[getattr(model, f'{field}_bidx').in_(tokens) for field in model.BLIND_INDEXED_FIELDS],
+        model.id.in_(matching_ids)
+    )
+
+
+def register_blind_index(model):
+    """Recalculer les index aveugles de model.BLIND_INDEXED_FIELDS à chaque écriture"""
+    event.listen(model, 'before_insert', _set_blind_indexes)
+    event.listen(model, 'before_update', _set_blind_indexes)
+    event.listen(model, 'after_insert', _write_search_tokens)
+    event.listen(model, 'after_update', _write_search_tokens)
+    event.listen(model, 'after_delete', _delete_search_tokens)
+
+
+def _set_blind_indexes(mapper, connection, target):
+    state = inspect(target)
+    pending = {}
+    for field in target.BLIND_INDEXED_FIELDS:
+        if state.has_identity and not state.attrs[f'{field}_encrypted'].history.has_changes():
+            continue
+        # Valeur en clair mémorisée par le setter ; déchiffrée si la colonne a été écrite directement
+        value = target.get_decrypted(field)
+        setattr(target, f'{field}_bidx', phone_index(value))
+        pending[field] = phone_suffix_tokens(value)
+    if pending:
+        target.__dict__['_pending_phone_tokens'] = pending
+
+
+def _write_search_tokens(mapper, connection, target):
+    from app.models.phone_search_token import PhoneSearchToken
+    
+    pending = target.__dict__.pop('_pending_phone_tokens', None)
+    if not pending:
+        return
+    
+    table = PhoneSearchToken.__table__
+    owner_type = mapper.local_table.name
+    connection.execute(table.delete().where(
+        table.c.owner_type == owner_type,
+        table.c.owner_id == target.id,
+        table.c.field.in_(list(pending))
+    ))
+    rows = [
+        {'owner_type': owner_type, 'owner_id': target.id, 'field': field, 'token': token}
+        for field, tokens in pending.items() for token in tokens
+    ]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def _delete_search_tokens(mapper, connection, target):
+    from app.models.phone_search_token import PhoneSearchToken
+    
+    table = PhoneSearchToken.__table__
+    connection.execute(table.delete().where(
+        table.c.owner_type == mapper.local_table.name,
+        table.c.owner_id == target.id
+    ))
+
+
+def backfill_blind_indexes(model, batch_size=500, only_missing=False):
+    """
+    Recalcule les index aveugles des lignes existantes par lots
+    
+    Args:
+        model: Modèle enregistré avec register_blind_index
+        batch_size: Nombre de lignes par lot (une transaction par lot)
+        only_missing: Ne traiter que les lignes dont un champ chiffré n'a pas encore d'empreinte
+    
+    Returns:
+        int: Nombre de lignes traitées
+    """
+    from sqlalchemy import and_, or_
+    from app import db
+    from app.models.phone_search_token import PhoneSearchToken
+    from app.utils.encryption import EncryptionService
+    
+    fields = model.BLIND_INDEXED_FIELDS
+    columns = [getattr(model, f'{field}_encrypted') for field in fields]
+    table = PhoneSearchToken.__table__
+    owner_type = model.__tablename__
+    
+    query = db.select(model.id, *columns).order_by(model.id).limit(batch_size)
+    if only_missing:
+        query = query.where(or_(*[
+            and_(getattr(model, f'{field}_encrypted').isnot(None), getattr(model, f'{field}_bidx').is_(None))
+            for field in fields
+        ]))
+    
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(model.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        # Un seul passage de déchiffrement pour tout le lot
+        values = EncryptionService.decrypt_many(row[index + 1] for row in rows for index in range(len(fields)))
+        updates = []
+        tokens = []
+        for position, row in enumerate(rows):
+            update = {'id': row[0]}
+            for index, field in enumerate(fields):
+                value = values[position * len(fields) + index]
+                update[f'{field}_bidx'] = phone_index(value)
+                tokens.extend(
+                    {'owner_type': owner_type, 'owner_id': row[0], 'field': field, 'token': token}
+                    for token in phone_suffix_tokens(value)
+                )
+            updates.append(update)
+        
+        db.session.execute(db.update(model), updates)
+        db.session.execute(table.delete().where(
+            table.c.owner_type == owner_type,
+            table.c.owner_id.in_([row[0] for row in rows])
+        ))
+        if tokens:
+            db.session.execute(table.insert(), tokens)
+        db.session.commit()
+        processed += len(rows)
+    
+    return processed
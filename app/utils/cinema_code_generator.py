@@ -23,6 +23,7 @@ Important: Le compteur est global par pays d'origine, donc:
 """
 from app import db
 from app.models.cinema_talent import CinemaTalent
+from app.models.code_sequence import CodeSequence
 from app.data.world_countries import WORLD_COUNTRIES
 import re
 
@@ -46,6 +47,38 @@ def clean_city_code(city_name):
     return city_clean[:3].upper().ljust(3, 'X')
 
 
+def _cinema_code_sequence(code):
+    """Numéro séquentiel d'un code PPVVVNNNNNG (ou de l'ancien format à 6 chiffres sur 13 caractères)"""
+    if not code:
+        return None
+    if len(code) == 13:
+        numeric_part = code[5:11]
+    elif len(code) >= 11:
+        numeric_part = code[5:9]
+    else:
+        return None
+    return int(numeric_part) if numeric_part.isdigit() else None
+
+
+def _last_cinema_sequence(country_code):
+    """Plus grand numéro déjà utilisé pour un pays (initialisation du compteur)"""
+    codes = db.session.execute(
+        db.select(CinemaTalent.unique_code).where(CinemaTalent.unique_code.like(f"{country_code}%"))
+    ).scalars()
+    return max((sequence for sequence in map(_cinema_code_sequence, codes) if sequence), default=0)
+
+
+def collect_cinema_sequences():
+    """Plus grand numéro par pays dans les codes existants : {'cinema:PP': n} (reprise)"""
+    sequences = {}
+    for code in db.session.execute(db.select(CinemaTalent.unique_code)).scalars():
+        sequence = _cinema_code_sequence(code)
+        if sequence:
+            scope = f"cinema:{code[:2].upper()}"
+            sequences[scope] = max(sequences.get(scope, 0), sequence)
+    return sequences
+
+
 def generate_cinema_unique_code(country_of_origin_name, city_of_residence_name, gender):
     """
     Générer un code unique pour un talent CINEMA
@@ -82,34 +115,12 @@ def generate_cinema_unique_code(country_of_origin_name, city_of_residence_name,
     # Obtenir le code ville de résidence (3 lettres)
     city_code = clean_city_code(city_of_residence_name)
     
-    # Trouver le prochain numéro séquentiel pour ce PAYS uniquement
-    # On cherche tous les codes qui commencent par le code pays (2 lettres)
-    all_talents = CinemaTalent.query.filter(
-        CinemaTalent.unique_code.like(f"{country_code}%")
-    ).all()
-    
-    max_sequence = 0
-    if all_talents:
-        for talent in all_talents:
-            if talent.unique_code:
-                try:
-                    # Format attendu: PPVVVNNNNNG (11 caractères)
-                    # La partie numérique se trouve aux positions 5-9 (4 chiffres)
-                    if len(talent.unique_code) >= 11:
-                        numeric_part = talent.unique_code[5:9]
-                        if numeric_part.isdigit():
-                            sequence_num = int(numeric_part)
-                            max_sequence = max(max_sequence, sequence_num)
-                    # Rétrocompatibilité avec l'ancien format à 6 chiffres (PPVVVNNNNNNNG - 13 chars)
-                    elif len(talent.unique_code) == 13:
-                        numeric_part = talent.unique_code[5:11]
-                        if numeric_part.isdigit():
-                            sequence_num = int(numeric_part)
-                            max_sequence = max(max_sequence, sequence_num)
-                except (ValueError, IndexError):
-                    continue
-    
-    next_number = max_sequence + 1
+    # Prochain numéro du compteur 'cinema:PP' (un seul UPDATE atomique dans la transaction
+    # de l'inscription), initialisé à partir des codes existants au premier usage du pays
+    next_number = CodeSequence.next_value(
+        f"cinema:{country_code}",
+        initial=lambda: _last_cinema_sequence(country_code)
+    )
     
     # Formatter le numéro sur 4 chiffres
     sequence = str(next_number).zfill(4)
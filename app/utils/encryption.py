@@ -9,11 +9,43 @@ www.myoneart.com
 """
 Module de chiffrement des données sensibles
 Utilise Fernet (chiffrement symétrique) pour protéger les données
+
+Le cipher est construit une seule fois par processus puis mis en cache.
+Il est reconstruit automatiquement si ENCRYPTION_KEY ou
+ENCRYPTION_KEYS_PREVIOUS changent dans la configuration.
+Les anciennes clés (rotation) restent utilisables en déchiffrement via MultiFernet.
 """
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from flask import current_app
 import base64
 import hashlib
+import threading
+
+
+_cipher_lock = threading.Lock()
+_cipher_cache = {'config': None, 'cipher': None}
+
+
+def _derive_fernet(key):
+    """Dériver une instance Fernet à partir d'une clé brute (SHA-256 + base64)"""
+    if isinstance(key, str):
+        key_bytes = key.encode()
+    else:
+        key_bytes = key
+    
+    derived_key = base64.urlsafe_b64encode(hashlib.sha256(key_bytes).digest())
+    return Fernet(derived_key)
+
+
+def _parse_previous_keys(value):
+    """Normaliser ENCRYPTION_KEYS_PREVIOUS (liste ou chaîne séparée par des virgules)"""
+    if not value:
+        return ()
+    if isinstance(value, (list, tuple)):
+        keys = value
+    else:
+        keys = str(value).split(',')
+    return tuple(k.strip() for k in keys if k and k.strip())
 
 
 class EncryptionService:
@@ -21,18 +53,37 @@ class EncryptionService:
     
     @staticmethod
     def _get_cipher():
-        """Obtenir l'instance Fernet avec la clé de chiffrement"""
+        """
+        Obtenir le cipher (MultiFernet) avec la clé de chiffrement courante
+        
+        L'instance est mise en cache au niveau du processus et n'est reconstruite
+        que lorsque la configuration des clés change.
+        """
         key = current_app.config.get('ENCRYPTION_KEY')
         if not key:
             raise ValueError("ENCRYPTION_KEY n'est pas définie dans l'environnement")
         
-        if isinstance(key, str):
-            key_bytes = key.encode()
-        else:
-            key_bytes = key
+        config_key = (key, _parse_previous_keys(current_app.config.get('ENCRYPTION_KEYS_PREVIOUS')))
+        
+        cached = _cipher_cache
+        if cached['config'] == config_key:
+            return cached['cipher']
         
-        derived_key = base64.urlsafe_b64encode(hashlib.sha256(key_bytes).digest())
-        return Fernet(derived_key)
+        with _cipher_lock:
+            if _cipher_cache['config'] != config_key:
+                primary, previous = config_key
+                fernets = [_derive_fernet(primary)]
+                fernets.extend(_derive_fernet(k) for k in previous if k != primary)
+                _cipher_cache['cipher'] = MultiFernet(fernets)
+                _cipher_cache['config'] = config_key
+            return _cipher_cache['cipher']
+    
+    @staticmethod
+    def clear_cipher_cache():
+        """Forcer la reconstruction du cipher au prochain appel"""
+        with _cipher_lock:
+            _cipher_cache['config'] = None
+            _cipher_cache['cipher'] = None
     
     @staticmethod
     def encrypt(data):
@@ -83,6 +134,73 @@ class EncryptionService:
             current_app.logger.warning(f"Échec du déchiffrement (clé incorrecte?): {str(e)[:100]}")
             return None
     
+    @staticmethod
+    def decrypt_many(values):
+        """
+        Déchiffrer une liste de valeurs en une seule passe
+        
+        Le cipher est résolu une seule fois pour tout le lot. Les valeurs vides
+        ou indéchiffrables donnent None, comme pour decrypt().
+        
+        Args:
+            values (iterable): Données chiffrées
+            
+        Returns:
+            list: Données déchiffrées, dans le même ordre
+        """
+        values = list(values)
+        if not any(values):
+            return [None] * len(values)
+        
+        cipher = EncryptionService._get_cipher()
+        results = []
+        failures = 0
+        for encrypted_data in values:
+            if not encrypted_data:
+                results.append(None)
+                continue
+            
+            if not isinstance(encrypted_data, str):
+                encrypted_data = str(encrypted_data)
+            
+            try:
+                results.append(cipher.decrypt(encrypted_data.encode()).decode())
+            except (InvalidToken, ValueError, TypeError):
+                failures += 1
+                results.append(None)
+        
+        if failures:
+            current_app.logger.warning(f"Échec du déchiffrement de {failures}/{len(values)} valeur(s) (clé incorrecte?)")
+        
+        return results
+    
+    @staticmethod
+    def rotate(encrypted_data):
+        """
+        Re-chiffrer une donnée avec la clé principale courante
+        
+        Utile après une rotation de clé : l'ancienne clé doit être listée
+        dans ENCRYPTION_KEYS_PREVIOUS.
+        
+        Args:
+            encrypted_data (str): Données chiffrées (ancienne ou nouvelle clé)
+            
+        Returns:
+            str: Données chiffrées avec la clé principale, ou None si impossible
+        """
+        if not encrypted_data:
+            return None
+        
+        if not isinstance(encrypted_data, str):
+            encrypted_data = str(encrypted_data)
+        
+        try:
+            cipher = EncryptionService._get_cipher()
+            return cipher.rotate(encrypted_data.encode()).decode()
+        except Exception as e:
+            current_app.logger.warning(f"Échec de la rotation de clé: {str(e)[:100]}")
+            return None
+    
     @staticmethod
     def generate_key():
         """
@@ -95,6 +213,125 @@ class EncryptionService:
         return key.decode()
 
 
+class EncryptedFieldsMixin:
+    """
+    Mixin pour les modèles exposant des champs chiffrés (<champ>_encrypted)
+    
+    Les valeurs déchiffrées sont mémorisées sur l'instance, qui vit le temps
+    d'une requête (session SQLAlchemy). Chaque entrée garde le texte chiffré
+    d'origine : si la colonne change (setter, rotation, refresh), la valeur
+    est déchiffrée à nouveau.
+    """
+    
+    ENCRYPTED_FIELDS = ()
+    # Champs recherchables par index aveugle (<champ>_bidx, voir app/utils/blind_index.py)
+    BLIND_INDEXED_FIELDS = ()
+    
+    def _decrypted_cache(self):
+        return self.__dict__.setdefault('_decrypted_values', {})
+    
+    def get_decrypted(self, field):
+        """Retourner la valeur déchiffrée d'un champ (mémorisée)"""
+        encrypted_value = getattr(self, f"{field}_encrypted", None)
+        if not encrypted_value:
+            return None
+        
+        cache = self._decrypted_cache()
+        cached = cache.get(field)
+        if cached is not None and cached[0] == encrypted_value:
+            return cached[1]
+        
+        try:
+            value = EncryptionService.decrypt(encrypted_value)
+        except Exception:
+            value = None
+        cache[field] = (encrypted_value, value)
+        return value
+    
+    def set_encrypted(self, field, value):
+        """Chiffrer et stocker un champ, en mémorisant la valeur en clair"""
+        cache = self._decrypted_cache()
+        if value:
+            encrypted_value = EncryptionService.encrypt(value)
+            setattr(self, f"{field}_encrypted", encrypted_value)
+            # Évite un déchiffrement à la relecture (index aveugles recalculés au flush)
+            cache[field] = (encrypted_value, value if isinstance(value, str) else str(value))
+        else:
+            setattr(self, f"{field}_encrypted", None)
+            cache.pop(field, None)
+    
+    def decrypt_fields(self, *fields):
+        """
+        Déchiffrer plusieurs champs en un seul lot
+        
+        Args:
+            *fields: Noms des champs (par défaut tous les ENCRYPTED_FIELDS)
+            
+        Returns:
+            dict: {champ: valeur déchiffrée ou None}
+        """
+        fields = fields or self.ENCRYPTED_FIELDS
+        self.preload_decrypted([self], *fields)
+        return {field: self.get_decrypted(field) for field in fields}
+    
+    @classmethod
+    def preload_decrypted(cls, instances, *fields):
+        """
+        Déchiffrer en un seul lot les champs demandés pour une liste d'instances
+        
+        Seules les valeurs absentes du cache sont déchiffrées. Les accès suivants
+        aux propriétés (templates, exports) sont servis depuis la mémoire.
+        
+        Args:
+            instances: Liste d'instances du modèle
+            *fields: Noms des champs (par défaut tous les ENCRYPTED_FIELDS)
+            
+        Returns:
+            list: Les instances
+        """
+        instances = list(instances)
+        fields = fields or cls.ENCRYPTED_FIELDS
+        
+        pending = []
+        for instance in instances:
+            cache = instance._decrypted_cache()
+            for field in fields:
+                encrypted_value = getattr(instance, f"{field}_encrypted", None)
+                if not encrypted_value:
+                    continue
+                cached = cache.get(field)
+                if cached is None or cached[0] != encrypted_value:
+                    pending.append((cache, field, encrypted_value))
+        
+        if pending:
+            try:
+                values = EncryptionService.decrypt_many(item[2] for item in pending)
+            except Exception:
+                values = [None] * len(pending)
+            for (cache, field, encrypted_value), value in zip(pending, values):
+                cache[field] = (encrypted_value, value)
+        
+        return instances
+    
+    @classmethod
+    def encrypted_load_options(cls, *fields):
+        """
+        Options de requête ne chargeant que les colonnes chiffrées demandées
+        
+        Exemple:
+            User.query.options(*User.encrypted_load_options('phone', 'whatsapp'))
+        
+        Returns:
+            list: Options defer() pour les autres colonnes chiffrées
+        """
+        from sqlalchemy.orm import defer
+        return [
+            defer(getattr(cls, f"{field}_encrypted"))
+            for field in cls.ENCRYPTED_FIELDS
+            if field not in fields
+        ]
+
+
 def encrypt_sensitive_data(data):
     """Helper function pour chiffrer des données sensibles"""
     return EncryptionService.encrypt(data)
@@ -105,6 +342,11 @@ def decrypt_sensitive_data(encrypted_data):
     return EncryptionService.decrypt(encrypted_data)
 
 
+def decrypt_many_sensitive_data(values):
+    """Helper function pour déchiffrer un lot de données sensibles"""
+    return EncryptionService.decrypt_many(values)
+
+
 # Backward compatibility aliases
 encrypt_data = encrypt_sensitive_data
 decrypt_data = decrypt_sensitive_data
@@ -58,6 +58,14 @@ def save_file(file, upload_type='photo'):
     file_path = os.path.join(upload_path, unique_filename)
     file.save(file_path)
     
+    if upload_type == 'cv':
+        # Extraire le texte du CV en arrière-plan (matching IA, analyse de CV)
+        try:
+            from app.services.cv_text_service import CVTextService
+            CVTextService.extract_in_background(unique_filename)
+        except Exception as e:
+            current_app.logger.warning(f"Extraction du texte du CV non planifiée: {e}")
+    
     return unique_filename
 
 def delete_file(filename, upload_type='photo'):
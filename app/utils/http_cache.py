@@ -0,0 +1,113 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Cache HTTP des données de référence (talents, pays, villes)
+- Le corps JSON est sérialisé une fois par processus puis resservi tel quel
+- ETag (empreinte du contenu) et Last-Modified : les GET conditionnels reçoivent un 304
+- Politique Cache-Control propre à chaque endpoint (add_no_cache_headers la respecte)
+- Invalidation à chaque écriture ORM sur Talent / Country / City ; les autres workers
+  reconstruisent au plus tard après REFERENCE_CACHE_TTL secondes
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+# Durée de cache navigateur par type de données (secondes)
+CACHE_POLICIES = {
+    'talents': 300,
+    'countries': 24 * 3600,
+    'cities': 24 * 3600,
+}
+
+_entries = {}  # clé -> {'body', 'etag', 'last_modified', 'built_at'}
+_state = {'generation': 0}
+_lock = threading.Lock()
+
+
+def invalidate():
+    """Oublier tous les corps en cache (données de référence modifiées)"""
+    with _lock:
+        _state['generation'] += 1
+        _entries.clear()
+
+
+def cached_json_response(key, build, policy, ttl=None):
+    """
+    Réponse JSON servie depuis le cache du processus, avec ETag / Last-Modified
+    
+    Args:
+        key: Clé du corps en cache (inclure les paramètres de la requête)
+        build: Fonction sans argument qui retourne les données à sérialiser
+        policy: Type de données dans CACHE_POLICIES (durée du cache navigateur)
+        ttl: Durée de vie du corps en cache en secondes (None = REFERENCE_CACHE_TTL)
+    
+    Returns:
+        Response (200, ou 304 si le client a déjà cette version)
+    """
+    if ttl is None:
+        ttl = int(current_app.config.get('REFERENCE_CACHE_TTL', 300))
+    
+    entry = _entries.get(key)
+    if entry is None or (ttl and time.monotonic() - entry['built_at'] > ttl):
+        generation = _state['generation']
+        body = current_app.json.dumps(build()).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        
+        # Contenu inchangé après expiration : garder la date de modification d'origine
+        if entry is not None and entry['etag'] == etag:
+            last_modified = entry['last_modified']
+        else:
+            last_modified = datetime.utcnow().replace(microsecond=0)
+        
+        entry = {'body': body, 'etag': etag, 'last_modified': last_modified, 'built_at': time.monotonic()}
+        with _lock:
+            # Ne pas stocker un corps construit avant une invalidation
+            if generation == _state['generation']:
+                if len(_entries) >= int(current_app.config.get('REFERENCE_CACHE_MAX_ENTRIES', 1000)):
+                    _entries.clear()
+                _entries[key] = entry
+    
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['last_modified']
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_POLICIES[policy]
+    return response.make_conditional(request)
+
+
+def init_reference_cache(app):
+    """Brancher l'invalidation sur les écritures ORM des données de référence"""
+    from app import db
+    from app.models.talent import Talent
+    from app.models.location import Country, City
+    
+    for model in (Talent, Country, City):
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            if not event.contains(model, event_name, _on_reference_write):
+                event.listen(model, event_name, _on_reference_write)
+    
+    if not event.contains(db.session, 'after_commit', _on_session_commit):
+        event.listen(db.session, 'after_commit', _on_session_commit)
+
+
+def _on_reference_write(mapper, connection, target):
+    invalidate()
+    session = object_session(target)
+    if session is not None:
+        session.info['reference_data_dirty'] = True
+
+
+def _on_session_commit(session):
+    # Réinvalider après le commit : une requête concurrente a pu reconstruire l'ancien état
+    if session.info.pop('reference_data_dirty', False):
+        invalidate()
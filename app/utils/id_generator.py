@@ -6,6 +6,39 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
+
+def _user_code_sequence(code):
+    """Sequence number NNNN of a PPGNNNNVVV code (None if the code has another format)"""
+    if code and len(code) >= 10 and code[3:7].isdigit():
+        return int(code[3:7])
+    return None
+
+
+def _last_user_sequence(country_part):
+    """Highest sequence already used for a country (seeds a new code_sequences row)"""
+    from app import db
+    from app.models.user import User
+    
+    codes = db.session.execute(
+        db.select(User.unique_code).where(User.unique_code.like(f"{country_part}%"))
+    ).scalars()
+    return max((sequence for sequence in map(_user_code_sequence, codes) if sequence), default=0)
+
+
+def collect_user_sequences():
+    """Highest sequence per country in existing user codes: {'user:PP': n} (backfill)"""
+    from app import db
+    from app.models.user import User
+    
+    sequences = {}
+    for code in db.session.execute(db.select(User.unique_code)).scalars():
+        sequence = _user_code_sequence(code)
+        if sequence:
+            scope = f"user:{code[:2].upper()}"
+            sequences[scope] = max(sequences.get(scope, 0), sequence)
+    return sequences
+
+
 def generate_unique_code(country_code, city_code, gender):
     """
     Generate unique alphanumeric code: PPGNNNNVVV
@@ -19,34 +52,22 @@ def generate_unique_code(country_code, city_code, gender):
     Note: The sequential number is incremented per COUNTRY OF ORIGIN, not per city.
     The city code represents the city of residence.
     This ensures unique identification while maintaining country-level tracking.
+    
+    The number comes from the code_sequences counter 'user:PP' (one atomic UPDATE,
+    allocated in the caller's transaction); the counter is seeded from existing
+    codes the first time a country is used. The counter row stays locked until the
+    caller commits: generate the code right before the commit, after any slow work.
     """
-    from app.models.user import User
+    from app.models.code_sequence import CodeSequence
     
     country_part = country_code[:2].upper()
     city_part = city_code[:3].upper()
     gender_part = gender.upper() if gender in ['M', 'F', 'N'] else 'N'
     
-    # Find the next sequential number for this COUNTRY
-    # Search for all codes starting with the country code
-    all_users = User.query.filter(
-        User.unique_code.like(f"{country_part}%")
-    ).all()
-    
-    max_sequence = 0
-    if all_users:
-        for user in all_users:
-            if user.unique_code and len(user.unique_code) >= 10:
-                try:
-                    # Extract the numeric part from PPGNNNNVVV format
-                    # Position 3-7 contains NNNN (4 digits)
-                    numeric_part = user.unique_code[3:7]
-                    if numeric_part.isdigit():
-                        sequence_num = int(numeric_part)
-                        max_sequence = max(max_sequence, sequence_num)
-                except (ValueError, IndexError):
-                    continue
-    
-    next_number = max_sequence + 1
+    next_number = CodeSequence.next_value(
+        f"user:{country_part}",
+        initial=lambda: _last_user_sequence(country_part)
+    )
     
     # Format the number with 4 digits (zero-padded)
     sequence = str(next_number).zfill(4)
@@ -75,43 +96,11 @@ def generate_unique_user_code(country_code, city_code, gender):
     Sequential numbering is incremented per country of origin, not per city.
     The city code represents the city of residence.
     """
-    # Generate the code
-    code = generate_unique_code(country_code, city_code, gender)
+    # A code can only be taken if it was created outside the counter (manual edit, import):
+    # skip to the next allocated number
+    for _ in range(10):
+        code = generate_unique_code(country_code, city_code, gender)
+        if is_code_unique(code):
+            return code
     
-    # Double-check uniqueness (should always be unique with sequential numbering)
-    if not is_code_unique(code):
-        # This should rarely happen, but handle it just in case
-        # Try up to 10 times with incremented numbers
-        from app.models.user import User
-        for i in range(1, 11):
-            country_part = country_code[:2].upper()
-            city_part = city_code[:3].upper()
-            gender_part = gender.upper() if gender in ['M', 'F', 'N'] else 'N'
-            
-            # Find max again and add offset
-            all_users = User.query.filter(
-                User.unique_code.like(f"{country_part}%")
-            ).all()
-            
-            max_sequence = 0
-            if all_users:
-                for user in all_users:
-                    if user.unique_code and len(user.unique_code) >= 10:
-                        try:
-                            numeric_part = user.unique_code[3:7]
-                            if numeric_part.isdigit():
-                                sequence_num = int(numeric_part)
-                                max_sequence = max(max_sequence, sequence_num)
-                        except (ValueError, IndexError):
-                            continue
-            
-            next_number = max_sequence + i
-            sequence = str(next_number).zfill(4)
-            code = f"{country_part}{gender_part}{sequence}{city_part}"
-            
-            if is_code_unique(code):
-                return code
-        
-        raise ValueError("Unable to generate unique code after maximum attempts")
-    
-    return code
+    raise ValueError("Unable to generate unique code after maximum attempts")
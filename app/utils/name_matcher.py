@@ -0,0 +1,103 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Recherche de noms surveillés (watchlist)
+- normalize_name : minuscules sans accents, forme stockée dans <table>.name_normalized
+- NameMatcher : automate Aho–Corasick construit une fois pour toute la liste,
+  un nom est comparé à tous les noms surveillés en un seul parcours
+"""
+
+import unicodedata
+from collections import deque
+
+
+def normalize_name(text):
+    """
+    Normalise un nom en retirant les accents et les caractères spéciaux
+    
+    Args:
+        text: Texte à normaliser
+    
+    Returns:
+        str: Texte normalisé sans accents en minuscules
+    """
+    if not text:
+        return ""
+    # Supprimer les accents
+    nfkd_form = unicodedata.normalize('NFKD', text.lower())
+    return ''.join([c for c in nfkd_form if not unicodedata.combining(c)])
+
+
+def normalize_full_name(first_name, last_name):
+    """Forme normalisée du nom complet (valeur de la colonne name_normalized)"""
+    return normalize_name(f"{first_name or ''} {last_name or ''}".strip())
+
+
+class NameMatcher:
+    """Automate Aho–Corasick sur les noms surveillés normalisés"""
+    
+    def __init__(self, names):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self.size = 0
+        
+        for name in names:
+            name = name.strip()
+            pattern = normalize_name(name)
+            if not pattern:
+                continue
+            
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                node = child
+            if self._output[node] is None:
+                self._output[node] = name
+                self.size += 1
+        
+        # Liens d'échec en largeur : chaque nœud hérite du nom trouvé par son suffixe
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+    
+    def __bool__(self):
+        return self.size > 0
+    
+    def find(self, normalized_text):
+        """
+        Premier nom surveillé contenu dans un texte déjà normalisé
+        
+        Returns:
+            str: Nom surveillé (tel que saisi dans la liste) ou None
+        """
+        if not normalized_text:
+            return None
+        
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in normalized_text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
@@ -0,0 +1,111 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Pagination par curseur (keyset) sur (created_at, id)
+Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position dans la liste
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def get_per_page(value, default=DEFAULT_PER_PAGE):
+    """Taille de page demandée, bornée à [1, MAX_PER_PAGE]"""
+    try:
+        per_page = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def encode_cursor(created_at, row_id):
+    """Curseur opaque pour l'URL à partir de la clé (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Clé (created_at, id) d'un curseur, ou None s'il est absent ou invalide"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        created_at, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """Une page de résultats et les curseurs des pages voisines"""
+    
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, created_col, id_col, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Page de résultats triés du plus récent au plus ancien, servie par un index (created_at, id)
+    
+    Args:
+        query: Requête SQLAlchemy filtrée (sans order_by)
+        created_col, id_col: Colonnes de la clé de tri (created_at non NULL)
+        after: Curseur de la dernière ligne de la page précédente (page suivante)
+        before: Curseur de la première ligne de la page suivante (page précédente)
+        per_page: Nombre de lignes par page
+    
+    Returns:
+        KeysetPage
+    """
+    per_page = get_per_page(per_page)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+    
+    if before_key is not None:
+        # Parcours inverse puis remise dans l'ordre d'affichage
+        created_at, row_id = before_key
+        rows = query.filter(or_(
+            created_col > created_at,
+            and_(created_col == created_at, id_col > row_id)
+        )).order_by(created_col.asc(), id_col.asc()).limit(per_page + 1).all()
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = len(rows) > per_page, True
+    else:
+        if after_key is not None:
+            created_at, row_id = after_key
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id)
+            ))
+        rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_prev, has_next = after_key is not None, len(rows) > per_page
+    
+    def key(item):
+        return encode_cursor(getattr(item, created_col.key), getattr(item, id_col.key))
+    
+    return KeysetPage(
+        items,
+        per_page,
+        next_cursor=key(items[-1]) if items and has_next else None,
+        prev_cursor=key(items[0]) if items and has_prev else None
+    )
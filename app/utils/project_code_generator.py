@@ -15,6 +15,8 @@ Format: CCIII001001 (sans tirets, minimum 10 caractères)
   - 001: Numéro séquentiel du talent (3 chiffres)
 Exemple: MAABC001001 = Maroc, ABC Productions, projet 1, talent 1
 """
+from app import db
+from app.models.code_sequence import CodeSequence
 from app.models.project import ProjectTalent
 from app.data.world_countries import WORLD_COUNTRIES
 
@@ -64,6 +66,29 @@ def get_production_initials(production_name):
     
     return initials
 
+def _last_project_sequence(project_id):
+    """
+    Dernier numéro utilisé dans un projet (initialisation du compteur) :
+    nombre d'assignations ou plus grand suffixe à 3 chiffres des codes existants
+    """
+    codes = db.session.execute(
+        db.select(ProjectTalent.project_code).where(ProjectTalent.project_id == project_id)
+    ).scalars().all()
+    suffixes = [int(code[-3:]) for code in codes if code and code[-3:].isdigit()]
+    return max([len(codes), *suffixes])
+
+def collect_project_sequences():
+    """Dernier numéro par projet dans les assignations existantes : {'project_talent:<id>': n} (reprise)"""
+    sequences = {}
+    rows = db.session.execute(db.select(ProjectTalent.project_id, ProjectTalent.project_code))
+    counts = {}
+    for project_id, code in rows:
+        scope = f"project_talent:{project_id}"
+        counts[scope] = counts.get(scope, 0) + 1
+        suffix = int(code[-3:]) if code and code[-3:].isdigit() else 0
+        sequences[scope] = max(sequences.get(scope, 0), suffix, counts[scope])
+    return sequences
+
 def generate_project_talent_code(project):
     """
     Génère un code unique pour un talent assigné à un projet
@@ -92,18 +117,16 @@ def generate_project_talent_code(project):
     # 3. ID du projet (3 chiffres)
     project_id_str = str(project.id).zfill(3)
     
-    # 4. Compter le nombre de talents déjà assignés au projet
-    existing_count = ProjectTalent.query.filter_by(project_id=project.id).count()
-    next_number = existing_count + 1
-    talent_number_str = str(next_number).zfill(3)
-    
-    # 5. Construire le code final (sans tirets)
-    code = f"{country_code}{production_initials}{project_id_str}{talent_number_str}"
-    
-    # 6. Vérifier l'unicité (au cas où il y aurait un doublon)
-    while ProjectTalent.query.filter_by(project_code=code).first():
-        next_number += 1
+    # 4. Numéro suivant du compteur du projet (UPDATE atomique dans la transaction de l'assignation)
+    #    puis code final sans tirets ; un code déjà pris (créé hors compteur) passe au numéro suivant
+    for _ in range(10):
+        next_number = CodeSequence.next_value(
+            f"project_talent:{project.id}",
+            initial=lambda: _last_project_sequence(project.id)
+        )
         talent_number_str = str(next_number).zfill(3)
         code = f"{country_code}{production_initials}{project_id_str}{talent_number_str}"
+        if not db.session.query(ProjectTalent.query.filter_by(project_code=code).exists()).scalar():
+            return code
     
-    return code
+    raise ValueError("Impossible de générer un code projet unique")
@@ -0,0 +1,206 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Cache des images QR code (PDF, badges, pages de profil)
+- Clé = empreinte SHA-256 du contenu encodé et des paramètres de rendu (taille, marge)
+- Mémoire du processus (LRU de QR_CACHE_MAX_ENTRIES images) puis disque (QR_CACHE_FOLDER,
+  partagé par les workers) : un même QR code n'est dessiné qu'une fois
+- Le contenu ne dépend que de l'URL encodée : un changement de BASE_URL donne de nouvelles clés,
+  les anciennes images ne sont simplement plus lues
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import qrcode
+from flask import current_app, has_app_context
+
+from config import Config
+
+# Paramètres des QR codes de profil (fichiers qr_<code>.png et fiches PDF)
+PROFILE_BOX_SIZE = 10
+PROFILE_BORDER = 4
+
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
+_entries = OrderedDict()  # clé -> PNG (bytes), du plus ancien au plus récent
+_lock = threading.Lock()
+_stats = {'memory': 0, 'disk': 0, 'rendered': 0}
+
+
+def _setting(name, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return getattr(Config, name, default)
+
+
+def cache_dir():
+    """Dossier du cache disque (QR_CACHE_FOLDER, sinon instance/qr_cache)"""
+    folder = _setting('QR_CACHE_FOLDER', None)
+    if folder:
+        return folder
+    if has_app_context():
+        return os.path.join(current_app.instance_path, 'qr_cache')
+    return os.path.join('instance', 'qr_cache')
+
+
+def profile_url(unique_code, profile_type='user'):
+    """URL publique encodée dans le QR code d'un profil"""
+    base_url = Config.get_base_url()
+    if profile_type == 'cinema':
+        return f"{base_url}/cinema/profile/{unique_code}"
+    return f"{base_url}/profile/view/{unique_code}"
+
+
+def asset_key(payload, box_size=PROFILE_BOX_SIZE, border=PROFILE_BORDER, error_correction='L'):
+    """Empreinte du contenu et des paramètres de rendu"""
+    raw = f"qr-v1|{error_correction}|{box_size}|{border}|{payload}".encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _asset_path(key):
+    return os.path.join(cache_dir(), key[:2], f"{key}.png")
+
+
+def _remember(key, png, source):
+    max_entries = int(_setting('QR_CACHE_MAX_ENTRIES', 2000))
+    with _lock:
+        _stats[source] += 1
+        if max_entries <= 0:
+            return
+        _entries[key] = png
+        _entries.move_to_end(key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+
+
+def _render(payload, box_size, border, error_correction):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=ERROR_CORRECTION[error_correction],
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    """Écriture via un fichier temporaire renommé : jamais de PNG à moitié écrit"""
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def qr_png(payload, box_size=PROFILE_BOX_SIZE, border=PROFILE_BORDER, error_correction='L'):
+    """
+    Image PNG du QR code (mémoire, puis disque, puis rendu)
+    
+    Args:
+        payload: Texte encodé (URL de profil, code projet...)
+        box_size: Taille d'un module en pixels
+        border: Marge en modules
+        error_correction: Niveau de correction d'erreur ('L', 'M', 'Q' ou 'H')
+    
+    Returns:
+        bytes: Contenu PNG
+    """
+    key = asset_key(payload, box_size, border, error_correction)
+    
+    with _lock:
+        png = _entries.get(key)
+        if png is not None:
+            _entries.move_to_end(key)
+            _stats['memory'] += 1
+            return png
+    
+    path = _asset_path(key)
+    try:
+        with open(path, 'rb') as handle:
+            png = handle.read()
+    except OSError:
+        png = None
+    
+    source = 'disk'
+    if not png:
+        png = _render(payload, box_size, border, error_correction)
+        source = 'rendered'
+        try:
+            _write_atomic(path, png)
+        except OSError as e:
+            # Dossier en lecture seule : le cache mémoire suffit
+            print(f"⚠️ Cache QR non écrit ({path}): {e}")
+    
+    _remember(key, png, source)
+    return png
+
+
+def qr_path(payload, box_size=PROFILE_BOX_SIZE, border=PROFILE_BORDER, error_correction='L'):
+    """Chemin du PNG dans le cache disque (créé si absent), pour les API qui lisent un fichier"""
+    path = _asset_path(asset_key(payload, box_size, border, error_correction))
+    if not os.path.exists(path):
+        png = qr_png(payload, box_size, border, error_correction)
+        if not os.path.exists(path):
+            _write_atomic(path, png)
+    return path
+
+
+def profile_qr_png(unique_code, profile_type='user'):
+    """PNG du QR code d'un profil (même image pour la page, le tableau de bord et les PDF)"""
+    return qr_png(profile_url(unique_code, profile_type))
+
+
+def write_if_changed(path, png):
+    """
+    Copier un PNG du cache vers un fichier public s'il diffère
+    
+    Returns:
+        bool: True si le fichier a été (ré)écrit
+    """
+    try:
+        if os.path.getsize(path) == len(png):
+            with open(path, 'rb') as handle:
+                if handle.read() == png:
+                    return False
+    except OSError:
+        pass
+    _write_atomic(path, png)
+    return True
+
+
+def cache_stats():
+    """Compteurs du processus : {'memory', 'disk', 'rendered', 'entries'}"""
+    with _lock:
+        return dict(_stats, entries=len(_entries))
+
+
+def clear_memory_cache():
+    """Vider le cache mémoire (le cache disque est conservé)"""
+    with _lock:
+        _entries.clear()
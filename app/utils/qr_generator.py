@@ -6,15 +6,34 @@ Mail : moa@myoneart.com
 www.myoneart.com
 """
 
-import qrcode
 import os
-from config import Config
+from app.utils.qr_cache import profile_qr_png, write_if_changed
+
+def sync_qr_code(unique_code, save_path, profile_type='user'):
+    """
+    Mettre à jour le fichier public qr_<code>.png depuis le cache des QR codes
+    
+    Returns:
+        tuple: (nom du fichier, True si le fichier a été réécrit)
+    """
+    png = profile_qr_png(unique_code, profile_type)
+    
+    filename = f"qr_{unique_code}.png"
+    os.makedirs(save_path, exist_ok=True)
+    changed = write_if_changed(os.path.join(save_path, filename), png)
+    
+    return filename, changed
+
 
 def generate_qr_code(unique_code, save_path, profile_type='user'):
     """
     Generate QR code for user or cinema profile
     Fonctionne sur toutes les plateformes (Replit, VPS, local)
     
+    L'image vient du cache des QR codes (app/utils/qr_cache.py) : l'URL du profil
+    (BASE_URL selon l'environnement) n'est dessinée qu'une fois pour la page, les PDF
+    et le tableau de bord.
+    
     Args:
         unique_code (str): Unique code of the profile
         save_path (str): Path to save the QR code image
@@ -23,33 +42,7 @@ def generate_qr_code(unique_code, save_path, profile_type='user'):
     Returns:
         str: Filename of saved QR code
     """
-    # Obtenir l'URL de base selon l'environnement (Replit, VPS, ou local)
-    base_url = Config.get_base_url()
-    
-    # Construire l'URL complète selon le type de profil
-    if profile_type == 'cinema':
-        profile_url = f"{base_url}/cinema/profile/{unique_code}"
-    else:  # user profile (default)
-        profile_url = f"{base_url}/profile/view/{unique_code}"
-    
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(profile_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    filename = f"qr_{unique_code}.png"
-    filepath = os.path.join(save_path, filename)
-    
-    os.makedirs(save_path, exist_ok=True)
-    img.save(filepath)
-    
-    return filename
+    return sync_qr_code(unique_code, save_path, profile_type)[0]
 
 
 def generate_cinema_qr_code(unique_code, save_path):
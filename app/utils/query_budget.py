@@ -0,0 +1,85 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Budget de requêtes SQL par vue
+Détecte les régressions N+1 : une vue de liste décorée avec @query_budget(n)
+qui exécute plus de n requêtes lève QueryBudgetExceeded en mode test
+(app.testing) et journalise un avertissement sinon.
+Actif si app.testing ou QUERY_BUDGET_ENABLED=1.
+"""
+
+import logging
+import threading
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Une vue a exécuté plus de requêtes SQL que son budget"""
+
+
+def _count_query(*args, **kwargs):
+    _local.count = getattr(_local, 'count', 0) + 1
+
+
+def query_count():
+    """Nombre de requêtes SQL exécutées par le thread courant depuis le démarrage"""
+    return getattr(_local, 'count', 0)
+
+
+def is_enabled(app):
+    return app.testing or app.config.get('QUERY_BUDGET_ENABLED', False)
+
+
+def init_query_counter(app, db):
+    """
+    Compter les requêtes SQL exécutées (à appeler dans create_app)
+    Le compteur est toujours branché (un incrément par requête) : les tests
+    activent souvent app.testing après la création de l'application
+    """
+    with app.app_context():
+        if not event.contains(db.engine, 'before_cursor_execute', _count_query):
+            event.listen(db.engine, 'before_cursor_execute', _count_query)
+    if is_enabled(app):
+        app.logger.info("🔢 Budget de requêtes SQL actif sur les vues de liste")
+
+
+def query_budget(max_queries):
+    """
+    Décorateur : nombre maximum de requêtes SQL exécutées par la vue (rendu compris)
+    
+    A placer sous les décorateurs d'authentification, qui ne sont pas comptés :
+        @bp.route('/users')
+        @login_required
+        @query_budget(10)
+        def users(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            app = current_app._get_current_object()
+            if not is_enabled(app):
+                return f(*args, **kwargs)
+            
+            start = query_count()
+            response = f(*args, **kwargs)
+            used = query_count() - start
+            
+            if used > max_queries:
+                message = f"{request.endpoint} a exécuté {used} requêtes SQL (budget : {max_queries})"
+                if app.testing:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(f"⚠️ {message}")
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+
+"""
+Remplit les index aveugles des téléphones / WhatsApp chiffrés (recherche sans déchiffrement)
+pour les talents et talents cinéma existants
+
+La migration automatique fait de même au démarrage (lignes sans empreinte, tout
+après un changement de BLIND_INDEX_KEY, ENCRYPTION_KEY sans BLIND_INDEX_KEY ou
+BLIND_INDEX_MIN_DIGITS) ; ce script permet de le faire sans redémarrer
+
+Usage:
+    python backfill_blind_index.py              # toutes les lignes
+    python backfill_blind_index.py --missing    # seulement les lignes sans empreinte
+    python backfill_blind_index.py --batch-size 1000
+"""
+import argparse
+import time
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remplit les index aveugles des numéros chiffrés")
+    parser.add_argument('--missing', action='store_true', help="ne traiter que les lignes sans empreinte")
+    parser.add_argument('--batch-size', type=int, default=500, help="lignes par transaction (défaut : 500)")
+    args = parser.parse_args()
+    
+    app = create_app()
+    
+    from app.models.user import User
+    from app.models.cinema_talent import CinemaTalent
+    from app.utils.blind_index import backfill_blind_indexes
+    
+    with app.app_context():
+        for model, label in ((User, 'talents'), (CinemaTalent, 'talents cinéma')):
+            started = time.monotonic()
+            count = backfill_blind_indexes(model, batch_size=args.batch_size, only_missing=args.missing)
+            print(f"✅ {count} {label} indexé(s) en {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+
+"""
+Initialise les compteurs de codes uniques (table code_sequences) à partir des codes existants
+- user:PP            talents (PPGNNNNVVV), par pays d'origine
+- cinema:PP          talents cinéma (PPVVVNNNNG), par pays d'origine
+- project_talent:ID  talents assignés à un projet (CCIII001001), par projet
+
+Un compteur absent est aussi initialisé automatiquement à sa première utilisation ;
+ce script évite cette lecture lors des premières inscriptions et relève les compteurs
+en retard après un import de données (un compteur n'est jamais abaissé).
+
+Usage:
+    python backfill_code_sequences.py
+"""
+import time
+
+from app import create_app
+
+
+def main():
+    app = create_app()
+    
+    from app.models.code_sequence import CodeSequence
+    from app.utils.id_generator import collect_user_sequences
+    from app.utils.cinema_code_generator import collect_cinema_sequences
+    from app.utils.project_code_generator import collect_project_sequences
+    
+    with app.app_context():
+        for collect, label in (
+            (collect_user_sequences, 'talents'),
+            (collect_cinema_sequences, 'talents cinéma'),
+            (collect_project_sequences, 'talents de projets'),
+        ):
+            started = time.monotonic()
+            sequences = collect()
+            updated = CodeSequence.ensure_at_least(sequences)
+            print(f"✅ {label}: {len(sequences)} compteur(s), {updated} créé(s) ou relevé(s) en {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
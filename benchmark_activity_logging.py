@@ -0,0 +1,117 @@
+"""
+taalentio.com
+Micro-benchmark du coût du logging d'activité par requête
+
+Mesure, pour un trafic réaliste (quelques User-Agents, routes dynamiques) :
+1. Avant : user_agents.parse à chaque requête + parcours linéaire de PAGE_NAMES_MAP
+2. Après : User-Agent en cache LRU + nom de page mis en cache par règle Flask (url_rule)
+
+Ne nécessite pas de base de données (seule la préparation de l'entrée est mesurée).
+
+Usage:
+    python benchmark_activity_logging.py [nombre_de_requetes]
+"""
+
+import os
+import sys
+import time
+
+from flask import Flask
+from user_agents import parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.activity_logger import ActivityLogger, _parse_user_agent_cached
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+    'Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1',
+]
+
+# (règle Flask, URL appelée) : pages fixes et routes dynamiques
+ROUTES = [
+    ('/admin/users', '/admin/users'),
+    ('/admin/users/<int:user_id>', '/admin/users/42'),
+    ('/cinema/talents', '/cinema/talents'),
+    ('/cinema/talent/<int:talent_id>', '/cinema/talent/17'),
+    ('/cinema/projects/<int:project_id>/talents', '/cinema/projects/3/talents'),
+    ('/presence/talent-history/<code>', '/presence/talent-history/MAN0001RAB'),
+    ('/profile/view/<int:user_id>', '/profile/view/8'),
+    ('/legal/privacy', '/legal/privacy'),
+]
+
+
+def _legacy_page_name(path):
+    """Reproduction de l'ancien comportement (parcours du mapping à chaque requête)"""
+    if path in ActivityLogger.PAGE_NAMES_MAP:
+        return ActivityLogger.PAGE_NAMES_MAP[path]
+    for mapped_path, page_name in ActivityLogger.PAGE_NAMES_MAP.items():
+        if path.startswith(mapped_path + '/') or path.startswith(mapped_path + '?'):
+            return page_name
+    clean_path = path.replace('/', ' > ').strip(' > ')
+    return clean_path.title() if clean_path else path
+
+
+def _legacy_user_agent(user_agent_string):
+    """Reproduction de l'ancien comportement (analyse complète à chaque requête)"""
+    user_agent = parse(user_agent_string)
+    return {
+        'browser': user_agent.browser.family,
+        'browser_version': user_agent.browser.version_string,
+        'device_type': 'mobile' if user_agent.is_mobile else ('tablet' if user_agent.is_tablet else 'desktop'),
+        'device_brand': user_agent.device.brand or None,
+        'device_model': user_agent.device.model or None,
+        'operating_system': user_agent.os.family,
+        'os_version': user_agent.os.version_string
+    }
+
+
+def run_benchmark(requests_count=5000):
+    app = Flask(__name__)
+    for index, (rule, _) in enumerate(ROUTES):
+        app.add_url_rule(rule, f'route_{index}', lambda **kwargs: '')
+    
+    adapter = app.url_map.bind('localhost')
+    traffic = []
+    for i in range(requests_count):
+        rule, path = ROUTES[i % len(ROUTES)]
+        url_rule, _ = adapter.match(path, return_rule=True)
+        traffic.append((USER_AGENTS[i % len(USER_AGENTS)], path, url_rule))
+    
+    print(f"\n{'='*60}")
+    print(f"📝 BENCHMARK LOGGING D'ACTIVITÉ - {requests_count} requêtes")
+    print(f"   {len(USER_AGENTS)} User-Agents, {len(ROUTES)} routes, {len(ActivityLogger.PAGE_NAMES_MAP)} pages nommées")
+    print(f"{'='*60}")
+    
+    start = time.perf_counter()
+    for user_agent, path, _ in traffic:
+        _legacy_user_agent(user_agent)
+        _legacy_page_name(path)
+    legacy = time.perf_counter() - start
+    
+    _parse_user_agent_cached.cache_clear()
+    ActivityLogger._page_names_by_rule.clear()
+    start = time.perf_counter()
+    for user_agent, path, url_rule in traffic:
+        ActivityLogger._parse_user_agent(user_agent)
+        ActivityLogger.get_page_name_from_url(path, url_rule)
+    cached = time.perf_counter() - start
+    
+    for label, elapsed in (
+        ('Avant (parse + parcours du mapping)', legacy),
+        ('Après (cache LRU + url_rule)', cached),
+    ):
+        per_request_us = elapsed / requests_count * 1_000_000
+        print(f"  {label:<38} {elapsed:7.3f}s  |  {per_request_us:8.1f} µs/requête  |  x{legacy / elapsed:4.2f}")
+    
+    info = _parse_user_agent_cached.cache_info()
+    print(f"  Cache User-Agent : {info.hits} hits, {info.misses} misses, {info.currsize}/{info.maxsize}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,99 @@
+"""
+taalentio.com
+Benchmark hors ligne du matching IA (fournisseur local simulé)
+
+Compare le temps total d'analyse de N talents cinéma :
+1. Séquentiel (AI_MATCHING_CONCURRENCY=1, comportement historique)
+2. Parallèle borné (AI_MATCHING_CONCURRENCY=N workers)
+
+Aucun appel réseau ni base de données : le fournisseur 'fake' répond
+après AI_FAKE_LATENCY secondes avec un score déterministe, et le cache
+de matching (AI_MATCH_CACHE_TTL=0) est désactivé.
+
+Usage:
+    python benchmark_ai_matching.py [nombre_de_talents] [concurrence]
+    AI_FAKE_LATENCY=0.5 python benchmark_ai_matching.py 200 16
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import date
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.models.cinema_talent import CinemaTalent
+from app.services.ai_matching_service import AIMatchingService
+
+FAKE_CONFIG = {'provider': 'fake', 'api_key': 'fake', 'model': 'fake-scorer', 'endpoint': None}
+JOB_DESCRIPTION = "Rôle principal féminin, 25-35 ans, 1m65 minimum, parle arabe et français."
+
+
+def _build_talents(count):
+    """Profils transients (non persistés) représentatifs"""
+    return [
+        CinemaTalent(
+            id=i,
+            first_name=f'Talent{i}',
+            last_name='Benchmark',
+            gender='F' if i % 2 else 'M',
+            date_of_birth=date(1985 + i % 20, 1 + i % 12, 1 + i % 28),
+            nationality='Marocaine',
+            country_of_residence='Maroc',
+            city_of_residence='Casablanca',
+            height=150 + i % 40,
+            languages_spoken=json.dumps(['Arabe', 'Français']),
+            talent_types=json.dumps(['Acteur Principal']),
+            years_of_experience=i % 15,
+            unique_code=f'MAF{i:09d}'
+        )
+        for i in range(count)
+    ]
+
+
+def _run(app, talents, concurrency):
+    app.config['AI_MATCHING_CONCURRENCY'] = concurrency
+    first_result_at = None
+    start = time.perf_counter()
+    count = 0
+    for _ in AIMatchingService.iter_cinema_talent_matches(JOB_DESCRIPTION, talents, config=FAKE_CONFIG):
+        if first_result_at is None:
+            first_result_at = time.perf_counter() - start
+        count += 1
+    return time.perf_counter() - start, first_result_at or 0.0, count
+
+
+def run_benchmark(count=50, concurrency=8):
+    os.environ.setdefault('AI_FAKE_LATENCY', '0.2')
+    app = Flask(__name__)
+    # Sans cache : chaque passe mesure les appels au fournisseur, pas des lectures en base
+    app.config.update(AI_MATCHING_MAX_RETRIES=0, AI_RATE_LIMIT_PER_MINUTE=0, AI_MATCH_CACHE_TTL=0)
+    
+    with app.app_context():
+        talents = _build_talents(count)
+        
+        print(f"\n{'='*60}")
+        print(f"🤖 BENCHMARK MATCHING IA - {count} talents, latence simulée {os.environ['AI_FAKE_LATENCY']}s")
+        print(f"{'='*60}")
+        
+        sequential, seq_first, seq_count = _run(app, talents, 1)
+        parallel, par_first, par_count = _run(app, talents, concurrency)
+        
+        for label, elapsed, first, matched in (
+            ('Séquentiel (1 worker)', sequential, seq_first, seq_count),
+            (f'Parallèle ({concurrency} workers)', parallel, par_first, par_count),
+        ):
+            print(f"  {label:<26} total {elapsed:7.2f}s  |  1er résultat {first:5.2f}s  |  "
+                  f"{matched} résultats  |  x{sequential / elapsed:5.2f}")
+        
+        print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    )
@@ -0,0 +1,80 @@
+"""
+taalentio.com
+Micro-benchmark du déchiffrement des données sensibles
+
+Compare le coût par ligne (≈ 20 champs chiffrés, comme User/CinemaTalent) :
+1. Avant : dérivation de clé SHA-256 + nouvelle instance Fernet à chaque appel
+2. Après : cipher mis en cache (decrypt champ par champ)
+3. Après : decrypt_many (un seul appel pour toute la ligne)
+
+Ne nécessite pas de base de données.
+
+Usage:
+    python benchmark_encryption.py [nombre_de_lignes]
+"""
+
+import base64
+import hashlib
+import os
+import sys
+import time
+
+from cryptography.fernet import Fernet
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.encryption import EncryptionService
+
+FIELDS_PER_ROW = 20
+
+
+def _legacy_decrypt(key, encrypted_data):
+    """Reproduction de l'ancien comportement (cipher reconstruit à chaque appel)"""
+    derived_key = base64.urlsafe_b64encode(hashlib.sha256(key.encode()).digest())
+    return Fernet(derived_key).decrypt(encrypted_data.encode()).decode()
+
+
+def run_benchmark(rows=2000):
+    app = Flask(__name__)
+    app.config['ENCRYPTION_KEY'] = os.environ.get('ENCRYPTION_KEY') or Fernet.generate_key().decode()
+    key = app.config['ENCRYPTION_KEY']
+
+    with app.app_context():
+        row = [EncryptionService.encrypt(f'+2126000000{i:02d}') for i in range(FIELDS_PER_ROW)]
+
+        print(f"\n{'='*60}")
+        print(f"🔐 BENCHMARK DÉCHIFFREMENT - {rows} lignes x {FIELDS_PER_ROW} champs")
+        print(f"{'='*60}")
+
+        start = time.perf_counter()
+        for _ in range(rows):
+            for value in row:
+                _legacy_decrypt(key, value)
+        legacy = time.perf_counter() - start
+
+        EncryptionService.clear_cipher_cache()
+        start = time.perf_counter()
+        for _ in range(rows):
+            for value in row:
+                EncryptionService.decrypt(value)
+        cached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(rows):
+            EncryptionService.decrypt_many(row)
+        batched = time.perf_counter() - start
+
+        for label, elapsed in (
+            ('Avant (clé dérivée à chaque appel)', legacy),
+            ('Cipher en cache (decrypt)', cached),
+            ('Cipher en cache (decrypt_many)', batched),
+        ):
+            per_row_us = elapsed / rows * 1_000_000
+            print(f"  {label:<38} {elapsed:7.3f}s  |  {per_row_us:8.1f} µs/ligne  |  x{legacy / elapsed:4.2f}")
+
+        print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
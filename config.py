@@ -20,11 +20,19 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///talento.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Cache des paramètres (AppSettings) : délai en secondes avant de revérifier
+    # la version partagée en base (cohérence entre workers gunicorn)
+    SETTINGS_CACHE_TTL = int(os.environ.get('SETTINGS_CACHE_TTL') or 5)
+    
     # Clé de chiffrement (OBLIGATOIRE pour protéger les données sensibles)
     ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
     if not ENCRYPTION_KEY:
         raise ValueError("ENCRYPTION_KEY environment variable must be set. Generate one with: python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'") 
     
+    # Anciennes clés de chiffrement (rotation) - séparées par des virgules
+    # Utilisées uniquement pour déchiffrer les données chiffrées avant la rotation
+    ENCRYPTION_KEYS_PREVIOUS = os.environ.get('ENCRYPTION_KEYS_PREVIOUS', '')
+    
     # Configuration CSRF
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
@@ -66,6 +74,86 @@ class Config:
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     
+    # Matching IA : appels parallèles bornés, limite de débit par fournisseur, reprises
+    AI_MATCHING_CONCURRENCY = int(os.environ.get('AI_MATCHING_CONCURRENCY') or 8)
+    AI_MATCHING_MAX_RETRIES = int(os.environ.get('AI_MATCHING_MAX_RETRIES') or 2)
+    AI_MATCHING_RETRY_BACKOFF = float(os.environ.get('AI_MATCHING_RETRY_BACKOFF') or 1.0)
+    AI_MATCHING_TIMEOUT = int(os.environ.get('AI_MATCHING_TIMEOUT') or 60)
+    AI_RATE_LIMIT_PER_MINUTE = int(os.environ.get('AI_RATE_LIMIT_PER_MINUTE') or 0)
+    # Cache des résultats IA (durée de validité en secondes, 0 = désactivé ; taille maximale)
+    AI_MATCH_CACHE_TTL = int(os.environ.get('AI_MATCH_CACHE_TTL') or 7 * 24 * 3600)
+    AI_MATCH_CACHE_MAX_ENTRIES = int(os.environ.get('AI_MATCH_CACHE_MAX_ENTRIES') or 20000)
+    # Casting IA : nombre maximum de talents pré-sélectionnés envoyés à l'IA (0 = tous)
+    AI_PREFILTER_SHORTLIST = int(os.environ.get('AI_PREFILTER_SHORTLIST') or 30)
+    
+    # Tâches d'arrière-plan (analyse CV, recherches IA, sauvegardes, emails, exports)
+    # Activé par défaut pour qu'un déploiement à un seul processus (python app.py) traite la file ;
+    # avec plusieurs workers web : JOB_WORKER_ENABLED=0 et un processus dédié (job_worker.py)
+    # JOB_STALE_AFTER : délai sans signe de vie du processus (entretenu pendant toute la tâche)
+    JOB_WORKER_ENABLED = os.environ.get('JOB_WORKER_ENABLED', '1') == '1'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_POLL_INTERVAL = int(os.environ.get('JOB_POLL_INTERVAL') or 2)
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL') or 2 * 24 * 3600)
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER') or 3600)
+    
+    # Budget de requêtes SQL des vues de liste (toujours actif en mode test)
+    QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED') == '1'
+    
+    # Logs d'activité : file mémoire écrite par lots par un thread (ACTIVITY_LOG_ASYNC=0 : écriture synchrone)
+    ACTIVITY_LOG_ASYNC = os.environ.get('ACTIVITY_LOG_ASYNC', '1') == '1'
+    ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE') or 100)
+    ACTIVITY_LOG_FLUSH_INTERVAL_MS = int(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL_MS') or 500)
+    ACTIVITY_LOG_QUEUE_SIZE = int(os.environ.get('ACTIVITY_LOG_QUEUE_SIZE') or 10000)
+    ACTIVITY_LOG_BLOCK_TIMEOUT_MS = int(os.environ.get('ACTIVITY_LOG_BLOCK_TIMEOUT_MS') or 50)
+    
+    # Rétention des logs, sur activation (0 = conservation illimitée, défaut) : les pages de logs
+    # lisent les logs bruts, les agrégats quotidiens des logs d'activité supprimés n'y apparaissent pas
+    ACTIVITY_LOG_RETENTION_DAYS = int(os.environ.get('ACTIVITY_LOG_RETENTION_DAYS') or 0)
+    SECURITY_LOG_RETENTION_DAYS = int(os.environ.get('SECURITY_LOG_RETENTION_DAYS') or 0)
+    LOG_RETENTION_BATCH_SIZE = int(os.environ.get('LOG_RETENTION_BATCH_SIZE') or 5000)
+    LOG_RETENTION_MAX_BATCHES = int(os.environ.get('LOG_RETENTION_MAX_BATCHES') or 0)
+    
+    # Statistiques précalculées (API stats, tableau de bord)
+    STATS_REFRESH_MIN_INTERVAL = int(os.environ.get('STATS_REFRESH_MIN_INTERVAL') or 30)
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL') or 900)
+    
+    # Cache HTTP des données de référence (talents, pays, villes)
+    REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL') or 300)
+    REFERENCE_CACHE_MAX_ENTRIES = int(os.environ.get('REFERENCE_CACHE_MAX_ENTRIES') or 1000)
+    
+    # Pointage : nombre maximum de scans par lot synchronisé
+    PRESENCE_SCAN_BATCH_MAX = int(os.environ.get('PRESENCE_SCAN_BATCH_MAX') or 500)
+    
+    # File d'envoi des emails (EMAIL_OUTBOX_ENABLED=0 : envoi synchrone dans la requête)
+    # EMAIL_TRANSPORT=fake : aucun envoi réseau, messages gardés en mémoire (tests, développement)
+    EMAIL_OUTBOX_ENABLED = os.environ.get('EMAIL_OUTBOX_ENABLED', '1') == '1'
+    EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT') or 'sendgrid'
+    EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS') or 4)
+    EMAIL_POLL_INTERVAL = int(os.environ.get('EMAIL_POLL_INTERVAL') or 5)
+    EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE') or 1000)
+    EMAIL_RATE_PER_SECOND = float(os.environ.get('EMAIL_RATE_PER_SECOND') or 10)
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS') or 5)
+    EMAIL_RETRY_BASE_SECONDS = int(os.environ.get('EMAIL_RETRY_BASE_SECONDS') or 60)
+    EMAIL_RETRY_MAX_SECONDS = int(os.environ.get('EMAIL_RETRY_MAX_SECONDS') or 3600)
+    EMAIL_STALE_AFTER = int(os.environ.get('EMAIL_STALE_AFTER') or 600)
+    EMAIL_OUTBOX_RETENTION_DAYS = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS') or 30)
+    EMAIL_FAKE_LATENCY_MS = int(os.environ.get('EMAIL_FAKE_LATENCY_MS') or 0)
+    EMAIL_FAKE_FAILURE_RATE = float(os.environ.get('EMAIL_FAKE_FAILURE_RATE') or 0)
+    
+    # Index aveugles des téléphones chiffrés (défaut : clé dérivée de ENCRYPTION_KEY, qui change
+    # avec une rotation ; une clé dédiée ne change jamais)
+    # Après un changement de clé ou de longueur minimale, recalcul au démarrage (migration automatique)
+    BLIND_INDEX_KEY = os.environ.get('BLIND_INDEX_KEY')
+    BLIND_INDEX_MIN_DIGITS = int(os.environ.get('BLIND_INDEX_MIN_DIGITS') or 4)
+    
+    # Recherche à facettes des talents cinéma (taille de page de /cinema/talents)
+    CINEMA_TALENTS_PER_PAGE = int(os.environ.get('CINEMA_TALENTS_PER_PAGE') or 50)
+    
+    # Cache des images QR code (profils, PDF, badges) : disque partagé + mémoire du processus
+    # QR_CACHE_FOLDER vide : dossier instance/qr_cache
+    QR_CACHE_FOLDER = os.environ.get('QR_CACHE_FOLDER')
+    QR_CACHE_MAX_ENTRIES = int(os.environ.get('QR_CACHE_MAX_ENTRIES') or 2000)
+    
     # Autres API Keys
     OMDB_API_KEY = os.environ.get('OMDB_API_KEY')
     
@@ -522,7 +522,7 @@ class DatabaseInitializer:
             rabat = City.query.filter_by(name='Rabat').first() if morocco else None
             
             admin = User(
-                unique_code=generate_unique_code(),
+                unique_code=generate_unique_code('MA', rabat.code if rabat and rabat.code else 'RAB', 'N'),
                 first_name='Admin',
                 last_name='Talento',
                 email=admin_email,
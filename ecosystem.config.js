@@ -11,17 +11,43 @@ module.exports = {
     env: {
       NODE_ENV: 'production',
       PORT: '5004',
-      FLASK_ENV: 'production'
+      FLASK_ENV: 'production',
+      JOB_WORKER_ENABLED: '0'  // Tâches d'arrière-plan traitées par talento-worker
     },
     env_production: {
       NODE_ENV: 'production',
       PORT: '5004',
-      FLASK_ENV: 'production'
+      FLASK_ENV: 'production',
+      JOB_WORKER_ENABLED: '0'
     },
     error_file: './logs/pm2-error.log',
     out_file: './logs/pm2-out.log',
     log_file: './logs/pm2-combined.log',
     time: true,
     merge_logs: true
+  }, {
+    // Worker dédié : tâches d'arrière-plan et file d'envoi des emails
+    name: 'talento-worker',
+    script: 'job_worker.py',
+    interpreter: 'python3',
+    cwd: '/root/Talento',  // Changez selon votre chemin
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    max_memory_restart: '500M',
+    kill_timeout: 30000,
+    env: {
+      NODE_ENV: 'production',
+      FLASK_ENV: 'production'
+    },
+    env_production: {
+      NODE_ENV: 'production',
+      FLASK_ENV: 'production'
+    },
+    error_file: './logs/pm2-worker-error.log',
+    out_file: './logs/pm2-worker-out.log',
+    log_file: './logs/pm2-worker-combined.log',
+    time: true,
+    merge_logs: true
   }]
 };
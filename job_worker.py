@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+
+"""
+Worker dédié aux tâches d'arrière-plan (analyse CV, recherches IA, sauvegardes,
+emails de sélection, exports PDF) et à la file d'envoi des emails
+
+Les workers web enregistrent les tâches dans la table background_jobs ;
+ce processus les exécute hors du serveur web.
+
+Usage:
+    JOB_WORKER_ENABLED=0 python app.py     # serveur web sans exécution de tâches
+    python job_worker.py                   # worker (JOB_WORKERS tâches en parallèle)
+"""
+import os
+import signal
+import threading
+
+os.environ['JOB_WORKER_ENABLED'] = '1'
+
+from app import create_app
+
+
+def main():
+    app = create_app()
+    
+    from app.scheduler import scheduler
+    if scheduler is None or not scheduler.running:
+        app.logger.error("❌ Le scheduler n'a pas démarré, impossible de traiter les tâches")
+        return 1
+    
+    app.logger.info(f"👷 Worker de tâches démarré ({app.config.get('JOB_WORKERS', 2)} tâche(s) en parallèle)")
+    
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+    
+    app.logger.info("👋 Arrêt du worker de tâches")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
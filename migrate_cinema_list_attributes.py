@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+"""
+
+
+"""
+Migration des attributs multi-valués des talents cinéma
+(ethnicities, languages_spoken, talent_types, other_talents, gallery_photos)
+
+1. Réécrit les colonnes au format canonique : liste JSON sans doublons, NULL si vide
+   (les anciennes saisies "Arabe, Français" deviennent ["Arabe", "Français"])
+2. Reconstruit la table cinema_talent_attributes utilisée par les filtres SQL
+
+La migration automatique remplit déjà la table au démarrage ; ce script sert à
+normaliser les données existantes et à reconstruire la table à la demande.
+
+Usage:
+    python migrate_cinema_list_attributes.py              # normaliser puis reconstruire
+    python migrate_cinema_list_attributes.py --dry-run    # compter les lignes à normaliser
+    python migrate_cinema_list_attributes.py --batch-size 1000
+"""
+import argparse
+import time
+
+from app import create_app
+
+LIST_COLUMNS = ('ethnicities', 'languages_spoken', 'talent_types', 'other_talents', 'gallery_photos')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalise les listes JSON des talents cinéma et reconstruit leur index")
+    parser.add_argument('--dry-run', action='store_true', help="compter sans rien modifier")
+    parser.add_argument('--batch-size', type=int, default=500, help="lignes par transaction (défaut : 500)")
+    args = parser.parse_args()
+    
+    app = create_app()
+    
+    from app.models.cinema_talent import CinemaTalent
+    from app.models.cinema_talent_attribute import backfill_list_attributes, normalize_list_columns
+    from app.models.settings import AppSettings
+    
+    with app.app_context():
+        started = time.monotonic()
+        changed = normalize_list_columns(CinemaTalent, LIST_COLUMNS, batch_size=args.batch_size, dry_run=args.dry_run)
+        if args.dry_run:
+            print(f"ℹ️ {changed} talent(s) cinéma à normaliser")
+            return 0
+        print(f"✅ {changed} talent(s) cinéma normalisé(s) en {time.monotonic() - started:.1f}s")
+        
+        started = time.monotonic()
+        count = backfill_list_attributes(CinemaTalent, batch_size=args.batch_size)
+        AppSettings.set('cinema_talent_attributes_indexed', ','.join(CinemaTalent.LIST_ATTRIBUTES))
+        print(f"✅ Attributs de {count} talent(s) cinéma indexés en {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
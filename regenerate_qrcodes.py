@@ -6,6 +6,9 @@ This script regenerates QR codes for:
 1. All regular users
 2. All CINEMA talents
 
+Images come from the QR asset cache (app/utils/qr_cache.py): a profile whose
+URL did not change is neither rasterized again nor rewritten on disk.
+
 Usage:
     python regenerate_qrcodes.py
 """
@@ -19,7 +22,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app import create_app, db
 from app.models.user import User
 from app.models.cinema_talent import CinemaTalent
-from app.utils.qr_generator import generate_qr_code, generate_cinema_qr_code
+from app.utils.qr_generator import sync_qr_code
+from app.utils.qr_cache import cache_stats
 from config import Config
 
 def regenerate_all_qrcodes():
@@ -39,15 +43,19 @@ def regenerate_all_qrcodes():
         print("👤 Régénération des QR codes pour les utilisateurs réguliers...")
         users = User.query.filter(User.unique_code.isnot(None)).all()
         users_count = 0
+        users_unchanged = 0
         users_errors = 0
+        qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
         
         for user in users:
             try:
-                qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
-                filename = generate_qr_code(user.unique_code, qr_path, profile_type='user')
+                filename, changed = sync_qr_code(user.unique_code, qr_path, profile_type='user')
                 user.qr_code_filename = filename
                 users_count += 1
-                print(f"  ✅ {user.unique_code} - {user.full_name}")
+                if changed:
+                    print(f"  ✅ {user.unique_code} - {user.full_name}")
+                else:
+                    users_unchanged += 1
             except Exception as e:
                 users_errors += 1
                 print(f"  ❌ Erreur pour {user.unique_code}: {str(e)}")
@@ -67,15 +75,18 @@ def regenerate_all_qrcodes():
         print("🎬 Régénération des QR codes pour les talents CINEMA...")
         cinema_talents = CinemaTalent.query.filter(CinemaTalent.unique_code.isnot(None)).all()
         cinema_count = 0
+        cinema_unchanged = 0
         cinema_errors = 0
         
         for talent in cinema_talents:
             try:
-                qr_path = os.path.join('app', 'static', 'uploads', 'qrcodes')
-                filename = generate_cinema_qr_code(talent.unique_code, qr_path)
+                filename, changed = sync_qr_code(talent.unique_code, qr_path, profile_type='cinema')
                 talent.qr_code_filename = filename
                 cinema_count += 1
-                print(f"  ✅ {talent.unique_code} - {talent.full_name}")
+                if changed:
+                    print(f"  ✅ {talent.unique_code} - {talent.full_name}")
+                else:
+                    cinema_unchanged += 1
             except Exception as e:
                 cinema_errors += 1
                 print(f"  ❌ Erreur pour {talent.unique_code}: {str(e)}")
@@ -94,8 +105,10 @@ def regenerate_all_qrcodes():
         print(f"\n{'='*60}")
         print("📊 RÉSUMÉ")
         print(f"{'='*60}")
-        print(f"✅ Utilisateurs réguliers: {users_count}/{len(users)}")
-        print(f"✅ Talents CINEMA: {cinema_count}/{len(cinema_talents)}")
+        print(f"✅ Utilisateurs réguliers: {users_count}/{len(users)} ({users_unchanged} inchangés)")
+        print(f"✅ Talents CINEMA: {cinema_count}/{len(cinema_talents)} ({cinema_unchanged} inchangés)")
+        stats = cache_stats()
+        print(f"🖼️  QR codes dessinés: {stats['rendered']} (cache disque: {stats['disk']}, mémoire: {stats['memory']})")
         print(f"🔗 Base URL: {base_url}")
         print(f"{'='*60}\n")
 
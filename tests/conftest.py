@@ -0,0 +1,71 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Application de test : base SQLite temporaire, sans chargement des données du monde
+"""
+
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix='talento-tests-')
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('ENCRYPTION_KEY', 'test-encryption-key')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'talento.db')}"
+os.environ['SKIP_AUTO_MIGRATION'] = '1'
+os.environ['JOB_WORKER_ENABLED'] = '0'
+
+import pytest
+
+
+def _clear_tables(db):
+    db.session.rollback()
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+    db.session.remove()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app, db
+    
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        # Le démarrage crée le compte admin : chaque test part de tables vides
+        _clear_tables(db)
+    return app
+
+
+@pytest.fixture
+def database(app):
+    """Tables vidées après chaque test"""
+    from app import db
+    
+    with app.app_context():
+        yield db
+        _clear_tables(db)
+
+
+@pytest.fixture
+def admin_client(app, database):
+    """Client de test connecté en administrateur"""
+    from app.models.user import User
+    
+    admin = User(unique_code='MAN0001RAB', first_name='Admin', last_name='Test',
+                 email='admin@test.local', role='admin', is_admin=True)
+    admin.set_password('test-password')
+    database.session.add(admin)
+    database.session.commit()
+    
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+        session['_fresh'] = True
+    return client
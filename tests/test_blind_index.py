@@ -0,0 +1,45 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Index aveugles des téléphones : remplis par la migration automatique pour les profils
+existants, recalculés quand la clé change
+"""
+
+from app.models.user import User
+from app.utils.auto_migrate import _backfill_blind_indexes
+from app.utils.blind_index import phone_search_clause
+
+
+def _find(number):
+    return [user.unique_code for user in User.query.filter(phone_search_clause(User, number))]
+
+
+def test_auto_migrate_fills_missing_and_follows_key_change(app, database):
+    user = User(unique_code='MAF0001RAB', first_name='Salma', last_name='Idrissi',
+                email='salma@test.local', role='user')
+    user.set_password('test-password')
+    user.set_encrypted('phone', '+212 6 12 34 56 78')
+    database.session.add(user)
+    database.session.commit()
+    
+    # Profil antérieur aux index : aucune empreinte
+    database.session.execute(database.update(User).values(phone_bidx=None))
+    database.session.execute(database.text('DELETE FROM phone_search_tokens'))
+    database.session.commit()
+    assert _find('0612345678') == []
+    
+    assert _backfill_blind_indexes(database)
+    assert _find('0612345678') == ['MAF0001RAB']
+    
+    original_key = app.config.get('BLIND_INDEX_KEY')
+    app.config['BLIND_INDEX_KEY'] = 'nouvelle-cle-dediee'
+    try:
+        assert _find('0612345678') == []
+        assert _backfill_blind_indexes(database)
+        assert _find('5678') == ['MAF0001RAB']
+    finally:
+        app.config['BLIND_INDEX_KEY'] = original_key
@@ -0,0 +1,65 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Extraction du genre par le pré-filtre casting : seuls les mots sans ambiguïté
+deviennent un filtre SQL, les masculins génériques restent un critère de classement
+"""
+
+import os
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('ENCRYPTION_KEY', 'test-encryption-key')
+
+import pytest
+
+from app.services.cinema_prefilter_service import CinemaPrefilterService
+
+extract = CinemaPrefilterService.extract_constraints
+
+
+@pytest.mark.parametrize('description', [
+    "Recherche figurants 20-60 ans pour scène de marché",
+    "Recherche des acteurs pour une pub",
+    "Comédiens et danseurs pour un clip",
+    "Acteurs et actrices de 25 à 40 ans",
+    "Figurant(e)s pour une scène de rue",
+])
+def test_mixed_casting_calls_have_no_gender_filter(description):
+    assert 'gender' not in extract(description)
+
+
+def test_generic_masculine_is_a_ranking_hint():
+    constraints = extract("Recherche des acteurs pour une pub")
+    assert constraints.get('gender_hint') == 'M'
+
+
+def test_mixed_call_keeps_other_constraints():
+    constraints = extract("Recherche figurants 20-60 ans pour scène de marché")
+    assert (constraints['age_min'], constraints['age_max']) == (20, 60)
+    assert constraints['talent_types'] == ['Figurant(e)']
+
+
+@pytest.mark.parametrize('description, gender', [
+    ("Homme de 30 ans, barbu", 'M'),
+    ("Rôle masculin, 1m80 minimum", 'M'),
+    ("Un garçon de 10 ans", 'M'),
+    ("Femme blonde, la quarantaine", 'F'),
+    ("Recherche actrice principale", 'F'),
+    ("Rôle féminin pour une série", 'F'),
+    ("Une fille de 12 ans", 'F'),
+    ("Figurantes pour un défilé", 'F'),
+])
+def test_explicit_gender_is_a_hard_filter(description, gender):
+    constraints = extract(description)
+    assert constraints['gender'] == gender
+    assert 'gender_hint' not in constraints
+
+
+def test_both_genders_mentioned():
+    constraints = extract("Un homme et une femme pour un couple")
+    assert 'gender' not in constraints
+    assert 'gender_hint' not in constraints
@@ -0,0 +1,110 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Budget de requêtes SQL des listes de talents : le nombre de requêtes de /admin/users
+et des profils UserLoad ne dépend pas du nombre de talents affichés
+"""
+
+import pytest
+from flask import g
+
+from app.models.location import City, Country
+from app.models.talent import Talent, UserTalent
+from app.models.user import User, UserLoad
+from app.utils.query_budget import QueryBudgetExceeded, query_budget, query_count
+
+
+def _seed_talents(database, count, start=0):
+    country = Country.query.filter_by(code='MA').first()
+    if country is None:
+        country = Country(name='Maroc', code='MA')
+        database.session.add(country)
+        database.session.flush()
+    talents = Talent.query.filter_by(tag='general').all()
+    if not talents:
+        talents = [Talent(name=name, emoji='⭐', category='Arts', tag='general') for name in ('Chant', 'Danse')]
+        database.session.add_all(talents)
+        database.session.flush()
+    
+    for index in range(start, start + count):
+        # Villes de naissance et de résidence distinctes : chaque relation a sa propre requête
+        birth_city = City(name=f'Naissance {index}', code=f'N{index:04d}', country_id=country.id)
+        city = City(name=f'Ville {index}', code=f'V{index:04d}', country_id=country.id)
+        database.session.add_all([birth_city, city])
+        database.session.flush()
+        user = User(
+            unique_code=f'MAF{index:04d}RAB', first_name='Talent', last_name=f'N{index}',
+            email=f'talent{index}@test.local', role='user',
+            country_id=country.id, city_id=birth_city.id,
+            residence_country_id=country.id, residence_city_id=city.id
+        )
+        user.set_password('test-password')
+        user.set_encrypted('phone', f'+2126000{index:05d}')
+        database.session.add(user)
+        database.session.flush()
+        database.session.add_all([UserTalent(user_id=user.id, talent_id=talent.id) for talent in talents])
+    database.session.commit()
+
+
+def _queries(callable_):
+    start = query_count()
+    result = callable_()
+    return query_count() - start, result
+
+
+def _get(client, database, url):
+    """
+    Requête HTTP comptée comme en production : le client de test réutilise le contexte
+    d'application du test, la session et l'utilisateur connecté sont donc rechargés
+    """
+    database.session.remove()
+    g.pop('_login_user', None)
+    return _queries(lambda: client.get(url))
+
+
+def test_admin_users_query_count_is_constant(app, admin_client, database, monkeypatch):
+    # Pas de relecture de la version des paramètres entre deux appels mesurés
+    monkeypatch.setitem(app.config, 'SETTINGS_CACHE_TTL', 3600)
+    _seed_talents(database, 3)
+    # Premier appel : caches du processus (paramètres, connexion) remplis
+    _get(admin_client, database, '/admin/users')
+    small, response = _get(admin_client, database, '/admin/users')
+    assert response.status_code == 200
+    
+    _seed_talents(database, 30, start=3)
+    large, response = _get(admin_client, database, '/admin/users')
+    assert response.status_code == 200
+    assert 'Talents (33)' in response.get_data(as_text=True)
+    
+    assert large == small
+
+
+def test_export_profile_loads_relations_up_front(app, database):
+    _seed_talents(database, 20)
+    database.session.remove()
+    
+    loading, users = _queries(lambda: User.query.options(*UserLoad.EXPORT).filter(User.role == 'user').all())
+    assert len(users) == 20
+    assert loading <= 3
+    
+    rendering, _ = _queries(lambda: [
+        (user.residence_city.name, user.country.name, [ut.talent.name for ut in user.talents], user.phone)
+        for user in users
+    ])
+    assert rendering == 0
+
+
+def test_budget_exceeded_fails_in_tests(app, database):
+    @query_budget(1)
+    def view():
+        User.query.count()
+        Talent.query.count()
+        return 'ok'
+    
+    with app.test_request_context('/admin/users'):
+        with pytest.raises(QueryBudgetExceeded):
+            view()
@@ -0,0 +1,48 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Cache des paramètres (AppSettings) : une écriture annulée ne doit pas rester
+servie depuis le cache du processus
+"""
+
+from app.models.settings import AppSettings
+
+
+def test_set_is_visible_immediately(database):
+    AppSettings.set('site_name', 'Talento')
+    assert AppSettings.get('site_name') == 'Talento'
+    
+    AppSettings.set('site_name', 'taalentio')
+    assert AppSettings.get('site_name') == 'taalentio'
+
+
+def test_rollback_discards_cached_values(database):
+    AppSettings.set('site_name', 'Talento')
+    
+    setting = AppSettings.query.filter_by(key='site_name').one()
+    setting.value = 'Brouillon'
+    database.session.flush()
+    # Lecture dans la transaction : le cache est rechargé avec la valeur non validée
+    assert AppSettings.get('site_name') == 'Brouillon'
+    
+    database.session.rollback()
+    assert AppSettings.get('site_name') == 'Talento'
+
+
+def test_savepoint_rollback_keeps_commit_invalidation(database):
+    AppSettings.set('site_name', 'Talento')
+    
+    AppSettings.query.filter_by(key='site_name').one().value = 'taalentio'
+    database.session.flush()
+    savepoint = database.session.begin_nested()
+    database.session.add(AppSettings(key='draft', value='1'))
+    database.session.flush()
+    savepoint.rollback()
+    database.session.commit()
+    
+    assert AppSettings.get('site_name') == 'taalentio'
+    assert AppSettings.get('draft') is None
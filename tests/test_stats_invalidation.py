@@ -0,0 +1,59 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Invalidation des statistiques précalculées : les versions des périmètres modifiés
+sont incrémentées au commit, sauf si la transaction racine est annulée
+"""
+
+import pytest
+
+from app.models.stats_snapshot import StatsSnapshot
+from app.models.talent import Talent
+
+
+@pytest.fixture
+def snapshots(database):
+    for scope in ('users', 'talents', 'dashboard', 'cinema'):
+        database.session.add(StatsSnapshot(scope=scope, version=0, computed_version=0))
+    database.session.commit()
+    return database
+
+
+def _version(database, scope):
+    database.session.expire_all()
+    return StatsSnapshot.query.filter_by(scope=scope).one().version
+
+
+def test_commit_bumps_versions(snapshots):
+    snapshots.session.add(Talent(name='Chant', emoji='🎤', category='Arts', tag='general'))
+    snapshots.session.commit()
+    
+    assert _version(snapshots, 'talents') == 1
+    assert _version(snapshots, 'cinema') == 0
+
+
+def test_savepoint_rollback_keeps_pending_scopes(snapshots):
+    snapshots.session.add(Talent(name='Chant', emoji='🎤', category='Arts', tag='general'))
+    snapshots.session.flush()
+    
+    savepoint = snapshots.session.begin_nested()
+    snapshots.session.add(Talent(name='Danse', emoji='💃', category='Arts', tag='general'))
+    snapshots.session.flush()
+    savepoint.rollback()
+    
+    snapshots.session.commit()
+    assert Talent.query.count() == 1
+    assert _version(snapshots, 'talents') == 1
+
+
+def test_rollback_drops_pending_scopes(snapshots):
+    snapshots.session.add(Talent(name='Chant', emoji='🎤', category='Arts', tag='general'))
+    snapshots.session.flush()
+    snapshots.session.rollback()
+    
+    snapshots.session.commit()
+    assert _version(snapshots, 'talents') == 0
@@ -0,0 +1,63 @@
+"""
+taalentio.com
+MOA Digital Agency LLC
+Par : Aisance KALONJI
+Mail : moa@myoneart.com
+www.myoneart.com
+
+Liste de surveillance : un talent cinéma reconnu apparaît sur la page admin
+et déclenche la notification (ville et pays de résidence)
+"""
+
+from datetime import date
+
+import pytest
+
+from app.models.cinema_talent import CinemaTalent
+from app.models.settings import AppSettings
+from app.services import watchlist_service
+
+
+@pytest.fixture
+def cinema_talent(database):
+    talent = CinemaTalent(
+        first_name='Hélène', last_name='Dupont', gender='F', date_of_birth=date(1990, 5, 1),
+        id_document_type='CIN', nationality='Marocaine',
+        country_of_residence='Maroc', city_of_residence='Rabat', unique_code='MARF0001RAB',
+        email='helene.dupont@test.local'
+    )
+    talent.set_encrypted('id_document_number', 'AB123456')
+    talent.set_encrypted('phone', '+212600000000')
+    database.session.add(talent)
+    AppSettings.set('watchlist_names', 'helene dupont')
+    database.session.commit()
+    return talent
+
+
+def test_cinema_match_is_listed(cinema_talent):
+    page = watchlist_service.find_watchlist_matches()
+    
+    assert page.total == 1
+    item = page.items[0]
+    assert (item['type'], item['city'], item['country']) == ('cinema', 'Rabat', 'Maroc')
+
+
+def test_cinema_match_on_admin_page(admin_client, cinema_talent):
+    response = admin_client.get('/admin/settings/watchlist')
+    
+    assert response.status_code == 200
+    assert 'Rabat' in response.get_data(as_text=True)
+
+
+def test_cinema_match_sends_notification(cinema_talent, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        watchlist_service.email_service, 'send_watchlist_notification',
+        lambda admin_email, talent_data, talent_type: sent.append((admin_email, talent_data, talent_type)) or True
+    )
+    AppSettings.set('watchlist_enabled', True)
+    AppSettings.set('watchlist_notification_email', 'veille@test.local')
+    
+    assert watchlist_service.check_watchlist_and_notify(cinema_talent, talent_type='cinema') is True
+    admin_email, talent_data, talent_type = sent[0]
+    assert (talent_data['city'], talent_data['country'], talent_type) == ('Rabat', 'Maroc', 'cinema')